@@ -1,13 +1,8 @@
 create schema if not exists running_corgium;
 
-create table running_corgium.activities (
-  id serial primary key,
-  create_date  timestamptz,
-  strava_response json,
-  strava_id bigint
-);
-
-select * from activities;
+-- Tables are created and migrated by the application at startup
+-- (src/database/migrations.py); running_corgium.activities is
+-- range-partitioned on create_date.
 
 -- SELECT datname FROM pg_database;
 -- SELECT nspname FROM pg_catalog.pg_namespace;
@@ -16,5 +11,5 @@ select * from activities;
 -- FROM information_schema.tables
 -- WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
 --   AND table_type = 'BASE TABLE';
-
--- ALTER TABLE running_corgium.activities ALTER COLUMN create_date TYPE timestamptz USING create_date AT TIME ZONE 'CTS';
+--
+-- SELECT version, name, applied_at FROM running_corgium.schema_migrations;
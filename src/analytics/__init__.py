@@ -0,0 +1,3 @@
+"""
+Analytics: training statistics derived from stored activities
+"""
@@ -0,0 +1,42 @@
+"""Field accessors for stravalib activities.
+
+stravalib wraps quantities (``Distance``, ``Duration``) and sport types in
+its own types; these helpers return plain numbers and strings, treating
+missing values as zero.
+"""
+
+from datetime import date, datetime
+from typing import Any
+
+from stravalib.model import SummaryActivity
+
+RUN_SPORT_TYPES = frozenset({"Run", "TrailRun", "VirtualRun"})
+
+
+def number(value: Any) -> float:
+    return float(value) if value is not None else 0.0
+
+
+def athlete_key(activity: SummaryActivity) -> int | None:
+    return activity.athlete.id if activity.athlete is not None else None
+
+
+def sport_type(activity: SummaryActivity) -> str:
+    kind = activity.sport_type or activity.type
+    if kind is None:
+        return ""
+    return str(getattr(kind, "root", kind))
+
+
+def is_run(activity: SummaryActivity) -> bool:
+    return sport_type(activity) in RUN_SPORT_TYPES
+
+
+def local_start(activity: SummaryActivity) -> datetime | None:
+    """Start time on the athlete's wall clock, falling back to UTC."""
+    return activity.start_date_local or activity.start_date
+
+
+def local_day(activity: SummaryActivity) -> date | None:
+    start = local_start(activity)
+    return start.date() if start is not None else None
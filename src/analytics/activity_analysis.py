@@ -0,0 +1,188 @@
+"""Splits, grade-adjusted pace and heart-rate zones for one activity.
+
+Everything works on whole stream arrays: split boundaries are located with
+``searchsorted`` on cumulative distance and interpolated, grade-adjusted
+distance weights every segment by Minetti's energy cost of running at its
+grade, and time in zone is a ``histogram`` of heart rate weighted by time
+deltas. Results are cached by activity and ``AnalysisSettings.version``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import astuple, dataclass
+from typing import Any
+
+import numpy as np
+
+# Minetti et al. (2002), energy cost of running in J/kg/m by grade, highest
+# power first; flat ground costs 3.6.
+_MINETTI = np.array([155.4, -30.4, -43.3, 46.3, 19.5, 3.6])
+_FLAT_COST = 3.6
+# The fit is only valid within about +/-45% grade.
+_MAX_GRADE = 0.45
+DEFAULT_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class AnalysisSettings:
+    split_m: float = 1000.0
+    max_heartrate: int = 190
+    # Zone lower bounds as fractions of max heart rate (Z1..Z5).
+    zone_fractions: tuple[float, ...] = (0.5, 0.6, 0.7, 0.8, 0.9)
+    # Distance over which altitude differences define the grade.
+    grade_window_m: float = 50.0
+
+    @property
+    def version(self) -> str:
+        return hashlib.blake2b(repr(astuple(self)).encode(), digest_size=8).hexdigest()
+
+    def zone_edges(self) -> np.ndarray:
+        edges = np.array(self.zone_fractions) * self.max_heartrate
+        return np.append(edges, np.inf)
+
+
+def grade_cost_factor(grade: np.ndarray) -> np.ndarray:
+    """Energy cost relative to flat running at each grade."""
+    clipped = np.clip(grade, -_MAX_GRADE, _MAX_GRADE)
+    return np.polyval(_MINETTI, clipped) / _FLAT_COST
+
+
+def _grades(distance: np.ndarray, altitude: np.ndarray, window_m: float) -> np.ndarray:
+    """Per-segment grade over roughly ``window_m`` around each point."""
+    behind = np.searchsorted(distance, distance - window_m / 2)
+    ahead = np.minimum(
+        np.searchsorted(distance, distance + window_m / 2), len(distance) - 1
+    )
+    run = distance[ahead] - distance[behind]
+    rise = altitude[ahead] - altitude[behind]
+    point_grade = np.divide(rise, run, out=np.zeros_like(run), where=run > 0)
+    return (point_grade[1:] + point_grade[:-1]) / 2
+
+
+def _at(boundaries: np.ndarray, distance: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """``values`` interpolated where cumulative ``distance`` reaches each boundary."""
+    right = np.clip(np.searchsorted(distance, boundaries), 1, len(distance) - 1)
+    left = right - 1
+    span = distance[right] - distance[left]
+    fraction = np.divide(
+        boundaries - distance[left],
+        span,
+        out=np.zeros_like(boundaries),
+        where=span > 0,
+    )
+    return values[left] + fraction * (values[right] - values[left])
+
+
+def _pace(seconds: np.ndarray, metres: np.ndarray) -> np.ndarray:
+    return np.divide(
+        seconds * 1000,
+        metres,
+        out=np.full_like(seconds, np.nan),
+        where=metres > 0,
+    )
+
+
+def _rounded(values: np.ndarray) -> list[float | None]:
+    return [None if not np.isfinite(v) else round(float(v), 1) for v in values]
+
+
+def analyse(
+    time: Sequence[float],
+    distance: Sequence[float],
+    altitude: Sequence[float] | None = None,
+    heartrate: Sequence[float] | None = None,
+    settings: AnalysisSettings | None = None,
+) -> dict[str, Any]:
+    settings = settings or AnalysisSettings()
+    time_s = np.asarray(time, dtype=np.float64)
+    distance_m = np.maximum.accumulate(np.asarray(distance, dtype=np.float64))
+    if len(time_s) < 2 or len(distance_m) != len(time_s):
+        return {"splits": [], "gap_s_per_km": None, "zones": []}
+
+    if altitude is not None and len(altitude) == len(time_s):
+        factor = grade_cost_factor(
+            _grades(
+                distance_m,
+                np.asarray(altitude, dtype=np.float64),
+                settings.grade_window_m,
+            )
+        )
+        adjusted = np.concatenate([[0.0], np.cumsum(np.diff(distance_m) * factor)])
+    else:
+        adjusted = distance_m - distance_m[0]
+
+    total = distance_m[-1]
+    boundaries = np.append(
+        np.arange(distance_m[0] + settings.split_m, total, settings.split_m), total
+    )
+    split_distance = np.diff(boundaries, prepend=distance_m[0])
+    split_time = np.diff(_at(boundaries, distance_m, time_s), prepend=time_s[0])
+    split_adjusted = np.diff(_at(boundaries, distance_m, adjusted), prepend=0.0)
+    pace = _pace(split_time, split_distance)
+    gap = _pace(split_time, split_adjusted)
+    splits = [
+        {
+            "distance_m": round(float(d), 1),
+            "time_s": round(float(t), 1),
+            "pace_s_per_km": p,
+            "gap_s_per_km": g,
+        }
+        for d, t, p, g in zip(
+            split_distance, split_time, _rounded(pace), _rounded(gap), strict=True
+        )
+    ]
+
+    zones: list[dict[str, Any]] = []
+    if heartrate is not None and len(heartrate) == len(time_s):
+        edges = settings.zone_edges()
+        # Each interval counts at the heart rate recorded at its end.
+        seconds, _ = np.histogram(
+            np.asarray(heartrate, dtype=np.float64)[1:],
+            bins=edges,
+            weights=np.diff(time_s),
+        )
+        zones = [
+            {
+                "zone": index + 1,
+                "min_bpm": round(float(edges[index])),
+                "max_bpm": None
+                if np.isinf(edges[index + 1])
+                else round(float(edges[index + 1])),
+                "seconds": round(float(value), 1),
+            }
+            for index, value in enumerate(seconds)
+        ]
+
+    return {
+        "splits": splits,
+        "gap_s_per_km": _rounded(_pace(time_s[-1:] - time_s[:1], adjusted[-1:]))[0],
+        "zones": zones,
+    }
+
+
+class AnalysisCache:
+    """LRU of analysis results keyed by activity and settings version."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._max_size = max_size
+        self._results: OrderedDict[tuple[int, str], dict[str, Any]] = OrderedDict()
+
+    def get(
+        self, activity_id: int, settings: AnalysisSettings
+    ) -> dict[str, Any] | None:
+        key = (activity_id, settings.version)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+        return result
+
+    def put(
+        self, activity_id: int, settings: AnalysisSettings, result: dict[str, Any]
+    ) -> None:
+        self._results[(activity_id, settings.version)] = result
+        self._results.move_to_end((activity_id, settings.version))
+        while len(self._results) > self._max_size:
+            self._results.popitem(last=False)
@@ -0,0 +1,79 @@
+"""Best efforts and personal records from activity streams.
+
+``fastest_time`` finds the quickest stretch of an activity covering a target
+distance. It sweeps the cumulative distance and time streams with two
+pointers, so one pass costs O(n). The start of each stretch is
+interpolated to the exact distance. Each synced run is swept once: its
+efforts are offered to the repository, which keeps only the fastest per
+athlete and distance. Personal records therefore never need the streams
+of earlier activities again.
+"""
+
+import math
+from collections.abc import Sequence
+
+from stravalib.model import SummaryActivity
+
+from src.analytics.activities import athlete_key
+from src.database.records import PersonalRecord
+
+BEST_EFFORT_DISTANCES = {
+    "1k": 1000.0,
+    "5k": 5000.0,
+    "10k": 10000.0,
+    "half_marathon": 21097.5,
+    "marathon": 42195.0,
+}
+
+
+def fastest_time(
+    distance: Sequence[float], time: Sequence[float], target: float
+) -> float | None:
+    """Seconds of the fastest stretch covering ``target`` metres, if any."""
+    if len(distance) < 2 or distance[-1] - distance[0] < target:
+        return None
+    best = math.inf
+    start = 0
+    for end in range(1, len(distance)):
+        if distance[end] - distance[0] < target:
+            continue
+        # Keep distance[end] - distance[start] >= target > distance[end] -
+        # distance[start + 1]; start + 1 <= end since target > 0.
+        while distance[end] - distance[start + 1] >= target:
+            start += 1
+        reached = distance[end] - target
+        d0, d1 = distance[start], distance[start + 1]
+        t0, t1 = time[start], time[start + 1]
+        began = t0 + (t1 - t0) * (reached - d0) / (d1 - d0)
+        best = min(best, time[end] - began)
+    return best
+
+
+def best_efforts(distance: Sequence[float], time: Sequence[float]) -> dict[str, float]:
+    """Fastest time per ``BEST_EFFORT_DISTANCES`` entry the activity covers."""
+    efforts = {}
+    for name, target in BEST_EFFORT_DISTANCES.items():
+        elapsed = fastest_time(distance, time, target)
+        if elapsed is not None:
+            efforts[name] = elapsed
+    return efforts
+
+
+def effort_records(
+    activity: SummaryActivity, distance: Sequence[float], time: Sequence[float]
+) -> list[PersonalRecord]:
+    """The activity's best efforts as candidate personal records."""
+    athlete_id = athlete_key(activity)
+    if athlete_id is None or activity.id is None:
+        return []
+    return [
+        PersonalRecord(
+            athlete_id,
+            name,
+            BEST_EFFORT_DISTANCES[name],
+            round(elapsed, 1),
+            activity.id,
+            activity.start_date,
+        )
+        for name, elapsed in best_efforts(distance, time).items()
+    ]
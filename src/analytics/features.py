@@ -0,0 +1,313 @@
+"""Rolling training features for race prediction (docs/race_prediction.md, phase 2).
+
+Activities stream in ``(athlete, start)`` order, from the repository or a
+Parquet export, and each one yields a ``FeatureRow`` describing the
+athlete's training in the 7, 30 and 90 days before it. The activity itself
+is excluded to avoid leaking it into its own features. Each window keeps
+only the runs inside it: a deque with running sums for means, pace
+variance and the least-squares pace trend, plus a monotonic deque for the
+best pace. State is O(window) per athlete, and the stream is read once.
+
+``generate_features`` hands each athlete's activities to a process pool
+and yields rows in input order, with a bounded number of athletes in
+flight. ``repository_features`` does the same for the stored activities,
+reading the repository a page at a time as the pool drains.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import groupby, pairwise
+from typing import TYPE_CHECKING
+
+from stravalib.model import SummaryActivity
+
+from src.analytics.activities import athlete_key, is_run, number
+from src.database.activity_repository import HISTORY_PAGE_SIZE
+
+if TYPE_CHECKING:
+    from src.database.activity_repository import ActivityRepository
+
+WINDOW_DAYS = (7, 30, 90)
+WINDOW_FEATURES = (
+    "runs_per_week",
+    "distance_mean_m",
+    "duration_mean_s",
+    "pace_mean_s_per_km",
+    "pace_variance",
+    "pace_trend_s_per_km_per_day",
+    "best_pace_s_per_km",
+)
+FEATURE_NAMES = tuple(
+    f"{name}_{days}d" for days in WINDOW_DAYS for name in WINDOW_FEATURES
+) + ("cumulative_distance_m", "run_count")
+# Athletes submitted to the pool per worker before waiting for results.
+IN_FLIGHT_PER_WORKER = 4
+PARQUET_COLUMNS = ("athlete", "datetime", "distance", "duration")
+_SECONDS_PER_DAY = 86_400.0
+
+
+@dataclass(frozen=True)
+class ActivityRecord:
+    """The fields the pipeline needs, in metres and seconds."""
+
+    athlete_id: int | None
+    start: datetime
+    distance_m: float
+    duration_s: float
+    is_run: bool = True
+
+    @property
+    def pace(self) -> float | None:
+        """Seconds per kilometre, for runs with a distance."""
+        if not self.is_run or self.distance_m <= 0 or self.duration_s <= 0:
+            return None
+        return self.duration_s / (self.distance_m / 1000)
+
+    @classmethod
+    def from_activity(cls, activity: SummaryActivity) -> ActivityRecord | None:
+        if activity.start_date is None:
+            return None
+        return cls(
+            athlete_key(activity),
+            activity.start_date,
+            number(activity.distance),
+            number(activity.moving_time),
+            is_run(activity),
+        )
+
+
+@dataclass(frozen=True)
+class FeatureRow:
+    athlete_id: int | None
+    start: datetime
+    features: dict[str, float]
+
+
+class RollingWindow:
+    """Running aggregates over the runs of the last ``days`` days."""
+
+    def __init__(self, days: int) -> None:
+        self.days = days
+        # (t, distance, duration, pace); t is days since the athlete's first run.
+        self._runs: deque[tuple[float, float, float, float | None]] = deque()
+        # (t, pace) with increasing paces: the front is the window's best.
+        self._best: deque[tuple[float, float]] = deque()
+        self._distance = 0.0
+        self._duration = 0.0
+        self._paced = 0
+        self._pace = 0.0
+        self._pace_sq = 0.0
+        self._t = 0.0
+        self._t_sq = 0.0
+        self._t_pace = 0.0
+
+    def _update(
+        self, t: float, distance: float, duration: float, pace: float | None, sign: int
+    ) -> None:
+        self._distance += sign * distance
+        self._duration += sign * duration
+        if pace is not None:
+            self._paced += sign
+            self._pace += sign * pace
+            self._pace_sq += sign * pace * pace
+            self._t += sign * t
+            self._t_sq += sign * t * t
+            self._t_pace += sign * t * pace
+
+    def add(
+        self, t: float, distance: float, duration: float, pace: float | None
+    ) -> None:
+        self._runs.append((t, distance, duration, pace))
+        self._update(t, distance, duration, pace, 1)
+        if pace is not None:
+            while self._best and self._best[-1][1] >= pace:
+                self._best.pop()
+            self._best.append((t, pace))
+
+    def expire(self, now: float) -> None:
+        """Drop runs that started ``days`` or more before ``now``."""
+        cutoff = now - self.days
+        while self._runs and self._runs[0][0] <= cutoff:
+            self._update(*self._runs.popleft(), -1)
+        while self._best and self._best[0][0] <= cutoff:
+            self._best.popleft()
+
+    def features(self) -> list[float]:
+        count = len(self._runs)
+        paced = self._paced
+        nan = math.nan
+        pace_mean = self._pace / paced if paced else nan
+        variance = nan
+        trend = nan
+        if paced >= 2:
+            variance = max(self._pace_sq / paced - pace_mean * pace_mean, 0.0)
+            t_mean = self._t / paced
+            spread = self._t_sq / paced - t_mean * t_mean
+            if spread > 1e-9:
+                trend = (self._t_pace / paced - t_mean * pace_mean) / spread
+        return [
+            count / (self.days / 7),
+            self._distance / count if count else nan,
+            self._duration / count if count else nan,
+            pace_mean,
+            variance,
+            trend,
+            self._best[0][1] if self._best else nan,
+        ]
+
+
+def athlete_features(records: Sequence[ActivityRecord]) -> list[FeatureRow]:
+    """Feature rows for one athlete's records, oldest first."""
+    if not records:
+        return []
+    origin = records[0].start
+    windows = [RollingWindow(days) for days in WINDOW_DAYS]
+    cumulative = 0.0
+    runs = 0
+    rows = []
+    for record in records:
+        t = (record.start - origin).total_seconds() / _SECONDS_PER_DAY
+        values: list[float] = []
+        for window in windows:
+            window.expire(t)
+            values.extend(window.features())
+        values.extend((cumulative, float(runs)))
+        rows.append(
+            FeatureRow(
+                record.athlete_id, record.start, dict(zip(FEATURE_NAMES, values))
+            )
+        )
+        if record.is_run:
+            pace = record.pace
+            for window in windows:
+                window.add(t, record.distance_m, record.duration_s, pace)
+            cumulative += record.distance_m
+            runs += 1
+    return rows
+
+
+def _by_athlete(
+    records: Iterable[ActivityRecord],
+) -> Iterator[list[ActivityRecord]]:
+    seen: set[int | None] = set()
+    for athlete_id, group in groupby(records, key=lambda r: r.athlete_id):
+        if athlete_id in seen:
+            raise ValueError(f"Records for athlete {athlete_id} are not contiguous")
+        seen.add(athlete_id)
+        chunk = list(group)
+        for previous, current in pairwise(chunk):
+            if current.start < previous.start:
+                raise ValueError(
+                    f"Records for athlete {athlete_id} are not in start order"
+                )
+        yield chunk
+
+
+def generate_features(
+    records: Iterable[ActivityRecord], workers: int | None = None
+) -> Iterator[FeatureRow]:
+    """Feature rows for ``(athlete, start)``-ordered records.
+
+    ``workers=0`` computes in this process; otherwise athletes are spread
+    over a process pool of that size (default: one per CPU).
+    """
+    if workers == 0:
+        for chunk in _by_athlete(records):
+            yield from athlete_features(chunk)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        limit = workers * IN_FLIGHT_PER_WORKER
+        pending: deque[Future[list[FeatureRow]]] = deque()
+        for chunk in _by_athlete(records):
+            pending.append(pool.submit(athlete_features, chunk))
+            if len(pending) >= limit:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+async def repository_records(
+    repository: ActivityRepository, page_size: int = HISTORY_PAGE_SIZE
+) -> AsyncIterator[ActivityRecord]:
+    """Stored activities as records, each athlete's oldest first, streamed."""
+    async for page in repository.iter_activity_history(page_size):
+        for activity in page:
+            if (record := ActivityRecord.from_activity(activity)) is not None:
+                yield record
+
+
+async def _athlete_chunks(
+    records: AsyncIterator[ActivityRecord],
+) -> AsyncIterator[list[ActivityRecord]]:
+    chunk: list[ActivityRecord] = []
+    async for record in records:
+        if chunk and record.athlete_id != chunk[0].athlete_id:
+            yield chunk
+            chunk = []
+        chunk.append(record)
+    if chunk:
+        yield chunk
+
+
+async def repository_features(
+    repository: ActivityRepository,
+    workers: int | None = None,
+    page_size: int = HISTORY_PAGE_SIZE,
+) -> AsyncIterator[FeatureRow]:
+    """``generate_features`` over the repository's activities.
+
+    Only the page being read and the athletes in flight are held in memory.
+    """
+    chunks = _athlete_chunks(repository_records(repository, page_size))
+    if workers == 0:
+        async for chunk in chunks:
+            for row in athlete_features(chunk):
+                yield row
+        return
+
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        limit = workers * IN_FLIGHT_PER_WORKER
+        pending: deque[asyncio.Future[list[FeatureRow]]] = deque()
+        async for chunk in chunks:
+            pending.append(loop.run_in_executor(pool, athlete_features, chunk))
+            if len(pending) >= limit:
+                for row in await pending.popleft():
+                    yield row
+        while pending:
+            for row in await pending.popleft():
+                yield row
+
+
+def parquet_records(
+    path: str, columns: Sequence[str] = PARQUET_COLUMNS, batch_size: int = 65_536
+) -> Iterator[ActivityRecord]:
+    """Stream records from a Parquet export sorted by athlete and start.
+
+    ``columns`` names the athlete, start time, distance (metres) and
+    duration (seconds) columns. Every row counts as a run. Needs the
+    optional ``pyarrow`` package.
+    """
+    import pyarrow.parquet as pq
+
+    athlete, start, distance, duration = columns
+    for batch in pq.ParquetFile(path).iter_batches(
+        batch_size=batch_size, columns=list(columns)
+    ):
+        data = batch.to_pydict()
+        for row in zip(data[athlete], data[start], data[distance], data[duration]):
+            athlete_id, started, metres, seconds = row
+            if started is None or metres is None or seconds is None:
+                continue
+            yield ActivityRecord(athlete_id, started, float(metres), float(seconds))
@@ -0,0 +1,242 @@
+"""Personal heatmap tiles from activity routes.
+
+Routes are rasterised into Web Mercator ("slippy map") tiles for zoom
+levels ``MIN_ZOOM`` to ``MAX_ZOOM``. Each segment is sampled at most half a
+pixel apart, and an activity counts at most once per pixel, so a tile's
+``TILE_SIZE`` square ``uint16`` density grid holds the number of activities
+that crossed each pixel. Grids are stored zlib-compressed (``to_blob``) and
+rendered to PNG on read.
+
+A new activity only produces the tiles its route touches, and repositories
+add those into the stored grids. A full build shards the work by the
+``MIN_ZOOM`` tile that contains each output tile: a route goes to every
+shard its bounding box overlaps, shards render in a process pool, and no
+two shards produce the same tile.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import struct
+import zlib
+from collections import defaultdict, deque
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+MIN_ZOOM = 8
+MAX_ZOOM = 16
+TILE_SIZE = 256
+# Consecutive points further apart are GPS gaps, not paths.
+MAX_SEGMENT_DEGREES = 0.02
+# Passes at which a pixel reaches full intensity.
+SATURATION = 32
+# Shards submitted to the pool per worker before waiting for results.
+IN_FLIGHT_PER_WORKER = 4
+_MAX_LATITUDE = 85.0511287798
+_SAMPLE_SPACING_PX = 0.5
+_TILE_BITS = 8  # log2(TILE_SIZE)
+
+TileKey = tuple[int, int, int]
+
+
+def tile_bounds(zoom: int) -> int:
+    """Number of tiles along each axis at ``zoom``."""
+    return 1 << zoom
+
+
+def project(points: np.ndarray, zoom: int) -> np.ndarray:
+    """Global pixel ``(x, y)`` at ``zoom`` for ``(lat, lng)`` points."""
+    lat = np.radians(np.clip(points[:, 0], -_MAX_LATITUDE, _MAX_LATITUDE))
+    scale = TILE_SIZE * tile_bounds(zoom)
+    x = (points[:, 1] + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * scale
+    return np.column_stack([x, y])
+
+
+def _pixels(points: np.ndarray, zoom: int) -> np.ndarray:
+    """Distinct global pixels the route passes through at ``zoom``."""
+    if len(points) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    pixels = project(points, zoom)
+    segments = np.diff(pixels, axis=0)
+    gaps = np.abs(np.diff(points, axis=0)).max(axis=1) > MAX_SEGMENT_DEGREES
+    lengths = np.hypot(segments[:, 0], segments[:, 1])
+    steps = np.where(gaps, 1, np.ceil(lengths / _SAMPLE_SPACING_PX)).astype(np.int64)
+    steps = np.maximum(steps, 1)
+    segment_of = np.repeat(np.arange(len(segments)), steps)
+    first_sample = np.repeat(np.cumsum(steps) - steps, steps)
+    fraction = (np.arange(len(segment_of)) - first_sample) / steps[segment_of]
+    fraction[gaps[segment_of]] = 0.0
+    samples = np.concatenate(
+        [pixels[segment_of] + segments[segment_of] * fraction[:, None], pixels[-1:]]
+    )
+    return np.unique(np.floor(samples).astype(np.int64), axis=0)
+
+
+def _accumulate(
+    tiles: dict[TileKey, np.ndarray], zoom: int, pixels: np.ndarray
+) -> None:
+    """Count each of the route's pixels once in its tile's grid."""
+    tile_xy = pixels >> _TILE_BITS
+    local = pixels & (TILE_SIZE - 1)
+    keys, inverse = np.unique(tile_xy, axis=0, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind="stable")
+    bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(keys)))[:-1]
+    for (x, y), mine in zip(keys.tolist(), np.split(local[order], bounds)):
+        grid = tiles.get((zoom, x, y))
+        if grid is None:
+            grid = tiles[(zoom, x, y)] = np.zeros((TILE_SIZE, TILE_SIZE), np.uint16)
+        row, column = mine[:, 1], mine[:, 0]
+        # Saturate instead of wrapping around.
+        grid[row, column] = np.minimum(grid[row, column].astype(np.int64) + 1, 65535)
+
+
+def route_tiles(
+    points: np.ndarray, shard: tuple[int, int] | None = None
+) -> dict[TileKey, np.ndarray]:
+    """Density grids of every tile one route touches.
+
+    With ``shard``, only tiles inside that ``MIN_ZOOM`` tile are produced.
+    """
+    tiles: dict[TileKey, np.ndarray] = {}
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+        pixels = _pixels(points, zoom)
+        if shard is not None:
+            ancestor = pixels >> (zoom - MIN_ZOOM + _TILE_BITS)
+            pixels = pixels[(ancestor[:, 0] == shard[0]) & (ancestor[:, 1] == shard[1])]
+        _accumulate(tiles, zoom, pixels)
+    return tiles
+
+
+def add_tiles(
+    total: dict[TileKey, np.ndarray], tiles: dict[TileKey, np.ndarray]
+) -> None:
+    for key, grid in tiles.items():
+        existing = total.get(key)
+        if existing is None:
+            total[key] = grid
+        else:
+            total[key] = np.minimum(existing.astype(np.int64) + grid, 65535).astype(
+                np.uint16
+            )
+
+
+def _render_shard(
+    shard: tuple[int, int], routes: list[np.ndarray]
+) -> dict[TileKey, np.ndarray]:
+    tiles: dict[TileKey, np.ndarray] = {}
+    for points in routes:
+        add_tiles(tiles, route_tiles(points, shard))
+    return tiles
+
+
+def shards_for(points: np.ndarray) -> list[tuple[int, int]]:
+    """``MIN_ZOOM`` tiles overlapped by the route's bounding box."""
+    if len(points) == 0:
+        return []
+    corners = (
+        project(np.array([points.min(axis=0), points.max(axis=0)]), MIN_ZOOM)
+        // TILE_SIZE
+    )
+    last = tile_bounds(MIN_ZOOM) - 1
+    xs = np.clip(corners[:, 0], 0, last).astype(int)
+    ys = np.clip(corners[:, 1], 0, last).astype(int)
+    return [
+        (x, y)
+        for x in range(xs.min(), xs.max() + 1)
+        for y in range(ys.min(), ys.max() + 1)
+    ]
+
+
+def build_heatmap(
+    routes: Iterable[np.ndarray], workers: int | None = None
+) -> Iterator[tuple[TileKey, np.ndarray]]:
+    """Every tile of a full rebuild from decoded ``(lat, lng)`` routes.
+
+    ``workers=0`` renders in this process; otherwise shards are spread
+    over a process pool of that size (default: one per CPU).
+    """
+    by_shard: dict[tuple[int, int], list[np.ndarray]] = defaultdict(list)
+    for points in routes:
+        for shard in shards_for(points):
+            by_shard[shard].append(points)
+
+    if workers == 0:
+        for shard, members in by_shard.items():
+            yield from _render_shard(shard, members).items()
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        limit = workers * IN_FLIGHT_PER_WORKER
+        pending: deque[Future[dict[TileKey, np.ndarray]]] = deque()
+        for shard, members in by_shard.items():
+            pending.append(pool.submit(_render_shard, shard, members))
+            if len(pending) >= limit:
+                yield from pending.popleft().result().items()
+        while pending:
+            yield from pending.popleft().result().items()
+
+
+def to_blob(grid: np.ndarray) -> bytes:
+    return zlib.compress(grid.astype("<u2").tobytes())
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return (
+        np.frombuffer(zlib.decompress(blob), dtype="<u2")
+        .reshape(TILE_SIZE, TILE_SIZE)
+        .astype(np.uint16)
+    )
+
+
+def merge_tile_blob(existing: bytes | None, addition: bytes) -> bytes:
+    """Stored grid ``existing`` with ``addition`` added, as a blob."""
+    if existing is None:
+        return addition
+    total = from_blob(existing).astype(np.int64) + from_blob(addition)
+    return to_blob(np.minimum(total, 65535))
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """8-bit RGBA PNG of an ``(height, width, 4)`` array."""
+    height, width, _ = rgba.shape
+    # Filter type 0 (none) before every row.
+    rows = np.concatenate(
+        [np.zeros((height, 1), np.uint8), rgba.astype(np.uint8).reshape(height, -1)],
+        axis=1,
+    )
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(rows.tobytes()))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def render_tile(grid: np.ndarray | None) -> bytes:
+    """The density grid as a transparent-background heat PNG."""
+    if grid is None:
+        grid = np.zeros((TILE_SIZE, TILE_SIZE), np.uint16)
+    intensity = np.minimum(np.log1p(grid) / math.log1p(SATURATION), 1.0)
+    rgba = np.zeros((*grid.shape, 4), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 1] = np.round(64 + 191 * intensity)
+    rgba[..., 2] = np.round(255 * np.clip(2 * intensity - 1, 0, 1))
+    rgba[..., 3] = np.where(grid > 0, np.round(128 + 127 * intensity), 0)
+    return encode_png(rgba)
+
+
+def decode_routes(encoded: Sequence[str]) -> list[np.ndarray]:
+    """Decoded routes for encoded polylines, skipping empty ones."""
+    from src.analytics.route_geometry import decode_polylines
+
+    return [route for route in decode_polylines(encoded) if len(route) >= 2]
@@ -0,0 +1,123 @@
+"""Mean-maximal speed and heart-rate curves.
+
+For every duration on ``DURATION_GRID`` (5 seconds to 3 hours, log-spaced),
+an activity's curve holds its best average speed and heart rate over any
+window of that length. The streams are resampled to 1 Hz and turned into
+cumulative sums, so each window average is one vectorised difference.
+
+Curves are stored as ``float32`` blobs (``to_bytes``). Repositories keep an
+envelope per athlete and season (``"all"`` and the calendar year), which is
+the element-wise maximum of the activity curves merged into it. A new
+activity costs one merge, and a query reads one envelope however many
+activities fed it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import numpy as np
+
+ALL_SEASONS = "all"
+DURATION_GRID = np.unique(np.round(np.geomspace(5, 3 * 3600, 40)).astype(np.int64))
+_BLOB_DTYPE = np.dtype("<f4")
+
+
+def seasons_for(day: date) -> list[str]:
+    return [ALL_SEASONS, str(day.year)]
+
+
+def _resample(time: Sequence[float], values: Sequence[float]) -> np.ndarray:
+    """``values`` at every whole second from the first to the last sample."""
+    time_s = np.asarray(time, dtype=np.float64)
+    return np.interp(
+        np.arange(time_s[0], time_s[-1] + 1), time_s, np.asarray(values, np.float64)
+    )
+
+
+def _window_maxima(cumulative: np.ndarray) -> np.ndarray:
+    """Best ``cumulative[i + d] - cumulative[i]`` for each grid duration ``d``."""
+    out = np.full(len(DURATION_GRID), np.nan)
+    for index, duration in enumerate(DURATION_GRID):
+        if duration >= len(cumulative):
+            break
+        out[index] = np.max(cumulative[duration:] - cumulative[:-duration])
+    return out
+
+
+@dataclass
+class MeanMaxCurve:
+    """Best average speed (m/s) and heart rate per ``DURATION_GRID`` entry.
+
+    NaN marks durations longer than the activity (or without heart rate).
+    """
+
+    speed: np.ndarray
+    heartrate: np.ndarray
+
+    @classmethod
+    def empty(cls) -> MeanMaxCurve:
+        return cls(
+            np.full(len(DURATION_GRID), np.nan), np.full(len(DURATION_GRID), np.nan)
+        )
+
+    @classmethod
+    def from_streams(
+        cls,
+        time: Sequence[float],
+        distance: Sequence[float],
+        heartrate: Sequence[float] | None = None,
+    ) -> MeanMaxCurve:
+        if len(time) < 2:
+            return cls.empty()
+        speed = _window_maxima(_resample(time, distance)) / DURATION_GRID
+        hr = np.full(len(DURATION_GRID), np.nan)
+        if heartrate is not None and len(heartrate) == len(time):
+            per_second = _resample(time, heartrate)
+            cumulative = np.concatenate([[0.0], np.cumsum(per_second)])
+            hr = _window_maxima(cumulative) / DURATION_GRID
+        return cls(speed, hr)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> MeanMaxCurve:
+        values = np.frombuffer(blob, dtype=_BLOB_DTYPE).astype(np.float64)
+        if len(values) != 2 * len(DURATION_GRID):
+            # Stored for another grid; treat as unknown rather than misalign.
+            return cls.empty()
+        speed, heartrate = values.reshape(2, -1)
+        return cls(speed, heartrate)
+
+    def to_bytes(self) -> bytes:
+        return (
+            np.concatenate([self.speed, self.heartrate]).astype(_BLOB_DTYPE).tobytes()
+        )
+
+    def merge(self, other: MeanMaxCurve) -> MeanMaxCurve:
+        """Element-wise maximum, ignoring NaN gaps."""
+        return MeanMaxCurve(
+            np.fmax(self.speed, other.speed), np.fmax(self.heartrate, other.heartrate)
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        with np.errstate(divide="ignore"):
+            pace = 1000 / self.speed
+
+        def column(values: np.ndarray) -> list[float | None]:
+            return [None if not np.isfinite(v) else round(float(v), 2) for v in values]
+
+        return {
+            "durations_s": DURATION_GRID.tolist(),
+            "pace_s_per_km": column(pace),
+            "speed_m_per_s": column(self.speed),
+            "heartrate": column(self.heartrate),
+        }
+
+
+def merge_blob(existing: bytes | None, curve: MeanMaxCurve) -> bytes:
+    """``curve`` max-merged into a stored envelope blob."""
+    if existing is None:
+        return curve.to_bytes()
+    return MeanMaxCurve.from_bytes(existing).merge(curve).to_bytes()
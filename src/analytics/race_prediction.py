@@ -0,0 +1,391 @@
+"""Race time predictions from an athlete's stored runs.
+
+The reference performance is the run with the highest VDOT (Jack Daniels'
+running formula) among the last ``REFERENCE_WINDOW_DAYS`` days of runs of
+at least ``MIN_REFERENCE_DISTANCE_M``. Two baselines extrapolate from it:
+Riegel's ``T2 = T1 * (D2 / D1) ** 1.06`` and the race time at the same
+VDOT. A trained gradient-boosting model (see ``docs/race_prediction.md``)
+can be plugged in through ``race_model_path``; it receives the
+``MODEL_FEATURES`` row for each athlete and distance.
+
+``predict_batch`` evaluates many athletes and distances as one array
+operation. ``RacePredictor`` loads an athlete's runs as arrays on their
+first request and caches their predictions until one of their activities is
+inserted or the day changes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+import numpy as np
+from numpy.typing import ArrayLike
+from stravalib.model import SummaryActivity
+
+from src.analytics.activities import athlete_key, is_run, local_day, number
+from src.database.activity_repository import activity_digest
+from src.observability.tracing import span
+
+if TYPE_CHECKING:
+    from src.database.activity_repository import ActivityRepository
+
+RACE_DISTANCES = {
+    "5k": 5000.0,
+    "10k": 10000.0,
+    "half_marathon": 21097.5,
+    "marathon": 42195.0,
+}
+RIEGEL_EXPONENT = 1.06
+REFERENCE_WINDOW_DAYS = 180
+MIN_REFERENCE_DISTANCE_M = 3000.0
+VOLUME_WINDOW_DAYS = 28
+MODEL_FEATURES = (
+    "distance_m",
+    "vdot",
+    "riegel_s",
+    "weekly_distance_m",
+    "runs_28d",
+)
+# Race durations searched by vdot_time, in minutes.
+_VDOT_SEARCH_MINUTES = (1.0, 2000.0)
+_VDOT_SEARCH_STEPS = 48
+
+
+class RaceModel(Protocol):
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Race times in seconds for ``MODEL_FEATURES`` rows."""
+
+
+def _oxygen_cost(speed_m_per_min: np.ndarray) -> np.ndarray:
+    return -4.60 + 0.182258 * speed_m_per_min + 0.000104 * speed_m_per_min**2
+
+
+def _sustainable_fraction(minutes: np.ndarray) -> np.ndarray:
+    return (
+        0.8
+        + 0.1894393 * np.exp(-0.012778 * minutes)
+        + 0.2989558 * np.exp(-0.1932605 * minutes)
+    )
+
+
+def vdot(distance_m: ArrayLike, time_s: ArrayLike) -> np.ndarray:
+    minutes = np.asarray(time_s, dtype=np.float64) / 60
+    return _oxygen_cost(np.asarray(distance_m) / minutes) / _sustainable_fraction(
+        minutes
+    )
+
+
+def vdot_time(vdot_value: ArrayLike, distance_m: ArrayLike) -> np.ndarray:
+    """Race time in seconds at ``vdot_value`` (arrays broadcast).
+
+    VDOT falls as the time grows, so this bisects every element at once.
+    """
+    target, distance = np.broadcast_arrays(
+        np.asarray(vdot_value, dtype=np.float64), np.asarray(distance_m)
+    )
+    low = np.full(target.shape, _VDOT_SEARCH_MINUTES[0])
+    high = np.full(target.shape, _VDOT_SEARCH_MINUTES[1])
+    for _ in range(_VDOT_SEARCH_STEPS):
+        middle = (low + high) / 2
+        too_fast = vdot(distance, middle * 60) > target
+        low = np.where(too_fast, middle, low)
+        high = np.where(too_fast, high, middle)
+    return (low + high) / 2 * 60
+
+
+def riegel_time(
+    reference_distance_m: ArrayLike,
+    reference_time_s: ArrayLike,
+    distance_m: ArrayLike,
+) -> np.ndarray:
+    return (
+        np.asarray(reference_time_s)
+        * (np.asarray(distance_m) / np.asarray(reference_distance_m)) ** RIEGEL_EXPONENT
+    )
+
+
+@dataclass
+class RunLog:
+    """One athlete's runs as parallel arrays (day ordinal, metres, seconds)."""
+
+    days: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    distance_m: np.ndarray = field(default_factory=lambda: np.empty(0))
+    time_s: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    @classmethod
+    def from_activities(cls, activities: Sequence[SummaryActivity]) -> RunLog:
+        log = cls()
+        for activity in activities:
+            log.append(activity)
+        return log
+
+    def append(self, activity: SummaryActivity) -> bool:
+        day = local_day(activity)
+        time_s = number(activity.moving_time)
+        if day is None or not is_run(activity) or time_s <= 0:
+            return False
+        self.days = np.append(self.days, day.toordinal())
+        self.distance_m = np.append(self.distance_m, number(activity.distance))
+        self.time_s = np.append(self.time_s, time_s)
+        return True
+
+    def reference(self, today: date) -> tuple[float, float, float] | None:
+        """``(distance_m, time_s, vdot)`` of the best recent run."""
+        recent = (self.days > today.toordinal() - REFERENCE_WINDOW_DAYS) & (
+            self.distance_m >= MIN_REFERENCE_DISTANCE_M
+        )
+        if not recent.any():
+            return None
+        scores = vdot(self.distance_m[recent], self.time_s[recent])
+        best = int(np.argmax(scores))
+        return (
+            float(self.distance_m[recent][best]),
+            float(self.time_s[recent][best]),
+            float(scores[best]),
+        )
+
+    def volume(self, today: date) -> tuple[float, int]:
+        """Weekly distance and run count over the last ``VOLUME_WINDOW_DAYS``."""
+        recent = self.days > today.toordinal() - VOLUME_WINDOW_DAYS
+        weeks = VOLUME_WINDOW_DAYS / 7
+        return float(self.distance_m[recent].sum()) / weeks, int(recent.sum())
+
+
+def predict_batch(
+    logs: Sequence[RunLog],
+    distances_m: Sequence[float],
+    today: date,
+    model: RaceModel | None = None,
+) -> dict[str, np.ndarray]:
+    """Predict every distance for every athlete in one vectorised pass.
+
+    Returns ``(len(logs), len(distances_m))`` arrays of seconds keyed by
+    method (``riegel``, ``vdot`` and, with a model, ``model``), plus the
+    reference ``vdot_score`` per athlete. Athletes without a reference run
+    get NaN.
+    """
+    references = np.full((len(logs), 3), np.nan)
+    volumes = np.zeros((len(logs), 2))
+    for row, log in enumerate(logs):
+        reference = log.reference(today)
+        if reference is not None:
+            references[row] = reference
+        volumes[row] = log.volume(today)
+
+    distances = np.asarray(distances_m, dtype=np.float64)[np.newaxis, :]
+    reference_distance = references[:, 0:1]
+    reference_time = references[:, 1:2]
+    score = references[:, 2:3]
+    known = ~np.isnan(score)
+
+    riegel = riegel_time(reference_distance, reference_time, distances)
+    vdot_times = np.full(riegel.shape, np.nan)
+    rows = known[:, 0]
+    if rows.any():
+        vdot_times[rows] = vdot_time(score[rows], distances)
+    predictions = {
+        "riegel": riegel,
+        "vdot": vdot_times,
+        "vdot_score": score[:, 0],
+    }
+
+    if model is not None:
+        shape = riegel.shape
+        features = np.column_stack(
+            [
+                np.broadcast_to(distances, shape).ravel(),
+                np.broadcast_to(score, shape).ravel(),
+                riegel.ravel(),
+                np.broadcast_to(volumes[:, 0:1], shape).ravel(),
+                np.broadcast_to(volumes[:, 1:2], shape).ravel(),
+            ]
+        )
+        modelled = np.full(features.shape[0], np.nan)
+        usable = ~np.isnan(features).any(axis=1)
+        if usable.any():
+            modelled[usable] = model.predict(features[usable])
+        predictions["model"] = modelled.reshape(shape)
+    return predictions
+
+
+class TreeEnsemble:
+    """Gradient-boosted regression trees stored as one structured ``.npy``.
+
+    Each row is a node: ``feature`` (-1 for leaves), ``threshold``,
+    absolute ``left``/``right`` child indices and the leaf ``value``; ``root``
+    lists each tree's first node. Rows go left when
+    ``features[feature] <= threshold``. The prediction is the sum of the
+    leaves reached. The arrays are memory-mapped, so loading costs no reads
+    until the first prediction.
+    """
+
+    NODE_DTYPE = np.dtype(
+        [
+            ("feature", "<i4"),
+            ("threshold", "<f8"),
+            ("left", "<i4"),
+            ("right", "<i4"),
+            ("value", "<f8"),
+        ]
+    )
+
+    def __init__(self, nodes: np.ndarray, roots: np.ndarray) -> None:
+        self.nodes = nodes
+        self.roots = roots
+
+    @classmethod
+    def load(cls, path: Path) -> TreeEnsemble:
+        nodes = np.load(path, mmap_mode="r")
+        roots = np.load(path.with_suffix(".roots.npy"), mmap_mode="r")
+        return cls(nodes, roots)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        feature = self.nodes["feature"]
+        threshold = self.nodes["threshold"]
+        left = self.nodes["left"]
+        right = self.nodes["right"]
+        value = self.nodes["value"]
+        rows = np.arange(features.shape[0])
+        total = np.zeros(features.shape[0])
+        for root in self.roots:
+            node = np.full(features.shape[0], root)
+            while True:
+                split = feature[node]
+                inner = split >= 0
+                if not inner.any():
+                    break
+                goes_left = features[rows, np.where(inner, split, 0)] <= threshold[node]
+                node = np.where(
+                    inner, np.where(goes_left, left[node], right[node]), node
+                )
+            total += value[node]
+        return total
+
+
+@functools.cache
+def load_race_model(path: str) -> RaceModel:
+    """Load the model artifact once per process.
+
+    ``.npy`` files are ``TreeEnsemble`` exports (memory-mapped); ``.txt``
+    files are LightGBM models, which need the optional ``lightgbm`` package.
+    """
+    artifact = Path(path)
+    if artifact.suffix == ".npy":
+        model: RaceModel = TreeEnsemble.load(artifact)
+    elif artifact.suffix == ".txt":
+        import lightgbm
+
+        model = lightgbm.Booster(model_file=str(artifact))
+    else:
+        raise ValueError(f"Unsupported race model artifact: {path}")
+    logging.info(f"Loaded race model from {path}")
+    return model
+
+
+@dataclass(frozen=True)
+class RacePrediction:
+    distance: str
+    distance_m: float
+    riegel_s: float | None
+    vdot_s: float | None
+    model_s: float | None = None
+
+
+def _seconds(value: Any) -> float | None:
+    return None if math.isnan(value) else round(float(value), 1)
+
+
+class RacePredictor:
+    """Per-athlete race predictions cached between requests."""
+
+    def __init__(
+        self, repository: ActivityRepository, model: RaceModel | None = None
+    ) -> None:
+        self._repository = repository
+        self._model = model
+        self._logs: dict[int, RunLog] = {}
+        self._predictions: dict[int, tuple[date, list[RacePrediction]]] = {}
+        # Repository digest each athlete's run log reflects.
+        self._digests: dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def _load(self, athlete_id: int) -> None:
+        # Read before the history so inserts racing the read force a reload.
+        digest = self._repository.get_sync_state().digest
+        with span(
+            "race_prediction.reload", {"strava.athlete_id": str(athlete_id)}
+        ) as reload_span:
+            activities = await self._repository.get_activity_history(athlete_id)
+            reload_span.set_attribute("activity.count", len(activities))
+        self._logs[athlete_id] = RunLog.from_activities(activities)
+        self._predictions.pop(athlete_id, None)
+        self._digests[athlete_id] = digest
+
+    def _stale(self, athlete_ids: Sequence[int]) -> list[int]:
+        digest = self._repository.get_sync_state().digest
+        return [a for a in athlete_ids if self._digests.get(a) != digest]
+
+    async def predict(
+        self, athlete_ids: Sequence[int], today: date
+    ) -> dict[int, list[RacePrediction]]:
+        """Predictions for every athlete in ``athlete_ids``; misses are batched."""
+        if self._stale(athlete_ids):
+            async with self._lock:
+                for athlete_id in self._stale(athlete_ids):
+                    await self._load(athlete_id)
+
+        results: dict[int, list[RacePrediction]] = {}
+        missing = []
+        for athlete_id in athlete_ids:
+            cached = self._predictions.get(athlete_id)
+            if cached is not None and cached[0] == today:
+                results[athlete_id] = cached[1]
+            else:
+                missing.append(athlete_id)
+        if not missing:
+            return results
+
+        names = list(RACE_DISTANCES)
+        with span("race_prediction.batch", {"athlete.count": len(missing)}):
+            batch = predict_batch(
+                [self._logs.get(athlete_id, RunLog()) for athlete_id in missing],
+                [RACE_DISTANCES[name] for name in names],
+                today,
+                self._model,
+            )
+        for row, athlete_id in enumerate(missing):
+            predictions = [
+                RacePrediction(
+                    name,
+                    RACE_DISTANCES[name],
+                    _seconds(batch["riegel"][row, column]),
+                    _seconds(batch["vdot"][row, column]),
+                    _seconds(batch["model"][row, column]) if "model" in batch else None,
+                )
+                for column, name in enumerate(names)
+            ]
+            self._predictions[athlete_id] = (today, predictions)
+            results[athlete_id] = predictions
+        return results
+
+    def record(self, activity: SummaryActivity) -> None:
+        """Apply an activity the repository just inserted."""
+        if activity.id is None:
+            return
+        # Other athletes' logs are unaffected, so stay as fresh as they were.
+        change = activity_digest(activity.id)
+        for athlete_id in self._digests:
+            self._digests[athlete_id] ^= change
+        key = athlete_key(activity)
+        if key is None or key not in self._logs:
+            return
+        if self._logs[key].append(activity):
+            self._predictions.pop(key, None)
@@ -0,0 +1,122 @@
+"""Weekly, monthly and yearly training totals.
+
+Each activity contributes to one bucket per period of its athlete's totals,
+keyed by the bucket's first day on the athlete's local calendar (ISO weeks
+start on Monday). Repositories store the buckets and apply ``rollup_deltas``
+whenever an activity is written, so reads cost O(buckets). ``rebuild_plan``
+and ``compute_rollups`` recompute a date range from the stored activities to
+repair drift.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from stravalib.model import SummaryActivity
+
+from src.analytics.activities import athlete_key, is_run, local_day, number
+from src.database.records import Rollup
+
+PERIODS = ("week", "month", "year")
+
+
+def validate_period(period: str) -> str:
+    if period not in PERIODS:
+        raise ValueError(f"Unknown rollup period: {period}")
+    return period
+
+
+def bucket_start(period: str, day: date) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_bucket(period: str, start: date) -> date:
+    if period == "week":
+        return start + timedelta(days=7)
+    if period == "month":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    return start.replace(year=start.year + 1)
+
+
+def rollup_deltas(activity: SummaryActivity, sign: int = 1) -> list[Rollup]:
+    """The activity's contribution to each period's bucket.
+
+    ``sign=-1`` gives the contribution to remove, e.g. before applying an
+    edited version of the activity. Activities without an athlete belong to
+    no one's totals and contribute nothing.
+    """
+    athlete_id = athlete_key(activity)
+    day = local_day(activity)
+    if athlete_id is None or day is None:
+        return []
+    return [
+        Rollup(
+            athlete_id,
+            period,
+            bucket_start(period, day),
+            activity_count=sign,
+            run_count=sign if is_run(activity) else 0,
+            distance_m=sign * number(activity.distance),
+            moving_time_s=sign * number(activity.moving_time),
+            elapsed_time_s=sign * number(activity.elapsed_time),
+            elevation_gain_m=sign * number(activity.total_elevation_gain),
+        )
+        for period in PERIODS
+    ]
+
+
+@dataclass(frozen=True)
+class RebuildPlan:
+    """Buckets to recompute for a repair of ``start``..``end``.
+
+    ``ranges`` maps each period to its first and last bucket start; the
+    activities needed are those whose local day lies in
+    ``window_start`` <= day < ``window_end``.
+    """
+
+    ranges: dict[str, tuple[date, date]]
+    window_start: date
+    window_end: date
+
+    def covers(self, period: str, bucket: date) -> bool:
+        first, last = self.ranges[period]
+        return first <= bucket <= last
+
+
+def rebuild_plan(start: date, end: date) -> RebuildPlan:
+    if end < start:
+        raise ValueError("Rebuild range ends before it starts")
+    ranges = {
+        period: (bucket_start(period, start), bucket_start(period, end))
+        for period in PERIODS
+    }
+    window_start = min(first for first, _ in ranges.values())
+    window_end = max(next_bucket(period, last) for period, (_, last) in ranges.items())
+    return RebuildPlan(ranges, window_start, window_end)
+
+
+def compute_rollups(
+    activities: Iterable[SummaryActivity], plan: RebuildPlan
+) -> list[Rollup]:
+    """Fresh buckets for every period in ``plan``, built from ``activities``."""
+    buckets: dict[tuple[int, str, date], Rollup] = {}
+    for activity in activities:
+        for delta in rollup_deltas(activity):
+            if not plan.covers(delta.period, delta.bucket_start):
+                continue
+            key = (delta.athlete_id, delta.period, delta.bucket_start)
+            if key in buckets:
+                buckets[key].add(delta)
+            else:
+                buckets[key] = delta
+    return sorted(
+        buckets.values(), key=lambda r: (r.athlete_id, r.period, r.bucket_start)
+    )
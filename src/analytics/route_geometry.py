@@ -0,0 +1,184 @@
+"""Route geometry for activity lists: decoding, simplification, thumbnails.
+
+Strava's ``map.summary_polyline`` is an encoded polyline (precision 5).
+``decode_polylines`` decodes a whole page of them in one NumPy pass: the
+characters of every polyline are concatenated, split into varints where the
+continuation bit is clear and summed per polyline. ``simplify`` is an
+iterative Douglas-Peucker with vectorised distances, run at the tolerance of
+a ``DETAIL_TOLERANCES`` level. The simplified route is re-encoded and drawn
+as a small SVG polyline, and ``RouteCache`` keeps both per activity and
+level.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+# Douglas-Peucker tolerance per level of detail, in degrees of latitude
+# (1e-4 is about 11 m).
+DETAIL_TOLERANCES = {"low": 1e-3, "medium": 2.5e-4, "high": 5e-5}
+THUMBNAIL_SIZE = 64
+DEFAULT_CACHE_SIZE = 2048
+_PRECISION = 1e5
+_THUMBNAIL_PADDING = 4
+
+
+def decode_polylines(encoded: Sequence[str]) -> list[np.ndarray]:
+    """``(n, 2)`` arrays of ``(lat, lng)`` per encoded polyline.
+
+    Malformed polylines decode to an empty array.
+    """
+    lengths = np.array([len(text) for text in encoded], dtype=np.int64)
+    raw = np.frombuffer("".join(encoded).encode("ascii"), dtype=np.uint8)
+    chunks = raw.astype(np.int64) - 63
+    ends = (chunks & 0x20) == 0
+
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    # Varints start after every byte without the continuation bit, and at
+    # every polyline so a truncated one cannot run into the next.
+    starts_here = np.concatenate([[True], ends[:-1]])
+    starts_here[offsets[:-1][lengths > 0]] = True
+    starts = np.flatnonzero(starts_here)
+    value_of = np.cumsum(starts_here) - 1
+    shift = 5 * (np.arange(len(chunks)) - starts[value_of])
+    values = (
+        np.add.reduceat((chunks & 0x1F) << shift, starts)
+        if len(chunks)
+        else np.zeros(0, dtype=np.int64)
+    )
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    value_offsets = np.concatenate([[0], np.cumsum(starts_here)])[offsets]
+
+    routes = []
+    for index, length in enumerate(lengths):
+        first, last = value_offsets[index], value_offsets[index + 1]
+        complete = length == 0 or ends[offsets[index + 1] - 1]
+        if not complete or (last - first) % 2:
+            routes.append(np.zeros((0, 2)))
+            continue
+        pairs = deltas[first:last].reshape(-1, 2)
+        routes.append(np.cumsum(pairs, axis=0) / _PRECISION)
+    return routes
+
+
+def encode_polyline(points: np.ndarray) -> str:
+    """Encode ``(lat, lng)`` points at precision 5."""
+    scaled = np.round(np.asarray(points, dtype=np.float64) * _PRECISION)
+    start = np.zeros((1, 2), dtype=np.int64)
+    deltas: np.ndarray = np.diff(scaled.astype(np.int64), axis=0, prepend=start)
+    shifted = deltas.ravel() << 1
+    zigzag: np.ndarray = np.where(shifted < 0, ~shifted, shifted)
+    out: list[str] = []
+    for value in zigzag.tolist():
+        while value >= 0x20:
+            out.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        out.append(chr(value + 63))
+    return "".join(out)
+
+
+def _planar(points: np.ndarray) -> np.ndarray:
+    """``(x, y)`` in degrees of latitude, with longitude scaled by latitude."""
+    if len(points) == 0:
+        return np.zeros((0, 2))
+    scale = np.cos(np.radians(points[:, 0].mean()))
+    return np.column_stack([points[:, 1] * scale, points[:, 0]])
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker: the points no more than ``tolerance`` off the route."""
+    if len(points) < 3:
+        return points
+    xy = _planar(points)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = xy[last] - xy[first]
+        offsets = xy[first + 1 : last] - xy[first]
+        length = np.hypot(*segment)
+        if length > 0:
+            cross = segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]
+            distances = np.abs(cross) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+    return points[keep]
+
+
+def svg_thumbnail(points: np.ndarray, size: int = THUMBNAIL_SIZE) -> str:
+    """The route as a square SVG polyline drawn in ``currentColor``."""
+    header = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {size} {size}">'
+    )
+    if len(points) < 2:
+        return header + "</svg>"
+    xy = _planar(points)
+    low = xy.min(axis=0)
+    extent = max(float((xy.max(axis=0) - low).max()), 1e-9)
+    inner = size - 2 * _THUMBNAIL_PADDING
+    scaled = (xy - low) / extent * inner
+    # Centre the shorter side and flip y, which grows downwards in SVG.
+    scaled += (inner - scaled.max(axis=0)) / 2 + _THUMBNAIL_PADDING
+    scaled[:, 1] = size - scaled[:, 1]
+    coordinates = " ".join(f"{x:.1f},{y:.1f}" for x, y in scaled.tolist())
+    return (
+        header
+        + '<polyline fill="none" stroke="currentColor" stroke-width="2" '
+        + f'stroke-linejoin="round" stroke-linecap="round" points="{coordinates}"/>'
+        + "</svg>"
+    )
+
+
+@dataclass(frozen=True)
+class RouteGeometry:
+    polyline: str
+    svg: str
+    points: int
+
+
+def build_geometries(encoded: Sequence[str], detail: str) -> list[RouteGeometry]:
+    """Simplified polyline and thumbnail per encoded polyline."""
+    tolerance = DETAIL_TOLERANCES[detail]
+    geometries = []
+    for route in decode_polylines(encoded):
+        simplified = simplify(route, tolerance)
+        geometries.append(
+            RouteGeometry(
+                encode_polyline(simplified), svg_thumbnail(simplified), len(simplified)
+            )
+        )
+    return geometries
+
+
+class RouteCache:
+    """LRU of route geometry keyed by activity and level of detail."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._max_size = max_size
+        self._geometries: OrderedDict[tuple[int, str], RouteGeometry] = OrderedDict()
+
+    def get(self, activity_id: int, detail: str) -> RouteGeometry | None:
+        key = (activity_id, detail)
+        geometry = self._geometries.get(key)
+        if geometry is not None:
+            self._geometries.move_to_end(key)
+        return geometry
+
+    def put(self, activity_id: int, detail: str, geometry: RouteGeometry) -> None:
+        self._geometries[(activity_id, detail)] = geometry
+        self._geometries.move_to_end((activity_id, detail))
+        while len(self._geometries) > self._max_size:
+            self._geometries.popitem(last=False)
@@ -0,0 +1,400 @@
+"""Spatial index over activity routes: runs near a point and repeated routes.
+
+Each indexed activity is a ``RouteRecord``: start and end coordinates,
+their geohashes (``GEOHASH_PRECISION`` characters, about 5 m) and the
+route simplified to a short encoded polyline. Repositories store the
+geohashes in prefix-searchable form, so a proximity query reads only the
+rows in the cell under the point and its eight neighbours. The cell size
+is the finest one that still covers the radius. ``RouteIndex`` caches the
+rows per cell, and exact distances are checked in memory.
+
+``match_routes`` finds repeats of a route. Candidates start and end near
+the route's own start and end, and pass cheap prefilters on distance and
+bounding box. Only those survivors are compared by discrete Fréchet
+distance, on shapes resampled to ``FRECHET_POINTS`` points by arc length.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+from stravalib.model import SummaryActivity
+
+from src.analytics.activities import athlete_key, number
+from src.database.activity_repository import activity_digest
+from src.observability.tracing import span
+
+if TYPE_CHECKING:
+    from src.database.activity_repository import ActivityRepository
+
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6_371_008.8
+# Repeats start and end within this distance of the route's own start/end.
+MATCH_RADIUS_M = 200.0
+# Largest Fréchet distance for two activities to count as the same route.
+MATCH_TOLERANCE_M = 100.0
+# Prefilter: route lengths within this fraction of each other.
+MATCH_LENGTH_RATIO = 0.15
+FRECHET_POINTS = 48
+DEFAULT_CACHE_CELLS = 1024
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_FIELDS = ("start", "end")
+
+
+def geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash of a point; longitude takes the first of every two bits."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars: list[str] = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        bounds, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """``(lat, lng)`` extent in degrees of a geohash cell."""
+    lng_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def search_cells(lat: float, lng: float, radius_m: float) -> list[str]:
+    """Geohash prefixes covering every point within ``radius_m``.
+
+    The finest precision whose cells are at least ``radius_m`` across, so
+    the cell containing the point and its neighbours cover the circle.
+    """
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lng_deg = cell_size(candidate)
+        height = math.radians(lat_deg) * EARTH_RADIUS_M
+        width = (
+            math.radians(lng_deg)
+            * EARTH_RADIUS_M
+            * math.cos(math.radians(min(abs(lat) + lat_deg, 90.0)))
+        )
+        if min(height, width) >= radius_m:
+            precision = candidate
+            break
+    lat_deg, lng_deg = cell_size(precision)
+    cells = {
+        geohash(
+            max(min(lat + dy * lat_deg, 90.0), -90.0),
+            (lng + dx * lng_deg + 180.0) % 360.0 - 180.0,
+            precision,
+        )
+        for dy in (-1, 0, 1)
+        for dx in (-1, 0, 1)
+    }
+    return sorted(cells)
+
+
+@dataclass(frozen=True)
+class RouteRecord:
+    athlete_id: int
+    activity_id: int
+    start_date: datetime | None
+    distance_m: float
+    start_lat: float
+    start_lng: float
+    end_lat: float
+    end_lng: float
+    # Simplified route as an encoded polyline.
+    shape: str
+
+    @property
+    def start_geohash(self) -> str:
+        return geohash(self.start_lat, self.start_lng)
+
+    @property
+    def end_geohash(self) -> str:
+        return geohash(self.end_lat, self.end_lng)
+
+    def point(self, field: str) -> tuple[float, float]:
+        if field == "end":
+            return self.end_lat, self.end_lng
+        return self.start_lat, self.start_lng
+
+    def points(self) -> np.ndarray:
+        from src.analytics.route_geometry import decode_polylines
+
+        return decode_polylines([self.shape])[0]
+
+    @classmethod
+    def from_activity(cls, activity: SummaryActivity) -> RouteRecord | None:
+        """The activity's index entry, if it has an athlete and a route."""
+        from src.analytics.route_geometry import (
+            DETAIL_TOLERANCES,
+            decode_polylines,
+            encode_polyline,
+            simplify,
+        )
+
+        athlete_id = athlete_key(activity)
+        polyline = activity.map.summary_polyline if activity.map else None
+        if athlete_id is None or activity.id is None or not polyline:
+            return None
+        points = decode_polylines([polyline])[0]
+        if len(points) < 2:
+            return None
+        start = activity.start_latlng.root if activity.start_latlng else points[0]
+        end = activity.end_latlng.root if activity.end_latlng else points[-1]
+        return cls(
+            athlete_id,
+            activity.id,
+            activity.start_date,
+            number(activity.distance),
+            float(start[0]),
+            float(start[1]),
+            float(end[0]),
+            float(end[1]),
+            encode_polyline(simplify(points, DETAIL_TOLERANCES["medium"])),
+        )
+
+
+@dataclass(frozen=True)
+class NearbyRoute:
+    route: RouteRecord
+    distance_m: float
+
+
+@dataclass(frozen=True)
+class RouteMatch:
+    route: RouteRecord
+    frechet_m: float
+
+
+def _planar_m(points: np.ndarray, origin: tuple[float, float]) -> np.ndarray:
+    """Equirectangular metres around ``origin``; fine over a route's extent."""
+    lat0 = math.radians(origin[0])
+    radians = np.radians(points - np.array(origin))
+    return (
+        np.column_stack([radians[:, 1] * math.cos(lat0), radians[:, 0]])
+        * EARTH_RADIUS_M
+    )
+
+
+def resample(xy: np.ndarray, count: int = FRECHET_POINTS) -> np.ndarray:
+    """``count`` points evenly spaced along the path by arc length."""
+    lengths = np.hypot(*np.diff(xy, axis=0).T)
+    along = np.concatenate([[0.0], np.cumsum(lengths)])
+    targets = np.linspace(0.0, along[-1], count)
+    return np.column_stack(
+        [np.interp(targets, along, xy[:, 0]), np.interp(targets, along, xy[:, 1])]
+    )
+
+
+def frechet_m(a: np.ndarray, b: np.ndarray) -> float:
+    """Discrete Fréchet distance between two paths in planar metres.
+
+    The coupling table is filled one anti-diagonal at a time, so each step
+    is a vector operation over the whole diagonal.
+    """
+    distances = np.hypot(a[:, None, 0] - b[None, :, 0], a[:, None, 1] - b[None, :, 1])
+    rows, columns = distances.shape
+    coupling = np.full((rows, columns), np.inf)
+    coupling[0, 0] = distances[0, 0]
+    for diagonal in range(1, rows + columns - 1):
+        i = np.arange(max(0, diagonal - columns + 1), min(rows, diagonal + 1))
+        j = diagonal - i
+        best = np.full(len(i), np.inf)
+        up = i > 0
+        best[up] = coupling[i[up] - 1, j[up]]
+        left = j > 0
+        best[left] = np.minimum(best[left], coupling[i[left], j[left] - 1])
+        both = up & left
+        best[both] = np.minimum(best[both], coupling[i[both] - 1, j[both] - 1])
+        coupling[i, j] = np.maximum(distances[i, j], best)
+    return float(coupling[-1, -1])
+
+
+def _bounds(xy: np.ndarray) -> np.ndarray:
+    return np.concatenate([xy.min(axis=0), xy.max(axis=0)])
+
+
+def match_routes(
+    reference: RouteRecord,
+    candidates: Iterable[RouteRecord],
+    tolerance_m: float = MATCH_TOLERANCE_M,
+) -> list[RouteMatch]:
+    """Candidates that follow ``reference`` within ``tolerance_m``, closest first."""
+    origin = (reference.start_lat, reference.start_lng)
+    shape = _planar_m(reference.points(), origin)
+    if len(shape) < 2:
+        return []
+    reference_bounds = _bounds(shape)
+    reference_path = resample(shape)
+    matches = []
+    for candidate in candidates:
+        if candidate.activity_id == reference.activity_id:
+            continue
+        if haversine_m(*candidate.point("end"), *reference.point("end")) > (
+            MATCH_RADIUS_M
+        ):
+            continue
+        if reference.distance_m > 0 and (
+            abs(candidate.distance_m - reference.distance_m) / reference.distance_m
+            > MATCH_LENGTH_RATIO
+        ):
+            continue
+        other = _planar_m(candidate.points(), origin)
+        if len(other) < 2:
+            continue
+        if np.abs(_bounds(other) - reference_bounds).max() > tolerance_m:
+            continue
+        distance = frechet_m(reference_path, resample(other))
+        if distance <= tolerance_m:
+            matches.append(RouteMatch(candidate, round(distance, 1)))
+    matches.sort(key=lambda match: match.frechet_m)
+    return matches
+
+
+class RouteIndex:
+    """Proximity and repeated-route queries over the repository's route index.
+
+    Rows are cached per ``(athlete, field, cell)`` in an LRU. The cache is
+    dropped when the repository digest moves for activities this process
+    did not ``record``.
+    """
+
+    def __init__(
+        self, repository: ActivityRepository, max_cells: int = DEFAULT_CACHE_CELLS
+    ) -> None:
+        self._repository = repository
+        self._max_cells = max_cells
+        self._cells: OrderedDict[tuple[int, str, str], list[RouteRecord]] = (
+            OrderedDict()
+        )
+        self._digest: int | None = None
+        # Bumped whenever cached cells change, so a lookup that overlapped a
+        # change does not cache rows read before it.
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _validate(self) -> None:
+        digest = self._repository.get_sync_state().digest
+        if digest != self._digest:
+            self.clear()
+            self._digest = digest
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._generation += 1
+
+    async def _routes(
+        self, athlete_id: int, field: str, cells: list[str]
+    ) -> list[RouteRecord]:
+        self._validate()
+        by_cell: dict[str, list[RouteRecord]] = {}
+        for cell in cells:
+            key = (athlete_id, field, cell)
+            if key in self._cells:
+                self._cells.move_to_end(key)
+                by_cell[cell] = self._cells[key]
+        missing = [cell for cell in cells if cell not in by_cell]
+        if missing:
+            async with self._lock:
+                generation = self._generation
+                with span("route_index.find", {"route_index.cells": len(missing)}):
+                    found = await self._repository.find_routes(
+                        athlete_id, field, missing
+                    )
+                fetched: dict[str, list[RouteRecord]] = {cell: [] for cell in missing}
+                for route in found:
+                    point = (
+                        route.start_geohash if field == "start" else route.end_geohash
+                    )
+                    for cell in missing:
+                        if point.startswith(cell):
+                            fetched[cell].append(route)
+                by_cell.update(fetched)
+                if generation == self._generation:
+                    for cell, cell_routes in fetched.items():
+                        self._cells[(athlete_id, field, cell)] = cell_routes
+        while len(self._cells) > self._max_cells:
+            self._cells.popitem(last=False)
+        by_id = {route.activity_id: route for cell in cells for route in by_cell[cell]}
+        return list(by_id.values())
+
+    async def near(
+        self,
+        athlete_id: int,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        field: str = "start",
+    ) -> list[NearbyRoute]:
+        """Routes whose ``field`` point lies within ``radius_m``, nearest first."""
+        if field not in _FIELDS:
+            raise ValueError(f"Unknown field {field!r}")
+        candidates = await self._routes(
+            athlete_id, field, search_cells(lat, lng, radius_m)
+        )
+        nearby = []
+        for route in candidates:
+            distance = haversine_m(lat, lng, *route.point(field))
+            if distance <= radius_m:
+                nearby.append(NearbyRoute(route, round(distance, 1)))
+        nearby.sort(key=lambda item: item.distance_m)
+        return nearby
+
+    async def similar(self, reference: RouteRecord) -> list[RouteMatch]:
+        """Other activities of the athlete that follow ``reference``."""
+        candidates = await self._routes(
+            reference.athlete_id,
+            "start",
+            search_cells(reference.start_lat, reference.start_lng, MATCH_RADIUS_M),
+        )
+        close = [
+            route
+            for route in candidates
+            if haversine_m(*route.point("start"), *reference.point("start"))
+            <= MATCH_RADIUS_M
+        ]
+        return match_routes(reference, close)
+
+    def record(self, route: RouteRecord) -> None:
+        """Apply a route this process just indexed."""
+        if self._digest is not None:
+            self._digest ^= activity_digest(route.activity_id)
+        self._generation += 1
+        for field in _FIELDS:
+            key = route.start_geohash if field == "start" else route.end_geohash
+            for (athlete_id, cached_field, cell), routes in self._cells.items():
+                if (
+                    athlete_id == route.athlete_id
+                    and cached_field == field
+                    and key.startswith(cell)
+                ):
+                    routes.append(route)
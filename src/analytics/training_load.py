@@ -0,0 +1,225 @@
+"""Fitness (CTL), fatigue (ATL) and form (TSB) from daily training load.
+
+Each activity's load is its Strava relative effort (``suffer_score``), or one
+point per moving minute when Strava has no effort score. Loads are summed
+into a dense daily array and smoothed with exponentially weighted moving
+averages over ``ATL_DAYS`` and ``CTL_DAYS``, the impulse-response model's
+time constants. Form is fitness minus fatigue.
+
+``TrainingLoadEngine`` caches one series per athlete. A newly synced
+activity updates the series from its day forward, and padding up to today
+only computes the new days. An athlete's series is reloaded from their
+history when the repository digest no longer matches the one it was
+computed at, e.g. after another worker inserted activities.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from stravalib.model import SummaryActivity
+
+from src.analytics.activities import athlete_key, local_day, number
+from src.database.activity_repository import activity_digest
+from src.observability.tracing import span
+
+if TYPE_CHECKING:
+    from src.database.activity_repository import ActivityRepository
+
+ATL_DAYS = 7
+CTL_DAYS = 42
+# Load for activities without a relative effort score.
+LOAD_PER_MOVING_MINUTE = 1.0
+# decay ** -_BLOCK must stay well inside float64 range for the shortest
+# time constant: exp(256 / 7) ~ 7e15.
+_BLOCK = 256
+
+
+def activity_load(activity: SummaryActivity) -> float:
+    if activity.suffer_score is not None:
+        return float(activity.suffer_score)
+    return number(activity.moving_time) / 60 * LOAD_PER_MOVING_MINUTE
+
+
+def smoothing(days: int) -> float:
+    """EWMA weight of today's load for a ``days`` time constant."""
+    return 1.0 - math.exp(-1.0 / days)
+
+
+def ewma(values: np.ndarray, alpha: float, initial: float = 0.0) -> np.ndarray:
+    """``y[i] = y[i-1] + alpha * (values[i] - y[i-1])`` with ``y[-1] = initial``.
+
+    Vectorised in blocks: within a block,
+    ``y[i] = decay**(i+1) * (y[-1] + alpha * cumsum(values * decay**-(k+1))[i])``.
+    """
+    decay = 1.0 - alpha
+    powers = decay ** np.arange(1, _BLOCK + 1, dtype=np.float64)
+    inverse = 1.0 / powers
+    out = np.empty(len(values), dtype=np.float64)
+    previous = initial
+    for start in range(0, len(values), _BLOCK):
+        block = values[start : start + _BLOCK]
+        n = len(block)
+        out[start : start + n] = powers[:n] * (
+            previous + alpha * np.cumsum(block * inverse[:n])
+        )
+        previous = float(out[start + n - 1])
+    return out
+
+
+@dataclass
+class TrainingLoad:
+    """Daily load, fatigue and fitness from ``origin`` to ``end``."""
+
+    origin: date
+    load: np.ndarray
+    atl: np.ndarray
+    ctl: np.ndarray
+
+    @classmethod
+    def from_activities(
+        cls, activities: Iterable[SummaryActivity]
+    ) -> TrainingLoad | None:
+        days: list[date] = []
+        loads: list[float] = []
+        for activity in activities:
+            day = local_day(activity)
+            if day is not None:
+                days.append(day)
+                loads.append(activity_load(activity))
+        if not days:
+            return None
+        origin = min(days)
+        offsets = np.array([(day - origin).days for day in days])
+        load = np.bincount(offsets, weights=loads).astype(np.float64)
+        series = cls(origin, load, np.empty(0), np.empty(0))
+        series._recompute(0)
+        return series
+
+    @property
+    def end(self) -> date:
+        return self.origin + timedelta(days=len(self.load) - 1)
+
+    @property
+    def tsb(self) -> np.ndarray:
+        return self.ctl - self.atl
+
+    def _recompute(self, index: int) -> None:
+        grow = len(self.load) - len(self.atl)
+        if grow > 0:
+            self.atl = np.concatenate([self.atl, np.zeros(grow)])
+            self.ctl = np.concatenate([self.ctl, np.zeros(grow)])
+        atl_start = float(self.atl[index - 1]) if index > 0 else 0.0
+        ctl_start = float(self.ctl[index - 1]) if index > 0 else 0.0
+        self.atl[index:] = ewma(self.load[index:], smoothing(ATL_DAYS), atl_start)
+        self.ctl[index:] = ewma(self.load[index:], smoothing(CTL_DAYS), ctl_start)
+
+    def _grow(self, day: date) -> int:
+        """Cover ``day``; returns the first index whose values are stale."""
+        if day < self.origin:
+            pad = (self.origin - day).days
+            self.load = np.concatenate([np.zeros(pad), self.load])
+            self.atl = np.concatenate([np.zeros(pad), self.atl])
+            self.ctl = np.concatenate([np.zeros(pad), self.ctl])
+            self.origin = day
+            return 0
+        stale = len(self.load)
+        if day > self.end:
+            self.load = np.concatenate([self.load, np.zeros((day - self.end).days)])
+        return stale
+
+    def add(self, day: date, load: float) -> int:
+        """Add ``load`` on ``day``; returns the number of days recomputed."""
+        stale = self._grow(day)
+        offset = (day - self.origin).days
+        self.load[offset] += load
+        index = min(stale, offset)
+        self._recompute(index)
+        return len(self.load) - index
+
+    def extend_to(self, day: date) -> int:
+        """Decay the curves through rest days up to ``day``."""
+        if day <= self.end:
+            return 0
+        index = self._grow(day)
+        self._recompute(index)
+        return len(self.load) - index
+
+    def window(
+        self, start: date | None = None, end: date | None = None
+    ) -> dict[str, Any]:
+        first = max((start - self.origin).days, 0) if start is not None else 0
+        last = (end - self.origin).days + 1 if end is not None else len(self.load)
+        last = min(max(last, first), len(self.load))
+        return {
+            "start": self.origin + timedelta(days=first) if first < last else None,
+            "load": np.round(self.load[first:last], 2).tolist(),
+            "atl": np.round(self.atl[first:last], 2).tolist(),
+            "ctl": np.round(self.ctl[first:last], 2).tolist(),
+            "tsb": np.round(self.tsb[first:last], 2).tolist(),
+        }
+
+
+class TrainingLoadEngine:
+    """Per-athlete training-load series cached between requests."""
+
+    def __init__(self, repository: ActivityRepository) -> None:
+        self._repository = repository
+        self._series: dict[int, TrainingLoad | None] = {}
+        # Repository digest each athlete's cached series reflects.
+        self._digests: dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def _load(self, athlete_id: int) -> None:
+        # Read before the history so inserts racing the read force a reload.
+        digest = self._repository.get_sync_state().digest
+        with span(
+            "training_load.reload", {"strava.athlete_id": str(athlete_id)}
+        ) as reload_span:
+            activities = await self._repository.get_activity_history(athlete_id)
+            series = TrainingLoad.from_activities(activities)
+            reload_span.set_attribute("activity.count", len(activities))
+        self._series[athlete_id] = series
+        self._digests[athlete_id] = digest
+        logging.info(
+            f"Computed training load for athlete {athlete_id} "
+            f"from {len(activities)} activities"
+        )
+
+    def _is_stale(self, athlete_id: int) -> bool:
+        return self._digests.get(athlete_id) != self._repository.get_sync_state().digest
+
+    async def get(self, athlete_id: int, today: date) -> TrainingLoad | None:
+        if self._is_stale(athlete_id):
+            async with self._lock:
+                if self._is_stale(athlete_id):
+                    await self._load(athlete_id)
+        series = self._series.get(athlete_id)
+        if series is not None:
+            series.extend_to(today)
+        return series
+
+    def record(self, activity: SummaryActivity) -> None:
+        """Apply an activity the repository just inserted."""
+        if activity.id is None:
+            return
+        # Other athletes' series are unaffected, so stay as fresh as they were.
+        change = activity_digest(activity.id)
+        for athlete_id in self._digests:
+            self._digests[athlete_id] ^= change
+        key = athlete_key(activity)
+        day = local_day(activity)
+        if key not in self._series or day is None:
+            return
+        series = self._series[key]
+        if series is None:
+            self._series[key] = TrainingLoad.from_activities([activity])
+        else:
+            series.add(day, activity_load(activity))
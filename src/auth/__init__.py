@@ -1,3 +1,15 @@
-from src.auth.users import auth_backend, current_active_user, fastapi_users
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from src.auth.users import auth_backend, current_active_user, fastapi_users
 
 __all__ = ["auth_backend", "current_active_user", "fastapi_users"]
+
+
+def __getattr__(name: str) -> Any:
+    # fastapi-users (and SQLAlchemy behind it) is only needed in standalone
+    # mode, so it is imported on first access rather than with the package.
+    if name in __all__:
+        return getattr(import_module("src.auth.users"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,5 @@
 import os
+import sys
 
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings
@@ -26,11 +27,126 @@ class Settings(BaseSettings):
     db_user: str = "rc-admin"
     db_password: str = "password"
     db_name: str = "postgres"
+    # Activities partitioning (src/database/migrations.py): "year" or "month";
+    # partitions for the next N periods are created at startup and re-checked
+    # every db_partition_check_seconds
+    db_partition_interval: str = "year"
+    db_partitions_ahead: int = 2
+    db_partition_check_seconds: float = 6 * 3600
+    # Read replicas (src/database/routing.py): "host[:port],..."; reads are
+    # balanced over healthy replicas, writes and recent-write reads use db_host
+    db_replica_hosts: str = ""
+    # Minimum time reads stay on db_host after a write; the measured replica
+    # lag extends it, and replicas further behind than max_lag are skipped
+    db_replica_sticky_seconds: float = 2.0
+    db_replica_max_lag_seconds: float = 30.0
+    db_replica_health_check_seconds: float = 10.0
+    # Connection pool (src/database/pool.py); size it per uvicorn worker
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # Seconds before a connection is replaced; -1 keeps connections forever
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Server-side statement_timeout; 0 disables
+    db_statement_timeout_ms: int = 0
+    # asyncpg / SQLAlchemy prepared-statement cache entries per connection
+    db_statement_cache_size: int = 100
+    # PgBouncer transaction pooling: NullPool, no prepared-statement caches
+    db_pgbouncer_mode: bool = False
+    # Read activities through raw asyncpg instead of the ORM
+    # (src/database/asyncpg_reader.py)
+    db_asyncpg_fast_reads: bool = False
+    # Share sync state between workers via LISTEN/NOTIFY
+    # (src/database/sync_notifications.py)
+    db_sync_notifications: bool = False
 
     # DynamoDB settings
     dynamodb_endpoint_url: str | None = None
     dynamodb_region: str = "us-east-2"
     dynamodb_table_name: str = "activities"
+    # Weekly/monthly/yearly totals per athlete (src/analytics/rollups.py)
+    dynamodb_rollups_table_name: str = "athlete-rollups"
+    # Fastest efforts per athlete and distance (src/analytics/best_efforts.py)
+    dynamodb_personal_records_table_name: str = "personal-records"
+    # Mean-maximal curves and envelopes (src/analytics/mean_max.py)
+    dynamodb_curves_table_name: str = "mean-max-curves"
+    # Heatmap tiles and the activities added to them (src/analytics/heatmap.py)
+    dynamodb_heatmap_table_name: str = "heatmap-tiles"
+    # Start/end geohash route index (src/analytics/spatial.py)
+    dynamodb_routes_table_name: str = "activity-routes"
+
+    # Background sync settings (src/sync_handler.py)
+    sync_interval_seconds: int = 3600
+    sync_concurrency: int = 4
+    sync_batch_size: int = 25
+    # Strava requests all sync invocations together may spend per 15-minute
+    # window (limit: 100 / 15 min), tracked in dynamodb_sync_window_table_name
+    sync_request_budget: int = 90
+    sync_queue_url: str | None = None
+    # Deferred athletes wait this long in SQS (max 900), i.e. for the next window
+    sync_requeue_delay_seconds: int = 900
+    # Run the sync loop inside the app process (standalone / local testing)
+    sync_local_worker: bool = False
+    dynamodb_sync_table_name: str = "athlete-sync"
+    dynamodb_sync_window_table_name: str = "sync-request-windows"
+
+    # Response compression (src/middleware/compression.py)
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Request metrics (src/middleware/request_metrics.py)
+    # Off by default: /metrics is unauthenticated, so only enable it where the
+    # endpoint is not publicly reachable (e.g. behind an internal scraper).
+    metrics_enabled: bool = False
+    # Add a Server-Timing header breaking out Strava / DB / serialise time
+    server_timing_enabled: bool = False
+
+    # Tracing (src/observability/tracing.py): "none", "console" or "file"
+    tracing_exporter: str = "none"
+    # Fraction of new traces to record; incoming traceparent flags win
+    tracing_sample_ratio: float = 1.0
+    tracing_file_path: str = "/tmp/running-corgium-traces.jsonl"
+
+    # SQL instrumentation (src/database/sql_instrumentation.py)
+    sql_instrumentation_enabled: bool = True
+    sql_slow_query_ms: float = 200.0
+    # Requests issuing more statements than this are logged as likely N+1
+    sql_statements_per_request_limit: int = 20
+    # Expose per-statement stats on /debug/sql (shows normalised SQL text)
+    sql_debug_endpoint: bool = False
+
+    # DynamoDB capacity accounting (src/observability/capacity.py)
+    dynamodb_capacity_tracking_enabled: bool = True
+    # Log operations that consume more capacity units than this
+    dynamodb_capacity_operation_budget: float | None = None
+    # Once a request consumed this many units, further operations are
+    # logged ("log") or refused with 503 ("reject")
+    dynamodb_capacity_request_budget: float | None = None
+    dynamodb_capacity_budget_mode: str = "log"
+    # Add an X-DynamoDB-Consumed-Capacity header with the request's units
+    dynamodb_capacity_header: bool = False
+
+    # Maintain personal records from new runs' distance/time streams, which
+    # the background sync fetches within its request budget
+    best_efforts_enabled: bool = True
+    # Merge new runs' mean-maximal pace/heart-rate curves into the envelopes
+    mean_max_curves_enabled: bool = True
+    # Default max heart rate for zones in activity analysis
+    # (src/analytics/activity_analysis.py); requests may override it
+    analysis_max_heartrate: int = 190
+    # Add new runs' routes to the athlete's heatmap tiles
+    heatmap_enabled: bool = True
+    # Processes for full heatmap rebuilds; None uses one per CPU. Lambda
+    # always builds in-process.
+    heatmap_build_workers: int | None = None
+    # Index new runs' start/end points and route shapes for spatial queries
+    route_index_enabled: bool = True
+
+    # Trained race-time model (src/analytics/race_prediction.py); empty
+    # serves the Riegel and VDOT baselines only
+    race_model_path: str = ""
 
     # MSK settings (standalone export)
     msk_bootstrap_servers: str = ""
@@ -51,14 +167,12 @@ class Settings(BaseSettings):
         file_secret_settings: PydanticBaseSettingsSource,
     ) -> tuple[PydanticBaseSettingsSource, ...]:
         if "AWS_LAMBDA_FUNCTION_NAME" in os.environ:
-            from pydantic_settings.sources.providers.aws import (
-                AWSSecretsManagerSettingsSource,
-            )
+            from src.secrets_cache import CachedSecretsManagerSettingsSource
 
             secret_id = os.environ.get(
                 "SECRETS_MANAGER_SECRET_ID", "running-corgium/config"
             )
-            aws_source = AWSSecretsManagerSettingsSource(
+            aws_source = CachedSecretsManagerSettingsSource(
                 settings_cls,
                 secret_id=secret_id,
                 case_sensitive=False,
@@ -67,4 +181,37 @@ class Settings(BaseSettings):
         return (init_settings, env_settings, dotenv_settings, file_secret_settings)
 
 
-settings = Settings()
+_settings: Settings | None = None
+_settings_generation: int = 0
+
+
+def get_settings() -> Settings:
+    """Return the process-wide settings, resolving the sources only once.
+
+    Warm Lambda invocations reuse the cached instance instead of going back
+    to Secrets Manager. The settings are rebuilt (from the in-memory secret
+    cache, without an API call) only after a background refresh has picked
+    up a changed secret.
+    """
+    global _settings, _settings_generation
+    if _settings is None or _secret_generation() != _settings_generation:
+        _settings = Settings()
+        _settings_generation = _secret_generation()
+    return _settings
+
+
+def _secret_generation() -> int:
+    # Only consult the secret cache once a Lambda-mode Settings has loaded it.
+    if "src.secrets_cache" not in sys.modules:
+        return 0
+    from src.secrets_cache import secret_cache_generation
+
+    return secret_cache_generation()
+
+
+def __getattr__(name: str) -> Settings:
+    # ``from src.config import settings`` keeps working, but the settings are
+    # only built on first access so importing this module stays cheap.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
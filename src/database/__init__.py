@@ -2,6 +2,26 @@
 Database Module: Handles connectivity with databases outside Strava APIs
 """
 
-from .activity_repository import ActivityRepository as ActivityRepository
-from .dynamo_service import DynamoService as DynamoService
-from .postgres_service import PostgresService as PostgresService
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .activity_repository import ActivityRepository as ActivityRepository
+    from .activity_repository import SyncState as SyncState
+    from .dynamo_service import DynamoService as DynamoService
+    from .postgres_service import PostgresService as PostgresService
+
+# Backends are imported on first access so that AWS mode never pays for
+# SQLAlchemy and standalone mode never pays for the Dynamo service.
+_LAZY_EXPORTS = {
+    "ActivityRepository": ".activity_repository",
+    "DynamoService": ".dynamo_service",
+    "PostgresService": ".postgres_service",
+    "SyncState": ".activity_repository",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_EXPORTS:
+        return getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,53 @@
+from __future__ import annotations
+
+import hashlib
 from abc import ABC, abstractmethod
-from datetime import datetime
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import TYPE_CHECKING
 
 from stravalib.model import SummaryActivity
 
+from src.database.records import PersonalRecord, Rollup
+
+if TYPE_CHECKING:
+    from src.analytics.mean_max import MeanMaxCurve
+    from src.analytics.spatial import RouteRecord
+
+# Activities per page of ``iter_activity_history``.
+HISTORY_PAGE_SIZE = 500
+
+
+def activity_digest(strava_id: int) -> int:
+    """64-bit hash of an activity ID.
+
+    Repositories XOR these together so the content digest can be updated
+    incrementally on insert and does not depend on insertion order.
+    """
+    digest = hashlib.blake2b(strava_id.to_bytes(8, "big", signed=True), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+def payload_size(strava_response: object) -> int:
+    """Size in bytes of a stored ``strava_response`` (for span attributes)."""
+    if isinstance(strava_response, str):
+        return len(strava_response.encode())
+    if isinstance(strava_response, bytes):
+        return len(strava_response)
+    return 0
+
+
+@dataclass(frozen=True)
+class SyncState:
+    """Cheap in-memory summary of what the repository currently holds."""
+
+    last_sync_date: datetime | None
+    activity_count: int
+    digest: int
+    # When the stored set of activities last changed, if known.
+    updated_at: datetime | None
+
 
 class ActivityRepository(ABC):
     """Abstract interface for activity storage backends."""
@@ -12,17 +57,138 @@ class ActivityRepository(ABC):
         """Initialize sync state from the backing store. Should be called at startup."""
 
     @abstractmethod
-    def get_last_sync_date(self) -> datetime | None:
-        """Get the date up to which activities have been synchronized."""
+    def get_last_sync_date(self, athlete_id: int | None = None) -> datetime | None:
+        """Get the date up to which activities have been synchronized.
+
+        With ``athlete_id``, the newest start date among that athlete's
+        activities (``None`` if none are stored).
+        """
+
+    @abstractmethod
+    def get_sync_state(self) -> SyncState:
+        """Summarise the synced activities without touching the backing store."""
 
     @abstractmethod
     def is_activity_synced(self, strava_id: int) -> bool:
         """Check if an activity has already been synced."""
 
     @abstractmethod
-    async def get_activities(self, limit: int = 100) -> list[SummaryActivity]:
-        """Get activities ordered by date descending, up to ``limit``."""
+    async def get_activities(
+        self, athlete_id: int, limit: int = 100
+    ) -> list[SummaryActivity]:
+        """Get the athlete's activities ordered by date descending, up to ``limit``."""
+
+    @abstractmethod
+    async def get_activity(self, activity_id: int) -> SummaryActivity | None:
+        """One stored activity by its Strava ID, whoever owns it."""
+
+    @abstractmethod
+    async def get_activity_history(self, athlete_id: int) -> list[SummaryActivity]:
+        """All of the athlete's activities, in no particular order (for analytics)."""
+
+    @abstractmethod
+    def iter_activity_history(
+        self, page_size: int = HISTORY_PAGE_SIZE
+    ) -> AsyncIterator[list[SummaryActivity]]:
+        """Every activity with a known athlete, a page at a time.
+
+        Each athlete's activities come together, oldest first, so batch jobs
+        can stream the whole history without holding it in memory.
+        """
 
     @abstractmethod
     async def insert_activity(self, activity: SummaryActivity) -> bool:
         """Insert a new activity. Returns True if inserted, False if skipped."""
+
+    @abstractmethod
+    async def get_rollups(
+        self,
+        athlete_id: int,
+        period: str,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> list[Rollup]:
+        """The athlete's ``period`` buckets within ``start``..``end``, oldest first."""
+
+    @abstractmethod
+    async def get_personal_records(self, athlete_id: int) -> list[PersonalRecord]:
+        """The athlete's fastest effort per distance."""
+
+    @abstractmethod
+    async def update_personal_records(
+        self, candidates: list[PersonalRecord]
+    ) -> list[PersonalRecord]:
+        """Store the candidates that beat the current records; returns them."""
+
+    @abstractmethod
+    async def get_mean_max_curve(
+        self, athlete_id: int, season: str
+    ) -> MeanMaxCurve | None:
+        """The athlete's envelope curve for ``season``; one read."""
+
+    @abstractmethod
+    async def merge_mean_max_curve(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        seasons: list[str],
+        curve: MeanMaxCurve,
+    ) -> bool:
+        """Store an activity's curve and max-merge it into the season envelopes.
+
+        Returns False if the activity's curve was already merged.
+        """
+
+    @abstractmethod
+    async def get_heatmap_tile(
+        self, athlete_id: int, zoom: int, x: int, y: int
+    ) -> bytes | None:
+        """The athlete's stored density blob for one tile; one read."""
+
+    @abstractmethod
+    async def merge_heatmap_tiles(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        tiles: dict[tuple[int, int, int], bytes],
+    ) -> bool:
+        """Add an activity's ``(zoom, x, y)`` density blobs to the stored tiles.
+
+        Returns False if the activity was already added.
+        """
+
+    @abstractmethod
+    async def replace_heatmap(
+        self,
+        athlete_id: int,
+        activity_ids: list[int],
+        tiles: dict[tuple[int, int, int], bytes],
+    ) -> int:
+        """Replace the athlete's tiles with a full build over ``activity_ids``.
+
+        Returns the number of tiles written.
+        """
+
+    @abstractmethod
+    async def index_routes(self, routes: list[RouteRecord]) -> int:
+        """Insert or replace route index entries; returns how many."""
+
+    @abstractmethod
+    async def get_route(self, athlete_id: int, activity_id: int) -> RouteRecord | None:
+        """One activity's route index entry."""
+
+    @abstractmethod
+    async def find_routes(
+        self, athlete_id: int, field: str, cells: list[str]
+    ) -> list[RouteRecord]:
+        """Routes whose ``field`` ("start" or "end") geohash starts with a cell."""
+
+    @abstractmethod
+    async def rebuild_rollups(self, athlete_id: int, start: date, end: date) -> int:
+        """Recompute the athlete's buckets covering ``start``..``end``.
+
+        Buckets are rebuilt from the athlete's stored activities; other
+        athletes' totals are untouched.
+
+        Returns the number of buckets written.
+        """
@@ -0,0 +1,66 @@
+"""Raw asyncpg read path for the hottest query: an athlete's recent activities.
+
+Bypasses the SQLAlchemy ORM: no ``Activity`` instances and no Python dicts
+for the JSONB payload. The statement is prepared once per connection
+(asyncpg's statement cache keeps it) and ``strava_response #>> '{}'`` returns
+the stored JSON as text, whether the column holds an object or a JSON
+string, so callers can hand it straight to pydantic's JSON parser.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import asyncpg
+
+RECENT_ACTIVITIES_SQL = """
+SELECT strava_id, strava_response #>> '{}'
+FROM running_corgium.activities
+WHERE athlete_id = $1
+ORDER BY create_date DESC
+LIMIT $2
+"""
+
+
+class AsyncpgActivityReader:
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        min_size: int = 1,
+        max_size: int = 5,
+        statement_cache_size: int = 100,
+        command_timeout: float | None = None,
+    ) -> None:
+        self._dsn = dsn
+        self._min_size = min_size
+        self._max_size = max_size
+        self._statement_cache_size = statement_cache_size
+        self._command_timeout = command_timeout
+        self._pool: asyncpg.Pool | None = None
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            import asyncpg
+
+            self._pool = await asyncpg.create_pool(
+                self._dsn,
+                min_size=self._min_size,
+                max_size=self._max_size,
+                statement_cache_size=self._statement_cache_size,
+                command_timeout=self._command_timeout,
+            )
+        return self._pool
+
+    async def fetch_recent(self, athlete_id: int, limit: int) -> list[asyncpg.Record]:
+        """``(strava_id, strava_response JSON text)`` records, newest first."""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            statement = await conn.prepare(RECENT_ACTIVITIES_SQL)
+            return await statement.fetch(athlete_id, limit)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
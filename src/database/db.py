@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncGenerator
 
 from fastapi import Depends
@@ -10,26 +11,123 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from src.config import settings
-from src.database.models import Base, User
+from src.database.asyncpg_reader import AsyncpgActivityReader
+from src.database.migrations import maintain_partitions, migrate
+from src.database.models import User
+from src.database.pool import engine_options, instrument_pool
+from src.database.routing import Replica, ReplicaRouter
+from src.database.sql_instrumentation import instrument_engine
+from src.observability.queries import QUERY_STATS
 
 _engine: AsyncEngine | None = None
 _async_session_maker: async_sessionmaker[AsyncSession] | None = None
+_activity_reader: AsyncpgActivityReader | None = None
+_replica_router: ReplicaRouter | None = None
+_replica_engines: list[AsyncEngine] = []
 
 
-def _build_database_url() -> str:
+def postgres_dsn(
+    driver: str = "postgresql", host: str | None = None, port: int | None = None
+) -> str:
     return (
-        f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}"
-        f"@{settings.db_host}:{settings.db_port}/{settings.db_name}"
+        f"{driver}://{settings.db_user}:{settings.db_password}"
+        f"@{host or settings.db_host}:{port or settings.db_port}/{settings.db_name}"
     )
 
 
+def _build_database_url(host: str | None = None, port: int | None = None) -> str:
+    return postgres_dsn("postgresql+asyncpg", host, port)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, **engine_options(settings))
+    instrument_pool(engine)
+    if settings.sql_instrumentation_enabled:
+        QUERY_STATS.slow_query_seconds = settings.sql_slow_query_ms / 1000
+        QUERY_STATS.statements_per_request_limit = (
+            settings.sql_statements_per_request_limit
+        )
+        instrument_engine(engine)
+    return engine
+
+
 def get_engine() -> AsyncEngine:
     global _engine
     if _engine is None:
-        _engine = create_async_engine(_build_database_url())
+        _engine = _create_engine(_build_database_url())
     return _engine
 
 
+def _replica_addresses() -> list[tuple[str, int]]:
+    """Parse ``db_replica_hosts`` ("host[:port],...")."""
+    addresses = []
+    for entry in settings.db_replica_hosts.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(":")
+        addresses.append((host, int(port) if port else settings.db_port))
+    return addresses
+
+
+def get_replica_router() -> ReplicaRouter | None:
+    """Router over ``db_replica_hosts``, or None when no replicas are set."""
+    global _replica_router
+    if _replica_router is None:
+        addresses = _replica_addresses()
+        if not addresses:
+            return None
+        replicas = []
+        for host, port in addresses:
+            engine = _create_engine(_build_database_url(host, port))
+            _replica_engines.append(engine)
+            replicas.append(
+                Replica(
+                    f"{host}:{port}",
+                    async_sessionmaker(engine, expire_on_commit=False),
+                )
+            )
+        _replica_router = ReplicaRouter(
+            get_session_maker(),
+            replicas,
+            settings.db_replica_sticky_seconds,
+            settings.db_replica_max_lag_seconds,
+        )
+    return _replica_router
+
+
+async def close_replicas() -> None:
+    global _replica_router
+    if _replica_router is not None:
+        await _replica_router.stop_health_checks()
+        _replica_router = None
+    for engine in _replica_engines:
+        await engine.dispose()
+    _replica_engines.clear()
+
+
+def get_activity_reader() -> AsyncpgActivityReader:
+    """Raw asyncpg reader for the activities fast path (own small pool)."""
+    global _activity_reader
+    if _activity_reader is None:
+        _activity_reader = AsyncpgActivityReader(
+            postgres_dsn(),
+            max_size=settings.db_pool_size,
+            statement_cache_size=(
+                0 if settings.db_pgbouncer_mode else settings.db_statement_cache_size
+            ),
+            command_timeout=settings.db_statement_timeout_ms / 1000 or None,
+        )
+    return _activity_reader
+
+
+async def close_activity_reader() -> None:
+    global _activity_reader
+    if _activity_reader is not None:
+        await _activity_reader.close()
+        _activity_reader = None
+
+
 def get_session_maker() -> async_sessionmaker[AsyncSession]:
     global _async_session_maker
     if _async_session_maker is None:
@@ -37,9 +135,22 @@ def get_session_maker() -> async_sessionmaker[AsyncSession]:
     return _async_session_maker
 
 
-async def create_db_and_tables() -> None:
-    async with get_engine().begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def run_migrations() -> None:
+    await migrate(
+        get_engine(), settings.db_partition_interval, settings.db_partitions_ahead
+    )
+
+
+def start_partition_maintenance() -> asyncio.Task[None]:
+    """Re-check upcoming activity partitions in the background."""
+    return asyncio.get_running_loop().create_task(
+        maintain_partitions(
+            get_engine(),
+            settings.db_partition_interval,
+            settings.db_partitions_ahead,
+            settings.db_partition_check_seconds,
+        )
+    )
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession]:
@@ -0,0 +1,60 @@
+"""boto3 Table wrapper that accounts for DynamoDB consumed capacity."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from src.observability.capacity import CAPACITY, CapacityTracker
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table
+
+# boto3 Table method -> DynamoDB operation name.
+TRACKED_METHODS = {
+    "get_item": "GetItem",
+    "put_item": "PutItem",
+    "update_item": "UpdateItem",
+    "delete_item": "DeleteItem",
+    "query": "Query",
+    "scan": "Scan",
+}
+
+
+class CapacityTrackingTable:
+    """Drop-in proxy for a boto3 ``Table``.
+
+    Data-plane calls are sent with ``ReturnConsumedCapacity=TOTAL`` (unless
+    the caller asked for something else) and the consumed capacity is
+    reported to the tracker. Every other attribute is passed through.
+    """
+
+    def __init__(self, table: Table, tracker: CapacityTracker = CAPACITY) -> None:
+        self._table = table
+        self._tracker = tracker
+
+    @property
+    def wrapped(self) -> Table:
+        return self._table
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._table, name)
+        operation = TRACKED_METHODS.get(name)
+        if operation is None:
+            return attr
+        return self._tracked(operation, attr)
+
+    def _tracked(
+        self, operation: str, method: Callable[..., dict[str, Any]]
+    ) -> Callable[..., dict[str, Any]]:
+        def call(**kwargs: Any) -> dict[str, Any]:
+            table_name = self._table.name
+            self._tracker.before_operation(operation, table_name)
+            kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+            response = method(**kwargs)
+            self._tracker.record(
+                operation, table_name, response.get("ConsumedCapacity")
+            )
+            return response
+
+        return call
@@ -2,34 +2,160 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime
+import time
+from collections.abc import AsyncIterator, Mapping
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from typing import TYPE_CHECKING, Any
 
 from pydantic import ValidationError
 from stravalib.model import SummaryActivity
 
-from src.database.activity_repository import ActivityRepository
+from src.analytics.activities import athlete_key
+from src.database.activity_repository import (
+    HISTORY_PAGE_SIZE,
+    ActivityRepository,
+    SyncState,
+    activity_digest,
+    payload_size,
+)
+from src.database.records import TOTAL_FIELDS, PersonalRecord, Rollup
+from src.observability.tracing import span
 
 if TYPE_CHECKING:
+    from boto3.dynamodb.conditions import ConditionBase
     from mypy_boto3_dynamodb.service_resource import Table
 
+    from src.analytics.mean_max import MeanMaxCurve
+    from src.analytics.spatial import RouteRecord
+
+
+_MERGE_RETRIES = 5
+# BatchGetItem reads at most this many keys per request.
+_BATCH_GET_KEYS = 100
+
+# "ADD activity_count :activity_count, run_count :run_count, ..."
+_ROLLUP_UPDATE = "ADD " + ", ".join(f"{name} :{name}" for name in TOTAL_FIELDS)
+
+
+def _rollup_key(rollup: Rollup) -> dict[str, str]:
+    return {
+        "athlete_id": str(rollup.athlete_id),
+        "bucket_key": f"{rollup.period}#{rollup.bucket_start.isoformat()}",
+    }
+
+
+def _from_rollup_item(item: Mapping[str, Any]) -> Rollup:
+    period, bucket = str(item["bucket_key"]).split("#", 1)
+    return Rollup(
+        athlete_id=int(item["athlete_id"]),
+        period=period,
+        bucket_start=date.fromisoformat(bucket),
+        activity_count=int(item.get("activity_count", 0)),
+        run_count=int(item.get("run_count", 0)),
+        distance_m=float(item.get("distance_m", 0)),
+        moving_time_s=float(item.get("moving_time_s", 0)),
+        elapsed_time_s=float(item.get("elapsed_time_s", 0)),
+        elevation_gain_m=float(item.get("elevation_gain_m", 0)),
+    )
+
+
+def _from_record_item(item: Mapping[str, Any]) -> PersonalRecord:
+    start_date = item.get("start_date")
+    return PersonalRecord(
+        int(item["athlete_id"]),
+        str(item["distance"]),
+        float(item["distance_m"]),
+        float(item["elapsed_s"]),
+        int(item["activity_id"]),
+        datetime.fromisoformat(start_date) if isinstance(start_date, str) else None,
+    )
+
+
+def _route_item(route: RouteRecord) -> dict[str, Any]:
+    item: dict[str, Any] = {
+        "athlete_id": str(route.athlete_id),
+        "activity_id": route.activity_id,
+        "distance_m": Decimal(str(route.distance_m)),
+        "start_lat": Decimal(str(route.start_lat)),
+        "start_lng": Decimal(str(route.start_lng)),
+        "end_lat": Decimal(str(route.end_lat)),
+        "end_lng": Decimal(str(route.end_lng)),
+        "shape": route.shape,
+    }
+    if route.start_date is not None:
+        item["start_date"] = route.start_date.isoformat()
+    return item
+
+
+def _from_route_item(item: Mapping[str, Any]) -> RouteRecord:
+    from src.analytics.spatial import RouteRecord
+
+    start_date = item.get("start_date")
+    return RouteRecord(
+        int(item["athlete_id"]),
+        int(item["activity_id"]),
+        datetime.fromisoformat(start_date) if isinstance(start_date, str) else None,
+        float(item["distance_m"]),
+        float(item["start_lat"]),
+        float(item["start_lng"]),
+        float(item["end_lat"]),
+        float(item["end_lng"]),
+        str(item["shape"]),
+    )
+
 
 class DynamoService(ActivityRepository):
-    def __init__(self, table: Table) -> None:
+    def __init__(
+        self,
+        table: Table,
+        rollups_table: Table | None = None,
+        records_table: Table | None = None,
+        curves_table: Table | None = None,
+        heatmap_table: Table | None = None,
+        routes_table: Table | None = None,
+    ) -> None:
         self._table: Table = table
+        # Aggregate items ("<period>#<bucket_start>") keyed by
+        # (athlete_id, bucket_key); rollups are not maintained when no table
+        # is configured.
+        self._rollups_table: Table | None = rollups_table
+        # Personal records keyed by (athlete_id, distance).
+        self._records_table: Table | None = records_table
+        # Activity curves ("activity#<id>") and season envelopes
+        # ("season#<season>") keyed by (athlete_id, curve_key).
+        self._curves_table: Table | None = curves_table
+        # Added activities ("activity#<id>") and tile grids
+        # ("tile#<zoom>/<x>/<y>") keyed by (athlete_id, tile_key).
+        self._heatmap_table: Table | None = heatmap_table
+        # Route index entries keyed by (athlete_id, route_key): one
+        # "activity#<id>" item plus "start#<geohash>#<id>" and
+        # "end#<geohash>#<id>" copies, so begins_with queries a cell.
+        self._routes_table: Table | None = routes_table
         self._last_sync_date: datetime | None = None
+        # Newest start date per athlete: the fallback sync cursor for
+        # athletes without a registry checkpoint.
+        self._athlete_sync_dates: dict[int, datetime] = {}
         self._initialized: bool = False
         self._synced_ids: set[int] = set()
+        self._digest: int = 0
+        self._updated_at: datetime | None = None
 
     async def initialize(self) -> None:
         """Initialize sync state from DynamoDB. Should be called at startup."""
         if self._initialized:
             return
         logging.info("Initializing DynamoService from DynamoDB")
-        raw = await asyncio.to_thread(
-            lambda: self._table.scan(ProjectionExpression="strava_id,create_date")
-        )
-        items: list[dict[str, Any]] = list(raw.get("Items", []))
+        with span(
+            "dynamo.initialize", {"db.system": "dynamodb", "db.operation.name": "Scan"}
+        ) as init_span:
+            raw = await asyncio.to_thread(
+                lambda: self._table.scan(
+                    ProjectionExpression="strava_id,create_date,athlete_id"
+                )
+            )
+            items: list[dict[str, Any]] = list(raw.get("Items", []))
+            init_span.set_attributes(_scan_attributes(raw, items))
 
         max_date: datetime | None = None
         for item in items:
@@ -39,50 +165,121 @@ class DynamoService(ActivityRepository):
                 dt = datetime.fromisoformat(date_str)
                 if max_date is None or dt > max_date:
                     max_date = dt
+                if "athlete_id" in item:
+                    self._note_athlete_date(int(item["athlete_id"]), dt)
 
         if max_date:
             self._last_sync_date = max_date
+            self._updated_at = max_date
             logging.info(f"Last sync date from DynamoDB: {self._last_sync_date}")
         else:
             self._last_sync_date = None
             logging.info("No activities in DynamoDB, will fetch recent activities")
 
         logging.info(f"Loaded {len(self._synced_ids)} existing activity IDs")
+        for strava_id in self._synced_ids:
+            self._digest ^= activity_digest(strava_id)
         self._initialized = True
 
-    def get_last_sync_date(self) -> datetime | None:
+    def _note_athlete_date(
+        self, athlete_id: int | None, start_date: datetime | None
+    ) -> None:
+        if athlete_id is None or start_date is None:
+            return
+        newest = self._athlete_sync_dates.get(athlete_id)
+        if newest is None or start_date > newest:
+            self._athlete_sync_dates[athlete_id] = start_date
+
+    def get_last_sync_date(self, athlete_id: int | None = None) -> datetime | None:
         """Get the date up to which activities have been synchronized."""
+        if athlete_id is not None:
+            return self._athlete_sync_dates.get(athlete_id)
         return self._last_sync_date
 
+    def get_sync_state(self) -> SyncState:
+        """Summarise the synced activities without touching the database."""
+        return SyncState(
+            last_sync_date=self._last_sync_date,
+            activity_count=len(self._synced_ids),
+            digest=self._digest,
+            updated_at=self._updated_at,
+        )
+
     def is_activity_synced(self, strava_id: int) -> bool:
         """Check if an activity has already been synced."""
         return strava_id in self._synced_ids
 
-    async def get_activities(self, limit: int = 100) -> list[SummaryActivity]:
-        """Get activities from DynamoDB as Pydantic models."""
-        logging.info(f"Fetching up to {limit} activities from DynamoDB")
-        raw = await asyncio.to_thread(lambda: self._table.scan())
-        items: list[dict[str, Any]] = list(raw.get("Items", []))
+    async def get_activities(
+        self, athlete_id: int, limit: int = 100
+    ) -> list[SummaryActivity]:
+        """Get the athlete's activities from DynamoDB as Pydantic models.
+
+        Items written before ``athlete_id`` was stored are matched on the
+        athlete in their Strava payload.
+        """
+        from boto3.dynamodb.conditions import Attr
+
+        logging.info(f"Fetching up to {limit} activities of {athlete_id} from DynamoDB")
+        owned = Attr("athlete_id").eq(str(athlete_id)) | Attr("athlete_id").not_exists()
+        with span(
+            "dynamo.get_activities",
+            {"db.system": "dynamodb", "db.operation.name": "Scan", "db.limit": limit},
+        ) as scan_span:
+            raw = await asyncio.to_thread(
+                lambda: self._table.scan(FilterExpression=owned)
+            )
+            items: list[dict[str, Any]] = list(raw.get("Items", []))
+            scan_span.set_attributes(_scan_attributes(raw, items))
 
         # DynamoDB doesn't support ORDER BY — sort in Python
         items.sort(key=lambda x: str(x.get("create_date", "")), reverse=True)
-        items = items[:limit]
-        logging.info(f"Found {len(items)} activities in DynamoDB")
+        logging.info(f"Found {len(items)} candidate activities in DynamoDB")
 
         activities: list[SummaryActivity] = []
-        for item in items:
-            try:
-                activity = SummaryActivity.model_validate_json(
-                    str(item["strava_response"])
-                )
+        with span("activities.parse", {"activity.count": len(items)}) as parse_span:
+            for item in items:
+                if len(activities) >= limit:
+                    break
+                try:
+                    activity = SummaryActivity.model_validate_json(
+                        str(item["strava_response"])
+                    )
+                except (ValidationError, KeyError) as e:
+                    logging.error(
+                        f"Failed to parse activity {item.get('strava_id')}: {e}"
+                    )
+                    continue
+                if "athlete_id" not in item and athlete_key(activity) != athlete_id:
+                    continue
                 activities.append(activity)
                 logging.debug(f"Parsed activity {item['strava_id']}: {activity.name}")
-            except (ValidationError, KeyError) as e:
-                logging.error(f"Failed to parse activity {item.get('strava_id')}: {e}")
+            parse_span.set_attribute("activity.parsed", len(activities))
 
         logging.info(f"Returning {len(activities)} parsed activities")
         return activities
 
+    async def get_activity(self, activity_id: int) -> SummaryActivity | None:
+        """Get one activity item by its ``strava_id`` key."""
+        with span(
+            "dynamo.get_activity",
+            {
+                "db.system": "dynamodb",
+                "db.operation.name": "GetItem",
+                "activity.id": activity_id,
+            },
+        ):
+            raw = await asyncio.to_thread(
+                self._table.get_item, Key={"strava_id": str(activity_id)}
+            )
+        item = raw.get("Item")
+        if item is None:
+            return None
+        try:
+            return SummaryActivity.model_validate_json(str(item["strava_response"]))
+        except (ValidationError, KeyError) as e:
+            logging.error(f"Failed to parse activity {activity_id}: {e}")
+            return None
+
     async def insert_activity(self, activity: SummaryActivity) -> bool:
         """Insert a new activity into DynamoDB."""
         await self.initialize()
@@ -102,9 +299,27 @@ class DynamoService(ActivityRepository):
         }
         if activity.start_date:
             item["create_date"] = activity.start_date.isoformat()
+        athlete_id = athlete_key(activity)
+        if athlete_id is not None:
+            item["athlete_id"] = str(athlete_id)
 
-        await asyncio.to_thread(lambda: self._table.put_item(Item=item))
+        with span(
+            "dynamo.put_item",
+            {
+                "db.system": "dynamodb",
+                "db.operation.name": "PutItem",
+                "activity.id": activity.id,
+                "db.request.bytes_written": payload_size(item["strava_response"]),
+            },
+        ):
+            await asyncio.to_thread(lambda: self._table.put_item(Item=item))
+        from src.analytics.rollups import rollup_deltas
+
+        await self._add_rollups(rollup_deltas(activity))
         self._synced_ids.add(activity.id)
+        self._digest ^= activity_digest(activity.id)
+        self._updated_at = datetime.now(timezone.utc)
+        self._note_athlete_date(athlete_id, activity.start_date)
 
         if activity.start_date and (
             self._last_sync_date is None or activity.start_date > self._last_sync_date
@@ -114,11 +329,643 @@ class DynamoService(ActivityRepository):
         logging.info(f"Activity {activity.id} inserted successfully")
         return True
 
+    async def _add_rollups(self, rollups: list[Rollup]) -> None:
+        """Atomically add ``rollups`` to their aggregate items."""
+        table = self._rollups_table
+        if table is None or not rollups:
+            return
+
+        def update() -> None:
+            for rollup in rollups:
+                table.update_item(
+                    Key=_rollup_key(rollup),
+                    UpdateExpression=_ROLLUP_UPDATE,
+                    ExpressionAttributeValues={
+                        f":{name}": Decimal(str(value))
+                        for name, value in rollup.totals().items()
+                    },
+                )
+
+        with span(
+            "dynamo.update_rollups",
+            {"db.system": "dynamodb", "db.operation.name": "UpdateItem"},
+        ):
+            await asyncio.to_thread(update)
+
+    async def get_rollups(
+        self,
+        athlete_id: int,
+        period: str,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> list[Rollup]:
+        """Query the athlete's aggregate items of one period; O(buckets)."""
+        table = self._rollups_table
+        if table is None:
+            return []
+        from boto3.dynamodb.conditions import Key
+
+        # ISO dates sort lexically, so "<period>#<date>" keys range by date.
+        first = (start or date.min).isoformat()
+        last = (end or date.max).isoformat()
+        buckets = Key("bucket_key").between(f"{period}#{first}", f"{period}#{last}")
+        condition: ConditionBase = Key("athlete_id").eq(str(athlete_id)) & buckets
+
+        items: list[dict[str, Any]] = []
+        query_kwargs: dict[str, Any] = {"KeyConditionExpression": condition}
+        with span(
+            "dynamo.get_rollups",
+            {"db.system": "dynamodb", "db.operation.name": "Query"},
+        ) as query_span:
+            while True:
+                raw = await asyncio.to_thread(table.query, **query_kwargs)
+                items.extend(raw.get("Items", []))
+                if "LastEvaluatedKey" not in raw:
+                    break
+                query_kwargs["ExclusiveStartKey"] = raw["LastEvaluatedKey"]
+            query_span.set_attribute("db.response.returned_rows", len(items))
+        return [_from_rollup_item(item) for item in items]
+
+    async def get_personal_records(self, athlete_id: int) -> list[PersonalRecord]:
+        """Query the athlete's record items (one partition)."""
+        table = self._records_table
+        if table is None:
+            return []
+        from boto3.dynamodb.conditions import Key
+
+        with span(
+            "dynamo.get_personal_records",
+            {"db.system": "dynamodb", "db.operation.name": "Query"},
+        ):
+            raw = await asyncio.to_thread(
+                table.query,
+                KeyConditionExpression=Key("athlete_id").eq(str(athlete_id)),
+            )
+        records = [_from_record_item(item) for item in raw.get("Items", [])]
+        return sorted(records, key=lambda r: r.distance_m)
+
+    async def update_personal_records(
+        self, candidates: list[PersonalRecord]
+    ) -> list[PersonalRecord]:
+        """Conditionally put each candidate that beats the stored record."""
+        table = self._records_table
+        if table is None or not candidates:
+            return []
+        from botocore.exceptions import ClientError
+
+        def put() -> list[PersonalRecord]:
+            improved = []
+            for candidate in candidates:
+                item: dict[str, Any] = {
+                    "athlete_id": str(candidate.athlete_id),
+                    "distance": candidate.distance,
+                    "distance_m": Decimal(str(candidate.distance_m)),
+                    "elapsed_s": Decimal(str(candidate.elapsed_s)),
+                    "activity_id": candidate.activity_id,
+                }
+                if candidate.start_date is not None:
+                    item["start_date"] = candidate.start_date.isoformat()
+                try:
+                    table.put_item(
+                        Item=item,
+                        ConditionExpression=(
+                            "attribute_not_exists(elapsed_s) OR elapsed_s > :elapsed"
+                        ),
+                        ExpressionAttributeValues={":elapsed": item["elapsed_s"]},
+                    )
+                except ClientError as e:
+                    code = e.response.get("Error", {}).get("Code")
+                    if code != "ConditionalCheckFailedException":
+                        raise
+                    continue
+                improved.append(candidate)
+            return improved
+
+        with span(
+            "dynamo.update_personal_records",
+            {"db.system": "dynamodb", "db.operation.name": "PutItem"},
+        ):
+            return await asyncio.to_thread(put)
+
+    async def get_mean_max_curve(
+        self, athlete_id: int, season: str
+    ) -> MeanMaxCurve | None:
+        """Get one envelope item."""
+        table = self._curves_table
+        if table is None:
+            return None
+        from src.analytics.mean_max import MeanMaxCurve
+
+        with span(
+            "dynamo.get_mean_max_curve",
+            {"db.system": "dynamodb", "db.operation.name": "GetItem"},
+        ):
+            raw = await asyncio.to_thread(
+                table.get_item,
+                Key={"athlete_id": str(athlete_id), "curve_key": f"season#{season}"},
+            )
+        item = raw.get("Item")
+        return MeanMaxCurve.from_bytes(bytes(item["curve"])) if item else None
+
+    async def merge_mean_max_curve(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        seasons: list[str],
+        curve: MeanMaxCurve,
+    ) -> bool:
+        """Put the activity curve once, then merge each envelope optimistically.
+
+        Envelope writes are conditional on the ``activity_count`` read, and
+        retried on conflict.
+        """
+        table = self._curves_table
+        if table is None:
+            return False
+        from botocore.exceptions import ClientError
+
+        from src.analytics.mean_max import merge_blob
+
+        def conflicted(e: ClientError) -> bool:
+            return (
+                e.response.get("Error", {}).get("Code")
+                == "ConditionalCheckFailedException"
+            )
+
+        def merge() -> bool:
+            blob = curve.to_bytes()
+            try:
+                table.put_item(
+                    Item={
+                        "athlete_id": str(athlete_id),
+                        "curve_key": f"activity#{activity_id}",
+                        "curve": blob,
+                    },
+                    ConditionExpression="attribute_not_exists(curve_key)",
+                )
+            except ClientError as e:
+                if conflicted(e):
+                    return False
+                raise
+            for season in seasons:
+                key = {"athlete_id": str(athlete_id), "curve_key": f"season#{season}"}
+                for _ in range(_MERGE_RETRIES):
+                    item = table.get_item(Key=key, ConsistentRead=True).get("Item")
+                    count = int(item["activity_count"]) if item else 0
+                    try:
+                        table.put_item(
+                            Item={
+                                **key,
+                                "curve": merge_blob(
+                                    bytes(item["curve"]) if item else None, curve
+                                ),
+                                "activity_count": count + 1,
+                            },
+                            ConditionExpression=(
+                                "attribute_not_exists(curve_key) "
+                                "OR activity_count = :count"
+                            ),
+                            ExpressionAttributeValues={":count": count},
+                        )
+                    except ClientError as e:
+                        if conflicted(e):
+                            continue
+                        raise
+                    break
+                else:
+                    logging.warning(
+                        f"Gave up merging activity {activity_id} into {key}"
+                    )
+            return True
+
+        with span(
+            "dynamo.merge_mean_max_curve",
+            {"db.system": "dynamodb", "activity.id": activity_id},
+        ):
+            return await asyncio.to_thread(merge)
+
+    async def get_heatmap_tile(
+        self, athlete_id: int, zoom: int, x: int, y: int
+    ) -> bytes | None:
+        """Get one tile item."""
+        table = self._heatmap_table
+        if table is None:
+            return None
+        with span(
+            "dynamo.get_heatmap_tile",
+            {"db.system": "dynamodb", "db.operation.name": "GetItem"},
+        ):
+            raw = await asyncio.to_thread(
+                table.get_item,
+                Key={
+                    "athlete_id": str(athlete_id),
+                    "tile_key": f"tile#{zoom}/{x}/{y}",
+                },
+            )
+        item = raw.get("Item")
+        return bytes(item["density"]) if item else None
+
+    async def merge_heatmap_tiles(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        tiles: dict[tuple[int, int, int], bytes],
+    ) -> bool:
+        """Put the activity marker once, then add into each tile optimistically.
+
+        Tile writes are conditional on the ``revision`` read, and retried on
+        conflict.
+        """
+        table = self._heatmap_table
+        if table is None:
+            return False
+        from botocore.exceptions import ClientError
+
+        from src.analytics.heatmap import merge_tile_blob
+
+        def conflicted(e: ClientError) -> bool:
+            return (
+                e.response.get("Error", {}).get("Code")
+                == "ConditionalCheckFailedException"
+            )
+
+        def merge() -> bool:
+            try:
+                table.put_item(
+                    Item={
+                        "athlete_id": str(athlete_id),
+                        "tile_key": f"activity#{activity_id}",
+                    },
+                    ConditionExpression="attribute_not_exists(tile_key)",
+                )
+            except ClientError as e:
+                if conflicted(e):
+                    return False
+                raise
+            for (zoom, x, y), blob in tiles.items():
+                key = {
+                    "athlete_id": str(athlete_id),
+                    "tile_key": f"tile#{zoom}/{x}/{y}",
+                }
+                for _ in range(_MERGE_RETRIES):
+                    item = table.get_item(Key=key, ConsistentRead=True).get("Item")
+                    revision = int(item["revision"]) if item else 0
+                    try:
+                        table.put_item(
+                            Item={
+                                **key,
+                                "density": merge_tile_blob(
+                                    bytes(item["density"]) if item else None, blob
+                                ),
+                                "revision": revision + 1,
+                            },
+                            ConditionExpression=(
+                                "attribute_not_exists(tile_key) OR revision = :revision"
+                            ),
+                            ExpressionAttributeValues={":revision": revision},
+                        )
+                    except ClientError as e:
+                        if conflicted(e):
+                            continue
+                        raise
+                    break
+                else:
+                    logging.warning(f"Gave up adding activity {activity_id} to {key}")
+            return True
+
+        with span(
+            "dynamo.merge_heatmap_tiles",
+            {"db.system": "dynamodb", "activity.id": activity_id},
+        ):
+            return await asyncio.to_thread(merge)
+
+    async def replace_heatmap(
+        self,
+        athlete_id: int,
+        activity_ids: list[int],
+        tiles: dict[tuple[int, int, int], bytes],
+    ) -> int:
+        """Delete the athlete's partition, then batch-write the new items."""
+        table = self._heatmap_table
+        if table is None:
+            return 0
+        from boto3.dynamodb.conditions import Key
+
+        def replace() -> int:
+            stale: list[str] = []
+            query_kwargs: dict[str, Any] = {
+                "KeyConditionExpression": Key("athlete_id").eq(str(athlete_id)),
+                "ProjectionExpression": "tile_key",
+            }
+            while True:
+                page = table.query(**query_kwargs)
+                stale.extend(item["tile_key"] for item in page.get("Items", []))
+                if "LastEvaluatedKey" not in page:
+                    break
+                query_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+            with table.batch_writer() as batch:
+                for tile_key in stale:
+                    batch.delete_item(
+                        Key={"athlete_id": str(athlete_id), "tile_key": tile_key}
+                    )
+            with table.batch_writer() as batch:
+                for activity_id in activity_ids:
+                    batch.put_item(
+                        Item={
+                            "athlete_id": str(athlete_id),
+                            "tile_key": f"activity#{activity_id}",
+                        }
+                    )
+                for (zoom, x, y), blob in tiles.items():
+                    batch.put_item(
+                        Item={
+                            "athlete_id": str(athlete_id),
+                            "tile_key": f"tile#{zoom}/{x}/{y}",
+                            "density": blob,
+                            "revision": 1,
+                        }
+                    )
+            return len(tiles)
+
+        with span(
+            "dynamo.replace_heatmap",
+            {"db.system": "dynamodb", "heatmap.tiles": len(tiles)},
+        ):
+            return await asyncio.to_thread(replace)
+
+    async def index_routes(self, routes: list[RouteRecord]) -> int:
+        """Batch-write each route's activity, start and end items."""
+        table = self._routes_table
+        if table is None or not routes:
+            return 0
+
+        def write() -> None:
+            with table.batch_writer(
+                overwrite_by_pkeys=["athlete_id", "route_key"]
+            ) as batch:
+                for route in routes:
+                    item = _route_item(route)
+                    for route_key in (
+                        f"activity#{route.activity_id}",
+                        f"start#{route.start_geohash}#{route.activity_id}",
+                        f"end#{route.end_geohash}#{route.activity_id}",
+                    ):
+                        batch.put_item(Item={**item, "route_key": route_key})
+
+        with span(
+            "dynamo.index_routes",
+            {"db.system": "dynamodb", "route.count": len(routes)},
+        ):
+            await asyncio.to_thread(write)
+        return len(routes)
+
+    async def get_route(self, athlete_id: int, activity_id: int) -> RouteRecord | None:
+        """Get the activity's route item."""
+        table = self._routes_table
+        if table is None:
+            return None
+        with span(
+            "dynamo.get_route",
+            {"db.system": "dynamodb", "db.operation.name": "GetItem"},
+        ):
+            raw = await asyncio.to_thread(
+                table.get_item,
+                Key={
+                    "athlete_id": str(athlete_id),
+                    "route_key": f"activity#{activity_id}",
+                },
+            )
+        item = raw.get("Item")
+        return _from_route_item(item) if item else None
+
+    async def find_routes(
+        self, athlete_id: int, field: str, cells: list[str]
+    ) -> list[RouteRecord]:
+        """Query ``begins_with(route_key, "<field>#<cell>")`` per cell."""
+        table = self._routes_table
+        if table is None or not cells:
+            return []
+        from boto3.dynamodb.conditions import Key
+
+        def query() -> list[RouteRecord]:
+            routes: list[RouteRecord] = []
+            for cell in cells:
+                # Strongly consistent: RouteIndex caches what this returns.
+                query_kwargs: dict[str, Any] = {
+                    "KeyConditionExpression": Key("athlete_id").eq(str(athlete_id))
+                    & Key("route_key").begins_with(f"{field}#{cell}"),
+                    "ConsistentRead": True,
+                }
+                while True:
+                    page = table.query(**query_kwargs)
+                    routes.extend(_from_route_item(item) for item in page["Items"])
+                    if "LastEvaluatedKey" not in page:
+                        break
+                    query_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+            return routes
+
+        with span(
+            "dynamo.find_routes",
+            {"db.system": "dynamodb", "route_index.cells": len(cells)},
+        ):
+            return await asyncio.to_thread(query)
+
+    async def _scan_activities(self, athlete_id: int) -> list[SummaryActivity]:
+        """The athlete's activity items via a paginated, filtered scan.
+
+        Items written before ``athlete_id`` was stored are matched on the
+        athlete in their Strava payload.
+        """
+        from boto3.dynamodb.conditions import Attr
+
+        scan_kwargs: dict[str, Any] = {
+            "FilterExpression": Attr("athlete_id").eq(str(athlete_id))
+            | Attr("athlete_id").not_exists()
+        }
+        items: list[dict[str, Any]] = []
+        while True:
+            raw = await asyncio.to_thread(self._table.scan, **scan_kwargs)
+            items.extend(raw.get("Items", []))
+            if "LastEvaluatedKey" not in raw:
+                break
+            scan_kwargs["ExclusiveStartKey"] = raw["LastEvaluatedKey"]
+
+        activities = []
+        for item in items:
+            try:
+                activity = SummaryActivity.model_validate_json(
+                    str(item["strava_response"])
+                )
+            except (ValidationError, KeyError) as e:
+                logging.error(f"Failed to parse activity {item.get('strava_id')}: {e}")
+                continue
+            if "athlete_id" not in item and athlete_key(activity) != athlete_id:
+                continue
+            activities.append(activity)
+        return activities
+
+    async def get_activity_history(self, athlete_id: int) -> list[SummaryActivity]:
+        """The athlete's activities, via a paginated scan filtered on ``athlete_id``."""
+        with span(
+            "dynamo.get_activity_history",
+            {"db.system": "dynamodb", "db.operation.name": "Scan"},
+        ) as scan_span:
+            activities = await self._scan_activities(athlete_id)
+            scan_span.set_attribute("activity.count", len(activities))
+        return activities
+
+    async def iter_activity_history(
+        self, page_size: int = HISTORY_PAGE_SIZE
+    ) -> AsyncIterator[list[SummaryActivity]]:
+        """Sort the activity keys, then fetch the items a page at a time.
+
+        DynamoDB cannot order a scan, so only the projected keys are held in
+        memory. Items written before ``athlete_id`` was stored are skipped.
+        """
+        scan_kwargs: dict[str, Any] = {
+            "ProjectionExpression": "strava_id,create_date,athlete_id"
+        }
+        keys: list[dict[str, Any]] = []
+        with span(
+            "dynamo.iter_activity_history",
+            {"db.system": "dynamodb", "db.operation.name": "Scan"},
+        ) as scan_span:
+            while True:
+                raw = await asyncio.to_thread(self._table.scan, **scan_kwargs)
+                keys.extend(
+                    item
+                    for item in raw.get("Items", [])
+                    if "athlete_id" in item and "create_date" in item
+                )
+                if "LastEvaluatedKey" not in raw:
+                    break
+                scan_kwargs["ExclusiveStartKey"] = raw["LastEvaluatedKey"]
+            scan_span.set_attribute("activity.count", len(keys))
+        keys.sort(key=lambda item: (int(item["athlete_id"]), str(item["create_date"])))
+
+        for offset in range(0, len(keys), page_size):
+            page = keys[offset : offset + page_size]
+            with span(
+                "dynamo.batch_get_activities",
+                {"db.system": "dynamodb", "db.operation.name": "BatchGetItem"},
+            ):
+                items = await asyncio.to_thread(
+                    self._batch_get, [{"strava_id": key["strava_id"]} for key in page]
+                )
+            by_id = {str(item["strava_id"]): item for item in items}
+            activities = []
+            for key in page:
+                item = by_id.get(str(key["strava_id"]))
+                if item is None:
+                    continue
+                try:
+                    activities.append(
+                        SummaryActivity.model_validate_json(
+                            str(item["strava_response"])
+                        )
+                    )
+                except (ValidationError, KeyError) as e:
+                    logging.error(f"Failed to parse activity {key['strava_id']}: {e}")
+            yield activities
+
+    def _batch_get(self, keys: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Items for ``keys``, retrying the keys DynamoDB left unprocessed."""
+        client = self._table.meta.client
+        name = self._table.name
+        items: list[dict[str, Any]] = []
+        for offset in range(0, len(keys), _BATCH_GET_KEYS):
+            request: dict[str, Any] = {
+                name: {"Keys": keys[offset : offset + _BATCH_GET_KEYS]}
+            }
+            attempt = 0
+            while request:
+                if attempt:
+                    # Unprocessed keys mean throttling: back off before retrying.
+                    time.sleep(min(0.05 * 2**attempt, 2.0))
+                raw = client.batch_get_item(RequestItems=request)
+                items.extend(raw.get("Responses", {}).get(name, []))
+                request = dict(raw.get("UnprocessedKeys") or {})
+                attempt += 1
+        return items
+
+    async def rebuild_rollups(self, athlete_id: int, start: date, end: date) -> int:
+        """Recompute the athlete's aggregate items covering ``start``..``end``.
+
+        DynamoDB has no date index on activities, so this scans the
+        athlete's items; it is a repair job, not a request path.
+        """
+        table = self._rollups_table
+        if table is None:
+            return 0
+        from src.analytics.rollups import compute_rollups, rebuild_plan
+
+        plan = rebuild_plan(start, end)
+
+        with span(
+            "dynamo.rebuild_rollups",
+            {
+                "db.system": "dynamodb",
+                "rollup.start": str(start),
+                "rollup.end": str(end),
+            },
+        ) as rebuild_span:
+            activities = await self._scan_activities(athlete_id)
+            rollups = compute_rollups(activities, plan)
+            fresh = {(r.period, r.bucket_start) for r in rollups}
+            stale = [
+                existing
+                for period, (first, last) in plan.ranges.items()
+                for existing in await self.get_rollups(athlete_id, period, first, last)
+                if (existing.period, existing.bucket_start) not in fresh
+            ]
+
+            def write() -> None:
+                with table.batch_writer() as batch:
+                    for rollup in stale:
+                        batch.delete_item(Key=_rollup_key(rollup))
+                    for rollup in rollups:
+                        batch.put_item(
+                            Item={
+                                **_rollup_key(rollup),
+                                **{
+                                    name: Decimal(str(value))
+                                    for name, value in rollup.totals().items()
+                                },
+                            }
+                        )
+
+            await asyncio.to_thread(write)
+            rebuild_span.set_attributes(
+                {"activity.count": len(activities), "rollup.buckets": len(rollups)}
+            )
+        logging.info(
+            f"Rebuilt {len(rollups)} rollup buckets from {len(activities)} activities"
+        )
+        return len(rollups)
+
+
+def _scan_attributes(
+    raw: Mapping[str, Any], items: list[dict[str, Any]]
+) -> dict[str, int | bool]:
+    return {
+        "db.response.returned_rows": len(items),
+        "db.response.bytes_read": sum(
+            payload_size(item.get("strava_response")) for item in items
+        ),
+        # Scans are not paginated yet; flag when DynamoDB truncated the result.
+        "dynamodb.page_count": 1,
+        "dynamodb.truncated": "LastEvaluatedKey" in raw,
+    }
+
 
 async def ensure_dynamo_table(
-    endpoint_url: str | None, region: str, table_name: str
+    endpoint_url: str | None,
+    region: str,
+    table_name: str,
+    key_name: str = "strava_id",
+    sort_key_name: str | None = None,
 ) -> None:
-    """Create the activities table in DynamoDB if it doesn't exist."""
+    """Create a table keyed by string ``key_name`` (and ``sort_key_name``)."""
     import boto3
 
     dynamodb = boto3.resource("dynamodb", endpoint_url=endpoint_url, region_name=region)
@@ -130,13 +977,16 @@ async def ensure_dynamo_table(
         return
 
     logging.info(f"Creating DynamoDB table '{table_name}'")
+    key_schema = [{"AttributeName": key_name, "KeyType": "HASH"}]
+    attributes = [{"AttributeName": key_name, "AttributeType": "S"}]
+    if sort_key_name is not None:
+        key_schema.append({"AttributeName": sort_key_name, "KeyType": "RANGE"})
+        attributes.append({"AttributeName": sort_key_name, "AttributeType": "S"})
     table = await asyncio.to_thread(
         lambda: dynamodb.create_table(
             TableName=table_name,
-            KeySchema=[{"AttributeName": "strava_id", "KeyType": "HASH"}],
-            AttributeDefinitions=[
-                {"AttributeName": "strava_id", "AttributeType": "S"},
-            ],
+            KeySchema=key_schema,
+            AttributeDefinitions=attributes,
             BillingMode="PAY_PER_REQUEST",
         )
     )
@@ -0,0 +1,457 @@
+"""Versioned schema migrations for the standalone Postgres backend.
+
+Replaces ``Base.metadata.create_all`` at startup. Applied versions are
+recorded in ``running_corgium.schema_migrations``. A database at head costs
+one ``SELECT max(version)`` round trip. Pending migrations run in a single
+transaction under an advisory lock, so concurrently starting workers
+migrate once.
+
+``running_corgium.activities`` is range-partitioned on ``create_date`` by
+year or month (``db_partition_interval``; pick one and keep it, since
+partitions of the other size would overlap). The primary key must contain
+the partition key, so it is ``(strava_id, create_date)``. The
+``create_date`` and ``(athlete_id, create_date)`` indexes are declared on the
+parent, which gives every partition its own. Partitions for the current and the next ``partitions_ahead``
+periods are created at startup and then on a schedule
+(``maintain_partitions``), so long-running workers never insert into a
+period without a partition. Rows outside every partition land in
+``activities_default``; when a partition is later created for their period
+they are moved into it, since Postgres refuses to create a partition over
+rows the default partition already holds.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import cast
+
+from sqlalchemy import Table, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.sql.elements import TextClause
+
+from src.database.models import User
+
+SCHEMA = "running_corgium"
+MIGRATIONS_TABLE = f"{SCHEMA}.schema_migrations"
+ACTIVITIES_TABLE = f"{SCHEMA}.activities"
+DEFAULT_PARTITION_NAME = "activities_default"
+DEFAULT_PARTITION = f"{SCHEMA}.{DEFAULT_PARTITION_NAME}"
+LEGACY_ACTIVITIES_TABLE = "activities_legacy"
+PARTITION_INTERVALS = ("year", "month")
+# Arbitrary key for pg_advisory_xact_lock, shared by all workers.
+MIGRATION_LOCK_KEY = 7_421_318_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[AsyncConnection, str], Awaitable[None]]
+
+
+def _period_start(moment: datetime, interval: str) -> datetime:
+    if interval == "year":
+        return datetime(moment.year, 1, 1, tzinfo=timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def _next_period(start: datetime, interval: str) -> datetime:
+    if interval == "year":
+        return start.replace(year=start.year + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    if interval == "year":
+        return f"activities_y{start.year}"
+    return f"activities_m{start.year}_{start.month:02d}"
+
+
+def partition_ranges(
+    interval: str, first: datetime, last: datetime
+) -> list[tuple[str, datetime, datetime]]:
+    """``(name, from, to)`` for every period touching ``first``..``last``."""
+    if interval not in PARTITION_INTERVALS:
+        raise ValueError(f"Unknown partition interval: {interval}")
+    ranges = []
+    start = _period_start(first.astimezone(timezone.utc), interval)
+    while start <= last:
+        end = _next_period(start, interval)
+        ranges.append((partition_name(start, interval), start, end))
+        start = end
+    return ranges
+
+
+async def _existing_partitions(conn: AsyncConnection) -> set[str]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": ACTIVITIES_TABLE},
+    )
+    return {row[0] for row in result}
+
+
+async def create_partitions(
+    conn: AsyncConnection, interval: str, first: datetime, last: datetime
+) -> list[str]:
+    """Create the missing partitions covering ``first``..``last``."""
+    existing = await _existing_partitions(conn)
+    created = []
+    for name, start, end in partition_ranges(interval, first, last):
+        if name in existing:
+            continue
+        create = text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.{name} "
+            f"PARTITION OF {ACTIVITIES_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        if DEFAULT_PARTITION_NAME in existing and (
+            await _default_has_rows(conn, start, end)
+        ):
+            await _create_over_default(conn, create, name, start, end)
+        else:
+            await conn.execute(create)
+        created.append(name)
+    return created
+
+
+async def _default_has_rows(
+    conn: AsyncConnection, start: datetime, end: datetime
+) -> bool:
+    result = await conn.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE create_date >= :start AND create_date < :end)"
+        ),
+        {"start": start, "end": end},
+    )
+    return bool(result.scalar())
+
+
+async def _create_over_default(
+    conn: AsyncConnection, create: TextClause, name: str, start: datetime, end: datetime
+) -> None:
+    """Create a partition for rows that already landed in the default one.
+
+    The default partition is detached while its rows for the period move
+    into the new partition, then reattached.
+    """
+    logging.info(f"Moving {name} rows out of the default activities partition")
+    in_range = "WHERE create_date >= :start AND create_date < :end"
+    bounds = {"start": start, "end": end}
+    await conn.execute(
+        text(f"ALTER TABLE {ACTIVITIES_TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+    )
+    await conn.execute(create)
+    await conn.execute(
+        text(
+            f"INSERT INTO {SCHEMA}.{name} SELECT * FROM {DEFAULT_PARTITION} {in_range}"
+        ),
+        bounds,
+    )
+    await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} {in_range}"), bounds)
+    await conn.execute(
+        text(
+            f"ALTER TABLE {ACTIVITIES_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+        )
+    )
+
+
+async def ensure_future_partitions(
+    conn: AsyncConnection, interval: str, partitions_ahead: int
+) -> list[str]:
+    now = datetime.now(timezone.utc)
+    last = _period_start(now, interval)
+    for _ in range(partitions_ahead):
+        last = _next_period(last, interval)
+    return await create_partitions(conn, interval, now, last)
+
+
+async def _create_users(conn: AsyncConnection, interval: str) -> None:
+    users = cast(Table, User.__table__)
+    await conn.run_sync(lambda sync_conn: users.create(sync_conn, checkfirst=True))
+
+
+async def _partition_activities(conn: AsyncConnection, interval: str) -> None:
+    relkind = (
+        await conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": ACTIVITIES_TABLE},
+        )
+    ).scalar()
+    if relkind == "p":
+        return
+    if relkind is not None:
+        # Built by create_all or an older schemas.sql; keep it as a backup.
+        await conn.execute(
+            text(f"ALTER TABLE {ACTIVITIES_TABLE} RENAME TO {LEGACY_ACTIVITIES_TABLE}")
+        )
+        await conn.execute(
+            text(
+                f"ALTER INDEX IF EXISTS {SCHEMA}.activities_pkey "
+                f"RENAME TO {LEGACY_ACTIVITIES_TABLE}_pkey"
+            )
+        )
+
+    await conn.execute(
+        text(
+            f"CREATE TABLE {ACTIVITIES_TABLE} ("
+            "strava_id bigint NOT NULL, "
+            "create_date timestamptz NOT NULL, "
+            "athlete_id bigint, "
+            "strava_response jsonb NOT NULL, "
+            "PRIMARY KEY (strava_id, create_date)"
+            ") PARTITION BY RANGE (create_date)"
+        )
+    )
+    await conn.execute(
+        text(
+            f"CREATE INDEX activities_create_date_idx "
+            f"ON {ACTIVITIES_TABLE} (create_date DESC)"
+        )
+    )
+    # Activities are read per athlete.
+    await conn.execute(
+        text(
+            f"CREATE INDEX activities_athlete_create_date_idx "
+            f"ON {ACTIVITIES_TABLE} (athlete_id, create_date DESC)"
+        )
+    )
+    await conn.execute(
+        text(
+            f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {ACTIVITIES_TABLE} DEFAULT"
+        )
+    )
+    if relkind is None:
+        return
+
+    legacy = f"{SCHEMA}.{LEGACY_ACTIVITIES_TABLE}"
+    first, last = (
+        await conn.execute(
+            text(f"SELECT min(create_date), max(create_date) FROM {legacy}")
+        )
+    ).one()
+    if first is not None:
+        # Partitions must exist before the copy: a partition cannot be
+        # attached over rows already sitting in the default partition.
+        await create_partitions(conn, interval, first, last)
+    # The owner of legacy rows is taken from the stored Strava payload.
+    await conn.execute(
+        text(
+            f"INSERT INTO {ACTIVITIES_TABLE} "
+            "(strava_id, create_date, athlete_id, strava_response) "
+            "SELECT strava_id, create_date, "
+            "(strava_response::jsonb #>> '{athlete,id}')::bigint, "
+            f"strava_response::jsonb FROM {legacy} "
+            "WHERE strava_id IS NOT NULL AND create_date IS NOT NULL "
+            "ON CONFLICT DO NOTHING"
+        )
+    )
+
+
+async def _create_rollups(conn: AsyncConnection, interval: str) -> None:
+    # Existing history is backfilled with the rebuild job
+    # (POST /strava/stats/rebuild).
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.activity_rollups ("
+            "athlete_id bigint NOT NULL, "
+            "period text NOT NULL, "
+            "bucket_start date NOT NULL, "
+            "activity_count integer NOT NULL DEFAULT 0, "
+            "run_count integer NOT NULL DEFAULT 0, "
+            "distance_m double precision NOT NULL DEFAULT 0, "
+            "moving_time_s double precision NOT NULL DEFAULT 0, "
+            "elapsed_time_s double precision NOT NULL DEFAULT 0, "
+            "elevation_gain_m double precision NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (athlete_id, period, bucket_start))"
+        )
+    )
+
+
+async def _create_personal_records(conn: AsyncConnection, interval: str) -> None:
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.personal_records ("
+            "athlete_id bigint NOT NULL, "
+            "distance text NOT NULL, "
+            "distance_m double precision NOT NULL, "
+            "elapsed_s double precision NOT NULL, "
+            "activity_id bigint NOT NULL, "
+            "start_date timestamptz, "
+            "PRIMARY KEY (athlete_id, distance))"
+        )
+    )
+
+
+async def _create_curves(conn: AsyncConnection, interval: str) -> None:
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.activity_curves ("
+            "athlete_id bigint NOT NULL, "
+            "activity_id bigint NOT NULL, "
+            "curve bytea NOT NULL, "
+            "PRIMARY KEY (athlete_id, activity_id))"
+        )
+    )
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.curve_envelopes ("
+            "athlete_id bigint NOT NULL, "
+            "season text NOT NULL, "
+            "curve bytea NOT NULL, "
+            "activity_count integer NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (athlete_id, season))"
+        )
+    )
+
+
+async def _create_heatmap(conn: AsyncConnection, interval: str) -> None:
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.heatmap_activities ("
+            "athlete_id bigint NOT NULL, "
+            "activity_id bigint NOT NULL, "
+            "PRIMARY KEY (athlete_id, activity_id))"
+        )
+    )
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.heatmap_tiles ("
+            "athlete_id bigint NOT NULL, "
+            "zoom integer NOT NULL, "
+            "x integer NOT NULL, "
+            "y integer NOT NULL, "
+            "density bytea NOT NULL, "
+            "PRIMARY KEY (athlete_id, zoom, x, y))"
+        )
+    )
+
+
+async def _create_routes(conn: AsyncConnection, interval: str) -> None:
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.activity_routes ("
+            "athlete_id bigint NOT NULL, "
+            "activity_id bigint NOT NULL, "
+            "start_date timestamptz, "
+            "distance_m double precision NOT NULL, "
+            "start_lat double precision NOT NULL, "
+            "start_lng double precision NOT NULL, "
+            "end_lat double precision NOT NULL, "
+            "end_lng double precision NOT NULL, "
+            'start_geohash text COLLATE "C" NOT NULL, '
+            'end_geohash text COLLATE "C" NOT NULL, '
+            "shape text NOT NULL, "
+            "PRIMARY KEY (athlete_id, activity_id))"
+        )
+    )
+    for field in ("start", "end"):
+        await conn.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS activity_routes_{field}_geohash "
+                f"ON {SCHEMA}.activity_routes (athlete_id, {field}_geohash)"
+            )
+        )
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "create users table", _create_users),
+    Migration(2, "range-partition activities on create_date", _partition_activities),
+    Migration(3, "create activity rollups", _create_rollups),
+    Migration(4, "create personal records", _create_personal_records),
+    Migration(5, "create mean-max curves", _create_curves),
+    Migration(6, "create heatmap tiles", _create_heatmap),
+    Migration(7, "create activity route index", _create_routes),
+]
+HEAD_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    try:
+        result = await conn.execute(
+            text(f"SELECT max(version) FROM {MIGRATIONS_TABLE}")
+        )
+    except ProgrammingError:
+        # No migrations table yet.
+        await conn.rollback()
+        return 0
+    return result.scalar() or 0
+
+
+async def migrate(
+    engine: AsyncEngine, interval: str = "year", partitions_ahead: int = 2
+) -> int:
+    """Bring the schema to head and create upcoming partitions.
+
+    Returns the number of migrations applied.
+    """
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+
+    applied = 0
+    if version < HEAD_VERSION:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+                    "version integer PRIMARY KEY, "
+                    "name text NOT NULL, "
+                    "applied_at timestamptz NOT NULL DEFAULT now())"
+                )
+            )
+            # Another worker may have migrated while we waited for the lock.
+            version = await current_version(conn)
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                await migration.upgrade(conn, interval)
+                await conn.execute(
+                    text(
+                        f"INSERT INTO {MIGRATIONS_TABLE} (version, name) "
+                        "VALUES (:version, :name)"
+                    ),
+                    {"version": migration.version, "name": migration.name},
+                )
+                applied += 1
+                logging.info(f"Applied migration {migration.version}: {migration.name}")
+
+    await ensure_partitions(engine, interval, partitions_ahead)
+    return applied
+
+
+async def ensure_partitions(
+    engine: AsyncEngine, interval: str, partitions_ahead: int
+) -> list[str]:
+    """Create the current and upcoming partitions in their own transaction."""
+    async with engine.begin() as conn:
+        created = await ensure_future_partitions(conn, interval, partitions_ahead)
+    if created:
+        logging.info(f"Created activity partitions: {', '.join(created)}")
+    return created
+
+
+async def maintain_partitions(
+    engine: AsyncEngine, interval: str, partitions_ahead: int, every_seconds: float
+) -> None:
+    """Keep ``partitions_ahead`` periods partitioned while the process runs."""
+    while True:
+        await asyncio.sleep(every_seconds)
+        try:
+            await ensure_partitions(engine, interval, partitions_ahead)
+        except Exception as e:
+            # Retried on the next tick; rows meanwhile land in the default
+            # partition and are moved out once their partition exists.
+            logging.error(f"Activity partition maintenance failed: {e}")
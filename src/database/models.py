@@ -1,7 +1,17 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
-from sqlalchemy import BigInteger, DateTime, Integer, String, func
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -29,9 +39,118 @@ class User(SQLAlchemyBaseUserTable[int], Base):
 
 
 class Activity(Base):
+    """Range-partitioned on ``create_date``; see ``src/database/migrations.py``."""
+
     __tablename__ = "activities"
-    __table_args__ = {"schema": "running_corgium"}
+    __table_args__ = {
+        "schema": "running_corgium",
+        "postgresql_partition_by": "RANGE (create_date)",
+    }
 
     strava_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    create_date: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    create_date: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    athlete_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     strava_response: Mapped[str] = mapped_column(JSONB)
+
+
+class ActivityRollup(Base):
+    """Training totals per week/month/year bucket (see ``src/analytics/rollups.py``)."""
+
+    __tablename__ = "activity_rollups"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    period: Mapped[str] = mapped_column(String, primary_key=True)
+    bucket_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    activity_count: Mapped[int] = mapped_column(Integer, default=0)
+    run_count: Mapped[int] = mapped_column(Integer, default=0)
+    distance_m: Mapped[float] = mapped_column(Float, default=0.0)
+    moving_time_s: Mapped[float] = mapped_column(Float, default=0.0)
+    elapsed_time_s: Mapped[float] = mapped_column(Float, default=0.0)
+    elevation_gain_m: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+class PersonalBest(Base):
+    """Fastest effort per athlete and distance (see ``src/analytics/best_efforts.py``)."""
+
+    __tablename__ = "personal_records"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    distance: Mapped[str] = mapped_column(String, primary_key=True)
+    distance_m: Mapped[float] = mapped_column(Float)
+    elapsed_s: Mapped[float] = mapped_column(Float)
+    activity_id: Mapped[int] = mapped_column(BigInteger)
+    start_date: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+
+
+class ActivityCurve(Base):
+    """An activity's mean-maximal curve (see ``src/analytics/mean_max.py``)."""
+
+    __tablename__ = "activity_curves"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    activity_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    curve: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class CurveEnvelope(Base):
+    """Element-wise maximum of an athlete's activity curves for a season."""
+
+    __tablename__ = "curve_envelopes"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    season: Mapped[str] = mapped_column(String, primary_key=True)
+    curve: Mapped[bytes] = mapped_column(LargeBinary)
+    activity_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class HeatmapActivity(Base):
+    """An activity already added to its athlete's heatmap tiles."""
+
+    __tablename__ = "heatmap_activities"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    activity_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+
+class HeatmapTile(Base):
+    """A heatmap tile's density grid (see ``src/analytics/heatmap.py``)."""
+
+    __tablename__ = "heatmap_tiles"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    zoom: Mapped[int] = mapped_column(Integer, primary_key=True)
+    x: Mapped[int] = mapped_column(Integer, primary_key=True)
+    y: Mapped[int] = mapped_column(Integer, primary_key=True)
+    density: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class ActivityRoute(Base):
+    """An activity's route index entry (see ``src/analytics/spatial.py``)."""
+
+    __tablename__ = "activity_routes"
+    __table_args__ = {"schema": "running_corgium"}
+
+    athlete_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    activity_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    start_date: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    distance_m: Mapped[float] = mapped_column(Float)
+    start_lat: Mapped[float] = mapped_column(Float)
+    start_lng: Mapped[float] = mapped_column(Float)
+    end_lat: Mapped[float] = mapped_column(Float)
+    end_lng: Mapped[float] = mapped_column(Float)
+    # Byte-ordered ("C" collation) so prefix ranges use the indexes.
+    start_geohash: Mapped[str] = mapped_column(String(collation="C"))
+    end_geohash: Mapped[str] = mapped_column(String(collation="C"))
+    shape: Mapped[str] = mapped_column(Text)
@@ -0,0 +1,138 @@
+"""Connection-pool configuration and pool health metrics for the Postgres engine.
+
+``engine_options()`` turns the ``db_pool_*`` / ``db_statement_*`` settings
+into ``create_async_engine`` keyword arguments. In PgBouncer mode
+(transaction pooling) PgBouncer owns the pooling, so the engine uses
+``NullPool``, prepared-statement caches are disabled and statements get
+unique names, since consecutive transactions may run on different server
+connections.
+
+The instrumented pool classes time how long callers wait for a connection
+and count overflow connections and checkout timeouts; checkout/checkin
+events keep a gauge of connections in use for any pool class.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any
+from uuid import uuid4
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.pool.base import ConnectionPoolEntry
+
+from src.observability.metrics import REGISTRY, MetricsRegistry
+
+if TYPE_CHECKING:
+    from src.config import Settings
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    def __init__(self, registry: MetricsRegistry = REGISTRY) -> None:
+        self.checked_out = registry.gauge(
+            "db_pool_checked_out_connections",
+            "Connections currently checked out of the pool.",
+        )
+        self.wait = registry.histogram(
+            "db_pool_checkout_wait_seconds",
+            "Time spent waiting for a pooled connection.",
+            buckets=POOL_WAIT_BUCKETS,
+        )
+        self.overflow_events = registry.counter(
+            "db_pool_overflow_events_total",
+            "Connections opened beyond pool_size (max_overflow headroom used).",
+        )
+        self.timeouts = registry.counter(
+            "db_pool_checkout_timeouts_total",
+            "Checkouts that gave up after pool_timeout (pool exhausted).",
+        )
+
+
+POOL_METRICS = PoolMetrics()
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics = POOL_METRICS
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except exc.TimeoutError:
+            self.metrics.timeouts.inc()
+            raise
+        finally:
+            self.metrics.wait.observe(time.perf_counter() - start)
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()  # type: ignore[misc]
+        # _overflow starts at -pool_size, so it is positive only beyond it.
+        if created and self._overflow > 0:  # type: ignore[attr-defined]
+            self.metrics.overflow_events.inc()
+        return created
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(
+    engine: AsyncEngine | Engine, metrics: PoolMetrics = POOL_METRICS
+) -> None:
+    """Track connections in use via pool events (idempotent)."""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if getattr(sync_engine, "_pool_metrics_instrumented", False):
+        return
+
+    @event.listens_for(sync_engine, "checkout")
+    def checkout(*_: Any) -> None:
+        metrics.checked_out.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def checkin(*_: Any) -> None:
+        metrics.checked_out.dec()
+
+    sync_engine._pool_metrics_instrumented = True  # type: ignore[attr-defined]
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def engine_options(config: Settings) -> dict[str, Any]:
+    """``create_async_engine`` keyword arguments for the asyncpg engine."""
+    connect_args: dict[str, Any] = {}
+    if config.db_pgbouncer_mode:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = _unique_statement_name
+        if config.db_statement_timeout_ms:
+            # PgBouncer rejects unknown startup parameters, so enforce the
+            # timeout client-side instead.
+            connect_args["command_timeout"] = config.db_statement_timeout_ms / 1000
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    connect_args["statement_cache_size"] = config.db_statement_cache_size
+    connect_args["prepared_statement_cache_size"] = config.db_statement_cache_size
+    if config.db_statement_timeout_ms:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(config.db_statement_timeout_ms)
+        }
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": config.db_pool_size,
+        "max_overflow": config.db_max_overflow,
+        "pool_timeout": config.db_pool_timeout,
+        "pool_recycle": config.db_pool_recycle,
+        "pool_pre_ping": config.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
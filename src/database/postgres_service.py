@@ -1,33 +1,181 @@
+from __future__ import annotations
+
 import logging
-from datetime import datetime, timedelta, timezone
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Any, TypeVar
 
 from pydantic import ValidationError
-from sqlalchemy import func, select
+from sqlalchemy import and_, delete, func, insert, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from stravalib.model import SummaryActivity
 
-from src.database.activity_repository import ActivityRepository
-from src.database.models import Activity
+from src.analytics.activities import athlete_key
+from src.database.activity_repository import (
+    HISTORY_PAGE_SIZE,
+    ActivityRepository,
+    SyncState,
+    activity_digest,
+    payload_size,
+)
+from src.database.models import (
+    Activity,
+    ActivityCurve,
+    ActivityRollup,
+    ActivityRoute,
+    CurveEnvelope,
+    HeatmapActivity,
+    HeatmapTile,
+    PersonalBest,
+)
+from src.database.records import TOTAL_FIELDS, PersonalRecord, Rollup
+from src.database.sync_notifications import NOTIFY_STATEMENT, notify_params
+from src.observability.tracing import span
+
+if TYPE_CHECKING:
+    from src.analytics.mean_max import MeanMaxCurve
+    from src.analytics.spatial import RouteRecord
+    from src.database.asyncpg_reader import AsyncpgActivityReader
+    from src.database.routing import ReplicaRouter
+
+T = TypeVar("T")
+
+
+def _parse_activity(strava_response: Any) -> SummaryActivity:
+    # JSON text (fast path, or a JSON string stored in the JSONB column) goes
+    # straight to pydantic's JSON parser; decoded JSONB objects are validated.
+    if isinstance(strava_response, str | bytes):
+        return SummaryActivity.model_validate_json(strava_response)
+    return SummaryActivity.model_validate(strava_response)
+
+
+_ROUTE_FIELDS = (
+    "start_date",
+    "distance_m",
+    "start_lat",
+    "start_lng",
+    "end_lat",
+    "end_lng",
+    "shape",
+)
+
+
+def _to_route(row: ActivityRoute) -> RouteRecord:
+    from src.analytics.spatial import RouteRecord
+
+    return RouteRecord(
+        row.athlete_id,
+        row.activity_id,
+        *(getattr(row, name) for name in _ROUTE_FIELDS),
+    )
+
+
+def _parse_rows(rows: Any) -> list[SummaryActivity]:
+    activities = []
+    for strava_id, strava_response in rows:
+        try:
+            activities.append(_parse_activity(strava_response))
+        except ValidationError as e:
+            logging.error(f"Failed to parse activity {strava_id}: {e}")
+    return activities
+
+
+def _rollup_upsert(rollups: list[Rollup]) -> Any:
+    """Add ``rollups`` to the stored buckets, creating missing ones."""
+    statement = pg_insert(ActivityRollup).values(
+        [
+            {
+                "athlete_id": r.athlete_id,
+                "period": r.period,
+                "bucket_start": r.bucket_start,
+                **r.totals(),
+            }
+            for r in rollups
+        ]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[
+            ActivityRollup.athlete_id,
+            ActivityRollup.period,
+            ActivityRollup.bucket_start,
+        ],
+        set_={
+            name: getattr(ActivityRollup, name) + statement.excluded[name]
+            for name in TOTAL_FIELDS
+        },
+    )
+
+
+def _to_rollup(row: ActivityRollup) -> Rollup:
+    return Rollup(
+        row.athlete_id,
+        row.period,
+        row.bucket_start,
+        **{name: getattr(row, name) for name in TOTAL_FIELDS},
+    )
+
+
+def _to_personal_record(row: Any) -> PersonalRecord:
+    return PersonalRecord(
+        row.athlete_id,
+        row.distance,
+        row.distance_m,
+        row.elapsed_s,
+        row.activity_id,
+        row.start_date,
+    )
 
 
 class PostgresService(ActivityRepository):
-    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        fast_reader: AsyncpgActivityReader | None = None,
+        publish_inserts: bool = False,
+        router: ReplicaRouter | None = None,
+    ) -> None:
         self._session_maker = session_maker
+        # Sends ORM reads to replicas; sync-state loads and writes stay on
+        # the primary (see routing.py)
+        self._router = router
+        self._fast_reader = fast_reader
+        # NOTIFY other workers of inserts (see sync_notifications.py)
+        self._publish_inserts = publish_inserts
         self._last_sync_date: datetime | None = None
+        # Newest start date per athlete: the fallback sync cursor for
+        # athletes without a registry checkpoint.
+        self._athlete_sync_dates: dict[int, datetime] = {}
         self._initialized: bool = False
         self._synced_ids: set[int] = set()
+        self._digest: int = 0
+        self._updated_at: datetime | None = None
+
+    async def _read(self, query: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """Run ``query`` on a replica when routed, else on the primary."""
+        if self._router is not None:
+            return await self._router.read(query)
+        async with self._session_maker() as session:
+            return await query(session)
 
     async def initialize(self) -> None:
         """Initialize sync state from database. Should be called at startup."""
         if self._initialized:
             return
         logging.info("Initializing PostgresService from database")
+        with span("postgres.initialize", {"db.system": "postgresql"}) as init_span:
+            await self._load_sync_state()
+            init_span.set_attribute("db.response.returned_rows", len(self._synced_ids))
+
+    async def _load_sync_state(self) -> None:
         async with self._session_maker() as session:
             # Get the most recent activity date from DB
             result = await session.execute(select(func.max(Activity.create_date)))
             last_date = result.scalar_one_or_none()
             if last_date:
                 self._last_sync_date = last_date
+                self._updated_at = last_date
                 logging.info(f"Last sync date from DB: {self._last_sync_date}")
             else:
                 self._last_sync_date = datetime.now(timezone.utc) - timedelta(days=1)
@@ -37,43 +185,237 @@ class PostgresService(ActivityRepository):
 
             # Load existing activity IDs to avoid duplicates
             result = await session.execute(select(Activity.strava_id))
-            self._synced_ids = {row[0] for row in result.all()}
+            # Merge, since notifications may have been applied meanwhile;
+            # activities are never deleted.
+            self._synced_ids |= {row[0] for row in result.all()}
             logging.info(f"Loaded {len(self._synced_ids)} existing activity IDs")
+            self._digest = 0
+            for strava_id in self._synced_ids:
+                self._digest ^= activity_digest(strava_id)
+
+            result = await session.execute(
+                select(Activity.athlete_id, func.max(Activity.create_date))
+                .where(Activity.athlete_id.is_not(None))
+                .group_by(Activity.athlete_id)
+            )
+            for athlete_id, newest in result.all():
+                self._note_athlete_date(athlete_id, newest)
 
             self._initialized = True
 
-    def get_last_sync_date(self) -> datetime | None:
+    async def reload_sync_state(self) -> None:
+        """Rebuild the sync state from the table (e.g. after missed notifications)."""
+        logging.info("Reloading PostgresService sync state from database")
+        await self._load_sync_state()
+        # The state now reflects the primary, which replicas may not have yet.
+        if self._router is not None:
+            self._router.mark_write()
+
+    def _note_athlete_date(
+        self, athlete_id: int | None, start_date: datetime | None
+    ) -> None:
+        if athlete_id is None or start_date is None:
+            return
+        newest = self._athlete_sync_dates.get(athlete_id)
+        if newest is None or start_date > newest:
+            self._athlete_sync_dates[athlete_id] = start_date
+
+    def apply_synced_activity(
+        self,
+        strava_id: int,
+        start_date: datetime | None,
+        athlete_id: int | None = None,
+    ) -> None:
+        """Record an activity synced by this or another worker (idempotent)."""
+        self._note_athlete_date(athlete_id, start_date)
+        if strava_id in self._synced_ids:
+            return
+        self._synced_ids.add(strava_id)
+        self._digest ^= activity_digest(strava_id)
+        self._updated_at = datetime.now(timezone.utc)
+        # The validators change now; keep reads on the primary until replicas
+        # have the row, so a new ETag is never paired with a stale body.
+        if self._router is not None:
+            self._router.mark_write()
+
+        # Update last sync date if this activity is newer
+        if start_date and (
+            self._last_sync_date is None or start_date > self._last_sync_date
+        ):
+            self._last_sync_date = start_date
+
+    def get_last_sync_date(self, athlete_id: int | None = None) -> datetime | None:
         """Get the date up to which activities have been synchronized."""
+        if athlete_id is not None:
+            return self._athlete_sync_dates.get(athlete_id)
         return self._last_sync_date
 
+    def get_sync_state(self) -> SyncState:
+        """Summarise the synced activities without touching the database."""
+        return SyncState(
+            last_sync_date=self._last_sync_date,
+            activity_count=len(self._synced_ids),
+            digest=self._digest,
+            updated_at=self._updated_at,
+        )
+
     def is_activity_synced(self, strava_id: int) -> bool:
         """Check if an activity has already been synced."""
         return strava_id in self._synced_ids
 
-    async def get_activities(self, limit: int = 100) -> list[SummaryActivity]:
-        """Get activities from the database as Pydantic models."""
-        logging.info(f"Fetching up to {limit} activities from database")
-        async with self._session_maker() as session:
-            result = await session.execute(
-                select(Activity).order_by(Activity.create_date.desc()).limit(limit)
-            )
-            rows = result.scalars().all()
+    async def get_activities(
+        self, athlete_id: int, limit: int = 100
+    ) -> list[SummaryActivity]:
+        """Get the athlete's activities from the database as Pydantic models."""
+        logging.info(f"Fetching up to {limit} activities of {athlete_id} from database")
+        with span(
+            "postgres.get_activities",
+            {
+                "db.system": "postgresql",
+                "db.limit": limit,
+                "db.fast_path": self._fast_reader is not None,
+            },
+        ) as query_span:
+            rows: list[Any]
+            if self._fast_reader is not None:
+                rows = await self._fast_reader.fetch_recent(athlete_id, limit)
+            else:
+
+                async def fetch(session: AsyncSession) -> list[Any]:
+                    result = await session.execute(
+                        select(Activity)
+                        .where(Activity.athlete_id == athlete_id)
+                        .order_by(Activity.create_date.desc())
+                        .limit(limit)
+                    )
+                    return [
+                        (row.strava_id, row.strava_response)
+                        for row in result.scalars().all()
+                    ]
+
+                rows = await self._read(fetch)
             logging.info(f"Found {len(rows)} activities in database")
+            query_span.set_attributes(
+                {
+                    "db.response.returned_rows": len(rows),
+                    "db.response.bytes_read": sum(payload_size(row[1]) for row in rows),
+                }
+            )
 
-            activities: list[SummaryActivity] = []
-            for row in rows:
+        activities: list[SummaryActivity] = []
+        with span("activities.parse", {"activity.count": len(rows)}) as parse_span:
+            for strava_id, strava_response in rows:
                 try:
-                    logging.debug(
-                        f"Parsing activity {type(row.strava_response)} {row.strava_response}"
-                    )
-                    activity = SummaryActivity.model_validate(row.strava_response)
+                    activity = _parse_activity(strava_response)
                     activities.append(activity)
-                    logging.debug(f"Parsed activity {row.strava_id}: {activity.name}")
+                    logging.debug(f"Parsed activity {strava_id}: {activity.name}")
                 except ValidationError as e:
-                    logging.error(f"Failed to parse activity {row.strava_id}: {e}")
+                    logging.error(f"Failed to parse activity {strava_id}: {e}")
+            parse_span.set_attribute("activity.parsed", len(activities))
+
+        logging.info(f"Returning {len(activities)} parsed activities")
+        return activities
+
+    async def get_activity(self, activity_id: int) -> SummaryActivity | None:
+        """Read one activity through the ``strava_id`` primary key index.
+
+        Every partition's index is probed, as the start date is unknown.
+        """
+
+        async def fetch(session: AsyncSession) -> list[Any]:
+            result = await session.execute(
+                select(Activity.strava_id, Activity.strava_response).where(
+                    Activity.strava_id == activity_id
+                )
+            )
+            return list(result.all())
+
+        with span(
+            "postgres.get_activity",
+            {"db.system": "postgresql", "activity.id": activity_id},
+        ):
+            activities = _parse_rows(await self._read(fetch))
+        return activities[0] if activities else None
+
+    async def get_activity_history(self, athlete_id: int) -> list[SummaryActivity]:
+        """The athlete's activities, read from a replica when one is configured.
+
+        A single athlete is read through ``activities_athlete_create_date_idx``.
+        """
+
+        async def fetch(session: AsyncSession) -> list[Any]:
+            result = await session.execute(
+                select(Activity.strava_id, Activity.strava_response).where(
+                    Activity.athlete_id == athlete_id
+                )
+            )
+            return list(result.all())
 
-            logging.info(f"Returning {len(activities)} parsed activities")
-            return activities
+        with span(
+            "postgres.get_activity_history", {"db.system": "postgresql"}
+        ) as query_span:
+            rows = await self._read(fetch)
+            query_span.set_attribute("db.response.returned_rows", len(rows))
+        return _parse_rows(rows)
+
+    async def iter_activity_history(
+        self, page_size: int = HISTORY_PAGE_SIZE
+    ) -> AsyncIterator[list[SummaryActivity]]:
+        """Keyset-paginate ``activities_athlete_create_date_idx`` backwards.
+
+        Athletes come newest ID first, which lets each athlete's activities
+        follow the index in ascending date order.
+        """
+        after: tuple[Any, ...] | None = None
+        while True:
+            with span(
+                "postgres.iter_activity_history",
+                {"db.system": "postgresql", "db.limit": page_size},
+            ) as query_span:
+                rows = await self._history_page(after, page_size)
+                query_span.set_attribute("db.response.returned_rows", len(rows))
+            if not rows:
+                return
+            yield _parse_rows((strava_id, response) for *_, strava_id, response in rows)
+            if len(rows) < page_size:
+                return
+            after = tuple(rows[-1][:3])
+
+    async def _history_page(
+        self, after: tuple[Any, ...] | None, page_size: int
+    ) -> list[Any]:
+        """``(athlete_id, create_date, strava_id, strava_response)`` rows."""
+        query = (
+            select(
+                Activity.athlete_id,
+                Activity.create_date,
+                Activity.strava_id,
+                Activity.strava_response,
+            )
+            .where(Activity.athlete_id.is_not(None))
+            .order_by(
+                Activity.athlete_id.desc(), Activity.create_date, Activity.strava_id
+            )
+            .limit(page_size)
+        )
+        if after is not None:
+            athlete_id, create_date, strava_id = after
+            query = query.where(
+                or_(
+                    Activity.athlete_id < athlete_id,
+                    and_(
+                        Activity.athlete_id == athlete_id,
+                        tuple_(Activity.create_date, Activity.strava_id)
+                        > (create_date, strava_id),
+                    ),
+                )
+            )
+
+        async def fetch(session: AsyncSession) -> list[Any]:
+            result = await session.execute(query)
+            return list(result.all())
+
+        return await self._read(fetch)
 
     async def insert_activity(self, activity: SummaryActivity) -> bool:
         """Insert a new activity into the database."""
@@ -87,23 +429,480 @@ class PostgresService(ActivityRepository):
             logging.info(f"Activity {activity.id} already synced, skipping insert")
             return False
 
+        if activity.start_date is None:
+            # create_date is the partition key (see migrations.py).
+            logging.warning(f"Activity {activity.id} has no start date, skipping")
+            return False
+
+        from src.analytics.rollups import rollup_deltas
+
         logging.info(f"Inserting activity {activity.id} into database")
-        async with self._session_maker() as session:
-            db_activity = Activity(
-                strava_id=activity.id,
-                create_date=activity.start_date,
-                strava_response=activity.model_dump_json(),
+        strava_response = activity.model_dump_json()
+        with span(
+            "postgres.insert_activity",
+            {
+                "db.system": "postgresql",
+                "activity.id": activity.id,
+                "db.request.bytes_written": len(strava_response),
+            },
+        ):
+            async with self._session_maker() as session:
+                db_activity = Activity(
+                    strava_id=activity.id,
+                    create_date=activity.start_date,
+                    athlete_id=athlete_key(activity),
+                    strava_response=strava_response,
+                )
+                deltas = rollup_deltas(activity)
+                try:
+                    session.add(db_activity)
+                    # Rollups change in the same transaction as the activity.
+                    if deltas:
+                        await session.execute(_rollup_upsert(deltas))
+                    if self._publish_inserts:
+                        # Delivered to listening workers only if the insert commits.
+                        await session.execute(
+                            NOTIFY_STATEMENT,
+                            notify_params(
+                                activity.id, activity.start_date, athlete_key(activity)
+                            ),
+                        )
+                    await session.commit()
+                except IntegrityError:
+                    # Another worker inserted it first.
+                    logging.info(f"Activity {activity.id} already stored, skipping")
+                    self.apply_synced_activity(
+                        activity.id, activity.start_date, athlete_key(activity)
+                    )
+                    return False
+            if self._router is not None:
+                self._router.mark_write()
+            self.apply_synced_activity(
+                activity.id, activity.start_date, athlete_key(activity)
             )
-            session.add(db_activity)
-            await session.commit()
-            self._synced_ids.add(activity.id)
-
-            # Update last sync date if this activity is newer
-            if activity.start_date and (
-                self._last_sync_date is None
-                or activity.start_date > self._last_sync_date
-            ):
-                self._last_sync_date = activity.start_date
 
             logging.info(f"Activity {activity.id} inserted successfully")
             return True
+
+    async def get_rollups(
+        self,
+        athlete_id: int,
+        period: str,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> list[Rollup]:
+        """Read stored rollup buckets; cost is proportional to the buckets."""
+        query = select(ActivityRollup).where(
+            ActivityRollup.athlete_id == athlete_id, ActivityRollup.period == period
+        )
+        if start is not None:
+            query = query.where(ActivityRollup.bucket_start >= start)
+        if end is not None:
+            query = query.where(ActivityRollup.bucket_start <= end)
+
+        async def fetch(session: AsyncSession) -> list[ActivityRollup]:
+            result = await session.execute(query.order_by(ActivityRollup.bucket_start))
+            return list(result.scalars().all())
+
+        with span(
+            "postgres.get_rollups", {"db.system": "postgresql", "rollup.period": period}
+        ) as query_span:
+            rows = await self._read(fetch)
+            query_span.set_attribute("db.response.returned_rows", len(rows))
+        return [_to_rollup(row) for row in rows]
+
+    async def get_personal_records(self, athlete_id: int) -> list[PersonalRecord]:
+        """Read the athlete's records through the primary key index."""
+
+        async def fetch(session: AsyncSession) -> list[PersonalRecord]:
+            result = await session.execute(
+                select(PersonalBest)
+                .where(PersonalBest.athlete_id == athlete_id)
+                .order_by(PersonalBest.distance_m)
+            )
+            return [_to_personal_record(row) for row in result.scalars().all()]
+
+        return await self._read(fetch)
+
+    async def update_personal_records(
+        self, candidates: list[PersonalRecord]
+    ) -> list[PersonalRecord]:
+        """Upsert the candidates, keeping whichever effort is faster."""
+        if not candidates:
+            return []
+        upsert = pg_insert(PersonalBest).values(
+            [
+                {
+                    "athlete_id": c.athlete_id,
+                    "distance": c.distance,
+                    "distance_m": c.distance_m,
+                    "elapsed_s": c.elapsed_s,
+                    "activity_id": c.activity_id,
+                    "start_date": c.start_date,
+                }
+                for c in candidates
+            ]
+        )
+        statement = upsert.on_conflict_do_update(
+            index_elements=[PersonalBest.athlete_id, PersonalBest.distance],
+            set_={
+                name: upsert.excluded[name]
+                for name in ("distance_m", "elapsed_s", "activity_id", "start_date")
+            },
+            where=PersonalBest.elapsed_s > upsert.excluded.elapsed_s,
+        ).returning(*PersonalBest.__table__.columns)
+        with span(
+            "postgres.update_personal_records",
+            {"db.system": "postgresql", "record.candidates": len(candidates)},
+        ) as update_span:
+            async with self._session_maker() as session:
+                # Only inserted or improved rows come back.
+                result = await session.execute(statement)
+                improved = [_to_personal_record(row) for row in result.all()]
+                await session.commit()
+            update_span.set_attribute("record.improved", len(improved))
+        if self._router is not None:
+            self._router.mark_write()
+        return improved
+
+    async def get_mean_max_curve(
+        self, athlete_id: int, season: str
+    ) -> MeanMaxCurve | None:
+        """Read one envelope row by primary key."""
+        from src.analytics.mean_max import MeanMaxCurve
+
+        async def fetch(session: AsyncSession) -> CurveEnvelope | None:
+            return await session.get(CurveEnvelope, (athlete_id, season))
+
+        envelope = await self._read(fetch)
+        return MeanMaxCurve.from_bytes(envelope.curve) if envelope else None
+
+    async def merge_mean_max_curve(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        seasons: list[str],
+        curve: MeanMaxCurve,
+    ) -> bool:
+        """Insert the activity curve and merge it into locked envelope rows."""
+        from src.analytics.mean_max import merge_blob
+
+        blob = curve.to_bytes()
+        with span(
+            "postgres.merge_mean_max_curve",
+            {"db.system": "postgresql", "activity.id": activity_id},
+        ):
+            # A second attempt covers a concurrent insert of a new envelope.
+            for attempt in range(2):
+                async with self._session_maker() as session:
+                    inserted = await session.execute(
+                        pg_insert(ActivityCurve)
+                        .values(
+                            athlete_id=athlete_id, activity_id=activity_id, curve=blob
+                        )
+                        .on_conflict_do_nothing()
+                        .returning(ActivityCurve.activity_id)
+                    )
+                    if inserted.first() is None:
+                        return False
+                    result = await session.execute(
+                        select(CurveEnvelope)
+                        .where(
+                            CurveEnvelope.athlete_id == athlete_id,
+                            CurveEnvelope.season.in_(seasons),
+                        )
+                        .with_for_update()
+                    )
+                    envelopes = {row.season: row for row in result.scalars().all()}
+                    for season in seasons:
+                        envelope = envelopes.get(season)
+                        if envelope is None:
+                            session.add(
+                                CurveEnvelope(
+                                    athlete_id=athlete_id,
+                                    season=season,
+                                    curve=blob,
+                                    activity_count=1,
+                                )
+                            )
+                        else:
+                            envelope.curve = merge_blob(envelope.curve, curve)
+                            envelope.activity_count += 1
+                    try:
+                        await session.commit()
+                    except IntegrityError:
+                        if attempt:
+                            raise
+                        continue
+                    break
+        if self._router is not None:
+            self._router.mark_write()
+        return True
+
+    async def get_heatmap_tile(
+        self, athlete_id: int, zoom: int, x: int, y: int
+    ) -> bytes | None:
+        """Read one tile row by primary key."""
+
+        async def fetch(session: AsyncSession) -> HeatmapTile | None:
+            return await session.get(HeatmapTile, (athlete_id, zoom, x, y))
+
+        tile = await self._read(fetch)
+        return tile.density if tile else None
+
+    async def merge_heatmap_tiles(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        tiles: dict[tuple[int, int, int], bytes],
+    ) -> bool:
+        """Mark the activity added and sum its grids into locked tile rows."""
+        from src.analytics.heatmap import merge_tile_blob
+
+        with span(
+            "postgres.merge_heatmap_tiles",
+            {
+                "db.system": "postgresql",
+                "activity.id": activity_id,
+                "heatmap.tiles": len(tiles),
+            },
+        ):
+            # A second attempt covers a concurrent insert of a new tile.
+            for attempt in range(2):
+                async with self._session_maker() as session:
+                    inserted = await session.execute(
+                        pg_insert(HeatmapActivity)
+                        .values(athlete_id=athlete_id, activity_id=activity_id)
+                        .on_conflict_do_nothing()
+                        .returning(HeatmapActivity.activity_id)
+                    )
+                    if inserted.first() is None:
+                        return False
+                    result = await session.execute(
+                        select(HeatmapTile)
+                        .where(
+                            HeatmapTile.athlete_id == athlete_id,
+                            tuple_(HeatmapTile.zoom, HeatmapTile.x, HeatmapTile.y).in_(
+                                list(tiles)
+                            ),
+                        )
+                        .with_for_update()
+                    )
+                    stored = {
+                        (row.zoom, row.x, row.y): row for row in result.scalars().all()
+                    }
+                    for (zoom, x, y), blob in tiles.items():
+                        tile = stored.get((zoom, x, y))
+                        if tile is None:
+                            session.add(
+                                HeatmapTile(
+                                    athlete_id=athlete_id,
+                                    zoom=zoom,
+                                    x=x,
+                                    y=y,
+                                    density=blob,
+                                )
+                            )
+                        else:
+                            tile.density = merge_tile_blob(tile.density, blob)
+                    try:
+                        await session.commit()
+                    except IntegrityError:
+                        if attempt:
+                            raise
+                        continue
+                    break
+        if self._router is not None:
+            self._router.mark_write()
+        return True
+
+    async def replace_heatmap(
+        self,
+        athlete_id: int,
+        activity_ids: list[int],
+        tiles: dict[tuple[int, int, int], bytes],
+    ) -> int:
+        """Swap the athlete's tiles and markers in one transaction."""
+        with span(
+            "postgres.replace_heatmap",
+            {"db.system": "postgresql", "heatmap.tiles": len(tiles)},
+        ):
+            async with self._session_maker() as session:
+                await session.execute(
+                    delete(HeatmapTile).where(HeatmapTile.athlete_id == athlete_id)
+                )
+                await session.execute(
+                    delete(HeatmapActivity).where(
+                        HeatmapActivity.athlete_id == athlete_id
+                    )
+                )
+                if activity_ids:
+                    await session.execute(
+                        insert(HeatmapActivity),
+                        [
+                            {"athlete_id": athlete_id, "activity_id": activity_id}
+                            for activity_id in activity_ids
+                        ],
+                    )
+                if tiles:
+                    await session.execute(
+                        insert(HeatmapTile),
+                        [
+                            {
+                                "athlete_id": athlete_id,
+                                "zoom": zoom,
+                                "x": x,
+                                "y": y,
+                                "density": blob,
+                            }
+                            for (zoom, x, y), blob in tiles.items()
+                        ],
+                    )
+                await session.commit()
+        if self._router is not None:
+            self._router.mark_write()
+        return len(tiles)
+
+    async def index_routes(self, routes: list[RouteRecord]) -> int:
+        """Upsert route rows with their geohash columns."""
+        if not routes:
+            return 0
+        statement = pg_insert(ActivityRoute).values(
+            [
+                {
+                    "athlete_id": route.athlete_id,
+                    "activity_id": route.activity_id,
+                    **{name: getattr(route, name) for name in _ROUTE_FIELDS},
+                    "start_geohash": route.start_geohash,
+                    "end_geohash": route.end_geohash,
+                }
+                for route in routes
+            ]
+        )
+        updated = (*_ROUTE_FIELDS, "start_geohash", "end_geohash")
+        with span(
+            "postgres.index_routes",
+            {"db.system": "postgresql", "route.count": len(routes)},
+        ):
+            async with self._session_maker() as session:
+                await session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[
+                            ActivityRoute.athlete_id,
+                            ActivityRoute.activity_id,
+                        ],
+                        set_={name: statement.excluded[name] for name in updated},
+                    )
+                )
+                await session.commit()
+        if self._router is not None:
+            self._router.mark_write()
+        return len(routes)
+
+    async def get_route(self, athlete_id: int, activity_id: int) -> RouteRecord | None:
+        """Read one route row by primary key."""
+
+        async def fetch(session: AsyncSession) -> ActivityRoute | None:
+            return await session.get(ActivityRoute, (athlete_id, activity_id))
+
+        row = await self._read(fetch)
+        return _to_route(row) if row else None
+
+    async def find_routes(
+        self, athlete_id: int, field: str, cells: list[str]
+    ) -> list[RouteRecord]:
+        """Range-scan the geohash index once per cell prefix, on the primary."""
+        if not cells:
+            return []
+        column = (
+            ActivityRoute.end_geohash if field == "end" else ActivityRoute.start_geohash
+        )
+        # Geohashes use 0-9 and b-z, all of which sort below "~".
+        prefixes = [and_(column >= cell, column < cell + "~") for cell in cells]
+
+        async def fetch(session: AsyncSession) -> list[RouteRecord]:
+            result = await session.execute(
+                select(ActivityRoute).where(
+                    ActivityRoute.athlete_id == athlete_id, or_(*prefixes)
+                )
+            )
+            return [_to_route(row) for row in result.scalars().all()]
+
+        # RouteIndex caches the result, so read the primary: a lagging replica
+        # would keep a just-indexed route out of the cache.
+        with span(
+            "postgres.find_routes",
+            {"db.system": "postgresql", "route_index.cells": len(cells)},
+        ):
+            async with self._session_maker() as session:
+                return await fetch(session)
+
+    async def rebuild_rollups(self, athlete_id: int, start: date, end: date) -> int:
+        """Recompute the athlete's rollup buckets covering ``start``..``end``."""
+        from src.analytics.rollups import compute_rollups, rebuild_plan
+
+        plan = rebuild_plan(start, end)
+        # create_date is UTC while buckets follow local days; widen by a day
+        # and let compute_rollups drop what falls outside the plan.
+        window_start = datetime.combine(
+            plan.window_start - timedelta(days=1), time(), timezone.utc
+        )
+        window_end = datetime.combine(
+            plan.window_end + timedelta(days=1), time(), timezone.utc
+        )
+        with span(
+            "postgres.rebuild_rollups",
+            {
+                "db.system": "postgresql",
+                "rollup.start": str(start),
+                "rollup.end": str(end),
+            },
+        ) as rebuild_span:
+            async with self._session_maker() as session:
+                result = await session.execute(
+                    select(Activity.strava_id, Activity.strava_response).where(
+                        Activity.athlete_id == athlete_id,
+                        Activity.create_date >= window_start,
+                        Activity.create_date < window_end,
+                    )
+                )
+                activities = _parse_rows(result.all())
+                rollups = compute_rollups(activities, plan)
+
+                await session.execute(
+                    delete(ActivityRollup).where(
+                        ActivityRollup.athlete_id == athlete_id,
+                        or_(
+                            *(
+                                and_(
+                                    ActivityRollup.period == period,
+                                    ActivityRollup.bucket_start.between(first, last),
+                                )
+                                for period, (first, last) in plan.ranges.items()
+                            )
+                        ),
+                    )
+                )
+                if rollups:
+                    await session.execute(
+                        insert(ActivityRollup),
+                        [
+                            {
+                                "athlete_id": r.athlete_id,
+                                "period": r.period,
+                                "bucket_start": r.bucket_start,
+                                **r.totals(),
+                            }
+                            for r in rollups
+                        ],
+                    )
+                await session.commit()
+            if self._router is not None:
+                self._router.mark_write()
+            rebuild_span.set_attributes(
+                {"activity.count": len(activities), "rollup.buckets": len(rollups)}
+            )
+        logging.info(
+            f"Rebuilt {len(rollups)} rollup buckets from {len(activities)} activities"
+        )
+        return len(rollups)
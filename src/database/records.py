@@ -0,0 +1,44 @@
+"""Stored aggregate records shared by the repositories and the analytics.
+
+``Rollup`` buckets are built by ``src/analytics/rollups.py`` and
+``PersonalRecord`` candidates by ``src/analytics/best_efforts.py``; they live
+here so the database layer does not depend on the analytics modules.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+
+
+@dataclass
+class Rollup:
+    athlete_id: int
+    period: str
+    bucket_start: date
+    activity_count: int = 0
+    run_count: int = 0
+    distance_m: float = 0.0
+    moving_time_s: float = 0.0
+    elapsed_time_s: float = 0.0
+    elevation_gain_m: float = 0.0
+
+    def add(self, other: Rollup) -> None:
+        for name in TOTAL_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def totals(self) -> dict[str, float]:
+        return {name: getattr(self, name) for name in TOTAL_FIELDS}
+
+
+TOTAL_FIELDS = tuple(f.name for f in fields(Rollup)[3:])
+
+
+@dataclass(frozen=True)
+class PersonalRecord:
+    athlete_id: int
+    distance: str
+    distance_m: float
+    elapsed_s: float
+    activity_id: int
+    start_date: datetime | None
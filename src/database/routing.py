@@ -0,0 +1,161 @@
+"""Read-replica routing for repository sessions.
+
+Reads are load-balanced round-robin over the replicas that passed their
+last health check; writes always use the primary. After a write (by this
+process, or one another worker announced), reads stick to the primary for
+the lag window: ``sticky_seconds`` or the replication lag measured by the
+last health check, whichever is longer. Replicas lagging more than
+``max_lag_seconds`` are skipped. With no healthy replica, reads fall back to
+the primary, and a read that fails on a replica is retried there.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_STICKY_SECONDS = 2.0
+DEFAULT_MAX_LAG_SECONDS = 30.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 10.0
+HEALTH_CHECK_TIMEOUT = 2.0
+# Zero when the replica has replayed everything it received; otherwise the
+# age of the last replayed transaction. Comparing LSNs first keeps an idle
+# primary (no new transactions) from looking like lag.
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM "
+    "now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+# Errors after which a replica read is retried on the primary.
+REPLICA_READ_ERRORS = (DBAPIError, OSError, asyncio.TimeoutError)
+
+
+@dataclass
+class Replica:
+    name: str
+    session_maker: async_sessionmaker[AsyncSession]
+    healthy: bool = True
+    lag_seconds: float = 0.0
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: list[Replica],
+        sticky_seconds: float = DEFAULT_STICKY_SECONDS,
+        max_lag_seconds: float = DEFAULT_MAX_LAG_SECONDS,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self._last_write = float("-inf")
+        self._round_robin = itertools.cycle(range(len(replicas)))
+        self._health_task: asyncio.Task[None] | None = None
+
+    def lag_window(self) -> float:
+        """Seconds after a write during which replicas may not have it yet."""
+        lags = [replica.lag_seconds for replica in self.replicas if replica.healthy]
+        return max([self.sticky_seconds, *lags])
+
+    def mark_write(self) -> None:
+        """Pin reads to the primary for the lag window."""
+        self._last_write = time.monotonic()
+
+    def read_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        if time.monotonic() < self._last_write + self.lag_window():
+            return self.primary
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._round_robin)]
+            if replica.healthy:
+                return replica.session_maker
+        return self.primary
+
+    def write_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        return self.primary
+
+    async def read(self, query: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """Run ``query`` on a read session, retrying on the primary if a
+        replica fails.
+
+        The failing replica is skipped until its next successful health check.
+        """
+        session_maker = self.read_session_maker()
+        if session_maker is self.primary:
+            async with session_maker() as session:
+                return await query(session)
+        try:
+            async with session_maker() as session:
+                return await query(session)
+        except REPLICA_READ_ERRORS as e:
+            for replica in self.replicas:
+                if replica.session_maker is session_maker:
+                    replica.healthy = False
+                    logger.warning(
+                        "Read on replica %s failed, retrying on the primary: %s",
+                        replica.name,
+                        e,
+                    )
+        async with self.primary() as session:
+            return await query(session)
+
+    async def check_health(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.session_maker() as session:
+                result = await asyncio.wait_for(
+                    session.execute(LAG_QUERY), HEALTH_CHECK_TIMEOUT
+                )
+                lag_seconds = float(result.scalar() or 0)
+        except Exception as e:
+            if replica.healthy:
+                logger.warning("Replica %s failed health check: %s", replica.name, e)
+            replica.healthy = False
+            return
+        replica.lag_seconds = lag_seconds
+        if lag_seconds > self.max_lag_seconds:
+            if replica.healthy:
+                logger.warning(
+                    "Replica %s is %.1fs behind, skipping it", replica.name, lag_seconds
+                )
+            replica.healthy = False
+            return
+        if not replica.healthy:
+            logger.info("Replica %s is healthy again", replica.name)
+        replica.healthy = True
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def start_health_checks(
+        self, interval: float = DEFAULT_HEALTH_CHECK_INTERVAL
+    ) -> None:
+        if self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(
+                self._health_loop(interval)
+            )
+
+    async def stop_health_checks(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
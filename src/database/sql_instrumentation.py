@@ -0,0 +1,60 @@
+"""SQLAlchemy engine hooks that time every statement into ``QueryStats``."""
+
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.observability.queries import QUERY_STATS, QueryStats
+
+_START_TIMES_KEY = "query_start_times"
+
+
+def instrument_engine(
+    engine: AsyncEngine | Engine, stats: QueryStats = QUERY_STATS
+) -> None:
+    """Attach timing hooks to ``engine`` (idempotent)."""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if getattr(sync_engine, "_query_stats_instrumented", False):
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        # A stack, since a hook may fire while another statement is running
+        # on the same connection (e.g. autoflush).
+        conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        start = conn.info[_START_TIMES_KEY].pop()
+        stats.record(statement, time.perf_counter() - start, parameters)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context: Any) -> None:
+        conn = exception_context.connection
+        starts = conn.info.get(_START_TIMES_KEY) if conn is not None else None
+        if starts:
+            start = starts.pop()
+            stats.record(
+                exception_context.statement or "",
+                time.perf_counter() - start,
+                exception_context.parameters,
+            )
+
+    sync_engine._query_stats_instrumented = True  # type: ignore[attr-defined]
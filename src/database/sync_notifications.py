@@ -0,0 +1,116 @@
+"""Cross-worker sync-state coherence over Postgres LISTEN/NOTIFY.
+
+Every uvicorn worker keeps its own ``PostgresService`` sync state. Inserts
+publish a notification in the inserting transaction (so it is delivered
+only on commit), and each worker's ``SyncStateListener`` applies those
+notifications to its local state on a dedicated asyncpg connection. If the
+connection drops, notifications may have been missed, so after
+reconnecting the listener reloads the sync state from the table once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import text
+
+if TYPE_CHECKING:
+    import asyncpg
+
+    from src.database.postgres_service import PostgresService
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "running_corgium_activity_synced"
+RECONNECT_DELAY_SECONDS = 5.0
+
+NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+
+
+def notify_params(
+    strava_id: int, create_date: datetime | None, athlete_id: int | None = None
+) -> dict[str, str]:
+    payload = {
+        "strava_id": strava_id,
+        "create_date": create_date.isoformat() if create_date else None,
+        "athlete_id": athlete_id,
+    }
+    return {"channel": CHANNEL, "payload": json.dumps(payload)}
+
+
+def parse_payload(payload: str) -> tuple[int, datetime | None, int | None]:
+    data = json.loads(payload)
+    create_date = data.get("create_date")
+    athlete_id = data.get("athlete_id")
+    return (
+        int(data["strava_id"]),
+        datetime.fromisoformat(create_date) if create_date else None,
+        int(athlete_id) if athlete_id is not None else None,
+    )
+
+
+class SyncStateListener:
+    def __init__(
+        self,
+        dsn: str,
+        service: PostgresService,
+        reconnect_delay: float = RECONNECT_DELAY_SECONDS,
+    ) -> None:
+        self._dsn = dsn
+        self._service = service
+        self._reconnect_delay = reconnect_delay
+        self._conn: asyncpg.Connection | None = None
+        self._reconnect_task: asyncio.Task[None] | None = None
+        self._stopped = False
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self._dsn)
+        await self._conn.add_listener(CHANNEL, self._on_notification)
+        self._conn.add_termination_listener(self._on_termination)
+        logger.info("Listening for sync notifications on %s", CHANNEL)
+
+    def _on_notification(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            strava_id, create_date, athlete_id = parse_payload(payload)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed sync notification: %r", payload)
+            return
+        self._service.apply_synced_activity(strava_id, create_date, athlete_id)
+
+    def _on_termination(self, conn: Any) -> None:
+        if self._stopped or self._reconnect_task is not None:
+            return
+        logger.warning("Sync notification connection lost; reconnecting")
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        import asyncpg
+
+        try:
+            while not self._stopped:
+                try:
+                    await self.start()
+                except (OSError, asyncpg.PostgresError) as e:
+                    logger.warning("Sync notification reconnect failed: %s", e)
+                    await asyncio.sleep(self._reconnect_delay)
+                    continue
+                # Anything published while disconnected was lost.
+                await self._service.reload_sync_state()
+                return
+        finally:
+            self._reconnect_task = None
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.remove_listener(CHANNEL, self._on_notification)
+            await self._conn.close()
+        self._conn = None
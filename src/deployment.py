@@ -1,12 +1,20 @@
 """Deployment factory abstraction for standalone and AWS modes."""
 
+import asyncio
 from abc import ABC, abstractmethod
 from enum import StrEnum
+from typing import TYPE_CHECKING
 
 from fastapi import FastAPI
 
 from src.config import settings
 from src.database.activity_repository import ActivityRepository
+from src.sync.registry import SyncRegistry
+from src.sync.window import RequestWindow
+
+if TYPE_CHECKING:
+    from src.database.postgres_service import PostgresService
+    from src.database.sync_notifications import SyncStateListener
 
 
 class DeploymentMode(StrEnum):
@@ -18,6 +26,12 @@ class DeploymentFactory(ABC):
     @abstractmethod
     def create_repo(self) -> ActivityRepository: ...
 
+    @abstractmethod
+    def create_sync_registry(self) -> SyncRegistry: ...
+
+    @abstractmethod
+    def create_request_window(self) -> RequestWindow: ...
+
     @abstractmethod
     async def init_db(self) -> None: ...
 
@@ -29,17 +43,51 @@ class DeploymentFactory(ABC):
 
 
 class AWSFactory(DeploymentFactory):
-    def create_repo(self) -> ActivityRepository:
+    def _table(self, table_name: str):
         import boto3
 
-        from src.database.dynamo_service import DynamoService
-
         dynamodb = boto3.resource(
             "dynamodb",
             endpoint_url=settings.dynamodb_endpoint_url,
             region_name=settings.dynamodb_region,
         )
-        return DynamoService(dynamodb.Table(settings.dynamodb_table_name))
+        table = dynamodb.Table(table_name)
+        if not settings.dynamodb_capacity_tracking_enabled:
+            return table
+
+        from src.database.dynamo_capacity import CapacityTrackingTable
+        from src.observability.capacity import CAPACITY
+
+        CAPACITY.configure(
+            settings.dynamodb_capacity_operation_budget,
+            settings.dynamodb_capacity_request_budget,
+            settings.dynamodb_capacity_budget_mode,
+        )
+        return CapacityTrackingTable(table)
+
+    def create_repo(self) -> ActivityRepository:
+        from src.database.dynamo_service import DynamoService
+
+        return DynamoService(
+            self._table(settings.dynamodb_table_name),
+            self._table(settings.dynamodb_rollups_table_name),
+            self._table(settings.dynamodb_personal_records_table_name),
+            self._table(settings.dynamodb_curves_table_name),
+            self._table(settings.dynamodb_heatmap_table_name),
+            self._table(settings.dynamodb_routes_table_name),
+        )
+
+    def create_sync_registry(self) -> SyncRegistry:
+        from src.sync.registry import DynamoSyncRegistry
+
+        return DynamoSyncRegistry(self._table(settings.dynamodb_sync_table_name))
+
+    def create_request_window(self) -> RequestWindow:
+        from src.sync.window import DynamoRequestWindow
+
+        return DynamoRequestWindow(
+            self._table(settings.dynamodb_sync_window_table_name)
+        )
 
     async def init_db(self) -> None:
         from src.database.dynamo_service import ensure_dynamo_table
@@ -51,6 +99,53 @@ class AWSFactory(DeploymentFactory):
             settings.dynamodb_region,
             settings.dynamodb_table_name,
         )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_sync_table_name,
+            key_name="athlete_id",
+        )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_sync_window_table_name,
+            key_name="window",
+        )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_rollups_table_name,
+            key_name="athlete_id",
+            sort_key_name="bucket_key",
+        )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_personal_records_table_name,
+            key_name="athlete_id",
+            sort_key_name="distance",
+        )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_curves_table_name,
+            key_name="athlete_id",
+            sort_key_name="curve_key",
+        )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_heatmap_table_name,
+            key_name="athlete_id",
+            sort_key_name="tile_key",
+        )
+        await ensure_dynamo_table(
+            settings.dynamodb_endpoint_url,
+            settings.dynamodb_region,
+            settings.dynamodb_routes_table_name,
+            key_name="athlete_id",
+            sort_key_name="route_key",
+        )
 
     async def shutdown(self) -> None:
         pass
@@ -62,20 +157,72 @@ class AWSFactory(DeploymentFactory):
 
 
 class StandaloneFactory(DeploymentFactory):
+    def __init__(self) -> None:
+        self._repo: PostgresService | None = None
+        self._listener: SyncStateListener | None = None
+        self._partition_task: asyncio.Task[None] | None = None
+
     def create_repo(self) -> ActivityRepository:
         from src.database import PostgresService
-        from src.database.db import get_session_maker
+        from src.database.db import (
+            get_activity_reader,
+            get_replica_router,
+            get_session_maker,
+        )
+
+        fast_reader = get_activity_reader() if settings.db_asyncpg_fast_reads else None
+        self._repo = PostgresService(
+            get_session_maker(),
+            fast_reader,
+            publish_inserts=settings.db_sync_notifications,
+            router=get_replica_router(),
+        )
+        return self._repo
+
+    def create_sync_registry(self) -> SyncRegistry:
+        from src.sync.registry import InMemorySyncRegistry
+
+        return InMemorySyncRegistry()
+
+    def create_request_window(self) -> RequestWindow:
+        from src.sync.window import InMemoryRequestWindow
 
-        return PostgresService(get_session_maker())
+        return InMemoryRequestWindow()
 
     async def init_db(self) -> None:
-        from src.database.db import create_db_and_tables
+        from src.database.db import (
+            get_replica_router,
+            run_migrations,
+            start_partition_maintenance,
+        )
 
-        await create_db_and_tables()
+        await run_migrations()
+        self._partition_task = start_partition_maintenance()
+        router = get_replica_router()
+        if router is not None:
+            await router.check_health()
+            router.start_health_checks(settings.db_replica_health_check_seconds)
+        if settings.db_sync_notifications and self._repo is not None:
+            from src.database.db import postgres_dsn
+            from src.database.sync_notifications import SyncStateListener
 
-    async def shutdown(self) -> None:
-        from src.database.db import get_engine
+            self._listener = SyncStateListener(postgres_dsn(), self._repo)
+            await self._listener.start()
 
+    async def shutdown(self) -> None:
+        from src.database.db import close_activity_reader, close_replicas, get_engine
+
+        if self._partition_task is not None:
+            self._partition_task.cancel()
+            try:
+                await self._partition_task
+            except asyncio.CancelledError:
+                pass
+            self._partition_task = None
+        if self._listener is not None:
+            await self._listener.stop()
+        await close_activity_reader()
+        await close_replicas()
         await get_engine().dispose()
 
     def register_auth_routes(self, application: FastAPI) -> None:
@@ -93,4 +240,4 @@ _FACTORIES: dict[DeploymentMode, type[DeploymentFactory]] = {
 
 def get_factory(db_backend: str) -> DeploymentFactory:
     """Create the appropriate factory for the given db_backend value."""
-    return _FACTORIES[DeploymentMode(db_backend)]()
\ No newline at end of file
+    return _FACTORIES[DeploymentMode(db_backend)]()
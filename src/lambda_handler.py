@@ -1,5 +1,45 @@
-from mangum import Mangum
+"""AWS Lambda entry point.
 
-from src.main import app
+Nothing heavy is imported at module load: the FastAPI app, its routers and the
+Mangum adapter are built on the first invocation and reused while the
+container stays warm. Warm-up pings are answered without touching the ASGI
+stack.
+"""
 
-handler = Mangum(app, lifespan="auto")
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from mangum import Mangum
+
+_asgi_handler: Mangum | None = None
+
+WARMUP_SOURCES = frozenset({"serverless-plugin-warmup", "running-corgium.warmup"})
+
+
+def get_asgi_handler() -> Mangum:
+    """Build the Mangum-wrapped app once per container."""
+    global _asgi_handler
+    if _asgi_handler is None:
+        from mangum import Mangum
+
+        from src.main import app
+
+        _asgi_handler = Mangum(app, lifespan="auto")
+    return _asgi_handler
+
+
+def is_warmup_event(event: Any) -> bool:
+    """Return True for scheduled keep-warm pings rather than HTTP events."""
+    if not isinstance(event, dict):
+        return False
+    return event.get("warmup") is True or event.get("source") in WARMUP_SOURCES
+
+
+def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    if is_warmup_event(event):
+        # Pay for app construction off the request path, then return early.
+        get_asgi_handler()
+        return {"warmup": True}
+    return get_asgi_handler()(event, context)
@@ -1,12 +1,23 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 from src.config import settings
 from src.deployment import get_factory
+from src.middleware import (
+    CompressionMiddleware,
+    RequestMetricsMiddleware,
+    TracingMiddleware,
+)
+from src.observability.capacity import CapacityBudgetExceeded
+from src.observability.tracing import configure_tracing
+from src.routers.debug import create_debug_router
 from src.routers.frontend import register_spa_routes
+from src.routers.metrics import create_metrics_router
 from src.routers.strava import create_strava_router
 from src.strava import StravaService
 
@@ -21,31 +32,79 @@ logger = logging.getLogger("running-corgium")
 
 
 def create_app() -> FastAPI:
+    configure_tracing(
+        settings.tracing_exporter,
+        settings.tracing_sample_ratio,
+        Path(settings.tracing_file_path),
+    )
     factory = get_factory(settings.db_backend)
     activity_repo = factory.create_repo()
-    strava_service = StravaService(activity_repo)
+    strava_service = StravaService(activity_repo, factory.create_sync_registry())
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         await factory.init_db()
         await activity_repo.initialize()
+        stop_worker = asyncio.Event()
+        worker: asyncio.Task[None] | None = None
+        if settings.sync_local_worker:
+            worker = asyncio.create_task(_start_local_sync_worker(stop_worker))
         yield
+        if worker is not None:
+            stop_worker.set()
+            await worker
         await factory.shutdown()
 
+    async def _start_local_sync_worker(stop: asyncio.Event) -> None:
+        from src.sync.fanout import RateBudget
+        from src.sync.queue import InMemorySyncQueue
+        from src.sync.worker import (
+            STRAVA_REQUESTS_PER_SECOND,
+            build_fanout,
+            run_local_worker,
+        )
+
+        queue = InMemorySyncQueue()
+        budget = RateBudget(
+            settings.sync_request_budget, refill_per_second=STRAVA_REQUESTS_PER_SECOND
+        )
+        fanout = build_fanout(strava_service, queue, budget)
+        logger.info("Starting local background sync worker")
+        await run_local_worker(fanout, queue, settings.sync_interval_seconds, stop)
+
     app = FastAPI(lifespan=lifespan)
     app.state.strava_service = strava_service
 
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        logger.info("%s %s", request.method, request.url.path)
-        response = await call_next(request)
-        logger.info(
-            "%s %s -> %d", request.method, request.url.path, response.status_code
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+    app.add_middleware(TracingMiddleware)
+    # Added last so it is outermost: timings include compression and the
+    # recorded sizes are what actually went over the wire.
+    app.add_middleware(
+        RequestMetricsMiddleware,
+        server_timing=settings.server_timing_enabled,
+        capacity_header=settings.dynamodb_capacity_header,
+    )
+
+    @app.exception_handler(CapacityBudgetExceeded)
+    async def capacity_budget_exceeded(
+        request: Request, exc: CapacityBudgetExceeded
+    ) -> JSONResponse:
+        logger.warning(f"Rejected {request.url.path}: {exc}")
+        return JSONResponse(
+            {"detail": "DynamoDB capacity budget exceeded"}, status_code=503
         )
-        return response
 
     factory.register_auth_routes(app)
     app.include_router(create_strava_router(strava_service))
+    if settings.metrics_enabled:
+        app.include_router(create_metrics_router())
+    if settings.sql_debug_endpoint:
+        app.include_router(create_debug_router())
 
     _frontend_dist = Path(__file__).resolve().parent.parent / "frontend" / "dist"
     register_spa_routes(app, _frontend_dist)
@@ -53,4 +112,4 @@ def create_app() -> FastAPI:
     return app
 
 
-app = create_app()
\ No newline at end of file
+app = create_app()
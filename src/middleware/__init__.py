@@ -0,0 +1,5 @@
+from src.middleware.compression import CompressionMiddleware
+from src.middleware.request_metrics import RequestMetricsMiddleware
+from src.middleware.tracing import TracingMiddleware
+
+__all__ = ["CompressionMiddleware", "RequestMetricsMiddleware", "TracingMiddleware"]
@@ -0,0 +1,176 @@
+"""Negotiated gzip / brotli response compression.
+
+A pure ASGI middleware: buffered responses are compressed in one go once they
+exceed ``minimum_size``, streamed responses are compressed chunk by chunk.
+Responses that already carry a ``Content-Encoding`` (e.g. precompressed SPA
+assets) or have a non-text content type pass through untouched. Brotli is
+used only when the optional ``brotli`` package is installed.
+"""
+
+import zlib
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DEFAULT_MINIMUM_SIZE = 1024
+
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Parse an ``Accept-Encoding`` header, dropping codings with ``q=0``."""
+    accepted: set[str] = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(_COMPRESSIBLE_TYPES) or content_type.endswith(
+        "+json"
+    )
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        # wbits=31 selects the gzip container.
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose_encoding(self, accept_encoding: str) -> str | None:
+        accepted = accepted_encodings(accept_encoding)
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compressor(self, encoding: str) -> _Compressor:
+        if encoding == "br":
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=start["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type", ""))
+                    or start["status"] in (204, 304)
+                )
+                if passthrough:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            assert start is not None
+            body: bytes = message.get("body", b"")
+            more_body: bool = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The encoded bytes differ, so a strong validator no
+                    # longer holds.
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_compressed)
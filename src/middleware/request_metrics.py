@@ -0,0 +1,136 @@
+"""Pure ASGI request instrumentation.
+
+Records latency and response-size histograms per route template, requests by
+status and an in-flight gauge, logs one line per request and optionally adds
+a ``Server-Timing`` header. Database statements are counted per request so
+N+1 patterns are flagged per route, and DynamoDB consumed capacity is
+attributed to the route (optionally echoed in a response header). Unlike ``@app.middleware("http")`` it
+does not wrap the app in ``BaseHTTPMiddleware``, so streaming responses pass
+through untouched.
+"""
+
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.observability.capacity import CAPACITY, CapacityTracker
+from src.observability.metrics import (
+    DEFAULT_SIZE_BUCKETS,
+    REGISTRY,
+    MetricsRegistry,
+)
+from src.observability.queries import QUERY_STATS, QueryStats
+from src.observability.timing import (
+    current_timings,
+    server_timing_header,
+    start_collecting,
+    stop_collecting,
+)
+
+logger = logging.getLogger("running-corgium")
+
+CAPACITY_HEADER = "X-DynamoDB-Consumed-Capacity"
+
+# Label for requests that did not match any route, so unknown paths cannot
+# blow up the label cardinality.
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template, e.g. ``/login/{name}``."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if isinstance(path, str) else UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: MetricsRegistry = REGISTRY,
+        server_timing: bool = False,
+        query_stats: QueryStats = QUERY_STATS,
+        capacity: CapacityTracker = CAPACITY,
+        capacity_header: bool = False,
+    ) -> None:
+        self.app = app
+        self.server_timing = server_timing
+        self.query_stats = query_stats
+        self.capacity = capacity
+        self.capacity_header = capacity_header
+        self.requests = registry.counter(
+            "http_requests_total",
+            "HTTP requests by route template and status.",
+            ("method", "route", "status"),
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds",
+            "Time to send the complete response.",
+            ("method", "route"),
+        )
+        self.response_size = registry.histogram(
+            "http_response_size_bytes",
+            "Response body bytes sent (after compression).",
+            ("method", "route"),
+            buckets=DEFAULT_SIZE_BUCKETS,
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight",
+            "Requests currently being handled.",
+            ("method",),
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope["method"]
+        start = time.perf_counter()
+        status = 500
+        body_bytes = 0
+        token = start_collecting()
+        queries_token = self.query_stats.start_request()
+        capacity_token = self.capacity.start_request()
+
+        async def send_instrumented(message: Message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(raw=message["headers"])
+                if self.server_timing:
+                    headers.append(
+                        "Server-Timing",
+                        server_timing_header(
+                            current_timings(), time.perf_counter() - start
+                        ),
+                    )
+                consumed = self.capacity.current_request()
+                if self.capacity_header and consumed is not None:
+                    headers.append(CAPACITY_HEADER, consumed.header_value())
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        self.in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_instrumented)
+        finally:
+            elapsed = time.perf_counter() - start
+            stop_collecting(token)
+            self.in_flight.dec(method)
+            route = route_template(scope)
+            self.query_stats.finish_request(queries_token, route)
+            self.capacity.finish_request(capacity_token, route)
+            self.requests.inc(method, route, str(status))
+            self.latency.observe(elapsed, method, route)
+            self.response_size.observe(body_bytes, method, route)
+            logger.info(
+                "%s %s -> %d (%.1f ms)",
+                method,
+                scope["path"],
+                status,
+                elapsed * 1000,
+            )
@@ -0,0 +1,54 @@
+"""Pure ASGI middleware opening a server span per HTTP request.
+
+An incoming W3C ``traceparent`` header continues the caller's trace; spans
+opened further down (Strava calls, repository queries, parsing) become its
+children through the context variable.
+"""
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.middleware.request_metrics import route_template
+from src.observability.tracing import TRACEPARENT_HEADER, get_tracer, span
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or get_tracer() is None:
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope["method"]
+        traceparent = Headers(scope=scope).get(TRACEPARENT_HEADER)
+        status = 500
+        body_bytes = 0
+
+        async def send_traced(message: Message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        with span(
+            method,
+            {"http.request.method": method, "url.path": scope["path"]},
+            traceparent=traceparent,
+        ) as server_span:
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                route = route_template(scope)
+                # Named after the route template, as OpenTelemetry recommends.
+                server_span.name = f"{method} {route}"
+                server_span.set_attributes(
+                    {
+                        "http.route": route,
+                        "http.response.status_code": status,
+                        "http.response.body.size": body_bytes,
+                    }
+                )
@@ -0,0 +1,8 @@
+"""
+Observability: request metrics and per-request timing breakdowns
+"""
+
+from src.observability.metrics import REGISTRY, MetricsRegistry
+from src.observability.timing import record_timing, timed
+
+__all__ = ["REGISTRY", "MetricsRegistry", "record_timing", "timed"]
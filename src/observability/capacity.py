@@ -0,0 +1,191 @@
+"""DynamoDB consumed-capacity accounting and budget guard.
+
+``CapacityTrackingTable`` (``src/database/dynamo_capacity.py``) asks every
+data-plane call for ``ReturnConsumedCapacity=TOTAL`` and reports the result
+here. Capacity is aggregated per operation and table for the lifetime of the
+process, and per request through a context variable that the request
+metrics middleware opens, so costs can be attributed to routes.
+
+The budget guard logs operations that consumed more than
+``operation_budget`` units. Once a request has consumed ``request_budget``
+units, further operations are either logged or, in ``reject`` mode,
+refused with ``CapacityBudgetExceeded`` before they are sent.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Mapping
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any
+
+from src.observability.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+READ_OPERATIONS = frozenset({"GetItem", "BatchGetItem", "Query", "Scan"})
+BUDGET_MODES = ("log", "reject")
+
+
+class CapacityBudgetExceeded(Exception):
+    """Raised in ``reject`` mode when a request exhausted its capacity budget."""
+
+
+@dataclass
+class ConsumedCapacity:
+    read: float = 0.0
+    write: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return self.read + self.write
+
+    def add(self, other: ConsumedCapacity) -> None:
+        self.read += other.read
+        self.write += other.write
+
+    def header_value(self) -> str:
+        return f"read={self.read:g}, write={self.write:g}"
+
+
+def parse_consumed_capacity(
+    operation: str, consumed: Mapping[str, Any] | list[Mapping[str, Any]] | None
+) -> ConsumedCapacity:
+    """Turn a ``ConsumedCapacity`` response element into read/write units.
+
+    With ``TOTAL`` DynamoDB often reports only ``CapacityUnits``; those are
+    attributed to reads or writes by the operation type.
+    """
+    result = ConsumedCapacity()
+    if not consumed:
+        return result
+    entries = consumed if isinstance(consumed, list) else [consumed]
+    for entry in entries:
+        read = entry.get("ReadCapacityUnits")
+        write = entry.get("WriteCapacityUnits")
+        if read is None and write is None:
+            units = float(entry.get("CapacityUnits", 0))
+            if operation in READ_OPERATIONS:
+                result.read += units
+            else:
+                result.write += units
+        else:
+            result.read += float(read or 0)
+            result.write += float(write or 0)
+    return result
+
+
+_request_capacity: ContextVar[ConsumedCapacity | None] = ContextVar(
+    "_request_capacity", default=None
+)
+
+
+class CapacityTracker:
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        operation_budget: float | None = None,
+        request_budget: float | None = None,
+        mode: str = "log",
+    ) -> None:
+        self.operation_budget = operation_budget
+        self.request_budget = request_budget
+        self.mode = mode
+        self.units = registry.counter(
+            "dynamodb_consumed_capacity_units_total",
+            "DynamoDB capacity units consumed.",
+            ("operation", "table", "kind"),
+        )
+        self.per_request = registry.histogram(
+            "dynamodb_request_capacity_units",
+            "DynamoDB capacity units consumed while handling one request.",
+            ("route",),
+            buckets=(0.5, 1, 2, 5, 10, 25, 50, 100, 250),
+        )
+        self.route_units = registry.counter(
+            "dynamodb_route_capacity_units_total",
+            "DynamoDB capacity units consumed per route.",
+            ("route", "kind"),
+        )
+        self.over_budget = registry.counter(
+            "dynamodb_capacity_budget_exceeded_total",
+            "Operations over the per-operation budget or refused by the guard.",
+            ("operation", "reason"),
+        )
+
+    def configure(
+        self,
+        operation_budget: float | None,
+        request_budget: float | None,
+        mode: str,
+    ) -> None:
+        if mode not in BUDGET_MODES:
+            raise ValueError(f"Unknown capacity budget mode: {mode}")
+        self.operation_budget = operation_budget
+        self.request_budget = request_budget
+        self.mode = mode
+
+    def before_operation(self, operation: str, table: str) -> None:
+        """Apply the per-request budget before an operation is sent."""
+        consumed = _request_capacity.get()
+        if self.request_budget is None or consumed is None:
+            return
+        if consumed.total < self.request_budget:
+            return
+        self.over_budget.inc(operation, "request")
+        message = (
+            f"DynamoDB {operation} on {table} after {consumed.total:g} capacity "
+            f"units (request budget {self.request_budget:g})"
+        )
+        if self.mode == "reject":
+            raise CapacityBudgetExceeded(message)
+        logger.warning(message)
+
+    def record(
+        self,
+        operation: str,
+        table: str,
+        consumed: Mapping[str, Any] | list[Mapping[str, Any]] | None,
+    ) -> ConsumedCapacity:
+        capacity = parse_consumed_capacity(operation, consumed)
+        if capacity.read:
+            self.units.inc(operation, table, "read", amount=capacity.read)
+        if capacity.write:
+            self.units.inc(operation, table, "write", amount=capacity.write)
+        request = _request_capacity.get()
+        if request is not None:
+            request.add(capacity)
+        if self.operation_budget is not None and capacity.total > self.operation_budget:
+            self.over_budget.inc(operation, "operation")
+            logger.warning(
+                "DynamoDB %s on %s consumed %g capacity units (budget %g)",
+                operation,
+                table,
+                capacity.total,
+                self.operation_budget,
+            )
+        return capacity
+
+    def start_request(self) -> Token[ConsumedCapacity | None]:
+        return _request_capacity.set(ConsumedCapacity())
+
+    def current_request(self) -> ConsumedCapacity | None:
+        return _request_capacity.get()
+
+    def finish_request(
+        self, token: Token[ConsumedCapacity | None], route: str
+    ) -> ConsumedCapacity:
+        consumed = _request_capacity.get() or ConsumedCapacity()
+        _request_capacity.reset(token)
+        if consumed.total:
+            self.per_request.observe(consumed.total, route)
+            if consumed.read:
+                self.route_units.inc(route, "read", amount=consumed.read)
+            if consumed.write:
+                self.route_units.inc(route, "write", amount=consumed.write)
+        return consumed
+
+
+# Process-wide tracker fed by CapacityTrackingTable.
+CAPACITY = CapacityTracker()
@@ -0,0 +1,198 @@
+"""Per-statement database statistics, slow-query log and N+1 detection.
+
+Backend-agnostic: the SQLAlchemy engine hooks in
+``src/database/sql_instrumentation.py`` feed ``record()``, and the request
+metrics middleware opens a per-request scope so that requests issuing more
+than ``statements_per_request_limit`` statements are flagged.
+"""
+
+import logging
+import re
+import threading
+from collections.abc import Mapping, Sequence
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.observability.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_SECONDS = 0.2
+DEFAULT_STATEMENTS_PER_REQUEST_LIMIT = 20
+# Bound the number of distinct statements tracked.
+MAX_TRACKED_STATEMENTS = 500
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_POSITIONAL_PARAM = re.compile(r"\$\d+|%\([^)]+\)s|%s|:\w+")
+_VALUE_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse literals, parameters and value lists so equal shapes group."""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _POSITIONAL_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _VALUE_LIST.sub("(?, ...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def statement_operation(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def params_shape(params: Any) -> str:
+    """Describe parameters by type only, so slow-query logs carry no values."""
+    if params is None:
+        return "()"
+    if isinstance(params, Mapping):
+        return (
+            "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+        )
+    if isinstance(params, Sequence) and not isinstance(params, str | bytes):
+        if (
+            params
+            and isinstance(params[0], Mapping | Sequence)
+            and not isinstance(params[0], str | bytes)
+        ):
+            # executemany: a list of parameter sets.
+            return f"{len(params)} x {params_shape(params[0])}"
+        return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+    return type(params).__name__
+
+
+@dataclass
+class StatementStats:
+    statement: str
+    operation: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "statement": self.statement,
+            "operation": self.operation,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / max(self.count, 1), 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+@dataclass
+class _RequestQueries:
+    count: int = 0
+    statements: dict[str, int] = field(default_factory=dict)
+
+
+_request_queries: ContextVar[_RequestQueries | None] = ContextVar(
+    "_request_queries", default=None
+)
+
+
+class QueryStats:
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        slow_query_seconds: float = DEFAULT_SLOW_QUERY_SECONDS,
+        statements_per_request_limit: int = DEFAULT_STATEMENTS_PER_REQUEST_LIMIT,
+    ) -> None:
+        self.slow_query_seconds = slow_query_seconds
+        self.statements_per_request_limit = statements_per_request_limit
+        self._stats: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self.flagged_requests = 0
+        self.duration = registry.histogram(
+            "db_statement_duration_seconds",
+            "Database statement execution time.",
+            ("operation",),
+        )
+        self.slow_statements = registry.counter(
+            "db_slow_statements_total",
+            "Statements slower than the slow-query threshold.",
+            ("operation",),
+        )
+        self.per_request = registry.histogram(
+            "db_statements_per_request",
+            "Database statements issued while handling one request.",
+            ("route",),
+            buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+        )
+        self.excessive_requests = registry.counter(
+            "db_excessive_statement_requests_total",
+            "Requests that issued more statements than allowed (likely N+1).",
+            ("route",),
+        )
+
+    def record(self, statement: str, seconds: float, params: Any = None) -> None:
+        normalized = normalize_statement(statement)
+        operation = statement_operation(normalized)
+        with self._lock:
+            stats = self._stats.get(normalized)
+            if stats is None and len(self._stats) < MAX_TRACKED_STATEMENTS:
+                stats = self._stats[normalized] = StatementStats(normalized, operation)
+            if stats is not None:
+                stats.count += 1
+                stats.total_seconds += seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+        self.duration.observe(seconds, operation)
+
+        request = _request_queries.get()
+        if request is not None:
+            request.count += 1
+            request.statements[normalized] = request.statements.get(normalized, 0) + 1
+
+        if seconds >= self.slow_query_seconds:
+            self.slow_statements.inc(operation)
+            logger.warning(
+                "Slow query (%.1f ms): %s params=%s",
+                seconds * 1000,
+                normalized,
+                params_shape(params),
+            )
+
+    def start_request(self) -> Token[_RequestQueries | None]:
+        return _request_queries.set(_RequestQueries())
+
+    def finish_request(self, token: Token[_RequestQueries | None], route: str) -> int:
+        """Close the request scope; returns the number of statements issued."""
+        request = _request_queries.get()
+        _request_queries.reset(token)
+        if request is None:
+            return 0
+        if request.count:
+            self.per_request.observe(request.count, route)
+        if request.count > self.statements_per_request_limit:
+            self.flagged_requests += 1
+            self.excessive_requests.inc(route)
+            repeated = max(request.statements.items(), key=lambda item: item[1])
+            logger.warning(
+                "%s issued %d statements (limit %d); most repeated (%dx): %s",
+                route,
+                request.count,
+                self.statements_per_request_limit,
+                repeated[1],
+                repeated[0],
+            )
+        return request.count
+
+    def snapshot(self, limit: int = 50) -> list[dict[str, Any]]:
+        """Statements with the highest total time first."""
+        with self._lock:
+            stats = sorted(
+                self._stats.values(), key=lambda s: s.total_seconds, reverse=True
+            )
+            return [s.as_dict() for s in stats[:limit]]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+        self.flagged_requests = 0
+
+
+# Process-wide statistics fed by the engine hooks.
+QUERY_STATS = QueryStats()
@@ -0,0 +1,53 @@
+"""Per-request time breakdown, reported in the ``Server-Timing`` header.
+
+The request middleware opens a collector in a context variable; code on the
+request path records how long it spent in Strava, the database or
+serialisation. ``asyncio.to_thread`` copies the context, so work done in
+worker threads is attributed to the right request too. Outside a request
+(background sync, tests) recording is a no-op.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+STRAVA = "strava"
+DB = "db"
+SERIALIZE = "serialize"
+
+_timings: ContextVar[dict[str, float] | None] = ContextVar("_timings", default=None)
+
+
+def start_collecting() -> Token[dict[str, float] | None]:
+    return _timings.set({})
+
+
+def stop_collecting(token: Token[dict[str, float] | None]) -> None:
+    _timings.reset(token)
+
+
+def current_timings() -> dict[str, float]:
+    return dict(_timings.get() or {})
+
+
+def record_timing(name: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the duration of the block to the current request's ``name`` total."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+def server_timing_header(timings: dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
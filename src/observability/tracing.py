@@ -0,0 +1,263 @@
+"""Lightweight tracing with W3C Trace Context propagation.
+
+Spans follow the OpenTelemetry model: 128-bit trace IDs and 64-bit span IDs,
+parent-based sampling with a trace-ID ratio at the root, and ``traceparent``
+headers for propagation, so traces join up with an upstream collector's.
+Finished spans go to a local exporter (stdout or a JSON-lines file) in an
+OTLP-like shape; no collector or SDK is required.
+
+When tracing is disabled ``span()`` hands back a shared no-op span and does
+not touch the context, so instrumented code costs next to nothing.
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, Mapping, MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, TextIO
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_SAMPLED_FLAG = 0x01
+_UINT64 = 1 << 64
+
+AttributeValue = str | int | float | bool
+
+
+class Span:
+    """A timed operation. Non-sampled spans only carry context."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: int,
+        span_id: int,
+        parent_id: int | None,
+        sampled: bool,
+        attributes: Mapping[str, AttributeValue] | None = None,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: dict[str, AttributeValue] = (
+            dict(attributes) if sampled and attributes else {}
+        )
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Mapping[str, AttributeValue]) -> None:
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.set_attribute("exception.type", type(error).__name__)
+        self.set_attribute("exception.message", str(error))
+
+    @property
+    def traceparent(self) -> str:
+        flags = _SAMPLED_FLAG if self.sampled else 0
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-{flags:02x}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "parentSpanId": f"{self.parent_id:016x}" if self.parent_id else "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _NoopSpan(Span):
+    def __init__(self) -> None:
+        super().__init__("noop", 0, 0, None, sampled=False)
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Write one finished, sampled span."""
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """One JSON object per line on stdout (ends up in CloudWatch on Lambda)."""
+
+    def __init__(self, stream: TextIO | None = None) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            print(line, file=self._stream or sys.stdout, flush=True)
+
+
+class FileSpanExporter(SpanExporter):
+    """Append spans as JSON lines to ``path``."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in a list (tests and debugging)."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+def parse_traceparent(value: str | None) -> tuple[int, int, bool] | None:
+    """Return ``(trace_id, parent_span_id, sampled)`` or None if invalid."""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id = int(match[1], 16), int(match[2], 16)
+    if trace_id == 0 or span_id == 0:
+        return None
+    return trace_id, span_id, bool(int(match[3], 16) & _SAMPLED_FLAG)
+
+
+_current_span: ContextVar[Span | None] = ContextVar("_current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter, sample_ratio: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_ratio = min(max(sample_ratio, 0.0), 1.0)
+        # Same rule as OpenTelemetry's TraceIdRatioBased sampler: compare the
+        # low 64 bits of the trace ID against the ratio.
+        self._sample_bound = int(self.sample_ratio * _UINT64)
+
+    def _should_sample(self, trace_id: int) -> bool:
+        return (trace_id % _UINT64) < self._sample_bound
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        attributes: Mapping[str, AttributeValue] | None = None,
+        traceparent: str | None = None,
+    ) -> Iterator[Span]:
+        """Start a span as a child of the current span or of ``traceparent``."""
+        parent = _current_span.get()
+        remote = parse_traceparent(traceparent) if parent is None else None
+        if parent is not None:
+            trace_id, parent_id, sampled = (
+                parent.trace_id,
+                parent.span_id,
+                parent.sampled,
+            )
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id = random.getrandbits(128) or 1
+            parent_id, sampled = None, self._should_sample(trace_id)
+
+        span = Span(
+            name, trace_id, random.getrandbits(64) or 1, parent_id, sampled, attributes
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if span.sampled:
+                self.exporter.export(span)
+
+
+_tracer: Tracer | None = None
+
+
+def configure_tracing(
+    exporter: str = "none",
+    sample_ratio: float = 1.0,
+    file_path: Path | None = None,
+) -> Tracer | None:
+    """Install the process-wide tracer; ``exporter`` is none, console or file."""
+    global _tracer
+    span_exporter: SpanExporter
+    if exporter == "none":
+        _tracer = None
+        return None
+    if exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    elif exporter == "file":
+        if file_path is None:
+            raise ValueError("The file span exporter needs a file path")
+        span_exporter = FileSpanExporter(file_path)
+    else:
+        raise ValueError(f"Unknown span exporter: {exporter}")
+    _tracer = Tracer(span_exporter, sample_ratio)
+    return _tracer
+
+
+def set_tracer(tracer: Tracer | None) -> None:
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def current_span() -> Span:
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(
+    name: str,
+    attributes: Mapping[str, AttributeValue] | None = None,
+    traceparent: str | None = None,
+) -> Iterator[Span]:
+    """Trace the enclosed block with the configured tracer, if any."""
+    tracer = _tracer
+    if tracer is None:
+        yield NOOP_SPAN
+        return
+    with tracer.start_span(name, attributes, traceparent) as active:
+        yield active
+
+
+def inject(headers: MutableMapping[str, str]) -> None:
+    """Add the current span's ``traceparent`` to outgoing headers."""
+    active = _current_span.get()
+    if active is not None:
+        headers[TRACEPARENT_HEADER] = active.traceparent
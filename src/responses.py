@@ -0,0 +1,25 @@
+"""Response classes shared by the API routers."""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from src.observability.timing import SERIALIZE, timed
+from src.observability.tracing import span
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSON response serialised directly by pydantic-core.
+
+    Endpoints return an instance of this class (rather than the bare models)
+    so FastAPI skips ``jsonable_encoder``, which walks every nested model in
+    Python. ``to_json`` handles pydantic models, dataclasses, datetimes and
+    plain containers in Rust and produces the same compact output.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed(SERIALIZE), span("response.serialize") as serialize_span:
+            body = to_json(content)
+            serialize_span.set_attribute("http.response.body.size", len(body))
+            return body
@@ -0,0 +1,73 @@
+"""Conditional GET helpers (ETag / Last-Modified validators)."""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from src.database.activity_repository import SyncState
+
+# Let browsers keep the body but always revalidate before reusing it.
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: datetime | None = None
+
+    def headers(self) -> dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(
+                self.last_modified.astimezone(timezone.utc), usegmt=True
+            )
+        return headers
+
+
+def sync_state_validators(state: SyncState, *variant: object) -> Validators:
+    """Validators for a response derived from the repository's sync state.
+
+    ``variant`` covers request parameters (such as the page size) that change
+    the body for the same state.
+    """
+    last_sync = state.last_sync_date.isoformat() if state.last_sync_date else ""
+    key = "|".join(
+        str(part) for part in (last_sync, state.activity_count, state.digest, *variant)
+    )
+    digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return Validators(f'"{digest}"', state.updated_at)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a compressed (W/) copy matches.
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, validators.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validators.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have second precision.
+    return validators.last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status_code=304, headers=validators.headers())
@@ -0,0 +1,25 @@
+"""Debug endpoints (disabled unless explicitly enabled in settings)."""
+
+from fastapi import APIRouter
+
+from src.observability.queries import QUERY_STATS, QueryStats
+
+
+def create_debug_router(query_stats: QueryStats = QUERY_STATS) -> APIRouter:
+    """Create a router exposing per-statement SQL statistics."""
+    router = APIRouter(prefix="/debug")
+
+    @router.get("/sql", include_in_schema=False)
+    async def sql_stats(limit: int = 50):
+        return {
+            "slow_query_ms": query_stats.slow_query_seconds * 1000,
+            "statements_per_request_limit": query_stats.statements_per_request_limit,
+            "flagged_requests": query_stats.flagged_requests,
+            "statements": query_stats.snapshot(limit),
+        }
+
+    @router.delete("/sql", include_in_schema=False, status_code=204)
+    async def reset_sql_stats():
+        query_stats.reset()
+
+    return router
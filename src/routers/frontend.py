@@ -1,30 +1,189 @@
-"""SPA frontend static file serving."""
+"""SPA frontend static file serving.
 
+``frontend/dist`` is scanned once when the routes are registered. Small files
+(``index.html`` included) are held in memory together with compressed
+variants; larger files are served from disk, preferring pre-built ``.br`` /
+``.gz`` siblings when the client accepts them. Every variant has a strong
+ETag, and Vite's content-hashed files under ``/assets`` are marked immutable.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass
 from pathlib import Path
 
-from fastapi import APIRouter
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from src.middleware.compression import accepted_encodings
+
+# Files at or below this size are kept in memory.
+IN_MEMORY_MAX_BYTES = 256 * 1024
+# Only bother compressing text-like files larger than this.
+COMPRESS_MIN_BYTES = 512
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Vite emits e.g. ``assets/index-BxYz12_a.js``: an 8+ character hash suffix.
+_HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json")
+_COMPRESSIBLE_SUFFIXES = (".svg", ".js", ".mjs", ".css", ".html", ".json", ".txt")
+_PRECOMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+@dataclass(frozen=True)
+class AssetVariant:
+    """One encoding of an asset, either held in memory or on disk."""
+
+    encoding: str | None
+    etag: str
+    body: bytes | None = None
+    path: Path | None = None
+
+
+@dataclass(frozen=True)
+class Asset:
+    media_type: str
+    cache_control: str
+    variants: dict[str | None, AssetVariant]
+
+
+def _etag(data: bytes, encoding: str | None) -> str:
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _is_compressible(rel_path: str, media_type: str) -> bool:
+    return media_type.startswith(_COMPRESSIBLE_TYPES) or rel_path.endswith(
+        _COMPRESSIBLE_SUFFIXES
+    )
+
 
-router = APIRouter()
+def _cache_control(rel_path: str) -> str:
+    if rel_path == "index.html":
+        return REVALIDATE_CACHE_CONTROL
+    if rel_path.startswith("assets/") and _HASHED_NAME.search(rel_path):
+        return IMMUTABLE_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+class AssetCatalog:
+    """Immutable index of everything under the frontend dist directory."""
+
+    def __init__(self, root: Path, in_memory_max_bytes: int = IN_MEMORY_MAX_BYTES):
+        self._assets: dict[str, Asset] = {}
+        self._in_memory_max_bytes = in_memory_max_bytes
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or path.suffix in _PRECOMPRESSED_SUFFIXES:
+                continue
+            rel_path = path.relative_to(root).as_posix()
+            self._assets[rel_path] = self._load(rel_path, path)
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def get(self, rel_path: str) -> Asset | None:
+        return self._assets.get(rel_path)
+
+    def _load(self, rel_path: str, path: Path) -> Asset:
+        media_type = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+        data = path.read_bytes()
+        in_memory = len(data) <= self._in_memory_max_bytes
+        variants: dict[str | None, AssetVariant] = {
+            None: AssetVariant(
+                None, _etag(data, None), body=data if in_memory else None, path=path
+            )
+        }
+
+        for suffix, encoding in _PRECOMPRESSED_SUFFIXES.items():
+            sibling = path.with_name(path.name + suffix)
+            if sibling.is_file():
+                compressed = sibling.read_bytes()
+                variants[encoding] = AssetVariant(
+                    encoding,
+                    _etag(data, encoding),
+                    body=compressed if in_memory else None,
+                    path=sibling,
+                )
+
+        if (
+            in_memory
+            and len(data) >= COMPRESS_MIN_BYTES
+            and _is_compressible(rel_path, media_type)
+        ):
+            # No pre-built variant: compress once now rather than per request.
+            if "gzip" not in variants:
+                gz = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(gz) < len(data):
+                    variants["gzip"] = AssetVariant(
+                        "gzip", _etag(data, "gzip"), body=gz
+                    )
+            if "br" not in variants and brotli is not None:
+                br = brotli.compress(data)
+                if len(br) < len(data):
+                    variants["br"] = AssetVariant("br", _etag(data, "br"), body=br)
+
+        return Asset(media_type, _cache_control(rel_path), variants)
+
+
+def _etag_matches(if_none_match: str, etags: set[str]) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return not candidates.isdisjoint(etags)
+
+
+def asset_response(request: Request, asset: Asset) -> Response:
+    """Pick the best encoding for the request and answer 304 when possible."""
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    variant = asset.variants[None]
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and encoding in accepted:
+            variant = asset.variants[encoding]
+            break
+
+    headers = {"ETag": variant.etag, "Cache-Control": asset.cache_control}
+    if len(asset.variants) > 1:
+        headers["Vary"] = "Accept-Encoding"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(
+        if_none_match, {v.etag for v in asset.variants.values()}
+    ):
+        return Response(status_code=304, headers=headers)
+
+    if variant.encoding:
+        headers["Content-Encoding"] = variant.encoding
+    if variant.body is not None:
+        return Response(variant.body, media_type=asset.media_type, headers=headers)
+    if variant.path is None:
+        return Response(status_code=404)
+    return FileResponse(variant.path, media_type=asset.media_type, headers=headers)
 
 
 def register_spa_routes(app, frontend_dist: Path):
-    """Mount static files and SPA fallback route if frontend dist exists."""
+    """Serve the built SPA with fallback to index.html for client-side routing."""
     if not frontend_dist.is_dir():
         return
 
-    app.mount(
-        "/assets",
-        StaticFiles(directory=frontend_dist / "assets"),
-        name="static",
-    )
+    catalog = AssetCatalog(frontend_dist)
+    index = catalog.get("index.html")
 
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+    async def serve_spa(request: Request, full_path: str):
         """Serve SPA files with fallback to index.html for client-side routing."""
-        # Serve actual files (e.g. vite.svg) if they exist
-        file_path = frontend_dist / full_path
-        if full_path and file_path.is_file():
-            return FileResponse(file_path)
-        return FileResponse(frontend_dist / "index.html")
+        asset = catalog.get(full_path)
+        if asset is None and not full_path.startswith("assets/"):
+            asset = index
+        if asset is None:
+            return Response(status_code=404)
+        return asset_response(request, asset)
@@ -0,0 +1,17 @@
+"""Prometheus metrics endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.observability.metrics import CONTENT_TYPE, REGISTRY, MetricsRegistry
+
+
+def create_metrics_router(registry: MetricsRegistry = REGISTRY) -> APIRouter:
+    """Create a router exposing ``registry`` in Prometheus text format."""
+    router = APIRouter()
+
+    @router.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    return router
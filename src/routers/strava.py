@@ -2,15 +2,30 @@
 
 import logging
 import uuid
+from datetime import date, datetime, timezone
+from typing import Literal
 
-from fastapi import APIRouter, Cookie, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Cookie, HTTPException, Path, Query, Request
+from fastapi.responses import RedirectResponse, Response
 
+from src.responses import PydanticJSONResponse
+from src.routers.conditional import (
+    Validators,
+    is_not_modified,
+    not_modified,
+    sync_state_validators,
+)
 from src.strava import StravaService
+from src.strava.strava_client import DEFAULT_ACTIVITY_LIMIT
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Levels of src.analytics.route_geometry.DETAIL_TOLERANCES.
+RouteDetail = Literal["low", "medium", "high"]
+# src.analytics.heatmap.MIN_ZOOM and MAX_ZOOM, without importing NumPy here.
+HEATMAP_ZOOMS = (8, 16)
+
 
 def create_strava_router(strava_service: StravaService) -> APIRouter:
     """Create a router with Strava endpoints bound to a service instance."""
@@ -41,22 +56,321 @@ def create_strava_router(strava_service: StravaService) -> APIRouter:
             logger.error("Authorization failed: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
 
-    @router.get("/strava/athlete")
-    async def athlete(session_id: str | None = Cookie(None)):
+    @router.get("/strava/athlete", response_class=PydanticJSONResponse)
+    async def athlete(request: Request, session_id: str | None = Cookie(None)):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        validators = Validators(snapshot.etag, snapshot.fetched_at)
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        return Response(
+            snapshot.body,
+            media_type="application/json",
+            headers=validators.headers(),
+        )
+
+    @router.get("/strava/activities", response_class=PydanticJSONResponse)
+    async def list_activities(
+        request: Request,
+        detail: RouteDetail | None = None,
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            state = await strava_service.sync_session(session_id)
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        # Decide from the in-memory sync state before reading or serialising.
+        variant = () if detail is None else (detail,)
+        validators = sync_state_validators(
+            state, DEFAULT_ACTIVITY_LIMIT, snapshot.athlete_id, *variant
+        )
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        activities = await strava_service.read_activities(
+            snapshot.athlete_id, DEFAULT_ACTIVITY_LIMIT
+        )
+        if detail is not None:
+            activities = strava_service.simplify_routes(activities, detail)
+        # Returned as a response so FastAPI skips jsonable_encoder.
+        return PydanticJSONResponse(activities, headers=validators.headers())
+
+    @router.get("/strava/stats", response_class=PydanticJSONResponse)
+    async def stats(
+        request: Request,
+        period: Literal["week", "month", "year"] = "week",
+        start: date | None = None,
+        end: date | None = None,
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            state = await strava_service.sync_session(session_id)
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        validators = sync_state_validators(
+            state,
+            "stats",
+            strava_service.rollups_version,
+            snapshot.athlete_id,
+            period,
+            start,
+            end,
+        )
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        rollups = await strava_service.read_rollups(
+            snapshot.athlete_id, period, start, end
+        )
+        return PydanticJSONResponse(
+            {"period": period, "buckets": rollups}, headers=validators.headers()
+        )
+
+    @router.get("/strava/training-load", response_class=PydanticJSONResponse)
+    async def training_load(
+        request: Request,
+        start: date | None = None,
+        end: date | None = None,
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        today = datetime.now(timezone.utc).date()
+        try:
+            state = await strava_service.sync_session(session_id)
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        # Curves keep decaying on rest days, so the day is part of the
+        # validator.
+        athlete_id = snapshot.athlete_id
+        validators = sync_state_validators(
+            state, "training-load", athlete_id, today, start, end
+        )
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        series = await strava_service.read_training_load(athlete_id, today)
+        days = (
+            series.window(start, end)
+            if series is not None
+            else {"start": None, "load": [], "atl": [], "ctl": [], "tsb": []}
+        )
+        return PydanticJSONResponse(
+            {"athlete_id": athlete_id, **days}, headers=validators.headers()
+        )
+
+    @router.get("/strava/race-predictions", response_class=PydanticJSONResponse)
+    async def race_predictions(request: Request, session_id: str | None = Cookie(None)):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        today = datetime.now(timezone.utc).date()
+        try:
+            state = await strava_service.sync_session(session_id)
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        # The reference run window moves with the day.
+        athlete_id = snapshot.athlete_id
+        validators = sync_state_validators(state, "race-predictions", athlete_id, today)
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        predictions = await strava_service.read_race_predictions(athlete_id, today)
+        return PydanticJSONResponse(
+            {"athlete_id": athlete_id, "predictions": predictions},
+            headers=validators.headers(),
+        )
+
+    @router.get("/strava/personal-records", response_class=PydanticJSONResponse)
+    async def personal_records(request: Request, session_id: str | None = Cookie(None)):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            state = await strava_service.sync_session(session_id)
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        athlete_id = snapshot.athlete_id
+        validators = sync_state_validators(state, "personal-records", athlete_id)
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        records = await strava_service.read_personal_records(athlete_id)
+        return PydanticJSONResponse(
+            {"athlete_id": athlete_id, "records": records},
+            headers=validators.headers(),
+        )
+
+    @router.get("/strava/mean-max", response_class=PydanticJSONResponse)
+    async def mean_max(
+        request: Request,
+        season: str = Query("all", pattern=r"^(all|\d{4})$"),
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            state = await strava_service.sync_session(session_id)
+            snapshot = await strava_service.get_athlete_snapshot(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        athlete_id = snapshot.athlete_id
+        validators = sync_state_validators(state, "mean-max", athlete_id, season)
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+        curve = await strava_service.read_mean_max_curve(athlete_id, season)
+        return PydanticJSONResponse(
+            {
+                "athlete_id": athlete_id,
+                "season": season,
+                "curve": curve.as_dict() if curve is not None else None,
+            },
+            headers=validators.headers(),
+        )
+
+    @router.get("/strava/activities/{activity_id}/thumbnail.svg")
+    async def route_thumbnail(
+        activity_id: int,
+        detail: RouteDetail = "low",
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            svg = await strava_service.read_route_thumbnail(
+                session_id, activity_id, detail
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return Response(
+            svg,
+            media_type="image/svg+xml",
+            headers={"Cache-Control": "private, max-age=86400"},
+        )
+
+    @router.get(
+        "/strava/activities/{activity_id}/analysis",
+        response_class=PydanticJSONResponse,
+    )
+    async def activity_analysis(
+        activity_id: int,
+        max_heartrate: int | None = Query(None, ge=100, le=250),
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            return await strava_service.analyse_activity(
+                session_id, activity_id, max_heartrate
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    @router.get("/strava/heatmap/{zoom}/{x}/{y}.png")
+    async def heatmap_tile(
+        zoom: int = Path(ge=HEATMAP_ZOOMS[0], le=HEATMAP_ZOOMS[1]),
+        x: int = Path(ge=0),
+        y: int = Path(ge=0),
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            png = await strava_service.read_heatmap_tile(session_id, zoom, x, y)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return Response(
+            png,
+            media_type="image/png",
+            headers={"Cache-Control": "private, max-age=300"},
+        )
+
+    @router.post("/strava/heatmap/rebuild")
+    async def rebuild_heatmap(session_id: str | None = Cookie(None)):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            tiles = await strava_service.rebuild_heatmap(session_id)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        return {"tiles": tiles}
+
+    @router.get("/strava/routes/near", response_class=PydanticJSONResponse)
+    async def routes_near(
+        lat: float = Query(ge=-90, le=90),
+        lng: float = Query(ge=-180, le=180),
+        radius_m: float = Query(500.0, gt=0, le=50_000),
+        field: Literal["start", "end"] = "start",
+        session_id: str | None = Cookie(None),
+    ):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            athlete_id, nearby = await strava_service.read_routes_near(
+                session_id, lat, lng, radius_m, field
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        return PydanticJSONResponse({"athlete_id": athlete_id, "routes": nearby})
+
+    @router.get(
+        "/strava/activities/{activity_id}/similar",
+        response_class=PydanticJSONResponse,
+    )
+    async def similar_routes(activity_id: int, session_id: str | None = Cookie(None)):
+        if not session_id:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        try:
+            athlete_id, matches = await strava_service.read_similar_routes(
+                session_id, activity_id
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return PydanticJSONResponse(
+            {
+                "athlete_id": athlete_id,
+                "activity_id": activity_id,
+                "count": len(matches),
+                "matches": matches,
+            }
+        )
+
+    @router.post("/strava/routes/rebuild")
+    async def rebuild_route_index(session_id: str | None = Cookie(None)):
         if not session_id:
             raise HTTPException(status_code=401, detail="Not authenticated")
         try:
-            return await strava_service.get_athlete(session_id)
+            routes = await strava_service.rebuild_route_index(session_id)
         except ValueError as e:
             raise HTTPException(status_code=401, detail=str(e))
+        return {"routes": routes}
 
-    @router.get("/strava/activities")
-    async def list_activities(session_id: str | None = Cookie(None)):
+    @router.post("/strava/stats/rebuild")
+    async def rebuild_stats(
+        start: date, end: date, session_id: str | None = Cookie(None)
+    ):
         if not session_id:
             raise HTTPException(status_code=401, detail="Not authenticated")
+        if end < start:
+            raise HTTPException(status_code=422, detail="end is before start")
         try:
-            return await strava_service.list_activities(session_id)
+            buckets = await strava_service.rebuild_rollups(session_id, start, end)
         except ValueError as e:
             raise HTTPException(status_code=401, detail=str(e))
+        return {"buckets": buckets}
 
     return router
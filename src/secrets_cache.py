@@ -0,0 +1,253 @@
+"""Cached AWS Secrets Manager settings source.
+
+Resolved secrets are kept in memory for a TTL and refreshed in a background
+thread shortly before they expire. When a ``SECRETS_CACHE_KEY`` (a Fernet key)
+is configured, an encrypted copy is also written under ``/tmp`` so a runtime
+re-init inside the same Lambda sandbox can skip the API call entirely. If a
+refresh fails the last good value keeps being served.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pydantic_settings.sources.providers.aws import AWSSecretsManagerSettingsSource
+from pydantic_settings.sources.providers.env import EnvSettingsSource
+from pydantic_settings.sources.utils import parse_env_vars
+
+if TYPE_CHECKING:
+    from pydantic_settings import BaseSettings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_REFRESH_AHEAD_SECONDS = 60.0
+
+
+class SecretCache:
+    """In-memory TTL cache around a single secret fetch function."""
+
+    def __init__(
+        self,
+        fetch: Callable[[], str],
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        refresh_ahead_seconds: float = DEFAULT_REFRESH_AHEAD_SECONDS,
+        persist_path: Path | None = None,
+        encryption_key: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._fetch = fetch
+        self._ttl = ttl_seconds
+        self._refresh_ahead = min(refresh_ahead_seconds, ttl_seconds)
+        self._persist_path = persist_path if encryption_key else None
+        self._encryption_key = encryption_key
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_thread: threading.Thread | None = None
+        self._value: str | None = None
+        self._fetched_at: float = 0.0
+        self.generation: int = 0
+
+    def get(self) -> str:
+        """Return the cached secret, fetching or refreshing it as needed."""
+        if self._value is None:
+            self._load_persisted()
+        now = self._clock()
+        if self._value is None or now - self._fetched_at >= self._ttl:
+            with self._lock:
+                # Another caller may have refreshed while we waited.
+                if self._value is None or self._clock() - self._fetched_at >= self._ttl:
+                    self._refresh()
+        elif now - self._fetched_at >= self._ttl - self._refresh_ahead:
+            self._refresh_in_background()
+        return self._value  # type: ignore[return-value]
+
+    def maybe_refresh(self) -> int:
+        """Kick off a refresh-ahead if due and return the current generation."""
+        if self._value is not None:
+            age = self._clock() - self._fetched_at
+            if age >= self._ttl - self._refresh_ahead:
+                self._refresh_in_background()
+        return self.generation
+
+    def _refresh(self) -> None:
+        try:
+            value = self._fetch()
+        except Exception as e:
+            if self._value is None:
+                raise
+            logger.warning("Secret refresh failed, serving last good value: %s", e)
+            # Back off for one refresh-ahead window instead of retrying on
+            # every call while the API is unavailable.
+            self._fetched_at = self._clock() - max(
+                self._ttl - 2 * self._refresh_ahead, 0.0
+            )
+            return
+        self._store(value, self._clock())
+        self._persist()
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._locked_refresh, name="secret-cache-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _locked_refresh(self) -> None:
+        with self._lock:
+            self._refresh()
+
+    def _store(self, value: str, fetched_at: float) -> None:
+        if value != self._value:
+            self.generation += 1
+        self._value = value
+        self._fetched_at = fetched_at
+
+    def _fernet(self) -> Any:
+        from cryptography.fernet import Fernet
+
+        return Fernet(self._encryption_key.encode())  # type: ignore[union-attr]
+
+    def _persist(self) -> None:
+        if self._persist_path is None or self._value is None:
+            return
+        try:
+            envelope = json.dumps(
+                {"fetched_at": self._fetched_at, "value": self._value}
+            )
+            token = self._fernet().encrypt(envelope.encode())
+            tmp_path = self._persist_path.with_suffix(".tmp")
+            tmp_path.write_bytes(token)
+            tmp_path.chmod(0o600)
+            tmp_path.replace(self._persist_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not persist secret cache: %s", e)
+
+    def _load_persisted(self) -> None:
+        if self._persist_path is None or not self._persist_path.is_file():
+            return
+        from cryptography.fernet import InvalidToken
+
+        try:
+            envelope = json.loads(
+                self._fernet().decrypt(self._persist_path.read_bytes())
+            )
+        except (OSError, ValueError, InvalidToken) as e:
+            logger.warning("Ignoring unreadable secret cache file: %s", e)
+            return
+        fetched_at = float(envelope["fetched_at"])
+        if self._clock() - fetched_at < self._ttl:
+            self._store(str(envelope["value"]), fetched_at)
+            logger.info("Loaded secret from persisted cache")
+
+
+_caches: dict[str, SecretCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache_file(secret_id: str) -> Path:
+    digest = hashlib.sha256(secret_id.encode()).hexdigest()[:16]
+    cache_dir = Path(os.environ.get("SECRETS_CACHE_DIR", "/tmp"))
+    return cache_dir / f"running-corgium-secret-{digest}.bin"
+
+
+def get_secret_cache(secret_id: str, fetch: Callable[[], str]) -> SecretCache:
+    """Return the process-wide cache for ``secret_id``, creating it on first use.
+
+    TTLs come from the environment because they are needed before the
+    settings themselves can be resolved.
+    """
+    with _caches_lock:
+        cache = _caches.get(secret_id)
+        if cache is None:
+            cache = SecretCache(
+                fetch,
+                ttl_seconds=float(
+                    os.environ.get("SECRETS_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+                ),
+                refresh_ahead_seconds=float(
+                    os.environ.get(
+                        "SECRETS_CACHE_REFRESH_AHEAD_SECONDS",
+                        DEFAULT_REFRESH_AHEAD_SECONDS,
+                    )
+                ),
+                persist_path=_cache_file(secret_id),
+                encryption_key=os.environ.get("SECRETS_CACHE_KEY") or None,
+            )
+            _caches[secret_id] = cache
+        return cache
+
+
+def secret_cache_generation() -> int:
+    """Sum of cache generations; changes whenever any cached secret changes."""
+    return sum(cache.maybe_refresh() for cache in list(_caches.values()))
+
+
+def clear_secret_caches() -> None:
+    """Drop all in-memory secret caches (used by tests and on rotation)."""
+    with _caches_lock:
+        _caches.clear()
+
+
+class CachedSecretsManagerSettingsSource(AWSSecretsManagerSettingsSource):
+    """``AWSSecretsManagerSettingsSource`` backed by a process-wide ``SecretCache``.
+
+    The boto3 client is only created when the cache actually needs to call
+    Secrets Manager, so warm constructions of ``Settings`` cost no I/O.
+    """
+
+    def __init__(
+        self,
+        settings_cls: type[BaseSettings],
+        secret_id: str,
+        region_name: str | None = None,
+        endpoint_url: str | None = None,
+        case_sensitive: bool | None = True,
+        env_prefix: str | None = None,
+        env_nested_delimiter: str | None = "--",
+        env_parse_none_str: str | None = None,
+        env_parse_enums: bool | None = None,
+    ) -> None:
+        self._secret_id = secret_id
+        self._region_name = region_name
+        self._endpoint_url = endpoint_url
+        EnvSettingsSource.__init__(
+            self,
+            settings_cls,
+            case_sensitive=case_sensitive,
+            env_prefix=env_prefix,
+            env_nested_delimiter=env_nested_delimiter,
+            env_ignore_empty=False,
+            env_parse_none_str=env_parse_none_str,
+            env_parse_enums=env_parse_enums,
+        )
+
+    def _fetch_secret_string(self) -> str:
+        import boto3
+
+        client = boto3.client(
+            "secretsmanager",
+            region_name=self._region_name,
+            endpoint_url=self._endpoint_url,
+        )
+        response = client.get_secret_value(SecretId=self._secret_id)
+        return response["SecretString"]
+
+    def _load_env_vars(self) -> Mapping[str, str | None]:
+        cache = get_secret_cache(self._secret_id, self._fetch_secret_string)
+        return parse_env_vars(
+            json.loads(cache.get()),
+            self.case_sensitive,
+            self.env_ignore_empty,
+            self.env_parse_none_str,
+        )
@@ -1,19 +1,110 @@
+from __future__ import annotations
+
 import asyncio
+import hashlib
 import logging
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING, Any
 
+from pydantic_core import to_json
 from stravalib import Client
+from stravalib.exc import ObjectNotFound
 from stravalib.model import SummaryActivity
 
+from src.analytics.activities import athlete_key, is_run, local_day
+from src.analytics.best_efforts import effort_records
 from src.config import settings
-from src.database.activity_repository import ActivityRepository
+from src.database.activity_repository import ActivityRepository, SyncState
+from src.database.records import PersonalRecord, Rollup
+from src.observability.timing import DB, SERIALIZE, STRAVA, timed
+from src.observability.tracing import span
+from src.sync.fanout import AthleteSyncOutcome
+from src.sync.registry import AthleteCredentials, SyncRegistry
+
+if TYPE_CHECKING:
+    from src.analytics.activity_analysis import AnalysisCache
+    from src.analytics.mean_max import MeanMaxCurve
+    from src.analytics.race_prediction import RacePrediction, RacePredictor
+    from src.analytics.route_geometry import RouteCache, RouteGeometry
+    from src.analytics.spatial import NearbyRoute, RouteIndex, RouteMatch
+    from src.analytics.training_load import TrainingLoad, TrainingLoadEngine
+
+# Refresh access tokens that expire within this many seconds.
+TOKEN_EXPIRY_MARGIN_SECONDS = 300
+# How long a session's athlete profile is served without asking Strava.
+ATHLETE_CACHE_TTL_SECONDS = 300
+# Sessions whose athlete profile is kept in memory at most.
+ATHLETE_CACHE_SIZE = 1024
+DEFAULT_ACTIVITY_LIMIT = 100
+# stravalib's BatchedResultsIterator page size.
+STRAVA_PAGE_SIZE = 200
+
+
+@dataclass(frozen=True)
+class AthleteSnapshot:
+    """An athlete profile serialised once, with a validator for its body."""
+
+    body: bytes
+    etag: str
+    fetched_at: datetime
+    expires_at: float
+    athlete_id: int | None = None
+
+
+class AthleteCache:
+    """LRU of athlete snapshots keyed by session ID.
+
+    Expired snapshots stay until evicted so a refetch with an unchanged body
+    keeps its original ``fetched_at``.
+    """
+
+    def __init__(self, max_size: int = ATHLETE_CACHE_SIZE) -> None:
+        self._max_size = max_size
+        self._snapshots: OrderedDict[str, AthleteSnapshot] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, session_id: str) -> AthleteSnapshot | None:
+        snapshot = self._snapshots.get(session_id)
+        if snapshot is not None:
+            self._snapshots.move_to_end(session_id)
+        return snapshot
+
+    def put(self, session_id: str, snapshot: AthleteSnapshot) -> None:
+        self._snapshots[session_id] = snapshot
+        self._snapshots.move_to_end(session_id)
+        while len(self._snapshots) > self._max_size:
+            self._snapshots.popitem(last=False)
+
+    def discard(self, session_id: str) -> None:
+        self._snapshots.pop(session_id, None)
 
 
 class StravaService:
     tokens: dict[str, str] = {}
 
-    def __init__(self, activity_repo: ActivityRepository) -> None:
+    def __init__(
+        self,
+        activity_repo: ActivityRepository,
+        sync_registry: SyncRegistry | None = None,
+    ) -> None:
         self.client = Client()
         self.activity_repo = activity_repo
+        self.sync_registry = sync_registry
+        self._athlete_cache = AthleteCache()
+        # Bumped by rebuild_rollups so cached stats responses revalidate.
+        self.rollups_version = 0
+        # Created on first read so numpy stays off the Lambda cold start.
+        self.training_load: TrainingLoadEngine | None = None
+        self.race_predictor: RacePredictor | None = None
+        self.analysis_cache: AnalysisCache | None = None
+        self.route_cache: RouteCache | None = None
+        self.route_index: RouteIndex | None = None
 
     def get_basic_info(self) -> str:
         logging.info("Getting basic info from Strava")
@@ -26,20 +117,44 @@ class StravaService:
 
     async def authenticate_and_store(self, session_id: str, code: str) -> None:
         logging.info("Authenticating with Strava")
+        exchange_kwargs: dict[str, Any] = {
+            "client_id": settings.strava_client_id,
+            "client_secret": settings.strava_client_secret,
+            "code": code,
+        }
+        if self.sync_registry is not None:
+            # The athlete ID is needed to register for background sync.
+            exchange_kwargs["return_athlete"] = True
         token_response = await asyncio.to_thread(
-            self.client.exchange_code_for_token,
-            client_id=settings.strava_client_id,
-            client_secret=settings.strava_client_secret,
-            code=code,
+            self.client.exchange_code_for_token, **exchange_kwargs
         )
         # Handle union return type: AccessInfo or tuple[AccessInfo, athlete]
+        athlete = None
         if isinstance(token_response, tuple):
-            access_info = token_response[0]
+            access_info, athlete = token_response
         else:
             access_info = token_response
         self.tokens[session_id] = access_info["access_token"]
+        self._athlete_cache.discard(session_id)
         logging.info("Token stored successfully")
 
+        if self.sync_registry is not None and athlete is not None and athlete.id:
+            existing = await self.sync_registry.get(athlete.id)
+            credentials = AthleteCredentials(
+                athlete_id=athlete.id,
+                access_token=access_info["access_token"],
+                refresh_token=access_info["refresh_token"],
+                expires_at=access_info["expires_at"],
+            )
+            if existing is not None:
+                credentials = replace(
+                    credentials,
+                    last_activity_date=existing.last_activity_date,
+                    last_synced_at=existing.last_synced_at,
+                )
+            await self.sync_registry.save(credentials)
+            logging.info(f"Registered athlete {athlete.id} for background sync")
+
     def _get_client_for_session(self, session_id: str) -> Client:
         """Get a client configured with the session's access token."""
         if session_id not in self.tokens:
@@ -48,84 +163,672 @@ class StravaService:
         return self.client
 
     async def list_activities(
-        self, session_id: str, limit: int = 100
+        self, session_id: str, limit: int = DEFAULT_ACTIVITY_LIMIT
     ) -> list[SummaryActivity]:
-        """Return all activities, syncing new ones from Strava first.
+        """Return the session athlete's activities, syncing new ones first.
 
-        1. Fetches only NEW activities from Strava API (after last sync date)
+        1. Fetches only NEW activities from Strava API (after the athlete's
+           last synced activity)
         2. Stores new activities in the database
-        3. Returns ALL activities from the database as Pydantic models
+        3. Returns the athlete's activities from the database as Pydantic models
         """
         logging.info(f"list_activities called for session {session_id}, limit={limit}")
+        await self.sync_session(session_id)
+        snapshot = await self.get_athlete_snapshot(session_id)
+        return await self.read_activities(snapshot.athlete_id, limit)
+
+    async def sync_session(self, session_id: str) -> SyncState:
+        """Sync new activities for a session and return the repository state.
+
+        The state is cheap to compute, so callers can decide from it whether
+        the stored activities need to be read at all.
+        """
         try:
             client = self._get_client_for_session(session_id)
             logging.info("Client configured successfully")
+            snapshot = await self.get_athlete_snapshot(session_id)
 
             # Sync new activities from Strava
-            new_count = await self._sync_new_activities(client)
+            with span("strava.sync_session") as sync_span:
+                new_count = await self._sync_new_activities(client, snapshot.athlete_id)
+                sync_span.set_attribute("activity.inserted", new_count)
             logging.info(f"Sync complete: {new_count} new activities")
+            return self.activity_repo.get_sync_state()
+        except ValueError:
+            raise
+        except Exception as e:
+            logging.error(f"Error syncing activities: {e}", exc_info=True)
+            raise
 
-            # Return all activities from database
-            db_activities = await self.activity_repo.get_activities(limit=limit)
+    async def read_activities(
+        self, athlete_id: int | None, limit: int = DEFAULT_ACTIVITY_LIMIT
+    ) -> list[SummaryActivity]:
+        """Return the athlete's stored activities without syncing."""
+        if athlete_id is None:
+            return []
+        try:
+            with timed(DB), span("activities.read", {"db.limit": limit}) as read_span:
+                db_activities = await self.activity_repo.get_activities(
+                    athlete_id, limit=limit
+                )
+                read_span.set_attribute("activity.count", len(db_activities))
             logging.info(f"Returning {len(db_activities)} activities from database")
             if db_activities:
                 logging.info(
                     f"First activity: {db_activities[0].name} (ID: {db_activities[0].id})"
                 )
             return db_activities
-        except ValueError:
-            raise
         except Exception as e:
             logging.error(f"Error fetching activities: {e}", exc_info=True)
             raise
 
-    async def _sync_new_activities(self, client: Client) -> int:
-        """Sync new activities from Strava to the database.
+    def route_geometries(
+        self, activities: list[SummaryActivity], detail: str
+    ) -> dict[int, RouteGeometry]:
+        """Simplified route and thumbnail per activity with a summary polyline.
+
+        Cache misses are decoded together in one batch.
+        """
+        from src.analytics.route_geometry import RouteCache, build_geometries
+
+        if self.route_cache is None:
+            self.route_cache = RouteCache()
+        geometries: dict[int, RouteGeometry] = {}
+        missing: list[tuple[int, str]] = []
+        for activity in activities:
+            polyline = activity.map.summary_polyline if activity.map else None
+            if activity.id is None or not polyline:
+                continue
+            cached = self.route_cache.get(activity.id, detail)
+            if cached is not None:
+                geometries[activity.id] = cached
+            else:
+                missing.append((activity.id, polyline))
+        if missing:
+            with span("routes.simplify", {"route.count": len(missing)}):
+                built = build_geometries([polyline for _, polyline in missing], detail)
+            for (activity_id, _), geometry in zip(missing, built, strict=True):
+                self.route_cache.put(activity_id, detail, geometry)
+                geometries[activity_id] = geometry
+        return geometries
+
+    def simplify_routes(
+        self, activities: list[SummaryActivity], detail: str
+    ) -> list[SummaryActivity]:
+        """Activities with their summary polylines simplified to ``detail``."""
+        geometries = self.route_geometries(activities, detail)
+        simplified = []
+        for activity in activities:
+            geometry = geometries.get(activity.id) if activity.id else None
+            if geometry is not None and activity.map is not None:
+                route = activity.map.model_copy(
+                    update={"summary_polyline": geometry.polyline, "polyline": None}
+                )
+                activity = activity.model_copy(update={"map": route})
+            simplified.append(activity)
+        return simplified
+
+    async def read_route_thumbnail(
+        self, session_id: str, activity_id: int, detail: str
+    ) -> str:
+        """SVG thumbnail of one of the session athlete's stored routes.
+
+        Raises ``LookupError`` for activities without a stored route and for
+        other athletes' activities.
+        """
+        self._get_client_for_session(session_id)
+        snapshot = await self.get_athlete_snapshot(session_id)
+        with timed(DB):
+            activity = await self.activity_repo.get_activity(activity_id)
+        if activity is None or athlete_key(activity) != snapshot.athlete_id:
+            raise LookupError(f"No route stored for activity {activity_id}")
+        # List pages warm the cache, so only cold entries are simplified here.
+        geometry = self.route_geometries([activity], detail).get(activity_id)
+        if geometry is None:
+            raise LookupError(f"No route stored for activity {activity_id}")
+        return geometry.svg
+
+    async def read_rollups(
+        self,
+        athlete_id: int | None,
+        period: str,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> list[Rollup]:
+        """Return the athlete's stored training totals without syncing."""
+        if athlete_id is None:
+            return []
+        with timed(DB), span("rollups.read", {"rollup.period": period}) as read_span:
+            rollups = await self.activity_repo.get_rollups(
+                athlete_id, period, start, end
+            )
+            read_span.set_attribute("rollup.buckets", len(rollups))
+        return rollups
+
+    async def rebuild_rollups(self, session_id: str, start: date, end: date) -> int:
+        """Recompute the session athlete's training totals for a date range."""
+        self._get_client_for_session(session_id)
+        snapshot = await self.get_athlete_snapshot(session_id)
+        if snapshot.athlete_id is None:
+            return 0
+        with timed(DB):
+            buckets = await self.activity_repo.rebuild_rollups(
+                snapshot.athlete_id, start, end
+            )
+        self.rollups_version += 1
+        return buckets
+
+    async def read_training_load(
+        self, athlete_id: int | None, today: date
+    ) -> TrainingLoad | None:
+        """Return the athlete's fitness/fatigue series through ``today``."""
+        if athlete_id is None:
+            return None
+        if self.training_load is None:
+            from src.analytics.training_load import TrainingLoadEngine
+
+            self.training_load = TrainingLoadEngine(self.activity_repo)
+        with span("training_load.read", {"strava.athlete_id": str(athlete_id)}):
+            return await self.training_load.get(athlete_id, today)
+
+    async def read_race_predictions(
+        self, athlete_id: int | None, today: date
+    ) -> list[RacePrediction]:
+        """Return race time predictions for the athlete."""
+        if athlete_id is None:
+            return []
+        if self.race_predictor is None:
+            from src.analytics.race_prediction import RacePredictor, load_race_model
+
+            model = (
+                load_race_model(settings.race_model_path)
+                if settings.race_model_path
+                else None
+            )
+            self.race_predictor = RacePredictor(self.activity_repo, model)
+        predictions = await self.race_predictor.predict([athlete_id], today)
+        return predictions[athlete_id]
+
+    async def read_personal_records(
+        self, athlete_id: int | None
+    ) -> list[PersonalRecord]:
+        """Return the athlete's fastest effort per distance."""
+        if athlete_id is None:
+            return []
+        with timed(DB):
+            return await self.activity_repo.get_personal_records(athlete_id)
+
+    async def read_mean_max_curve(
+        self, athlete_id: int | None, season: str
+    ) -> MeanMaxCurve | None:
+        """Return the athlete's envelope curve for ``season``."""
+        if athlete_id is None:
+            return None
+        with timed(DB):
+            return await self.activity_repo.get_mean_max_curve(athlete_id, season)
+
+    async def analyse_activity(
+        self, session_id: str, activity_id: int, max_heartrate: int | None = None
+    ) -> dict[str, Any]:
+        """Splits, grade-adjusted pace and heart-rate zones of one activity.
+
+        Streams are fetched from Strava on the first request; results are
+        cached per activity and analysis settings. Raises ``LookupError``
+        when the activity or its distance/time streams are unavailable.
+        """
+        from src.analytics.activity_analysis import (
+            AnalysisCache,
+            AnalysisSettings,
+            analyse,
+        )
+
+        snapshot = await self.get_athlete_snapshot(session_id)
+        analysis_settings = AnalysisSettings(
+            max_heartrate=max_heartrate or settings.analysis_max_heartrate
+        )
+        if self.analysis_cache is None:
+            self.analysis_cache = AnalysisCache()
+        cached = self.analysis_cache.get(activity_id, analysis_settings)
+        # Only serve a cached result to the athlete it was fetched for.
+        if cached is not None and cached["athlete_id"] == snapshot.athlete_id:
+            return cached
+
+        client = self._get_client_for_session(session_id)
+        try:
+            with (
+                timed(STRAVA),
+                span("strava.get_streams", {"activity.id": activity_id}),
+            ):
+                streams = await asyncio.to_thread(
+                    client.get_activity_streams,
+                    activity_id,
+                    types=["distance", "time", "altitude", "heartrate"],
+                )
+        except ObjectNotFound as e:
+            raise LookupError(f"Activity {activity_id} not found") from e
+
+        def data(name: str) -> Sequence[float] | None:
+            stream = streams.get(name) if streams else None
+            return stream.data if stream is not None else None
+
+        elapsed, distance = data("time"), data("distance")
+        if elapsed is None or distance is None:
+            raise LookupError(f"Activity {activity_id} has no distance stream")
+
+        result = {
+            "athlete_id": snapshot.athlete_id,
+            "activity_id": activity_id,
+            "max_heartrate": analysis_settings.max_heartrate,
+            **analyse(
+                elapsed,
+                distance,
+                data("altitude"),
+                data("heartrate"),
+                analysis_settings,
+            ),
+        }
+        self.analysis_cache.put(activity_id, analysis_settings, result)
+        return result
+
+    async def _process_run_streams(
+        self, client: Client, activity: SummaryActivity
+    ) -> None:
+        """Fetch a new run's streams once and fold them into the athlete's
+        personal records and mean-maximal curves."""
+        if activity.id is None:
+            return
+        types = ["distance", "time"]
+        if settings.mean_max_curves_enabled:
+            types.append("heartrate")
+        try:
+            with (
+                timed(STRAVA),
+                span("strava.get_streams", {"activity.id": activity.id}),
+            ):
+                streams = await asyncio.to_thread(
+                    client.get_activity_streams, activity.id, types=types
+                )
+        except Exception as e:
+            # Records and curves catch up on the athlete's next faster effort.
+            logging.warning(f"Could not fetch streams for {activity.id}: {e}")
+            return
+        if "distance" not in streams or "time" not in streams:
+            return
+        distance = streams["distance"].data
+        elapsed = streams["time"].data
+        if distance is None or elapsed is None:
+            return
+
+        if settings.best_efforts_enabled:
+            candidates = effort_records(activity, distance, elapsed)
+            with timed(DB):
+                improved = await self.activity_repo.update_personal_records(candidates)
+            for record in improved:
+                logging.info(
+                    f"New {record.distance} record for athlete {record.athlete_id}: "
+                    f"{record.elapsed_s}s (activity {record.activity_id})"
+                )
+
+        athlete_id = athlete_key(activity)
+        day = local_day(activity)
+        if (
+            settings.mean_max_curves_enabled
+            and athlete_id is not None
+            and day is not None
+        ):
+            from src.analytics.mean_max import MeanMaxCurve, seasons_for
+
+            heartrate = streams["heartrate"].data if "heartrate" in streams else None
+            curve = MeanMaxCurve.from_streams(elapsed, distance, heartrate)
+            with timed(DB):
+                await self.activity_repo.merge_mean_max_curve(
+                    athlete_id, activity.id, seasons_for(day), curve
+                )
+
+    async def _add_to_heatmap(self, activity: SummaryActivity) -> None:
+        """Add a new run's route to the tiles its bounding box touches."""
+        athlete_id = athlete_key(activity)
+        polyline = activity.map.summary_polyline if activity.map else None
+        if athlete_id is None or activity.id is None or not polyline:
+            return
+        from src.analytics.heatmap import decode_routes, route_tiles, to_blob
+
+        def render() -> dict[tuple[int, int, int], bytes]:
+            routes = decode_routes([polyline])
+            if not routes:
+                return {}
+            return {key: to_blob(grid) for key, grid in route_tiles(routes[0]).items()}
+
+        # Rasterising is CPU-bound; keep it off the event loop.
+        with span("heatmap.render", {"activity.id": activity.id}):
+            tiles = await asyncio.to_thread(render)
+        if not tiles:
+            return
+        with timed(DB):
+            await self.activity_repo.merge_heatmap_tiles(athlete_id, activity.id, tiles)
+
+    async def rebuild_heatmap(self, session_id: str) -> int:
+        """Rebuild the session athlete's heatmap from every stored run.
+
+        Returns the number of tiles written.
+        """
+        self._get_client_for_session(session_id)
+        snapshot = await self.get_athlete_snapshot(session_id)
+        if snapshot.athlete_id is None:
+            return 0
+        from src.analytics.heatmap import build_heatmap, decode_routes, to_blob
+
+        with timed(DB):
+            history = await self.activity_repo.get_activity_history(snapshot.athlete_id)
+        # (activity ID, summary polyline) of each of the athlete's mapped runs.
+        runs = [
+            (activity.id, polyline)
+            for activity in history
+            if is_run(activity)
+            and activity.id is not None
+            and activity.map is not None
+            and (polyline := activity.map.summary_polyline)
+        ]
+        workers = 0 if settings.is_lambda else settings.heatmap_build_workers
+
+        def build() -> dict[tuple[int, int, int], bytes]:
+            routes = decode_routes([polyline for _, polyline in runs])
+            return {key: to_blob(grid) for key, grid in build_heatmap(routes, workers)}
+
+        with span("heatmap.build", {"heatmap.routes": len(runs)}):
+            tiles = await asyncio.to_thread(build)
+        with timed(DB):
+            return await self.activity_repo.replace_heatmap(
+                snapshot.athlete_id, [activity_id for activity_id, _ in runs], tiles
+            )
+
+    async def read_heatmap_tile(
+        self, session_id: str, zoom: int, x: int, y: int
+    ) -> bytes:
+        """The session athlete's heatmap tile as a PNG.
+
+        Raises ``LookupError`` for tiles outside the map.
+        """
+        from src.analytics.heatmap import from_blob, render_tile, tile_bounds
+
+        if not (0 <= x < tile_bounds(zoom) and 0 <= y < tile_bounds(zoom)):
+            raise LookupError(f"No tile {zoom}/{x}/{y}")
+        snapshot = await self.get_athlete_snapshot(session_id)
+        blob = None
+        if snapshot.athlete_id is not None:
+            with timed(DB):
+                blob = await self.activity_repo.get_heatmap_tile(
+                    snapshot.athlete_id, zoom, x, y
+                )
+        return render_tile(from_blob(blob) if blob is not None else None)
+
+    def _get_route_index(self) -> RouteIndex:
+        if self.route_index is None:
+            from src.analytics.spatial import RouteIndex
+
+            self.route_index = RouteIndex(self.activity_repo)
+        return self.route_index
+
+    async def _index_route(self, activity: SummaryActivity) -> None:
+        """Add a new run's start, end and shape to the route index."""
+        from src.analytics.spatial import RouteRecord
+
+        route = RouteRecord.from_activity(activity)
+        if route is None:
+            return
+        with timed(DB):
+            await self.activity_repo.index_routes([route])
+        if self.route_index is not None:
+            self.route_index.record(route)
+
+    async def rebuild_route_index(self, session_id: str) -> int:
+        """Index every stored run of the session athlete; returns how many."""
+        self._get_client_for_session(session_id)
+        snapshot = await self.get_athlete_snapshot(session_id)
+        if snapshot.athlete_id is None:
+            return 0
+        from src.analytics.spatial import RouteRecord
+
+        with timed(DB):
+            history = await self.activity_repo.get_activity_history(snapshot.athlete_id)
+        routes = [
+            route
+            for activity in history
+            if is_run(activity)
+            if (route := RouteRecord.from_activity(activity)) is not None
+        ]
+        with timed(DB):
+            indexed = await self.activity_repo.index_routes(routes)
+        self._get_route_index().clear()
+        return indexed
+
+    async def read_routes_near(
+        self, session_id: str, lat: float, lng: float, radius_m: float, field: str
+    ) -> tuple[int | None, list[NearbyRoute]]:
+        """The session athlete's runs that started (or ended) near a point."""
+        snapshot = await self.get_athlete_snapshot(session_id)
+        if snapshot.athlete_id is None:
+            return None, []
+        with timed(DB):
+            nearby = await self._get_route_index().near(
+                snapshot.athlete_id, lat, lng, radius_m, field
+            )
+        return snapshot.athlete_id, nearby
+
+    async def read_similar_routes(
+        self, session_id: str, activity_id: int
+    ) -> tuple[int | None, list[RouteMatch]]:
+        """Other runs of the session athlete along the same route.
+
+        Raises ``LookupError`` when the activity is not in the route index.
+        """
+        snapshot = await self.get_athlete_snapshot(session_id)
+        reference = None
+        if snapshot.athlete_id is not None:
+            with timed(DB):
+                reference = await self.activity_repo.get_route(
+                    snapshot.athlete_id, activity_id
+                )
+        if reference is None:
+            raise LookupError(f"Activity {activity_id} has no indexed route")
+        with timed(DB):
+            matches = await self._get_route_index().similar(reference)
+        return snapshot.athlete_id, matches
+
+    async def sync_athlete(self, credentials: AthleteCredentials) -> AthleteSyncOutcome:
+        """Sync one registered athlete outside of a request.
+
+        Uses a dedicated client so concurrent syncs never share a token, and
+        refreshes the access token first when it is about to expire.
+        """
+        if credentials.expires_at <= time.time() + TOKEN_EXPIRY_MARGIN_SECONDS:
+            logging.info(
+                f"Refreshing access token for athlete {credentials.athlete_id}"
+            )
+            access_info = await asyncio.to_thread(
+                Client().refresh_access_token,
+                client_id=settings.strava_client_id,
+                client_secret=settings.strava_client_secret,
+                refresh_token=credentials.refresh_token,
+            )
+            credentials = replace(
+                credentials,
+                access_token=access_info["access_token"],
+                refresh_token=access_info["refresh_token"],
+                expires_at=access_info["expires_at"],
+            )
+
+        client = Client(access_token=credentials.access_token)
+        with span(
+            "strava.sync_athlete", {"strava.athlete_id": credentials.athlete_id}
+        ) as sync_span:
+            new_count, last_activity_date, new_runs = await self._sync_activities_after(
+                client, credentials.last_activity_date
+            )
+            sync_span.set_attribute("activity.inserted", new_count)
+        return AthleteSyncOutcome(
+            credentials.with_pending(new_runs), new_count, last_activity_date
+        )
+
+    async def sync_run_streams(
+        self, credentials: AthleteCredentials, activity_id: int
+    ) -> None:
+        """Fold a stored run's streams into the athlete's records and curves.
+
+        Called by the sync fan-out for each pending run, so every streams
+        request is charged to its budget.
+        """
+        activity = await self.activity_repo.get_activity(activity_id)
+        if activity is None:
+            logging.warning(f"Pending run {activity_id} is not stored, skipping")
+            return
+        client = Client(access_token=credentials.access_token)
+        await self._process_run_streams(client, activity)
+
+    async def _sync_new_activities(self, client: Client, athlete_id: int | None) -> int:
+        """Sync the athlete's new activities from Strava to the database.
+
+        Only fetches activities after the athlete's registry checkpoint (or,
+        for unregistered athletes, their newest stored activity) to minimize
+        API calls, then moves the checkpoint forward. Returns the number of
+        new activities synced.
+        """
+        credentials = None
+        after: datetime | None = None
+        if self.sync_registry is not None and athlete_id is not None:
+            credentials = await self.sync_registry.get(athlete_id)
+        if credentials is not None and credentials.last_activity_date is not None:
+            after = credentials.last_activity_date
+        elif athlete_id is not None:
+            after = self.activity_repo.get_last_sync_date(athlete_id)
+
+        new_count, newest, new_runs = await self._sync_activities_after(client, after)
+
+        if self.sync_registry is not None and athlete_id is not None:
+            # Re-read so tokens refreshed by a background sync meanwhile are kept.
+            latest = await self.sync_registry.get(athlete_id)
+            if latest is not None:
+                checkpoint = latest.checkpointed(datetime.now(timezone.utc), newest)
+                # The background fan-out fetches the new runs' streams.
+                await self.sync_registry.save(checkpoint.with_pending(new_runs))
+        return new_count
+
+    async def _sync_activities_after(
+        self, client: Client, last_sync_date: datetime | None
+    ) -> tuple[int, datetime | None, list[int]]:
+        """Fetch activities after ``last_sync_date`` and store the new ones.
 
-        Only fetches activities after the last sync date to minimize API calls.
-        Returns the number of new activities synced.
+        Returns the number of new activities, the newest start date seen and
+        the IDs of new runs whose streams are still to be fetched.
         """
-        last_sync_date = self.activity_repo.get_last_sync_date()
         logging.info(f"Last sync date: {last_sync_date}")
 
+        fetch_kwargs: dict[str, Any]
         if last_sync_date:
             logging.info(f"Fetching activities from Strava after {last_sync_date}")
-            # Run sync Strava API call in thread to avoid blocking event loop
-            results = await asyncio.to_thread(
-                lambda: list(client.get_activities(after=last_sync_date))
-            )
+            fetch_kwargs = {"after": last_sync_date}
         else:
             logging.info("No sync date found, fetching recent activities from Strava")
+            fetch_kwargs = {"limit": 50}
+
+        with (
+            timed(STRAVA),
+            span(
+                "strava.fetch_activities", {"strava.after": str(last_sync_date)}
+            ) as fetch_span,
+        ):
             # Run sync Strava API call in thread to avoid blocking event loop
             results = await asyncio.to_thread(
-                lambda: list(client.get_activities(limit=50))
+                lambda: list(client.get_activities(**fetch_kwargs))
+            )
+            fetch_span.set_attributes(
+                {
+                    "strava.activity_count": len(results),
+                    # The iterator requests pages until one comes back short.
+                    "strava.page_count": len(results) // STRAVA_PAGE_SIZE + 1,
+                }
             )
 
         new_count = 0
-        for activity in results:
-            logging.info(
-                f"Processing activity {activity.id}: {activity.name} "
-                f"(start_date: {activity.start_date})"
-            )
-            if activity.id is not None and not self.activity_repo.is_activity_synced(
-                activity.id
-            ):
+        newest_date = last_sync_date
+        new_runs: list[int] = []
+        with span(
+            "strava.store_activities", {"activity.count": len(results)}
+        ) as store_span:
+            for activity in results:
                 logging.info(
-                    f"Inserting new activity: {activity.name} (ID: {activity.id})"
+                    f"Processing activity {activity.id}: {activity.name} "
+                    f"(start_date: {activity.start_date})"
                 )
-                inserted = await self.activity_repo.insert_activity(activity)
-                if inserted:
-                    new_count += 1
-                    logging.info(f"Successfully inserted activity {activity.id}")
+                if isinstance(activity.start_date, datetime) and (
+                    newest_date is None or activity.start_date > newest_date
+                ):
+                    newest_date = activity.start_date
+                if (
+                    activity.id is not None
+                    and not self.activity_repo.is_activity_synced(activity.id)
+                ):
+                    logging.info(
+                        f"Inserting new activity: {activity.name} (ID: {activity.id})"
+                    )
+                    with timed(DB):
+                        inserted = await self.activity_repo.insert_activity(activity)
+                    if inserted:
+                        new_count += 1
+                        if self.training_load is not None:
+                            self.training_load.record(activity)
+                        if self.race_predictor is not None:
+                            self.race_predictor.record(activity)
+                        if is_run(activity) and (
+                            settings.best_efforts_enabled
+                            or settings.mean_max_curves_enabled
+                        ):
+                            new_runs.append(activity.id)
+                        if is_run(activity) and settings.heatmap_enabled:
+                            await self._add_to_heatmap(activity)
+                        if is_run(activity) and settings.route_index_enabled:
+                            await self._index_route(activity)
+                        logging.info(f"Successfully inserted activity {activity.id}")
+                    else:
+                        logging.warning(f"Failed to insert activity {activity.id}")
                 else:
-                    logging.warning(f"Failed to insert activity {activity.id}")
-            else:
-                logging.info(f"Activity {activity.id} already synced, skipping")
+                    logging.info(f"Activity {activity.id} already synced, skipping")
+            store_span.set_attribute("activity.inserted", new_count)
 
         logging.info(f"Sync complete: {new_count} new activities synced from Strava")
-        return new_count
+        return new_count, newest_date, new_runs
 
     async def get_athlete(self, session_id: str):
         """Fetch athlete data for a session."""
         client = self._get_client_for_session(session_id)
-        return await asyncio.to_thread(client.get_athlete)
+        with timed(STRAVA), span("strava.get_athlete"):
+            return await asyncio.to_thread(client.get_athlete)
+
+    async def get_athlete_snapshot(self, session_id: str) -> AthleteSnapshot:
+        """Return the session's athlete profile, cached for a short TTL.
+
+        The body is serialised once per fetch; the fetch time only moves
+        forward when the profile actually changed.
+        """
+        if session_id not in self.tokens:
+            raise ValueError(f"No token found for session: {session_id}")
+        cached = self._athlete_cache.get(session_id)
+        if cached is not None and cached.expires_at > time.monotonic():
+            return cached
+
+        athlete = await self.get_athlete(session_id)
+        with timed(SERIALIZE):
+            body = to_json(athlete)
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        fetched_at = datetime.now(timezone.utc)
+        if cached is not None and cached.etag == etag:
+            fetched_at = cached.fetched_at
+        snapshot = AthleteSnapshot(
+            body,
+            etag,
+            fetched_at,
+            time.monotonic() + ATHLETE_CACHE_TTL_SECONDS,
+            getattr(athlete, "id", None),
+        )
+        self._athlete_cache.put(session_id, snapshot)
+        return snapshot
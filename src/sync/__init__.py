@@ -0,0 +1,10 @@
+"""Background Strava sync: due-athlete registry, work queue and fan-out."""
+
+from .fanout import RateBudget as RateBudget
+from .fanout import SyncFanout as SyncFanout
+from .fanout import SyncResult as SyncResult
+from .queue import InMemorySyncQueue as InMemorySyncQueue
+from .queue import SyncQueue as SyncQueue
+from .registry import AthleteCredentials as AthleteCredentials
+from .registry import InMemorySyncRegistry as InMemorySyncRegistry
+from .registry import SyncRegistry as SyncRegistry
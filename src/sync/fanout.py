@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+
+from src.sync.queue import SyncQueue
+from src.sync.registry import AthleteCredentials, SyncRegistry
+
+
+class RateBudget:
+    """Token bucket of Strava API requests available to a sync pass.
+
+    A Lambda invocation uses a fixed budget (``refill_per_second=0``); the
+    long-running local worker refills it at Strava's 15-minute rate.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        refill_per_second: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._capacity = capacity
+        self._refill_per_second = refill_per_second
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+
+    @property
+    def remaining(self) -> int:
+        self._refill()
+        return int(self._tokens)
+
+    def try_acquire(self, cost: int = 1) -> bool:
+        self._refill()
+        if self._tokens < cost:
+            return False
+        self._tokens -= cost
+        return True
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated_at) * self._refill_per_second,
+        )
+        self._updated_at = now
+
+
+@dataclass
+class AthleteSyncOutcome:
+    """Result of syncing one athlete; ``credentials`` may carry refreshed tokens."""
+
+    credentials: AthleteCredentials
+    new_activities: int
+    last_activity_date: datetime | None
+
+
+@dataclass
+class SyncResult:
+    synced: list[int] = field(default_factory=list)
+    failed: list[int] = field(default_factory=list)
+    deferred: list[int] = field(default_factory=list)
+    new_activities: int = 0
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "synced": self.synced,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "new_activities": self.new_activities,
+        }
+
+
+SyncOne = Callable[[AthleteCredentials], Awaitable[AthleteSyncOutcome]]
+# Fetches and processes the streams of one of the athlete's runs.
+ProcessStreams = Callable[[AthleteCredentials, int], Awaitable[None]]
+
+
+class SyncFanout:
+    """Syncs many athletes concurrently within a request budget.
+
+    Athletes are processed in batches; each batch is checkpointed to the
+    registry as soon as it finishes, so a timeout part-way through only loses
+    the batch in flight. Athletes that do not fit in the budget are sent back
+    to the queue for a later pass.
+
+    New runs' streams are fetched after the athlete's sync, one budgeted
+    request per run; runs that do not fit stay pending on the athlete, who
+    is re-enqueued with the deferred ones.
+    """
+
+    def __init__(
+        self,
+        registry: SyncRegistry,
+        queue: SyncQueue,
+        sync_one: SyncOne,
+        budget: RateBudget,
+        concurrency: int = 4,
+        batch_size: int = 25,
+        requests_per_athlete: int = 2,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        process_streams: ProcessStreams | None = None,
+    ) -> None:
+        self._registry = registry
+        self._queue = queue
+        self._sync_one = sync_one
+        self._budget = budget
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+        self._requests_per_athlete = requests_per_athlete
+        self._clock = clock
+        self._process_streams = process_streams
+
+    async def run_due(
+        self, interval_seconds: float, limit: int | None = None
+    ) -> SyncResult:
+        """Sync every athlete not synced within ``interval_seconds``."""
+        due = await self._registry.due(self._clock(), interval_seconds, limit)
+        logging.info(f"{len(due)} athletes due for sync")
+        return await self._run(due)
+
+    async def run_ids(
+        self, athlete_ids: Sequence[int], interval_seconds: float | None = None
+    ) -> SyncResult:
+        """Sync specific athletes, e.g. those delivered by the queue.
+
+        With ``interval_seconds``, athletes synced since they were enqueued are
+        skipped, so duplicate queue entries cost nothing.
+        """
+        now = self._clock()
+        athletes: list[AthleteCredentials] = []
+        for athlete_id in dict.fromkeys(athlete_ids):
+            credentials = await self._registry.get(athlete_id)
+            if credentials is None:
+                logging.warning(f"Athlete {athlete_id} is not registered, skipping")
+                continue
+            if interval_seconds is not None and not credentials.is_due(
+                now, interval_seconds
+            ):
+                continue
+            athletes.append(credentials)
+        return await self._run(athletes)
+
+    async def _run(self, athletes: list[AthleteCredentials]) -> SyncResult:
+        result = SyncResult()
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        for start in range(0, len(athletes), self._batch_size):
+            batch = athletes[start : start + self._batch_size]
+            admitted: list[AthleteCredentials] = []
+            for credentials in batch:
+                if self._budget.try_acquire(self._requests_per_athlete):
+                    admitted.append(credentials)
+                else:
+                    result.deferred.append(credentials.athlete_id)
+
+            outcomes = await asyncio.gather(
+                *(self._sync_limited(semaphore, c) for c in admitted),
+                return_exceptions=True,
+            )
+            await self._checkpoint(admitted, outcomes, result)
+
+        if result.deferred:
+            logging.info(f"Budget exhausted, deferring {len(result.deferred)} athletes")
+            await self._queue.send(result.deferred)
+        return result
+
+    async def _sync_limited(
+        self, semaphore: asyncio.Semaphore, credentials: AthleteCredentials
+    ) -> AthleteSyncOutcome:
+        async with semaphore:
+            outcome = await self._sync_one(credentials)
+            process = self._process_streams
+            if outcome.credentials.pending_streams and process is not None:
+                drained = await self._drain_streams(outcome.credentials, process)
+                outcome = replace(outcome, credentials=drained)
+            return outcome
+
+    async def _drain_streams(
+        self, credentials: AthleteCredentials, process: ProcessStreams
+    ) -> AthleteCredentials:
+        pending = list(credentials.pending_streams)
+        while pending and self._budget.try_acquire():
+            await process(credentials, pending[0])
+            pending.pop(0)
+        return replace(credentials, pending_streams=tuple(pending))
+
+    async def _checkpoint(
+        self,
+        admitted: list[AthleteCredentials],
+        outcomes: list[AthleteSyncOutcome | BaseException],
+        result: SyncResult,
+    ) -> None:
+        synced_at = self._clock()
+        for credentials, outcome in zip(admitted, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                logging.error(
+                    f"Sync failed for athlete {credentials.athlete_id}: {outcome}"
+                )
+                result.failed.append(credentials.athlete_id)
+                continue
+            await self._registry.save(
+                outcome.credentials.checkpointed(synced_at, outcome.last_activity_date)
+            )
+            result.synced.append(credentials.athlete_id)
+            if outcome.credentials.pending_streams:
+                result.deferred.append(credentials.athlete_id)
+            result.new_activities += outcome.new_activities
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import Any
+
+from src.observability.tracing import inject
+
+# SQS caps SendMessageBatch at ten entries.
+_SQS_MAX_BATCH = 10
+# ... and message delays at 15 minutes.
+_SQS_MAX_DELAY_SECONDS = 900
+
+
+class SyncQueue(ABC):
+    """Work queue of athlete IDs waiting for a background sync."""
+
+    @abstractmethod
+    async def send(self, athlete_ids: Sequence[int]) -> None:
+        """Enqueue athletes for a later sync pass."""
+
+    @abstractmethod
+    async def receive(self, max_messages: int = 10) -> list[int]:
+        """Dequeue up to ``max_messages`` athlete IDs without blocking long."""
+
+
+def encode_message(athlete_ids: Sequence[int]) -> str:
+    return json.dumps({"athlete_ids": list(athlete_ids)})
+
+
+def decode_message(body: str) -> list[int]:
+    return [int(athlete_id) for athlete_id in json.loads(body)["athlete_ids"]]
+
+
+class InMemorySyncQueue(SyncQueue):
+    """``asyncio.Queue`` stand-in for SQS, used by the local worker and tests."""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._pending: set[int] = set()
+
+    async def send(self, athlete_ids: Sequence[int]) -> None:
+        for athlete_id in athlete_ids:
+            # An athlete already waiting does not need a second entry.
+            if athlete_id not in self._pending:
+                self._pending.add(athlete_id)
+                self._queue.put_nowait(athlete_id)
+
+    async def receive(self, max_messages: int = 10) -> list[int]:
+        athlete_ids: list[int] = []
+        while len(athlete_ids) < max_messages and not self._queue.empty():
+            athlete_id = self._queue.get_nowait()
+            self._pending.discard(athlete_id)
+            athlete_ids.append(athlete_id)
+        return athlete_ids
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class SQSSyncQueue(SyncQueue):
+    """SQS-backed queue. Receiving is normally done by the Lambda event source.
+
+    Sent messages stay invisible for ``delay_seconds`` so deferred athletes
+    come back once the rate-limit window has moved on, not straight away.
+    """
+
+    def __init__(self, client: Any, queue_url: str, delay_seconds: int = 0) -> None:
+        self._client = client
+        self._queue_url = queue_url
+        self._delay_seconds = min(delay_seconds, _SQS_MAX_DELAY_SECONDS)
+
+    async def send(self, athlete_ids: Sequence[int]) -> None:
+        # The worker continues the sending pass's trace from these attributes.
+        headers: dict[str, str] = {}
+        inject(headers)
+        attributes = {
+            name: {"DataType": "String", "StringValue": value}
+            for name, value in headers.items()
+        }
+        ids = list(athlete_ids)
+        for start in range(0, len(ids), _SQS_MAX_BATCH):
+            chunk = ids[start : start + _SQS_MAX_BATCH]
+            entries = [
+                {
+                    "Id": str(athlete_id),
+                    "MessageBody": encode_message([athlete_id]),
+                    "DelaySeconds": self._delay_seconds,
+                    **({"MessageAttributes": attributes} if attributes else {}),
+                }
+                for athlete_id in chunk
+            ]
+            await asyncio.to_thread(
+                self._client.send_message_batch,
+                QueueUrl=self._queue_url,
+                Entries=entries,
+            )
+        logging.info(f"Re-enqueued {len(ids)} athletes to SQS")
+
+    async def receive(self, max_messages: int = 10) -> list[int]:
+        raw = await asyncio.to_thread(
+            lambda: self._client.receive_message(
+                QueueUrl=self._queue_url,
+                MaxNumberOfMessages=min(max_messages, _SQS_MAX_BATCH),
+            )
+        )
+        athlete_ids: list[int] = []
+        for message in raw.get("Messages", []):
+            athlete_ids.extend(decode_message(message["Body"]))
+            await asyncio.to_thread(
+                self._client.delete_message,
+                QueueUrl=self._queue_url,
+                ReceiptHandle=message["ReceiptHandle"],
+            )
+        return athlete_ids
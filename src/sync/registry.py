@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table
+
+
+@dataclass(frozen=True)
+class AthleteCredentials:
+    """Everything the background sync needs to act on behalf of an athlete.
+
+    ``pending_streams`` holds new runs whose streams the fan-out has not
+    fetched yet; an athlete with any is due straight away.
+    """
+
+    athlete_id: int
+    access_token: str
+    refresh_token: str
+    expires_at: int
+    last_activity_date: datetime | None = None
+    last_synced_at: datetime | None = None
+    pending_streams: tuple[int, ...] = ()
+
+    def is_due(self, now: datetime, interval_seconds: float) -> bool:
+        if self.last_synced_at is None or self.pending_streams:
+            return True
+        return (now - self.last_synced_at).total_seconds() >= interval_seconds
+
+    def checkpointed(
+        self, synced_at: datetime, last_activity_date: datetime | None
+    ) -> AthleteCredentials:
+        return replace(
+            self,
+            last_synced_at=synced_at,
+            last_activity_date=last_activity_date or self.last_activity_date,
+        )
+
+    def with_pending(self, activity_ids: Sequence[int]) -> AthleteCredentials:
+        return replace(
+            self,
+            pending_streams=tuple(
+                dict.fromkeys((*self.pending_streams, *activity_ids))
+            ),
+        )
+
+
+class SyncRegistry(ABC):
+    """Abstract store of athletes whose activities are synced in the background."""
+
+    @abstractmethod
+    async def save(self, credentials: AthleteCredentials) -> None:
+        """Insert or replace the stored credentials and checkpoint for an athlete."""
+
+    @abstractmethod
+    async def get(self, athlete_id: int) -> AthleteCredentials | None:
+        """Return the stored credentials for an athlete, if registered."""
+
+    @abstractmethod
+    async def due(
+        self, now: datetime, interval_seconds: float, limit: int | None = None
+    ) -> list[AthleteCredentials]:
+        """Return athletes not synced within ``interval_seconds``, oldest first."""
+
+
+def _due_sort_key(credentials: AthleteCredentials) -> datetime:
+    return credentials.last_synced_at or datetime.min.replace(tzinfo=timezone.utc)
+
+
+class InMemorySyncRegistry(SyncRegistry):
+    """Process-local registry for standalone mode and tests."""
+
+    def __init__(self) -> None:
+        self._athletes: dict[int, AthleteCredentials] = {}
+
+    async def save(self, credentials: AthleteCredentials) -> None:
+        self._athletes[credentials.athlete_id] = credentials
+
+    async def get(self, athlete_id: int) -> AthleteCredentials | None:
+        return self._athletes.get(athlete_id)
+
+    async def due(
+        self, now: datetime, interval_seconds: float, limit: int | None = None
+    ) -> list[AthleteCredentials]:
+        due = sorted(
+            (c for c in self._athletes.values() if c.is_due(now, interval_seconds)),
+            key=_due_sort_key,
+        )
+        return due[:limit] if limit is not None else due
+
+
+class DynamoSyncRegistry(SyncRegistry):
+    """Registry stored in its own DynamoDB table keyed by ``athlete_id``."""
+
+    def __init__(self, table: Table) -> None:
+        self._table: Table = table
+
+    @staticmethod
+    def _to_item(credentials: AthleteCredentials) -> dict[str, Any]:
+        item: dict[str, Any] = {
+            "athlete_id": str(credentials.athlete_id),
+            "access_token": credentials.access_token,
+            "refresh_token": credentials.refresh_token,
+            "expires_at": credentials.expires_at,
+        }
+        if credentials.last_activity_date:
+            item["last_activity_date"] = credentials.last_activity_date.isoformat()
+        if credentials.last_synced_at:
+            item["last_synced_at"] = credentials.last_synced_at.isoformat()
+        if credentials.pending_streams:
+            item["pending_streams"] = list(credentials.pending_streams)
+        return item
+
+    @staticmethod
+    def _from_item(item: dict[str, Any]) -> AthleteCredentials:
+        def _date(key: str) -> datetime | None:
+            value = item.get(key)
+            return datetime.fromisoformat(value) if isinstance(value, str) else None
+
+        return AthleteCredentials(
+            athlete_id=int(item["athlete_id"]),
+            access_token=str(item["access_token"]),
+            refresh_token=str(item["refresh_token"]),
+            expires_at=int(item["expires_at"]),
+            last_activity_date=_date("last_activity_date"),
+            last_synced_at=_date("last_synced_at"),
+            pending_streams=tuple(int(i) for i in item.get("pending_streams", [])),
+        )
+
+    async def save(self, credentials: AthleteCredentials) -> None:
+        item = self._to_item(credentials)
+        await asyncio.to_thread(lambda: self._table.put_item(Item=item))
+
+    async def get(self, athlete_id: int) -> AthleteCredentials | None:
+        raw = await asyncio.to_thread(
+            lambda: self._table.get_item(Key={"athlete_id": str(athlete_id)})
+        )
+        item = raw.get("Item")
+        return self._from_item(dict(item)) if item else None
+
+    async def due(
+        self, now: datetime, interval_seconds: float, limit: int | None = None
+    ) -> list[AthleteCredentials]:
+        # The registry holds one small item per athlete, so a paginated scan
+        # with the due check in Python is cheaper than maintaining a GSI.
+        items: list[dict[str, Any]] = []
+        scan_kwargs: dict[str, Any] = {}
+        while True:
+            raw = await asyncio.to_thread(self._table.scan, **scan_kwargs)
+            items.extend(raw.get("Items", []))
+            if "LastEvaluatedKey" not in raw:
+                break
+            scan_kwargs["ExclusiveStartKey"] = raw["LastEvaluatedKey"]
+        logging.info(f"Scanned {len(items)} athletes from the sync registry")
+
+        due = sorted(
+            (c for c in map(self._from_item, items) if c.is_due(now, interval_seconds)),
+            key=_due_sort_key,
+        )
+        return due[:limit] if limit is not None else due
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table
+
+# Strava's short-term limit resets on the quarter hour.
+STRAVA_WINDOW_SECONDS = 15 * 60
+# Conditional updates lost to a concurrent invocation before giving up.
+_MAX_ATTEMPTS = 5
+
+
+def window_start(now: float) -> int:
+    return int(now // STRAVA_WINDOW_SECONDS) * STRAVA_WINDOW_SECONDS
+
+
+@dataclass(frozen=True)
+class Reservation:
+    """Requests granted to one sync pass out of a 15-minute window."""
+
+    window: int
+    granted: int
+
+
+class RequestWindow(ABC):
+    """Strava requests spent by every sync process in the current window.
+
+    Each Lambda invocation reserves its share up front and releases what it
+    did not spend, so concurrent and back-to-back invocations together stay
+    under the app-wide limit.
+    """
+
+    @abstractmethod
+    async def reserve(self, requested: int, limit: int) -> Reservation:
+        """Claim up to ``requested`` of the window's ``limit`` requests."""
+
+    @abstractmethod
+    async def release(self, reservation: Reservation, unused: int) -> None:
+        """Give back requests a pass reserved but did not spend."""
+
+
+class InMemoryRequestWindow(RequestWindow):
+    """Per-process window, used by the standalone deployment and tests."""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._used: dict[int, int] = {}
+
+    async def reserve(self, requested: int, limit: int) -> Reservation:
+        window = window_start(self._clock())
+        used = self._used.get(window, 0)
+        granted = max(0, min(requested, limit - used))
+        # Only the current window matters; drop the ones that have passed.
+        self._used = {window: used + granted}
+        return Reservation(window, granted)
+
+    async def release(self, reservation: Reservation, unused: int) -> None:
+        if unused > 0 and reservation.window in self._used:
+            self._used[reservation.window] -= unused
+
+
+class DynamoRequestWindow(RequestWindow):
+    """Window counters in a DynamoDB table keyed by the window's start time.
+
+    Counters are updated conditionally so concurrent invocations never grant
+    more than ``limit`` between them; ``expires_at`` lets a table TTL clean
+    up old windows.
+    """
+
+    def __init__(self, table: Table, clock: Callable[[], float] = time.time) -> None:
+        self._table: Table = table
+        self._clock = clock
+
+    async def _used(self, window: int) -> int:
+        raw = await asyncio.to_thread(
+            lambda: self._table.get_item(
+                Key={"window": str(window)}, ConsistentRead=True
+            )
+        )
+        item: dict[str, Any] = dict(raw.get("Item") or {})
+        return int(item.get("used", 0))
+
+    async def reserve(self, requested: int, limit: int) -> Reservation:
+        from botocore.exceptions import ClientError
+
+        window = window_start(self._clock())
+        for _ in range(_MAX_ATTEMPTS):
+            used = await self._used(window)
+            granted = min(requested, limit - used)
+            if granted <= 0:
+                return Reservation(window, 0)
+            try:
+                await asyncio.to_thread(
+                    self._table.update_item,
+                    Key={"window": str(window)},
+                    UpdateExpression="SET expires_at = :expires ADD used :granted",
+                    ConditionExpression="attribute_not_exists(used) OR used <= :ceiling",
+                    ExpressionAttributeValues={
+                        ":granted": granted,
+                        ":ceiling": limit - granted,
+                        ":expires": window + 2 * STRAVA_WINDOW_SECONDS,
+                    },
+                )
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code != "ConditionalCheckFailedException":
+                    raise
+                continue
+            return Reservation(window, granted)
+        return Reservation(window, 0)
+
+    async def release(self, reservation: Reservation, unused: int) -> None:
+        if unused <= 0 or reservation.window != window_start(self._clock()):
+            return
+        await asyncio.to_thread(
+            lambda: self._table.update_item(
+                Key={"window": str(reservation.window)},
+                UpdateExpression="ADD used :unused",
+                ExpressionAttributeValues={":unused": -unused},
+            )
+        )
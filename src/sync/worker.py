@@ -0,0 +1,62 @@
+"""Wiring shared by the sync Lambda and the local asyncio worker."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from src.config import settings
+from src.strava import StravaService
+from src.sync.fanout import RateBudget, SyncFanout
+from src.sync.queue import SyncQueue
+
+# Strava's short-term limit: 100 requests every 15 minutes.
+STRAVA_REQUESTS_PER_SECOND = 100 / 900
+
+
+def build_fanout(
+    strava_service: StravaService, queue: SyncQueue, budget: RateBudget
+) -> SyncFanout:
+    """Create a fan-out over the service's registry using configured limits."""
+    if strava_service.sync_registry is None:
+        raise ValueError("StravaService has no sync registry configured")
+    return SyncFanout(
+        strava_service.sync_registry,
+        queue,
+        strava_service.sync_athlete,
+        budget,
+        concurrency=settings.sync_concurrency,
+        batch_size=settings.sync_batch_size,
+        process_streams=strava_service.sync_run_streams,
+    )
+
+
+async def run_local_worker(
+    fanout: SyncFanout,
+    queue: SyncQueue,
+    interval_seconds: float,
+    stop: asyncio.Event,
+    poll_seconds: float = 60.0,
+) -> None:
+    """Local stand-in for the scheduled and SQS Lambda triggers.
+
+    Each tick syncs the athletes that are due and then drains whatever was
+    re-enqueued, until ``stop`` is set. Errors are logged so one bad tick does
+    not kill the worker.
+    """
+    while not stop.is_set():
+        try:
+            await fanout.run_due(interval_seconds)
+            athlete_ids = await queue.receive()
+            while athlete_ids:
+                result = await fanout.run_ids(athlete_ids, interval_seconds)
+                if result.deferred:
+                    # Out of budget: the rest waits for the bucket to refill.
+                    break
+                athlete_ids = await queue.receive()
+        except Exception as e:
+            logging.error(f"Local sync worker tick failed: {e}", exc_info=True)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+        except TimeoutError:
+            pass
@@ -0,0 +1,132 @@
+"""AWS Lambda entry point for scheduled and SQS-triggered background sync.
+
+An EventBridge schedule syncs every athlete that is due; SQS messages carry
+athletes deferred by an earlier pass that ran out of request budget. Each
+invocation reserves its request budget from a window shared by all
+invocations, so together they respect Strava's 15-minute limit. Failed SQS
+records are reported through ``batchItemFailures`` so only they are retried.
+An SQS batch continues the trace of the pass that enqueued its first
+message, from the ``traceparent`` message attribute. Dependencies are built on first invocation and reused while the container
+stays warm.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from src.strava import StravaService
+    from src.sync.queue import SyncQueue
+    from src.sync.window import RequestWindow
+
+_dependencies: tuple[StravaService, SyncQueue, RequestWindow] | None = None
+
+
+def get_dependencies() -> tuple[StravaService, SyncQueue, RequestWindow]:
+    global _dependencies
+    if _dependencies is None:
+        from pathlib import Path
+
+        from src.config import settings
+        from src.deployment import get_factory
+        from src.observability.tracing import configure_tracing
+        from src.strava import StravaService
+        from src.sync.queue import InMemorySyncQueue, SQSSyncQueue
+
+        configure_tracing(
+            settings.tracing_exporter,
+            settings.tracing_sample_ratio,
+            Path(settings.tracing_file_path),
+        )
+        factory = get_factory(settings.db_backend)
+        strava_service = StravaService(
+            factory.create_repo(), factory.create_sync_registry()
+        )
+        queue: SyncQueue
+        if settings.sync_queue_url:
+            import boto3
+
+            queue = SQSSyncQueue(
+                boto3.client("sqs"),
+                settings.sync_queue_url,
+                delay_seconds=settings.sync_requeue_delay_seconds,
+            )
+        else:
+            queue = InMemorySyncQueue()
+        _dependencies = (strava_service, queue, factory.create_request_window())
+    return _dependencies
+
+
+def _traceparent(sqs_records: list[dict[str, Any]]) -> str | None:
+    from src.observability.tracing import TRACEPARENT_HEADER
+
+    for record in sqs_records:
+        attribute = record.get("messageAttributes", {}).get(TRACEPARENT_HEADER)
+        if attribute is not None:
+            return attribute.get("stringValue")
+    return None
+
+
+async def handle_event(
+    event: dict[str, Any],
+    strava_service: StravaService,
+    queue: SyncQueue,
+    window: RequestWindow,
+) -> dict[str, Any]:
+    from src.config import settings
+    from src.observability.tracing import span
+    from src.sync.fanout import RateBudget
+    from src.sync.queue import decode_message
+    from src.sync.worker import build_fanout
+
+    await strava_service.activity_repo.initialize()
+    reservation = await window.reserve(
+        settings.sync_request_budget, settings.sync_request_budget
+    )
+    budget = RateBudget(reservation.granted)
+    fanout = build_fanout(strava_service, queue, budget)
+
+    sqs_records = [
+        record
+        for record in event.get("Records", [])
+        if record.get("eventSource") == "aws:sqs"
+    ]
+    try:
+        if not sqs_records:
+            with span("sync.scheduled", {"faas.trigger": "timer"}):
+                result = await fanout.run_due(settings.sync_interval_seconds)
+            return result.as_dict()
+
+        ids_by_message = {
+            record["messageId"]: decode_message(record["body"])
+            for record in sqs_records
+        }
+        with span(
+            "sync.queued",
+            {
+                "faas.trigger": "pubsub",
+                "messaging.batch.message_count": len(sqs_records),
+            },
+            traceparent=_traceparent(sqs_records),
+        ):
+            result = await fanout.run_ids(
+                [athlete_id for ids in ids_by_message.values() for athlete_id in ids],
+                settings.sync_interval_seconds,
+            )
+    finally:
+        await window.release(reservation, budget.remaining)
+    failed = set(result.failed)
+    return {
+        **result.as_dict(),
+        "batchItemFailures": [
+            {"itemIdentifier": message_id}
+            for message_id, ids in ids_by_message.items()
+            if failed.intersection(ids)
+        ],
+    }
+
+
+def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    strava_service, queue, window = get_dependencies()
+    return asyncio.run(handle_event(event, strava_service, queue, window))
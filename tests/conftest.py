@@ -1,8 +1,19 @@
 import os
 
+import pytest
+
 # Mock environment variables for testing
 # These must be set before src.config is imported
 os.environ["STRAVA_CLIENT_ID"] = "12345"
 os.environ["STRAVA_CLIENT_SECRET"] = "mock_secret"
 os.environ["ENVIRONMENT"] = "test"
 os.environ["JWT_SECRET"] = "test-secret"
+
+
+@pytest.fixture(autouse=True)
+def _reset_secret_caches():
+    """Secrets are cached per process; keep tests from seeing each other's."""
+    yield
+    from src.secrets_cache import clear_secret_caches
+
+    clear_secret_caches()
@@ -0,0 +1,42 @@
+"""Builders for the Strava models the tests store and analyse."""
+
+from datetime import date, datetime
+from typing import Any
+
+from stravalib.model import SummaryActivity
+
+
+def make_activity(
+    activity_id: int,
+    start: date | datetime | str | None = None,
+    *,
+    athlete_id: int | None = 7,
+    sport: str = "Run",
+    distance: float = 5000.0,
+    moving_time: int = 1500,
+    polyline: str | None = None,
+    **fields: Any,
+) -> SummaryActivity:
+    """A ``SummaryActivity`` owned by ``athlete_id``.
+
+    A ``date`` start means 08:00 that day; ``start`` is used as both the UTC
+    and the local start. Other ``fields`` use Strava's JSON names.
+    """
+    payload: dict[str, Any] = {
+        "id": activity_id,
+        "athlete": {"id": athlete_id} if athlete_id is not None else None,
+        "sport_type": sport,
+        "distance": distance,
+        "moving_time": moving_time,
+        "elapsed_time": moving_time + 100,
+        "total_elevation_gain": 40.0,
+    }
+    if isinstance(start, datetime):
+        start = start.isoformat()
+    elif isinstance(start, date):
+        start = f"{start.isoformat()}T08:00:00Z"
+    if start is not None:
+        payload["start_date"] = payload["start_date_local"] = start
+    if polyline is not None:
+        payload["map"] = {"summary_polyline": polyline}
+    return SummaryActivity.model_validate({**payload, **fields})
@@ -0,0 +1,154 @@
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from stravalib.exc import ObjectNotFound
+
+from src.analytics.activity_analysis import (
+    AnalysisCache,
+    AnalysisSettings,
+    analyse,
+    grade_cost_factor,
+)
+from src.strava.strava_client import AthleteSnapshot, StravaService
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_splits_interpolate_kilometre_boundaries(self) -> None:
+        # 2508 m at 4 m/s, sampled every 3 s so boundaries fall between points.
+        elapsed = np.arange(0.0, 628.0, 3.0)
+        distance = elapsed * 4.0
+
+        result = analyse(elapsed.tolist(), distance.tolist())
+
+        splits = result["splits"]
+        self.assertEqual([s["distance_m"] for s in splits], [1000.0, 1000.0, 508.0])
+        self.assertEqual([s["time_s"] for s in splits], [250.0, 250.0, 127.0])
+        self.assertEqual(splits[0]["pace_s_per_km"], 250.0)
+        # Without altitude, grade-adjusted pace is the actual pace.
+        self.assertEqual(splits[0]["gap_s_per_km"], 250.0)
+
+    def test_climbing_lowers_grade_adjusted_pace(self) -> None:
+        elapsed = np.arange(0.0, 501.0)
+        distance = elapsed * 4.0
+        altitude = distance * 0.05
+
+        result = analyse(elapsed.tolist(), distance.tolist(), altitude.tolist())
+
+        factor = float(grade_cost_factor(np.array([0.05]))[0])
+        self.assertGreater(factor, 1.0)
+        self.assertAlmostEqual(result["gap_s_per_km"], 250.0 / factor, places=0)
+        self.assertLess(result["splits"][0]["gap_s_per_km"], 250.0)
+
+    def test_zones_weight_heart_rate_by_time(self) -> None:
+        elapsed = np.array([0.0, 10.0, 40.0, 100.0])
+        heartrate = np.array([100, 120, 150, 185])
+
+        result = analyse(
+            elapsed.tolist(),
+            (elapsed * 3.0).tolist(),
+            heartrate=heartrate.tolist(),
+            settings=AnalysisSettings(max_heartrate=200),
+        )
+
+        seconds = [zone["seconds"] for zone in result["zones"]]
+        # Bounds 100/120/140/160/180 bpm; each interval counts at its end.
+        self.assertEqual(seconds, [0.0, 10.0, 30.0, 0.0, 60.0])
+        self.assertEqual(result["zones"][0]["min_bpm"], 100)
+        self.assertIsNone(result["zones"][-1]["max_bpm"])
+
+    def test_short_streams_have_no_splits(self) -> None:
+        self.assertEqual(
+            analyse([0.0], [0.0]), {"splits": [], "gap_s_per_km": None, "zones": []}
+        )
+
+    def test_analyses_a_thousand_points_in_under_a_millisecond(self) -> None:
+        rng = np.random.default_rng(3)
+        elapsed = np.arange(10_000.0).tolist()
+        distance = np.cumsum(rng.uniform(2.5, 4.5, 10_000)).tolist()
+        altitude = np.cumsum(rng.normal(0, 0.2, 10_000)).tolist()
+        heartrate = rng.uniform(110, 185, 10_000).tolist()
+        analyse(elapsed, distance, altitude, heartrate)
+
+        began = time.perf_counter()
+        for _ in range(10):
+            analyse(elapsed, distance, altitude, heartrate)
+        per_thousand = (time.perf_counter() - began) / 10 / 10
+
+        self.assertLess(per_thousand, 1e-3)
+
+
+class TestCache(unittest.TestCase):
+    def test_keys_by_activity_and_settings_version(self) -> None:
+        cache = AnalysisCache(max_size=2)
+        default = AnalysisSettings()
+        cache.put(1, default, {"a": 1})
+        cache.put(2, default, {"a": 2})
+
+        self.assertEqual(cache.get(1, default), {"a": 1})
+        self.assertIsNone(cache.get(1, AnalysisSettings(max_heartrate=180)))
+        self.assertNotEqual(
+            default.version, AnalysisSettings(max_heartrate=180).version
+        )
+        # 2 is now least recently used.
+        cache.put(3, default, {"a": 3})
+        self.assertIsNone(cache.get(2, default))
+        self.assertIsNotNone(cache.get(1, default))
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+    def _service(self, athlete_id: int = 7) -> tuple[StravaService, MagicMock]:
+        service = StravaService(MagicMock())
+        snapshot = patch.object(
+            service,
+            "get_athlete_snapshot",
+            AsyncMock(
+                return_value=AthleteSnapshot(b"{}", "", MagicMock(), 0.0, athlete_id)
+            ),
+        )
+        snapshot.start()
+        self.addCleanup(snapshot.stop)
+        service.tokens["analysis_session"] = "token"
+        client = MagicMock()
+        service.client = client
+        return service, client
+
+    async def test_fetches_streams_once_per_settings(self) -> None:
+        service, client = self._service()
+        client.get_activity_streams.return_value = {
+            "distance": MagicMock(data=[0.0, 500.0, 1000.0]),
+            "time": MagicMock(data=[0, 120, 240]),
+        }
+
+        first = await service.analyse_activity("analysis_session", 11)
+        second = await service.analyse_activity("analysis_session", 11)
+
+        self.assertIs(first, second)
+        self.assertEqual(first["splits"][0]["pace_s_per_km"], 240.0)
+        client.get_activity_streams.assert_called_once_with(
+            11, types=["distance", "time", "altitude", "heartrate"]
+        )
+        await service.analyse_activity("analysis_session", 11, max_heartrate=180)
+        self.assertEqual(client.get_activity_streams.call_count, 2)
+
+    async def test_missing_activity_raises_lookup_error(self) -> None:
+        service, client = self._service()
+        client.get_activity_streams.side_effect = ObjectNotFound("gone")
+
+        with self.assertRaises(LookupError):
+            await service.analyse_activity("analysis_session", 11)
+
+    async def test_stream_without_data_raises_lookup_error(self) -> None:
+        service, client = self._service()
+        client.get_activity_streams.return_value = {
+            "distance": MagicMock(data=None),
+            "time": MagicMock(data=[0, 120, 240]),
+        }
+
+        with self.assertRaises(LookupError):
+            await service.analyse_activity("analysis_session", 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import random
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from botocore.exceptions import ClientError
+from sqlalchemy.dialects import postgresql
+
+from src.analytics.best_efforts import (
+    PersonalRecord,
+    best_efforts,
+    effort_records,
+    fastest_time,
+)
+from src.config import settings
+from src.database.dynamo_service import DynamoService
+from src.database.postgres_service import PostgresService
+from src.strava.strava_client import StravaService
+from tests.factories import make_activity
+
+START = datetime(2024, 5, 4, 8, 0, tzinfo=timezone.utc)
+
+
+def _streams(points: int, seed: int) -> tuple[list[float], list[float]]:
+    rng = random.Random(seed)
+    distance, time = [0.0], [0.0]
+    for _ in range(points - 1):
+        time.append(time[-1] + rng.uniform(1, 5))
+        distance.append(distance[-1] + rng.uniform(0, 20))
+    return distance, time
+
+
+def _brute_force(distance: list[float], time: list[float], target: float) -> float:
+    best = float("inf")
+    for start in range(len(distance) - 1):
+        for end in range(start + 1, len(distance)):
+            reached = distance[end] - target
+            if distance[start] <= reached < distance[start + 1]:
+                d0, d1 = distance[start], distance[start + 1]
+                began = time[start] + (time[start + 1] - time[start]) * (
+                    reached - d0
+                ) / (d1 - d0)
+                best = min(best, time[end] - began)
+    return best
+
+
+class TestSweep(unittest.TestCase):
+    def test_matches_brute_force(self) -> None:
+        distance, time = _streams(400, seed=5)
+
+        for target in (100.0, 1000.0, 2500.0):
+            elapsed = fastest_time(distance, time, target)
+            assert elapsed is not None
+            self.assertAlmostEqual(elapsed, _brute_force(distance, time, target))
+
+    def test_even_pace_and_short_activities(self) -> None:
+        distance = [float(metres) for metres in range(0, 10_001, 10)]
+        time = [metres * 0.3 for metres in distance]
+
+        efforts = best_efforts(distance, time)
+
+        self.assertEqual(list(efforts), ["1k", "5k", "10k"])
+        self.assertAlmostEqual(efforts["5k"], 1500.0)
+        self.assertIsNone(fastest_time([0.0], [0.0], 1000.0))
+
+    def test_effort_records_need_an_athlete(self) -> None:
+        distance = [0.0, 600.0, 1200.0]
+        time = [0.0, 200.0, 420.0]
+
+        records = effort_records(make_activity(11, START), distance, time)
+
+        self.assertEqual(records, [PersonalRecord(7, "1k", 1000.0, 353.3, 11, START)])
+        anonymous = make_activity(11, START).model_copy(update={"athlete": None})
+        self.assertEqual(effort_records(anonymous, distance, time), [])
+
+
+class TestStorage(unittest.IsolatedAsyncioTestCase):
+    async def test_postgres_keeps_only_faster_efforts(self) -> None:
+        session = AsyncMock()
+        session.execute.return_value.all = MagicMock(return_value=[])
+        session_maker = MagicMock()
+        session_maker.return_value.__aenter__ = AsyncMock(return_value=session)
+        session_maker.return_value.__aexit__ = AsyncMock(return_value=None)
+        service = PostgresService(session_maker)
+
+        await service.update_personal_records(
+            [PersonalRecord(7, "5k", 5000.0, 1200.0, 11, START)]
+        )
+
+        statement = session.execute.await_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (athlete_id, distance) DO UPDATE", sql)
+        self.assertIn(
+            "WHERE running_corgium.personal_records.elapsed_s > excluded.elapsed_s",
+            sql,
+        )
+        self.assertIn("RETURNING", sql)
+        session.commit.assert_awaited_once()
+
+    async def test_dynamo_skips_slower_efforts(self) -> None:
+        records_table = MagicMock()
+        records_table.put_item.side_effect = [
+            None,
+            ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+            ),
+        ]
+        service = DynamoService(MagicMock(), records_table=records_table)
+        faster = PersonalRecord(7, "1k", 1000.0, 200.0, 11, START)
+        slower = PersonalRecord(7, "5k", 5000.0, 1300.0, 11, START)
+
+        improved = await service.update_personal_records([faster, slower])
+
+        self.assertEqual(improved, [faster])
+        kwargs = records_table.put_item.call_args_list[0].kwargs
+        self.assertEqual(kwargs["Item"]["athlete_id"], "7")
+        self.assertIn("elapsed_s > :elapsed", kwargs["ConditionExpression"])
+
+
+class TestSync(unittest.IsolatedAsyncioTestCase):
+    async def test_new_runs_offer_their_efforts_once(self) -> None:
+        repository = MagicMock()
+        repository.update_personal_records = AsyncMock(return_value=[])
+        service = StravaService(repository)
+        client = MagicMock()
+        client.get_activity_streams.return_value = {
+            "distance": MagicMock(data=[0.0, 600.0, 1200.0]),
+            "time": MagicMock(data=[0.0, 200.0, 420.0]),
+        }
+
+        with patch.object(settings, "mean_max_curves_enabled", False):
+            await service._process_run_streams(client, make_activity(11, START))
+            client.get_activity_streams.side_effect = RuntimeError("rate limited")
+            await service._process_run_streams(client, make_activity(12, START))
+
+        client.get_activity_streams.assert_called_with(12, types=["distance", "time"])
+        repository.update_personal_records.assert_awaited_once()
+        (candidates,) = repository.update_personal_records.await_args.args
+        self.assertEqual([c.distance for c in candidates], ["1k"])
+
+    async def test_streams_without_data_are_skipped(self) -> None:
+        repository = MagicMock()
+        repository.update_personal_records = AsyncMock(return_value=[])
+        service = StravaService(repository)
+        client = MagicMock()
+        client.get_activity_streams.return_value = {
+            "distance": MagicMock(data=None),
+            "time": MagicMock(data=[0.0, 200.0, 420.0]),
+        }
+
+        await service._process_run_streams(client, make_activity(11, START))
+
+        repository.update_personal_records.assert_not_awaited()
+
+    async def test_personal_records_for_the_athlete(self) -> None:
+        repository = MagicMock()
+        record = PersonalRecord(7, "5k", 5000.0, 1200.0, 11, START)
+        repository.get_personal_records = AsyncMock(return_value=[record])
+        service = StravaService(repository)
+
+        result = await service.read_personal_records(7)
+
+        self.assertEqual(result, [record])
+        self.assertEqual(await service.read_personal_records(None), [])
+        repository.get_personal_records.assert_awaited_once_with(7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from stravalib.strava_model import SummaryActivity
+
+from src.middleware import CompressionMiddleware
+from src.middleware.compression import accepted_encodings
+from src.responses import PydanticJSONResponse
+
+LARGE_TEXT = "corgi " * 1000
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(LARGE_TEXT, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/encoded")
+    async def encoded():
+        body = gzip.compress(LARGE_TEXT.encode())
+        return Response(
+            body, media_type="text/plain", headers={"Content-Encoding": "gzip"}
+        )
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\x00" * 2000, media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(10):
+                yield LARGE_TEXT
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_accepted_encodings_ignores_q_zero():
+    assert accepted_encodings("gzip;q=0.5, br;q=0, identity") == {"gzip", "identity"}
+
+
+def test_large_response_is_gzipped():
+    response = _client().get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert int(response.headers["content-length"]) < len(LARGE_TEXT)
+    assert response.text == LARGE_TEXT
+
+
+def test_no_compression_without_accept_encoding():
+    response = _client().get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == LARGE_TEXT
+
+
+def test_small_response_is_not_compressed():
+    response = _client().get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == "tiny"
+
+
+def test_already_encoded_and_binary_responses_pass_through():
+    client = _client()
+
+    encoded = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    binary = client.get("/binary", headers={"Accept-Encoding": "gzip"})
+
+    assert encoded.text == LARGE_TEXT
+    assert "content-encoding" not in binary.headers
+
+
+def test_streaming_response_is_compressed():
+    response = _client().get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == LARGE_TEXT * 10
+
+
+def test_pydantic_json_response_matches_default_encoding():
+    activity = SummaryActivity.model_validate(
+        {
+            "id": 1,
+            "name": "Morning Run",
+            "distance": 5000.5,
+            "start_date": "2024-01-01T10:00:00Z",
+            "map": {"id": "a1", "summary_polyline": "abc"},
+        }
+    )
+    app = FastAPI()
+
+    @app.get("/default")
+    async def default():
+        return [activity]
+
+    @app.get("/fast")
+    async def fast():
+        return PydanticJSONResponse([activity])
+
+    client = TestClient(app)
+    assert client.get("/fast").json() == client.get("/default").json()
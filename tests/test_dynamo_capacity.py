@@ -0,0 +1,137 @@
+import logging
+import unittest
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from src.database.dynamo_capacity import CapacityTrackingTable
+from src.middleware import RequestMetricsMiddleware
+from src.observability.capacity import (
+    CapacityBudgetExceeded,
+    CapacityTracker,
+    parse_consumed_capacity,
+)
+from src.observability.metrics import MetricsRegistry
+
+
+def _table(consumed: float) -> MagicMock:
+    table = MagicMock()
+    table.name = "activities"
+    response = {"Items": [], "ConsumedCapacity": {"CapacityUnits": consumed}}
+    table.scan.return_value = response
+    table.put_item.return_value = {"ConsumedCapacity": {"CapacityUnits": consumed}}
+    return table
+
+
+class TestParseConsumedCapacity(unittest.TestCase):
+    def test_total_units_attributed_by_operation(self) -> None:
+        self.assertEqual(
+            parse_consumed_capacity("Scan", {"CapacityUnits": 2.5}).read, 2.5
+        )
+        self.assertEqual(
+            parse_consumed_capacity("PutItem", {"CapacityUnits": 1.0}).write, 1.0
+        )
+
+    def test_explicit_read_write_units_win(self) -> None:
+        capacity = parse_consumed_capacity(
+            "UpdateItem",
+            [{"CapacityUnits": 3, "ReadCapacityUnits": 1, "WriteCapacityUnits": 2}],
+        )
+
+        self.assertEqual((capacity.read, capacity.write), (1.0, 2.0))
+
+    def test_missing_capacity_is_zero(self) -> None:
+        self.assertEqual(parse_consumed_capacity("Scan", None).total, 0.0)
+
+
+class TestCapacityTrackingTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+        self.tracker = CapacityTracker(self.registry)
+
+    def test_requests_and_records_consumed_capacity(self) -> None:
+        raw = _table(4.0)
+        table = CapacityTrackingTable(raw, self.tracker)
+
+        table.scan(ProjectionExpression="strava_id")
+        table.put_item(Item={"strava_id": "1"})
+
+        raw.scan.assert_called_once_with(
+            ProjectionExpression="strava_id", ReturnConsumedCapacity="TOTAL"
+        )
+        self.assertEqual(self.tracker.units.value("Scan", "activities", "read"), 4.0)
+        self.assertEqual(
+            self.tracker.units.value("PutItem", "activities", "write"), 4.0
+        )
+
+    def test_untracked_attributes_pass_through(self) -> None:
+        raw = _table(1.0)
+        table = CapacityTrackingTable(raw, self.tracker)
+
+        self.assertIs(table.meta, raw.meta)
+
+    def test_operation_budget_logs(self) -> None:
+        self.tracker.configure(operation_budget=2.0, request_budget=None, mode="log")
+        table = CapacityTrackingTable(_table(5.0), self.tracker)
+
+        with self.assertLogs("src.observability.capacity", logging.WARNING) as logs:
+            table.scan()
+
+        self.assertIn("consumed 5 capacity units", logs.output[0])
+        self.assertEqual(self.tracker.over_budget.value("Scan", "operation"), 1)
+
+    def test_request_budget_rejects_further_operations(self) -> None:
+        self.tracker.configure(operation_budget=None, request_budget=3.0, mode="reject")
+        raw = _table(2.0)
+        table = CapacityTrackingTable(raw, self.tracker)
+        token = self.tracker.start_request()
+        try:
+            table.scan()
+            table.scan()
+            with self.assertRaises(CapacityBudgetExceeded):
+                table.scan()
+        finally:
+            consumed = self.tracker.finish_request(token, "/strava/activities")
+
+        self.assertEqual(raw.scan.call_count, 2)
+        self.assertEqual(consumed.read, 4.0)
+
+    def test_unknown_budget_mode_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            self.tracker.configure(None, None, "block")
+
+
+class TestRequestAttribution(unittest.TestCase):
+    def test_capacity_attributed_to_route_and_header(self) -> None:
+        registry = MetricsRegistry()
+        tracker = CapacityTracker(registry)
+        table = CapacityTrackingTable(_table(1.5), tracker)
+        app = FastAPI()
+        app.add_middleware(
+            RequestMetricsMiddleware,
+            registry=registry,
+            capacity=tracker,
+            capacity_header=True,
+        )
+
+        @app.get("/activities/{activity_id}")
+        async def read(activity_id: str):
+            table.scan()
+            table.put_item(Item={"strava_id": activity_id})
+            return JSONResponse({})
+
+        response = TestClient(app).get("/activities/1")
+
+        self.assertEqual(
+            response.headers["x-dynamodb-consumed-capacity"], "read=1.5, write=1.5"
+        )
+        self.assertEqual(
+            tracker.route_units.value("/activities/{activity_id}", "read"), 1.5
+        )
+        self.assertEqual(tracker.per_request.count("/activities/{activity_id}"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,7 +14,7 @@ exists.
 
 import unittest
 from decimal import Decimal
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone
 
 from src.database.dynamo_service import DynamoService
@@ -96,6 +96,7 @@ class TestDynamoService(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 12345
         mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
         mock_activity.model_dump_json.return_value = (
@@ -113,6 +114,7 @@ class TestDynamoService(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize(existing_ids=[existing_id])
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = existing_id
 
         result = await self.service.insert_activity(mock_activity)
@@ -127,6 +129,7 @@ class TestDynamoService(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize(last_date=old_date, existing_ids=[99999])
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 12345
         mock_activity.start_date = new_date
         mock_activity.model_dump_json.return_value = '{"id": 12345}'
@@ -135,10 +138,24 @@ class TestDynamoService(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(self.service.get_last_sync_date(), new_date)
 
+    async def test_sync_state_digest_is_order_independent(self) -> None:
+        self._setup_initialize(existing_ids=[1, 2, 3])
+        await self.service.initialize()
+
+        other = DynamoService(MagicMock())
+        other._table.scan.return_value = {
+            "Items": [{"strava_id": Decimal(str(sid))} for sid in (3, 1, 2)]
+        }
+        await other.initialize()
+
+        self.assertEqual(self.service.get_sync_state(), other.get_sync_state())
+        self.assertEqual(self.service.get_sync_state().activity_count, 3)
+
     async def test_insert_activity_with_none_id(self) -> None:
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = None
 
         result = await self.service.insert_activity(mock_activity)
@@ -159,17 +176,19 @@ class TestDynamoService(unittest.IsolatedAsyncioTestCase):
                     "strava_id": Decimal("111"),
                     "strava_response": '{"id": 111, "name": "Morning Run", "distance": 5000, "type": "Run"}',
                     "create_date": "2024-01-15T08:00:00+00:00",
+                    "athlete_id": "7",
                 },
                 {
                     "strava_id": Decimal("222"),
                     "strava_response": '{"id": 222, "name": "Evening Walk", "distance": 2000, "type": "Walk"}',
                     "create_date": "2024-01-14T18:00:00+00:00",
+                    "athlete_id": "7",
                 },
             ],
             "Count": 2,
         }
 
-        result = await self.service.get_activities(limit=10)
+        result = await self.service.get_activities(7, limit=10)
 
         self.assertEqual(len(result), 2)
         self.assertIsInstance(result[0], SummaryActivity)
@@ -184,15 +203,138 @@ class TestDynamoService(unittest.IsolatedAsyncioTestCase):
                 "strava_id": Decimal(str(i)),
                 "strava_response": f'{{"id": {i}, "name": "Run {i}"}}',
                 "create_date": f"2024-01-{i:02d}T08:00:00+00:00",
+                "athlete_id": "7",
             }
             for i in range(1, 11)
         ]
         self.mock_table.scan.return_value = {"Items": items, "Count": 10}
 
-        result = await self.service.get_activities(limit=3)
+        result = await self.service.get_activities(7, limit=3)
 
         self.assertLessEqual(len(result), 3)
 
+    async def test_get_activities_only_returns_the_athletes_own(self) -> None:
+        def item(strava_id: int, athlete_id: int, stored: bool) -> dict:
+            response = f'{{"id": {strava_id}, "athlete": {{"id": {athlete_id}}}}}'
+            item = {
+                "strava_id": Decimal(strava_id),
+                "strava_response": response,
+                "create_date": f"2024-01-{strava_id:02d}T08:00:00+00:00",
+            }
+            if stored:
+                item["athlete_id"] = str(athlete_id)
+            return item
+
+        # The filter runs server-side; legacy items without athlete_id
+        # come back and are matched on their payload.
+        self.mock_table.scan.return_value = {
+            "Items": [item(1, 7, True), item(2, 7, False), item(3, 8, False)]
+        }
+
+        result = await self.service.get_activities(7)
+
+        self.assertEqual([activity.id for activity in result], [2, 1])
+        self.assertIn("FilterExpression", self.mock_table.scan.call_args.kwargs)
+
+    async def test_activity_history_is_scanned_per_athlete(self) -> None:
+        def item(strava_id: int, athlete_id: int, stored: bool) -> dict:
+            response = f'{{"id": {strava_id}, "athlete": {{"id": {athlete_id}}}}}'
+            item = {"strava_id": Decimal(strava_id), "strava_response": response}
+            if stored:
+                item["athlete_id"] = str(athlete_id)
+            return item
+
+        self.mock_table.scan.side_effect = [
+            {"Items": [item(1, 7, True)], "LastEvaluatedKey": {"strava_id": "1"}},
+            {"Items": [item(2, 7, False), item(3, 8, False)]},
+        ]
+
+        result = await self.service.get_activity_history(7)
+
+        self.assertEqual([activity.id for activity in result], [1, 2])
+        first, second = self.mock_table.scan.call_args_list
+        self.assertIn("FilterExpression", first.kwargs)
+        self.assertEqual(second.kwargs["ExclusiveStartKey"], {"strava_id": "1"})
+
+    async def test_activity_history_pages_follow_athlete_and_date(self) -> None:
+        def key(strava_id: int, athlete_id: int | None, day: int) -> dict:
+            item = {
+                "strava_id": str(strava_id),
+                "create_date": f"2024-01-{day:02d}T08:00:00+00:00",
+            }
+            if athlete_id is not None:
+                item["athlete_id"] = str(athlete_id)
+            return item
+
+        self.mock_table.scan.return_value = {
+            "Items": [key(1, 9, 1), key(2, 3, 5), key(3, 3, 2), key(4, None, 1)]
+        }
+        self.mock_table.name = "activities"
+        client = self.mock_table.meta.client
+
+        def batch_get_item(RequestItems: dict) -> dict:
+            keys = RequestItems["activities"]["Keys"]
+            # The last key is left unprocessed once, as under throttling.
+            if len(keys) == 2 and client.batch_get_item.call_count == 1:
+                return {
+                    "Responses": {"activities": [self._item(keys[0])]},
+                    "UnprocessedKeys": {"activities": {"Keys": keys[1:]}},
+                }
+            return {"Responses": {"activities": [self._item(k) for k in keys]}}
+
+        client.batch_get_item.side_effect = batch_get_item
+
+        with patch("src.database.dynamo_service.time.sleep") as sleep:
+            pages = [
+                [activity.id for activity in page]
+                async for page in self.service.iter_activity_history(page_size=2)
+            ]
+
+        self.assertEqual(pages, [[3, 2], [1]])
+        self.assertEqual(client.batch_get_item.call_count, 3)
+        sleep.assert_called_once()
+
+    @staticmethod
+    def _item(key: dict) -> dict:
+        return {
+            "strava_id": key["strava_id"],
+            "strava_response": f'{{"id": {key["strava_id"]}}}',
+        }
+
+    async def test_get_activity_by_id(self) -> None:
+        self.mock_table.get_item.side_effect = [
+            {"Item": {"strava_id": "5", "strava_response": '{"id": 5}'}},
+            {},
+        ]
+
+        found = await self.service.get_activity(5)
+        missing = await self.service.get_activity(6)
+
+        assert found is not None
+        self.assertEqual(found.id, 5)
+        self.assertIsNone(missing)
+        self.assertEqual(
+            self.mock_table.get_item.call_args_list[0].kwargs,
+            {"Key": {"strava_id": "5"}},
+        )
+
+    async def test_last_sync_date_per_athlete(self) -> None:
+        start = datetime(2024, 1, 15, 8, 0, tzinfo=timezone.utc)
+        self.mock_table.scan.return_value = {
+            "Items": [
+                {
+                    "strava_id": Decimal(1),
+                    "create_date": start.isoformat(),
+                    "athlete_id": "7",
+                }
+            ]
+        }
+
+        await self.service.initialize()
+
+        self.assertEqual(self.service.get_last_sync_date(7), start)
+        self.assertIsNone(self.service.get_last_sync_date(8))
+
     # ------------------------------------------------------------------
     # get_last_sync_date() / is_activity_synced()
     # ------------------------------------------------------------------
@@ -242,6 +384,7 @@ class TestDynamoServiceTableUsage(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 12345
         mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
         mock_activity.model_dump_json.return_value = '{"id": 12345}'
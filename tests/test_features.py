@@ -0,0 +1,176 @@
+import math
+import random
+import unittest
+from collections.abc import AsyncIterator
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from stravalib.model import SummaryActivity
+
+from src.analytics.features import (
+    FEATURE_NAMES,
+    ActivityRecord,
+    generate_features,
+    repository_features,
+    repository_records,
+)
+from tests.factories import make_activity
+
+START = datetime(2024, 1, 1, 7, 0, tzinfo=timezone.utc)
+
+
+def _records(athlete_id: int, count: int, seed: int) -> list[ActivityRecord]:
+    rng = random.Random(seed)
+    records = []
+    start = START
+    for _ in range(count):
+        start += timedelta(hours=rng.uniform(6, 80))
+        records.append(
+            ActivityRecord(
+                athlete_id,
+                start,
+                rng.uniform(3000, 25000),
+                rng.uniform(900, 8000),
+                is_run=rng.random() > 0.2,
+            )
+        )
+    return records
+
+
+def _brute_force(history: list[ActivityRecord], at: datetime, days: int) -> dict:
+    runs = [
+        r
+        for r in history
+        if r.is_run and r.start < at and (at - r.start) < timedelta(days=days)
+    ]
+    paces = [(r.start, r.pace) for r in runs if r.pace is not None]
+    result = {
+        "runs_per_week": len(runs) / (days / 7),
+        "best_pace_s_per_km": min((p for _, p in paces), default=math.nan),
+    }
+    if len(runs):
+        result["distance_mean_m"] = sum(r.distance_m for r in runs) / len(runs)
+    if len(paces) >= 2:
+        mean = sum(p for _, p in paces) / len(paces)
+        result["pace_variance"] = sum((p - mean) ** 2 for _, p in paces) / len(paces)
+        ts = [(s - START).total_seconds() / 86400 for s, _ in paces]
+        t_mean = sum(ts) / len(ts)
+        result["pace_trend_s_per_km_per_day"] = sum(
+            (t - t_mean) * (p - mean) for t, (_, p) in zip(ts, paces)
+        ) / sum((t - t_mean) ** 2 for t in ts)
+    return result
+
+
+class TestRollingFeatures(unittest.TestCase):
+    def test_matches_brute_force_windows(self) -> None:
+        records = _records(1, 300, seed=3)
+
+        rows = list(generate_features(records, workers=0))
+
+        self.assertEqual(len(rows), len(records))
+        self.assertEqual(tuple(rows[0].features), FEATURE_NAMES)
+        self.assertEqual(rows[0].features["run_count"], 0.0)
+        for index in (1, 50, 299):
+            for days in (7, 30, 90):
+                expected = _brute_force(records[:index], records[index].start, days)
+                for name, value in expected.items():
+                    actual = rows[index].features[f"{name}_{days}d"]
+                    if math.isnan(value):
+                        self.assertTrue(math.isnan(actual), (index, days, name))
+                    else:
+                        self.assertAlmostEqual(actual, value, places=5)
+
+    def test_process_pool_matches_single_process(self) -> None:
+        records = [r for athlete in range(6) for r in _records(athlete, 40, athlete)]
+
+        pooled = list(generate_features(records, workers=2))
+        local = list(generate_features(records, workers=0))
+
+        self.assertEqual(
+            [(r.athlete_id, r.start) for r in pooled],
+            [(r.athlete_id, r.start) for r in local],
+        )
+        self.assertEqual(
+            repr([r.features for r in pooled]), repr([r.features for r in local])
+        )
+
+    def test_rejects_unordered_streams(self) -> None:
+        records = _records(1, 3, seed=1) + _records(2, 3, seed=2)
+
+        with self.assertRaises(ValueError):
+            list(generate_features(records + _records(1, 1, seed=4), workers=0))
+        with self.assertRaises(ValueError):
+            list(generate_features(records[::-1], workers=0))
+
+
+def _paged_repository(pages: list[list[SummaryActivity]]) -> MagicMock:
+    async def iter_activity_history(
+        page_size: int,
+    ) -> AsyncIterator[list[SummaryActivity]]:
+        for page in pages:
+            yield page
+
+    repository = MagicMock()
+    repository.iter_activity_history = MagicMock(side_effect=iter_activity_history)
+    return repository
+
+
+class TestSources(unittest.IsolatedAsyncioTestCase):
+    async def test_repository_records_stream_the_pages(self) -> None:
+        repository = _paged_repository(
+            [
+                [
+                    make_activity(3, date(2024, 1, 7), athlete_id=3, sport="Ride"),
+                    make_activity(1, date(2024, 1, 2), athlete_id=9),
+                ],
+                [make_activity(2, date(2024, 1, 5), athlete_id=9)],
+            ]
+        )
+
+        records = [record async for record in repository_records(repository, 2)]
+
+        self.assertEqual(
+            [(r.athlete_id, r.start.day) for r in records], [(3, 7), (9, 2), (9, 5)]
+        )
+        self.assertFalse(records[0].is_run)
+        self.assertIsNone(records[0].pace)
+        repository.iter_activity_history.assert_called_once_with(2)
+
+    async def test_repository_features_match_generate_features(self) -> None:
+        # Athlete 9's history spans a page boundary.
+        pages = [
+            [
+                make_activity(1, date(2024, 1, 1), athlete_id=3),
+                make_activity(2, date(2024, 1, 4), athlete_id=3),
+                make_activity(4, date(2024, 1, 2), athlete_id=9),
+            ],
+            [
+                make_activity(5, date(2024, 1, 3), athlete_id=9),
+                make_activity(7, date(2024, 1, 9), athlete_id=9),
+            ],
+        ]
+        records = [
+            record
+            for page in pages
+            for activity in page
+            if (record := ActivityRecord.from_activity(activity)) is not None
+        ]
+        expected = list(generate_features(records, workers=0))
+
+        for workers in (0, 2):
+            rows = [
+                row
+                async for row in repository_features(
+                    _paged_repository(pages), workers=workers
+                )
+            ]
+
+            self.assertEqual(
+                [(r.athlete_id, r.start) for r in rows],
+                [(r.athlete_id, r.start) for r in expected],
+            )
+            self.assertEqual(rows[-1].features["run_count"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.routers.frontend import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    AssetCatalog,
+    register_spa_routes,
+)
+
+INDEX_HTML = b"<!doctype html><html><body>" + b"<div></div>" * 100 + b"</body></html>"
+APP_JS = b"console.log('corgi');\n" * 200
+
+
+@pytest.fixture
+def dist(tmp_path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (tmp_path / "index.html").write_bytes(INDEX_HTML)
+    (tmp_path / "favicon.ico").write_bytes(b"\x00\x01")
+    (assets / "index-BxYz12_a.js").write_bytes(APP_JS)
+    (assets / "index-BxYz12_a.js.gz").write_bytes(gzip.compress(APP_JS))
+    (assets / "index-BxYz12_a.js.br").write_bytes(b"fake-brotli")
+    return tmp_path
+
+
+@pytest.fixture
+def client(dist):
+    app = FastAPI()
+    register_spa_routes(app, dist)
+    return TestClient(app)
+
+
+def test_catalog_indexes_files_but_not_compressed_siblings(dist):
+    catalog = AssetCatalog(dist)
+
+    assert len(catalog) == 3
+    assert catalog.get("assets/index-BxYz12_a.js.gz") is None
+
+
+def test_hashed_asset_is_immutable(client):
+    response = client.get(
+        "/assets/index-BxYz12_a.js", headers={"Accept-Encoding": "identity"}
+    )
+
+    assert response.status_code == 200
+    assert response.content == APP_JS
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"].startswith('"')
+    assert "content-encoding" not in response.headers
+
+
+def test_prefers_brotli_then_gzip(client):
+    br = client.get(
+        "/assets/index-BxYz12_a.js", headers={"Accept-Encoding": "gzip, br"}
+    )
+    gz = client.get("/assets/index-BxYz12_a.js", headers={"Accept-Encoding": "gzip"})
+
+    assert br.headers["content-encoding"] == "br"
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.content == APP_JS
+    assert br.headers["vary"] == "Accept-Encoding"
+    assert br.headers["etag"] != gz.headers["etag"]
+
+
+def test_rejected_encoding_is_not_used(client):
+    response = client.get(
+        "/assets/index-BxYz12_a.js", headers={"Accept-Encoding": "br;q=0, gzip"}
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_if_none_match_returns_304(client):
+    first = client.get("/assets/index-BxYz12_a.js")
+
+    second = client.get(
+        "/assets/index-BxYz12_a.js", headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_index_is_compressed_in_memory_and_revalidated(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert response.content == INDEX_HTML
+
+
+def test_client_routes_fall_back_to_index(client):
+    response = client.get("/activities/42")
+
+    assert response.status_code == 200
+    assert response.content == INDEX_HTML
+
+
+def test_missing_asset_is_404(client):
+    assert client.get("/assets/missing-12345678.js").status_code == 404
+
+
+def test_large_files_stay_on_disk(dist):
+    catalog = AssetCatalog(dist, in_memory_max_bytes=16)
+    variant = catalog.get("assets/index-BxYz12_a.js").variants["gzip"]
+
+    assert variant.body is None
+    assert variant.path == dist / "assets" / "index-BxYz12_a.js.gz"
+
+
+def test_head_request(client):
+    response = client.head("/favicon.ico")
+
+    assert response.status_code == 200
+    assert response.headers["content-length"] == "2"
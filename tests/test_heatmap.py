@@ -0,0 +1,191 @@
+import struct
+import unittest
+import zlib
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from botocore.exceptions import ClientError
+from stravalib.model import SummaryActivity
+
+from src.analytics.heatmap import (
+    MAX_ZOOM,
+    MIN_ZOOM,
+    TILE_SIZE,
+    add_tiles,
+    build_heatmap,
+    from_blob,
+    merge_tile_blob,
+    project,
+    render_tile,
+    route_tiles,
+    shards_for,
+    to_blob,
+)
+from src.analytics.route_geometry import encode_polyline
+from src.database.dynamo_service import DynamoService
+from src.strava.strava_client import AthleteSnapshot, StravaService
+
+
+def _route(seed: int, lat: float = 51.5, lng: float = -0.1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 3e-4, (400, 2))
+    return np.column_stack([lat, lng]) + np.cumsum(steps, axis=0)
+
+
+def _png_pixels(png: bytes) -> np.ndarray:
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    offset, idat = 8, b""
+    while offset < len(png):
+        (length,) = struct.unpack(">I", png[offset : offset + 4])
+        kind = png[offset + 4 : offset + 8]
+        data = png[offset + 8 : offset + 8 + length]
+        if kind == b"IHDR":
+            width, height = struct.unpack(">II", data[:8])
+        elif kind == b"IDAT":
+            idat += data
+        offset += 12 + length
+    rows = np.frombuffer(zlib.decompress(idat), np.uint8).reshape(height, -1)
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+class TestTiles(unittest.TestCase):
+    def test_route_counts_once_per_pixel_at_every_zoom(self) -> None:
+        # Doubling back over the same street still counts one pass.
+        out = np.column_stack([np.full(50, 51.5), np.linspace(-0.1, -0.09, 50)])
+        route = np.concatenate([out, out[::-1]])
+
+        tiles = route_tiles(route)
+
+        self.assertEqual({z for z, _, _ in tiles}, set(range(MIN_ZOOM, MAX_ZOOM + 1)))
+        self.assertTrue(all(grid.max() == 1 for grid in tiles.values()))
+        # ~700 m east at zoom 16 (~1.5 m/px here) crosses several tiles.
+        deepest = [grid for (z, _, _), grid in tiles.items() if z == MAX_ZOOM]
+        self.assertGreater(len(deepest), 1)
+        position = project(route[:1], MAX_ZOOM)[0]
+        pixel = position % TILE_SIZE
+        tile_x, tile_y = position // TILE_SIZE
+        key = (MAX_ZOOM, int(tile_x), int(tile_y))
+        self.assertEqual(tiles[key][int(pixel[1]), int(pixel[0])], 1)
+
+    def test_gaps_are_not_drawn(self) -> None:
+        jump = np.array([[51.5, -0.1], [51.5, -0.1001], [52.5, 1.0], [52.5, 1.0001]])
+
+        tiles = route_tiles(jump)
+
+        self.assertEqual(sum(1 for z, _, _ in tiles if z == MAX_ZOOM), 2)
+
+    def test_sharded_build_matches_per_route_tiles(self) -> None:
+        # The second route straddles the boundary of two zoom-8 tiles.
+        routes = [_route(1), _route(2), _route(3, lat=51.5, lng=0.0)]
+        expected: dict = {}
+        for route in routes:
+            add_tiles(expected, route_tiles(route))
+
+        inline = dict(build_heatmap(routes, workers=0))
+        pooled = dict(build_heatmap(routes, workers=2))
+
+        self.assertGreater(len(shards_for(routes[2])), 1)
+        self.assertEqual(sorted(inline), sorted(expected))
+        for key, grid in expected.items():
+            np.testing.assert_array_equal(inline[key], grid)
+            np.testing.assert_array_equal(pooled[key], grid)
+
+    def test_blobs_add_and_saturate(self) -> None:
+        grid = np.zeros((TILE_SIZE, TILE_SIZE), np.uint16)
+        grid[3, 4] = 65535
+        grid[5, 6] = 2
+
+        merged = from_blob(merge_tile_blob(to_blob(grid), to_blob(grid)))
+
+        self.assertLess(len(to_blob(grid)), 1024)
+        self.assertEqual(merged[3, 4], 65535)
+        self.assertEqual(merged[5, 6], 4)
+        self.assertEqual(merge_tile_blob(None, to_blob(grid)), to_blob(grid))
+
+    def test_renders_transparent_background_png(self) -> None:
+        grid = np.zeros((TILE_SIZE, TILE_SIZE), np.uint16)
+        grid[10, 20] = 1
+        grid[10, 21] = 1000
+
+        pixels = _png_pixels(render_tile(grid))
+
+        self.assertEqual(pixels.shape, (TILE_SIZE, TILE_SIZE, 4))
+        self.assertEqual(pixels[0, 0, 3], 0)
+        self.assertGreater(pixels[10, 20, 3], 0)
+        self.assertEqual(tuple(pixels[10, 21]), (255, 255, 255, 255))
+        self.assertEqual(_png_pixels(render_tile(None))[..., 3].max(), 0)
+
+
+class TestStorage(unittest.IsolatedAsyncioTestCase):
+    async def test_dynamo_adds_each_activity_once(self) -> None:
+        conflict = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+        )
+        grid = np.zeros((TILE_SIZE, TILE_SIZE), np.uint16)
+        grid[0, 0] = 1
+        blob = to_blob(grid)
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {"Item": {"density": blob, "revision": 3}},
+            {"Item": {"density": blob, "revision": 4}},
+        ]
+        table.put_item.side_effect = [None, conflict, None]
+        service = DynamoService(MagicMock(), heatmap_table=table)
+
+        added = await service.merge_heatmap_tiles(7, 11, {(16, 1, 2): blob})
+
+        self.assertTrue(added)
+        puts = [call.kwargs["Item"] for call in table.put_item.call_args_list]
+        self.assertEqual(
+            [item["tile_key"] for item in puts],
+            ["activity#11", "tile#16/1/2", "tile#16/1/2"],
+        )
+        self.assertEqual(puts[-1]["revision"], 5)
+        self.assertEqual(from_blob(puts[-1]["density"])[0, 0], 2)
+
+        table.put_item.side_effect = conflict
+        self.assertFalse(await service.merge_heatmap_tiles(7, 11, {(16, 1, 2): blob}))
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+    async def test_new_run_adds_only_its_tiles(self) -> None:
+        repository = MagicMock()
+        repository.merge_heatmap_tiles = AsyncMock(return_value=True)
+        service = StravaService(repository)
+        route = _route(4)
+        run = SummaryActivity.model_validate(
+            {
+                "id": 11,
+                "athlete": {"id": 7},
+                "sport_type": "Run",
+                "start_date": datetime(2024, 5, 4, tzinfo=timezone.utc).isoformat(),
+                "map": {"summary_polyline": encode_polyline(route)},
+            }
+        )
+
+        await service._add_to_heatmap(run)
+
+        athlete_id, activity_id, tiles = repository.merge_heatmap_tiles.await_args.args
+        self.assertEqual((athlete_id, activity_id), (7, 11))
+        self.assertEqual(set(tiles), set(route_tiles(np.round(route, 5))))
+
+    async def test_tiles_outside_the_map_are_missing(self) -> None:
+        repository = MagicMock()
+        repository.get_heatmap_tile = AsyncMock(return_value=None)
+        service = StravaService(repository)
+        snapshot = AthleteSnapshot(b"{}", "", MagicMock(), 0.0, 7)
+
+        with patch.object(
+            service, "get_athlete_snapshot", AsyncMock(return_value=snapshot)
+        ):
+            with self.assertRaises(LookupError):
+                await service.read_heatmap_tile("heatmap_session", 8, 256, 0)
+            png = await service.read_heatmap_tile("heatmap_session", 8, 127, 85)
+
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        repository.get_heatmap_tile.assert_awaited_once_with(7, 8, 127, 85)
+
+
+if __name__ == "__main__":
+    unittest.main()
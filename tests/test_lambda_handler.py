@@ -15,9 +15,116 @@ class TestLambdaHandler:
         """The handler must wrap the FastAPI app with Mangum."""
         from mangum import Mangum
 
-        from src.lambda_handler import handler
+        from src.lambda_handler import get_asgi_handler
+        from src.main import app
 
-        assert isinstance(handler, Mangum)
+        asgi_handler = get_asgi_handler()
+        assert isinstance(asgi_handler, Mangum)
+        assert asgi_handler.app is app
+
+    def test_asgi_handler_is_reused(self):
+        from src.lambda_handler import get_asgi_handler
+
+        assert get_asgi_handler() is get_asgi_handler()
+
+    def test_warmup_event_bypasses_asgi(self):
+        from src import lambda_handler
+
+        mock_asgi = MagicMock()
+        with patch.object(lambda_handler, "_asgi_handler", mock_asgi):
+            result = lambda_handler.handler({"warmup": True}, None)
+
+        assert result == {"warmup": True}
+        mock_asgi.assert_not_called()
+
+    def test_http_event_goes_through_asgi(self):
+        from src import lambda_handler
+
+        mock_asgi = MagicMock(return_value={"statusCode": 200})
+        event = {"requestContext": {"http": {"method": "GET"}}}
+        with patch.object(lambda_handler, "_asgi_handler", mock_asgi):
+            result = lambda_handler.handler(event, "ctx")
+
+        assert result == {"statusCode": 200}
+        mock_asgi.assert_called_once_with(event, "ctx")
+
+    def test_is_warmup_event(self):
+        from src.lambda_handler import is_warmup_event
+
+        assert is_warmup_event({"warmup": True})
+        assert is_warmup_event({"source": "serverless-plugin-warmup"})
+        assert not is_warmup_event({"source": "aws.events"})
+        assert not is_warmup_event({"version": "2.0", "rawPath": "/"})
+        assert not is_warmup_event(None)
+
+
+# Cold-start budgets, measured in a fresh interpreter. Generous enough for a
+# noisy CI runner; a regression that re-introduces eager app construction or
+# Secrets Manager calls at import blows well past them.
+HANDLER_IMPORT_BUDGET_SECONDS = 0.25
+AWS_APP_INIT_BUDGET_SECONDS = 4.0
+
+_COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import src.lambda_handler as handler_module
+import_seconds = time.perf_counter() - start
+imported_on_load = sorted(m for m in {heavy} if m in sys.modules)
+start = time.perf_counter()
+{init}
+init_seconds = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": import_seconds,
+    "init_seconds": init_seconds,
+    "imported_on_load": imported_on_load,
+    "imported_after_init": sorted(m for m in {heavy} if m in sys.modules),
+}}))
+"""
+
+_HEAVY_MODULES = ("sqlalchemy", "fastapi_users", "stravalib", "boto3", "fastapi")
+
+
+def _measure_cold_start(init: str, extra_env: dict[str, str]) -> dict:
+    import json
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    env = os.environ.copy()
+    env.update(extra_env)
+    script = _COLD_START_SCRIPT.format(heavy=repr(set(_HEAVY_MODULES)), init=init)
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=Path(__file__).resolve().parent.parent,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestColdStartBudget:
+    def test_handler_import_is_cheap(self):
+        """Importing the handler must not build settings, the app or clients.
+
+        AWS_LAMBDA_FUNCTION_NAME is set so that any eager Settings() would try
+        to reach Secrets Manager.
+        """
+        measured = _measure_cold_start(
+            "pass", {"AWS_LAMBDA_FUNCTION_NAME": "budget-test"}
+        )
+        assert measured["imported_on_load"] == []
+        assert measured["import_seconds"] < HANDLER_IMPORT_BUDGET_SECONDS
+
+    def test_aws_mode_init_skips_standalone_dependencies(self):
+        measured = _measure_cold_start(
+            "handler_module.get_asgi_handler()",
+            {"DB_BACKEND": "aws", "DYNAMODB_REGION": "us-east-2"},
+        )
+        assert "sqlalchemy" not in measured["imported_after_init"]
+        assert "fastapi_users" not in measured["imported_after_init"]
+        assert measured["init_seconds"] < AWS_APP_INIT_BUDGET_SECONDS
 
 
 class TestConfigIsLambda:
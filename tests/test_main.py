@@ -1,8 +1,11 @@
+from datetime import datetime, timezone
 from unittest.mock import patch, AsyncMock
 
 from fastapi.testclient import TestClient
 
+from src.database.activity_repository import SyncState
 from src.main import app
+from src.strava.strava_client import AthleteSnapshot
 
 client = TestClient(app)
 
@@ -53,7 +56,8 @@ def test_authorize():
 
 def test_athlete():
     mock_athlete = {"id": 123, "firstname": "Gonzalo"}
-    session_id = "test_session_id"
+    session_id = "test_athlete_session"
+    app.state.strava_service.tokens[session_id] = "token"
     with patch.object(
         app.state.strava_service,
         "get_athlete",
@@ -62,26 +66,417 @@ def test_athlete():
     ) as mock_get:
         client.cookies.set("session_id", session_id)
         response = client.get("/strava/athlete")
+        cached = client.get(
+            "/strava/athlete", headers={"If-None-Match": response.headers["etag"]}
+        )
         client.cookies.clear()
 
         assert response.status_code == 200
         assert response.json() == mock_athlete
+        assert cached.status_code == 304
+        # The second request is answered from the cached snapshot.
         mock_get.assert_called_once_with(session_id)
 
 
+def test_athlete_requires_known_session():
+    client.cookies.set("session_id", "unknown-session")
+    response = client.get("/strava/athlete")
+    client.cookies.clear()
+
+    assert response.status_code == 401
+
+
+def _sync_state(count: int = 2) -> SyncState:
+    return SyncState(
+        last_sync_date=datetime(2024, 1, 15, 8, 0, tzinfo=timezone.utc),
+        activity_count=count,
+        digest=42 + count,
+        updated_at=datetime(2024, 1, 16, 9, 30, tzinfo=timezone.utc),
+    )
+
+
+def _athlete_snapshot(athlete_id: int = 7) -> AthleteSnapshot:
+    return AthleteSnapshot(
+        b"{}", '"athlete"', datetime(2024, 1, 1, tzinfo=timezone.utc), 0.0, athlete_id
+    )
+
+
 def test_activities():
-    mock_activities = [{"id": 1, "name": "Morning Run"}, {"id": 2, "name": "Evening Walk"}]
+    mock_activities = [
+        {"id": 1, "name": "Morning Run"},
+        {"id": 2, "name": "Evening Walk"},
+    ]
     session_id = "test_session_id"
-    with patch.object(
-        app.state.strava_service,
-        "list_activities",
-        new_callable=AsyncMock,
-        return_value=mock_activities,
-    ) as mock_list:
+    service = app.state.strava_service
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ) as mock_sync,
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service,
+            "read_activities",
+            new_callable=AsyncMock,
+            return_value=mock_activities,
+        ),
+    ):
         client.cookies.set("session_id", session_id)
         response = client.get("/strava/activities")
         client.cookies.clear()
 
         assert response.status_code == 200
         assert response.json() == mock_activities
-        mock_list.assert_called_once_with(session_id)
+        assert response.headers["etag"]
+        assert response.headers["last-modified"] == "Tue, 16 Jan 2024 09:30:00 GMT"
+        mock_sync.assert_called_once_with(session_id)
+
+
+def test_activities_not_modified_skips_read():
+    service = app.state.strava_service
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service, "read_activities", new_callable=AsyncMock, return_value=[]
+        ) as mock_read,
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        first = client.get("/strava/activities")
+        by_etag = client.get(
+            "/strava/activities", headers={"If-None-Match": first.headers["etag"]}
+        )
+        by_date = client.get(
+            "/strava/activities",
+            headers={"If-Modified-Since": first.headers["last-modified"]},
+        )
+        client.cookies.clear()
+
+        assert by_etag.status_code == 304
+        assert by_date.status_code == 304
+        mock_read.assert_awaited_once()
+
+
+def test_activities_changed_state_returns_body():
+    service = app.state.strava_service
+    with (
+        patch.object(
+            service,
+            "sync_session",
+            new_callable=AsyncMock,
+            side_effect=[_sync_state(2), _sync_state(3)],
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service, "read_activities", new_callable=AsyncMock, return_value=[]
+        ) as mock_read,
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        first = client.get("/strava/activities")
+        second = client.get(
+            "/strava/activities", headers={"If-None-Match": first.headers["etag"]}
+        )
+        client.cookies.clear()
+
+        assert second.status_code == 200
+        assert second.headers["etag"] != first.headers["etag"]
+        assert mock_read.await_count == 2
+
+
+def test_stats_returns_rollup_buckets():
+    from datetime import date
+
+    from src.database.records import Rollup
+
+    service = app.state.strava_service
+    rollups = [
+        Rollup(7, "month", date(2024, 1, 1), activity_count=3, distance_m=15000.0)
+    ]
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service, "read_rollups", new_callable=AsyncMock, return_value=rollups
+        ) as mock_read,
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.get("/strava/stats?period=month&start=2024-01-01")
+        cached = client.get(
+            "/strava/stats?period=month&start=2024-01-01",
+            headers={"If-None-Match": response.headers["etag"]},
+        )
+        invalid = client.get("/strava/stats?period=day")
+        client.cookies.clear()
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["period"] == "month"
+        assert body["buckets"][0]["bucket_start"] == "2024-01-01"
+        assert body["buckets"][0]["distance_m"] == 15000.0
+        assert cached.status_code == 304
+        assert invalid.status_code == 422
+        mock_read.assert_awaited_once_with(7, "month", date(2024, 1, 1), None)
+
+
+def test_stats_requires_session():
+    assert client.get("/strava/stats").status_code == 401
+    assert (
+        client.post("/strava/stats/rebuild?start=2024-01-01&end=2024-12-31").status_code
+        == 401
+    )
+
+
+def test_training_load_returns_daily_curves():
+    from datetime import date
+
+    import numpy as np
+
+    from src.analytics.training_load import TrainingLoad
+
+    service = app.state.strava_service
+    series = TrainingLoad(
+        date(2024, 1, 1), np.array([60.0, 0.0, 30.0]), np.empty(0), np.empty(0)
+    )
+    series._recompute(0)
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service, "read_training_load", new_callable=AsyncMock, return_value=series
+        ) as mock_read,
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.get("/strava/training-load?start=2024-01-02")
+        cached = client.get(
+            "/strava/training-load?start=2024-01-02",
+            headers={"If-None-Match": response.headers["etag"]},
+        )
+        client.cookies.clear()
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["athlete_id"] == 7
+        assert body["start"] == "2024-01-02"
+        assert body["load"] == [0.0, 30.0]
+        assert len(body["ctl"]) == len(body["tsb"]) == 2
+        assert cached.status_code == 304
+        mock_read.assert_awaited_once()
+
+
+def test_training_load_requires_session():
+    assert client.get("/strava/training-load").status_code == 401
+
+
+def test_race_predictions_for_session_athlete():
+    from src.analytics.race_prediction import RacePrediction
+
+    service = app.state.strava_service
+    predictions = [RacePrediction("5k", 5000.0, 1200.0, 1201.5)]
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service,
+            "read_race_predictions",
+            new_callable=AsyncMock,
+            return_value=predictions,
+        ),
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.get("/strava/race-predictions")
+        client.cookies.clear()
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["athlete_id"] == 7
+        assert body["predictions"][0]["distance"] == "5k"
+        assert body["predictions"][0]["riegel_s"] == 1200.0
+        assert body["predictions"][0]["model_s"] is None
+    assert client.get("/strava/race-predictions").status_code == 401
+
+
+def test_personal_records_not_modified_skips_read():
+    service = app.state.strava_service
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service, "read_personal_records", new_callable=AsyncMock, return_value=[]
+        ) as mock_read,
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        first = client.get("/strava/personal-records")
+        cached = client.get(
+            "/strava/personal-records",
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+        client.cookies.clear()
+
+        assert first.json() == {"athlete_id": 7, "records": []}
+        assert cached.status_code == 304
+        mock_read.assert_awaited_once_with(7)
+
+
+def test_activity_analysis_maps_missing_activity_to_404():
+    service = app.state.strava_service
+    analysis = AsyncMock(
+        side_effect=[{"activity_id": 11, "splits": []}, LookupError("not found")]
+    )
+    with patch.object(service, "analyse_activity", analysis):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.get("/strava/activities/11/analysis?max_heartrate=185")
+        missing = client.get("/strava/activities/12/analysis")
+        client.cookies.clear()
+
+    assert response.status_code == 200
+    assert response.json()["activity_id"] == 11
+    analysis.assert_any_await("test_session_id", 11, 185)
+    assert missing.status_code == 404
+    assert client.get("/strava/activities/11/analysis").status_code == 401
+
+
+def test_activities_detail_simplifies_routes_under_its_own_etag():
+    service = app.state.strava_service
+    with (
+        patch.object(
+            service, "sync_session", new_callable=AsyncMock, return_value=_sync_state()
+        ),
+        patch.object(
+            service,
+            "get_athlete_snapshot",
+            new_callable=AsyncMock,
+            return_value=_athlete_snapshot(),
+        ),
+        patch.object(
+            service, "read_activities", new_callable=AsyncMock, return_value=[]
+        ),
+        patch.object(service, "simplify_routes", return_value=[]) as mock_simplify,
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        full = client.get("/strava/activities")
+        low = client.get("/strava/activities?detail=low")
+        invalid = client.get("/strava/activities?detail=tiny")
+        client.cookies.clear()
+
+    assert low.status_code == 200
+    assert low.headers["etag"] != full.headers["etag"]
+    mock_simplify.assert_called_once_with([], "low")
+    assert invalid.status_code == 422
+
+
+def test_route_thumbnail_is_svg():
+    service = app.state.strava_service
+    thumbnail = AsyncMock(side_effect=["<svg/>", LookupError("no route")])
+    with patch.object(service, "read_route_thumbnail", thumbnail):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.get("/strava/activities/11/thumbnail.svg?detail=medium")
+        missing = client.get("/strava/activities/12/thumbnail.svg")
+        client.cookies.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert response.text == "<svg/>"
+    thumbnail.assert_any_await("test_session_id", 11, "medium")
+    assert missing.status_code == 404
+
+
+def test_heatmap_tiles_are_png_within_zoom_range():
+    service = app.state.strava_service
+    tile = AsyncMock(return_value=b"\x89PNG")
+    with patch.object(service, "read_heatmap_tile", tile):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.get("/strava/heatmap/12/2046/1362.png")
+        too_far = client.get("/strava/heatmap/17/0/0.png")
+        client.cookies.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    tile.assert_awaited_once_with("test_session_id", 12, 2046, 1362)
+    assert too_far.status_code == 422
+    assert client.get("/strava/heatmap/12/2046/1362.png").status_code == 401
+
+
+def test_heatmap_rebuild_reports_tiles():
+    service = app.state.strava_service
+    with patch.object(
+        service, "rebuild_heatmap", new_callable=AsyncMock, return_value=42
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        response = client.post("/strava/heatmap/rebuild")
+        client.cookies.clear()
+
+    assert response.json() == {"tiles": 42}
+
+
+def test_routes_near_and_similar():
+    from src.analytics.spatial import RouteMatch, RouteRecord
+
+    service = app.state.strava_service
+    route = RouteRecord(7, 12, None, 5000.0, 51.5, -0.1, 51.5, -0.1, "_p~iF~ps|U")
+    near = AsyncMock(return_value=(7, []))
+    similar = AsyncMock(
+        side_effect=[(7, [RouteMatch(route, 12.5)]), LookupError("no route")]
+    )
+    with (
+        patch.object(service, "read_routes_near", near),
+        patch.object(service, "read_similar_routes", similar),
+    ):
+        client.cookies.set("session_id", "test_session_id")
+        nearby = client.get("/strava/routes/near?lat=51.5&lng=-0.1&field=end")
+        matched = client.get("/strava/activities/11/similar")
+        missing = client.get("/strava/activities/13/similar")
+        out_of_range = client.get("/strava/routes/near?lat=91&lng=0")
+        client.cookies.clear()
+
+    assert nearby.json() == {"athlete_id": 7, "routes": []}
+    near.assert_awaited_once_with("test_session_id", 51.5, -0.1, 500.0, "end")
+    body = matched.json()
+    assert body["count"] == 1
+    assert body["matches"][0]["route"]["activity_id"] == 12
+    assert body["matches"][0]["frechet_m"] == 12.5
+    assert missing.status_code == 404
+    assert out_of_range.status_code == 422
@@ -0,0 +1,149 @@
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from botocore.exceptions import ClientError
+from stravalib.model import SummaryActivity
+
+from src.analytics.mean_max import DURATION_GRID, MeanMaxCurve, merge_blob
+from src.config import settings
+from src.database.dynamo_service import DynamoService
+from src.strava.strava_client import StravaService
+from tests.factories import make_activity
+
+
+def _brute_force(values_per_second: np.ndarray, duration: int) -> float:
+    return max(
+        values_per_second[start : start + duration].mean()
+        for start in range(len(values_per_second) - duration + 1)
+    )
+
+
+class TestCurves(unittest.TestCase):
+    def test_matches_brute_force_window_means(self) -> None:
+        rng = np.random.default_rng(4)
+        speed = rng.uniform(2.0, 5.0, 900)
+        heartrate = rng.uniform(120, 180, 901)
+        distance = np.concatenate([[0.0], np.cumsum(speed)])
+        time = np.arange(901.0)
+
+        curve = MeanMaxCurve.from_streams(
+            time.tolist(), distance.tolist(), heartrate.tolist()
+        )
+
+        for index, duration in enumerate(DURATION_GRID):
+            if duration > 900:
+                self.assertTrue(np.isnan(curve.speed[index]))
+                continue
+            self.assertAlmostEqual(curve.speed[index], _brute_force(speed, duration))
+            self.assertAlmostEqual(
+                curve.heartrate[index], _brute_force(heartrate, duration)
+            )
+
+    def test_grid_spans_five_seconds_to_three_hours(self) -> None:
+        self.assertEqual((DURATION_GRID[0], DURATION_GRID[-1]), (5, 10800))
+        self.assertTrue(np.all(np.diff(DURATION_GRID) > 0))
+
+    def test_blobs_merge_element_wise(self) -> None:
+        short = MeanMaxCurve.from_streams([0, 60], [0, 300])
+        long = MeanMaxCurve.from_streams([0, 3600], [0, 7200], [150, 150])
+
+        merged = MeanMaxCurve.from_bytes(merge_blob(short.to_bytes(), long))
+
+        self.assertEqual(len(short.to_bytes()), 2 * 4 * len(DURATION_GRID))
+        self.assertAlmostEqual(merged.speed[0], 5.0, places=5)
+        hour = int(np.searchsorted(DURATION_GRID, 3600)) - 1
+        self.assertAlmostEqual(merged.speed[hour], 2.0, places=5)
+        self.assertTrue(np.isnan(merged.speed[-1]))
+        self.assertAlmostEqual(merged.heartrate[0], 150.0, places=4)
+        body = merged.as_dict()
+        self.assertEqual(body["pace_s_per_km"][0], 200.0)
+        self.assertIsNone(body["pace_s_per_km"][-1])
+
+
+class TestStorage(unittest.IsolatedAsyncioTestCase):
+    async def test_dynamo_merges_once_and_retries_conflicts(self) -> None:
+        conflict = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+        )
+        table = MagicMock()
+        stored = MeanMaxCurve.from_streams([0, 60], [0, 120])
+        table.get_item.side_effect = [
+            {},
+            {"Item": {"curve": stored.to_bytes(), "activity_count": 1}},
+            {"Item": {"curve": stored.to_bytes(), "activity_count": 1}},
+        ]
+        table.put_item.side_effect = [None, None, conflict, None]
+        service = DynamoService(MagicMock(), curves_table=table)
+        curve = MeanMaxCurve.from_streams([0, 60], [0, 300])
+
+        merged = await service.merge_mean_max_curve(7, 11, ["all", "2024"], curve)
+
+        self.assertTrue(merged)
+        puts = [call.kwargs["Item"] for call in table.put_item.call_args_list]
+        self.assertEqual(
+            [item["curve_key"] for item in puts],
+            ["activity#11", "season#all", "season#2024", "season#2024"],
+        )
+        self.assertEqual(puts[-1]["activity_count"], 2)
+        self.assertAlmostEqual(
+            MeanMaxCurve.from_bytes(puts[-1]["curve"]).speed[0], 5.0, places=5
+        )
+
+        table.put_item.side_effect = conflict
+        self.assertFalse(
+            await service.merge_mean_max_curve(7, 11, ["all", "2024"], curve)
+        )
+
+    async def test_sync_merges_run_curves_into_seasons(self) -> None:
+        repository = MagicMock()
+        repository.update_personal_records = AsyncMock(return_value=[])
+        repository.merge_mean_max_curve = AsyncMock(return_value=True)
+        service = StravaService(repository)
+        client = MagicMock()
+        client.get_activity_streams.return_value = {
+            "distance": MagicMock(data=[0.0, 300.0, 600.0]),
+            "time": MagicMock(data=[0, 60, 120]),
+            "heartrate": MagicMock(data=[140, 150, 160]),
+        }
+        run = SummaryActivity.model_validate(
+            {
+                "id": 11,
+                "athlete": {"id": 7},
+                "sport_type": "Run",
+                "start_date": datetime(2024, 5, 4, tzinfo=timezone.utc).isoformat(),
+            }
+        )
+
+        await service._process_run_streams(client, run)
+
+        client.get_activity_streams.assert_called_once_with(
+            11, types=["distance", "time", "heartrate"]
+        )
+        athlete_id, activity_id, seasons, curve = (
+            repository.merge_mean_max_curve.await_args.args
+        )
+        self.assertEqual((athlete_id, activity_id, seasons), (7, 11, ["all", "2024"]))
+        self.assertAlmostEqual(curve.speed[0], 5.0)
+
+    async def test_sync_leaves_the_heartrate_fetch_to_the_budgeted_job(self) -> None:
+        repository = MagicMock()
+        repository.is_activity_synced.return_value = False
+        repository.insert_activity = AsyncMock(return_value=True)
+        service = StravaService(repository)
+        client = MagicMock()
+        client.get_activities.return_value = [make_activity(11, date(2024, 5, 4))]
+
+        with (
+            patch.object(settings, "best_efforts_enabled", False),
+            patch.object(settings, "mean_max_curves_enabled", True),
+        ):
+            _, _, new_runs = await service._sync_activities_after(client, None)
+
+        client.get_activity_streams.assert_not_called()
+        self.assertEqual(new_runs, [11])
+
+
+if __name__ == "__main__":
+    unittest.main()
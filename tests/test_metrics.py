@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.main import app as main_app
+from src.middleware import RequestMetricsMiddleware
+from src.observability.metrics import MetricsRegistry
+from src.observability.timing import DB, STRAVA, timed
+from src.routers.metrics import create_metrics_router
+
+
+def _client(registry: MetricsRegistry, server_timing: bool = False) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(
+        RequestMetricsMiddleware, registry=registry, server_timing=server_timing
+    )
+    app.include_router(create_metrics_router(registry))
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        with timed(DB):
+            await asyncio.sleep(0)
+        with timed(STRAVA):
+            await asyncio.to_thread(lambda: None)
+        return {"id": item_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield b"x" * 100
+
+        return StreamingResponse(chunks())
+
+    return TestClient(app)
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs run.", ("kind",))
+    histogram = registry.histogram("job_seconds", "Job time.", buckets=(0.1, 1.0))
+    counter.inc("sync")
+    counter.inc("sync")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    text = registry.render()
+
+    assert "# TYPE jobs_total counter\n" in text
+    assert 'jobs_total{kind="sync"} 2\n' in text
+    assert 'job_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'job_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "job_seconds_count 2\n" in text
+
+
+def test_registry_returns_existing_metric():
+    registry = MetricsRegistry()
+
+    assert registry.counter("a_total", "A.") is registry.counter("a_total", "A.")
+
+
+def test_requests_are_labelled_by_route_template():
+    registry = MetricsRegistry()
+    client = _client(registry)
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nope")
+
+    requests = registry.counter("http_requests_total", "", ())
+    assert requests.value("GET", "/items/{item_id}", "200") == 2
+    assert requests.value("GET", "unmatched", "404") == 1
+    latency = registry.histogram("http_request_duration_seconds", "")
+    assert latency.count("GET", "/items/{item_id}") == 2
+    assert registry.gauge("http_requests_in_flight", "").value("GET") == 0
+
+
+def test_streamed_response_size_is_recorded():
+    registry = MetricsRegistry()
+
+    response = _client(registry).get("/stream")
+
+    assert response.content == b"x" * 300
+    sizes = registry.histogram("http_response_size_bytes", "")
+    assert sizes.sum("GET", "/stream") == 300
+
+
+def test_server_timing_header_breaks_out_components():
+    registry = MetricsRegistry()
+
+    response = _client(registry, server_timing=True).get("/items/1")
+
+    timing = response.headers["server-timing"]
+    assert "db;dur=" in timing
+    assert "strava;dur=" in timing
+    assert "app;dur=" in timing
+
+
+def test_server_timing_is_off_by_default():
+    response = _client(MetricsRegistry()).get("/items/1")
+
+    assert "server-timing" not in response.headers
+
+
+def test_metrics_endpoint_is_not_exposed_by_default():
+    routes = {getattr(route, "path", None) for route in main_app.routes}
+
+    assert "/metrics" not in routes
@@ -0,0 +1,218 @@
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from typing import cast
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.database.migrations import (
+    HEAD_VERSION,
+    create_partitions,
+    maintain_partitions,
+    migrate,
+    partition_ranges,
+)
+
+
+class FakeConnection:
+    """Records executed SQL; answers the catalog queries migrations issue."""
+
+    def __init__(
+        self,
+        version: int,
+        relkind: str | None = None,
+        partitions: tuple[str, ...] = (),
+        default_rows: bool = False,
+    ) -> None:
+        self.version = version
+        self.relkind = relkind
+        self.partitions = partitions
+        self.default_rows = default_rows
+        self.statements: list[str] = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        result = MagicMock()
+        if "max(version)" in sql:
+            result.scalar.return_value = self.version
+        elif "relkind" in sql:
+            result.scalar.return_value = self.relkind
+        elif "pg_inherits" in sql:
+            result.__iter__.return_value = iter([(p,) for p in self.partitions])
+        elif "SELECT EXISTS" in sql:
+            result.scalar.return_value = self.default_rows
+        return result
+
+    async def run_sync(self, fn):
+        self.statements.append("run_sync")
+
+    async def rollback(self) -> None:
+        pass
+
+
+class FakeEngine:
+    def __init__(self, conn: FakeConnection) -> None:
+        self.conn = conn
+
+    def _context(self):
+        context = MagicMock()
+
+        async def enter(*_):
+            return self.conn
+
+        async def exit_(*_):
+            return None
+
+        context.__aenter__ = enter
+        context.__aexit__ = exit_
+        return context
+
+    def connect(self):
+        return self._context()
+
+    def begin(self):
+        return self._context()
+
+
+def fake_engine(conn: FakeConnection) -> AsyncEngine:
+    return cast(AsyncEngine, FakeEngine(conn))
+
+
+def fake_connection(conn: FakeConnection) -> AsyncConnection:
+    return cast(AsyncConnection, conn)
+
+
+class TestPartitionRanges(unittest.TestCase):
+    def test_yearly(self) -> None:
+        ranges = partition_ranges(
+            "year",
+            datetime(2023, 6, 1, tzinfo=timezone.utc),
+            datetime(2024, 2, 1, tzinfo=timezone.utc),
+        )
+
+        self.assertEqual(
+            [r[0] for r in ranges], ["activities_y2023", "activities_y2024"]
+        )
+        self.assertEqual(ranges[1][2], datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+    def test_monthly_crosses_year_boundary(self) -> None:
+        ranges = partition_ranges(
+            "month",
+            datetime(2023, 12, 15, tzinfo=timezone.utc),
+            datetime(2024, 1, 2, tzinfo=timezone.utc),
+        )
+
+        self.assertEqual(
+            [(r[0], r[2]) for r in ranges],
+            [
+                ("activities_m2023_12", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+                ("activities_m2024_01", datetime(2024, 2, 1, tzinfo=timezone.utc)),
+            ],
+        )
+
+    def test_unknown_interval(self) -> None:
+        now = datetime.now(timezone.utc)
+        with self.assertRaises(ValueError):
+            partition_ranges("week", now, now)
+
+
+class TestMigrate(unittest.IsolatedAsyncioTestCase):
+    async def test_at_head_only_checks_version_and_partitions(self) -> None:
+        conn = FakeConnection(version=HEAD_VERSION)
+
+        applied = await migrate(fake_engine(conn), "year", partitions_ahead=1)
+
+        self.assertEqual(applied, 0)
+        self.assertFalse(any("advisory" in sql for sql in conn.statements))
+        created = [sql for sql in conn.statements if "PARTITION OF" in sql]
+        self.assertEqual(len(created), 2)
+
+    async def test_fresh_database_creates_partitioned_table(self) -> None:
+        conn = FakeConnection(version=0)
+
+        applied = await migrate(fake_engine(conn), "month", partitions_ahead=0)
+
+        self.assertEqual(applied, HEAD_VERSION)
+        self.assertTrue(any("pg_advisory_xact_lock" in s for s in conn.statements))
+        self.assertTrue(
+            any("PARTITION BY RANGE (create_date)" in s for s in conn.statements)
+        )
+        self.assertTrue(
+            any("activities_athlete_create_date_idx" in s for s in conn.statements)
+        )
+        self.assertFalse(any("activities_legacy" in s for s in conn.statements))
+
+    async def test_existing_table_is_renamed_and_copied(self) -> None:
+        conn = FakeConnection(version=1, relkind="r")
+        original_execute = conn.execute
+
+        async def execute(statement, params=None):
+            result = await original_execute(statement, params)
+            if "min(create_date)" in str(statement):
+                result.one.return_value = (None, None)
+            return result
+
+        with patch.object(conn, "execute", execute):
+            await migrate(fake_engine(conn), "year", partitions_ahead=0)
+
+        self.assertIn(
+            "ALTER TABLE running_corgium.activities RENAME TO activities_legacy",
+            conn.statements,
+        )
+        copy = next(s for s in conn.statements if "ON CONFLICT DO NOTHING" in s)
+        self.assertIn("#>> '{athlete,id}'", copy)
+        self.assertNotIn("run_sync", conn.statements)
+
+
+class TestPartitionMaintenance(unittest.IsolatedAsyncioTestCase):
+    async def test_rows_in_the_default_partition_are_moved(self) -> None:
+        conn = FakeConnection(
+            HEAD_VERSION, partitions=("activities_default",), default_rows=True
+        )
+        month = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+        created = await create_partitions(fake_connection(conn), "month", month, month)
+
+        self.assertEqual(created, ["activities_m2024_03"])
+        steps = [
+            sql.split(" ")[0] + (" DEFAULT" if sql.endswith("DEFAULT") else "")
+            for sql in conn.statements
+            if not sql.startswith(("SELECT c.relname", "SELECT EXISTS"))
+        ]
+        self.assertEqual(
+            steps, ["ALTER", "CREATE", "INSERT", "DELETE", "ALTER DEFAULT"]
+        )
+        self.assertIn("DETACH PARTITION", conn.statements[2])
+
+    async def test_empty_default_partition_is_left_attached(self) -> None:
+        conn = FakeConnection(HEAD_VERSION, partitions=("activities_default",))
+        month = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+        await create_partitions(fake_connection(conn), "month", month, month)
+
+        self.assertFalse(any("DETACH" in sql for sql in conn.statements))
+
+    async def test_partitions_are_rechecked_on_a_schedule(self) -> None:
+        conn = FakeConnection(HEAD_VERSION)
+        sleeps = 0
+
+        async def sleep(_seconds: float) -> None:
+            nonlocal sleeps
+            sleeps += 1
+            if sleeps > 2:
+                raise asyncio.CancelledError
+
+        with (
+            patch("src.database.migrations.asyncio.sleep", sleep),
+            self.assertRaises(asyncio.CancelledError),
+        ):
+            await maintain_partitions(fake_engine(conn), "year", 0, 60)
+
+        created = [sql for sql in conn.statements if "PARTITION OF" in sql]
+        self.assertEqual(len(created), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
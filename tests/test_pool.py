@@ -0,0 +1,83 @@
+import unittest
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import NullPool
+
+from src.config import Settings
+from src.database.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    PoolMetrics,
+    engine_options,
+    instrument_pool,
+)
+from src.observability.metrics import MetricsRegistry
+
+
+class TestEngineOptions(unittest.TestCase):
+    def test_pool_settings_applied(self) -> None:
+        options = engine_options(
+            Settings(db_pool_size=8, db_max_overflow=2, db_statement_timeout_ms=5000)
+        )
+
+        self.assertIs(options["poolclass"], InstrumentedAsyncQueuePool)
+        self.assertEqual(options["pool_size"], 8)
+        self.assertEqual(options["max_overflow"], 2)
+        self.assertEqual(
+            options["connect_args"]["server_settings"], {"statement_timeout": "5000"}
+        )
+        self.assertEqual(options["connect_args"]["statement_cache_size"], 100)
+
+    def test_pgbouncer_mode_disables_pooling_and_statement_caches(self) -> None:
+        options = engine_options(
+            Settings(db_pgbouncer_mode=True, db_statement_timeout_ms=2500)
+        )
+        connect_args = options["connect_args"]
+
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertNotIn("pool_size", options)
+        self.assertEqual(connect_args["statement_cache_size"], 0)
+        self.assertEqual(connect_args["prepared_statement_cache_size"], 0)
+        self.assertNotEqual(
+            connect_args["prepared_statement_name_func"](),
+            connect_args["prepared_statement_name_func"](),
+        )
+        self.assertNotIn("server_settings", connect_args)
+        self.assertEqual(connect_args["command_timeout"], 2.5)
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics = PoolMetrics(MetricsRegistry())
+        pool_class = type(
+            "TestPool", (InstrumentedQueuePool,), {"metrics": self.metrics}
+        )
+        self.engine = create_engine(
+            "sqlite://",
+            poolclass=pool_class,
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.01,
+        )
+        instrument_pool(self.engine, self.metrics)
+        instrument_pool(self.engine, self.metrics)
+
+    def test_checked_out_overflow_and_timeouts(self) -> None:
+        first = self.engine.connect()
+        second = self.engine.connect()
+
+        self.assertEqual(self.metrics.checked_out.value(), 2)
+        self.assertEqual(self.metrics.overflow_events.value(), 1)
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+        self.assertEqual(self.metrics.timeouts.value(), 1)
+
+        first.close()
+        second.close()
+
+        self.assertEqual(self.metrics.checked_out.value(), 0)
+        self.assertEqual(self.metrics.wait.count(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
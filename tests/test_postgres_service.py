@@ -1,8 +1,12 @@
 import unittest
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 from datetime import datetime, timezone, timedelta
 
+from sqlalchemy.exc import IntegrityError
+
+from src.database.asyncpg_reader import RECENT_ACTIVITIES_SQL, AsyncpgActivityReader
 from src.database.postgres_service import PostgresService
+from src.database.sync_notifications import CHANNEL
 
 
 class TestPostgresService(unittest.IsolatedAsyncioTestCase):
@@ -31,7 +35,22 @@ class TestPostgresService(unittest.IsolatedAsyncioTestCase):
         ids_result = MagicMock()
         ids_result.all.return_value = [(sid,) for sid in existing_ids]
 
-        self.mock_session.execute = AsyncMock(side_effect=[max_result, ids_result])
+        # Third execute call: newest create_date per athlete
+        athletes_result = MagicMock()
+        athletes_result.all.return_value = (
+            [(7, last_date)] if last_date is not None else []
+        )
+
+        # Further calls: the rollup upsert on insert
+        self.mock_session.execute = AsyncMock(
+            side_effect=[
+                max_result,
+                ids_result,
+                athletes_result,
+                MagicMock(),
+                MagicMock(),
+            ]
+        )
 
     async def test_initialize_with_existing_activities(self) -> None:
         last_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
@@ -73,6 +92,7 @@ class TestPostgresService(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 12345
         mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
         mock_activity.model_dump_json.return_value = (
@@ -91,6 +111,7 @@ class TestPostgresService(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize(existing_ids=[existing_id])
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = existing_id
 
         result = await self.service.insert_activity(mock_activity)
@@ -103,6 +124,7 @@ class TestPostgresService(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize(last_date=old_date)
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 12345
         mock_activity.start_date = new_date
         mock_activity.model_dump_json.return_value = '{"id": 12345}'
@@ -111,16 +133,121 @@ class TestPostgresService(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(self.service._last_sync_date, new_date)
 
+    async def test_sync_state_tracks_inserts(self) -> None:
+        last_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
+        self._setup_initialize(last_date=last_date, existing_ids=[111, 222])
+        await self.service.initialize()
+        before = self.service.get_sync_state()
+
+        mock_activity = MagicMock()
+        mock_activity.start_date_local = None
+        mock_activity.id = 333
+        mock_activity.start_date = last_date
+        mock_activity.model_dump_json.return_value = '{"id": 333}'
+        await self.service.insert_activity(mock_activity)
+        after = self.service.get_sync_state()
+
+        self.assertEqual(before.activity_count, 2)
+        self.assertEqual(before.updated_at, last_date)
+        self.assertEqual(after.activity_count, 3)
+        self.assertNotEqual(after.digest, before.digest)
+        assert after.updated_at is not None
+        self.assertGreater(after.updated_at, last_date)
+
+    async def test_insert_activity_publishes_notification(self) -> None:
+        self._setup_initialize()
+        service = PostgresService(self.mock_session_maker, publish_inserts=True)
+        await service.initialize()
+        self.mock_session.execute = AsyncMock()
+
+        mock_activity = MagicMock()
+        mock_activity.start_date_local = None
+        mock_activity.id = 12345
+        mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
+        mock_activity.model_dump_json.return_value = '{"id": 12345}'
+        mock_activity.athlete.id = 7
+
+        self.assertTrue(await service.insert_activity(mock_activity))
+
+        params = self.mock_session.execute.await_args.args[1]
+        self.assertEqual(params["channel"], CHANNEL)
+        self.assertIn('"strava_id": 12345', params["payload"])
+        self.assertIn('"athlete_id": 7', params["payload"])
+
+    async def test_insert_activity_lost_race_marks_synced(self) -> None:
+        self._setup_initialize()
+        self.mock_session.commit.side_effect = IntegrityError("INSERT", {}, Exception())
+
+        mock_activity = MagicMock()
+        mock_activity.start_date_local = None
+        mock_activity.id = 12345
+        mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
+        mock_activity.model_dump_json.return_value = '{"id": 12345}'
+
+        self.assertFalse(await self.service.insert_activity(mock_activity))
+        self.assertTrue(self.service.is_activity_synced(12345))
+
+    def test_apply_synced_activity_is_idempotent(self) -> None:
+        start = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
+
+        self.service.apply_synced_activity(7, start)
+        digest = self.service.get_sync_state().digest
+        self.service.apply_synced_activity(7, start)
+
+        state = self.service.get_sync_state()
+        self.assertEqual(state.activity_count, 1)
+        self.assertEqual(state.digest, digest)
+        self.assertEqual(state.last_sync_date, start)
+
+    async def test_last_sync_date_per_athlete(self) -> None:
+        start = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
+        self._setup_initialize(last_date=start, existing_ids=[1])
+        await self.service.initialize()
+
+        self.service.apply_synced_activity(2, start + timedelta(days=1), 8)
+
+        self.assertEqual(self.service.get_last_sync_date(7), start)
+        self.assertEqual(self.service.get_last_sync_date(8), start + timedelta(days=1))
+        self.assertIsNone(self.service.get_last_sync_date(9))
+
     async def test_insert_activity_with_none_id(self) -> None:
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = None
 
         result = await self.service.insert_activity(mock_activity)
 
         self.assertFalse(result)
 
+    async def test_activity_history_is_keyset_paginated(self) -> None:
+        day = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
+        pages = [
+            [(9, day, 1, {"id": 1}), (9, day, 2, {"id": 2})],
+            [(3, day, 3, {"id": 3})],
+        ]
+        results = []
+        for rows in pages:
+            result = MagicMock()
+            result.all.return_value = rows
+            results.append(result)
+        self.mock_session.execute = AsyncMock(side_effect=results)
+
+        ids = [
+            [activity.id for activity in page]
+            async for page in self.service.iter_activity_history(page_size=2)
+        ]
+
+        self.assertEqual(ids, [[1, 2], [3]])
+        first, second = (
+            str(call.args[0]) for call in self.mock_session.execute.await_args_list
+        )
+        self.assertIn("ORDER BY", first)
+        self.assertNotIn(") > (", first)
+        self.assertIn("athlete_id < :athlete_id_", second)
+        self.assertIn("strava_id) > (", second)
+
     async def test_get_activities(self) -> None:
         from stravalib.strava_model import SummaryActivity
 
@@ -146,7 +273,7 @@ class TestPostgresService(unittest.IsolatedAsyncioTestCase):
         mock_result.scalars.return_value.all.return_value = [mock_row1, mock_row2]
         self.mock_session.execute = AsyncMock(return_value=mock_result)
 
-        result = await self.service.get_activities(limit=10)
+        result = await self.service.get_activities(7, limit=10)
 
         self.assertEqual(len(result), 2)
         self.assertIsInstance(result[0], SummaryActivity)
@@ -198,7 +325,22 @@ class TestPostgresServiceSessionUsage(unittest.IsolatedAsyncioTestCase):
         ids_result = MagicMock()
         ids_result.all.return_value = [(sid,) for sid in existing_ids]
 
-        self.mock_session.execute = AsyncMock(side_effect=[max_result, ids_result])
+        # Third execute call: newest create_date per athlete
+        athletes_result = MagicMock()
+        athletes_result.all.return_value = (
+            [(7, last_date)] if last_date is not None else []
+        )
+
+        # Further calls: the rollup upsert on insert
+        self.mock_session.execute = AsyncMock(
+            side_effect=[
+                max_result,
+                ids_result,
+                athletes_result,
+                MagicMock(),
+                MagicMock(),
+            ]
+        )
 
     async def test_session_created_on_initialize(self) -> None:
         """Verify that a session is created during initialization."""
@@ -214,7 +356,7 @@ class TestPostgresServiceSessionUsage(unittest.IsolatedAsyncioTestCase):
         mock_result.scalars.return_value.all.return_value = []
         self.mock_session.execute = AsyncMock(return_value=mock_result)
 
-        await self.service.get_activities(limit=10)
+        await self.service.get_activities(7, limit=10)
 
         self.mock_session.execute.assert_called_once()
 
@@ -223,6 +365,7 @@ class TestPostgresServiceSessionUsage(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 12345
         mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
         mock_activity.model_dump_json.return_value = '{"id": 12345}'
@@ -248,6 +391,7 @@ class TestPostgresServiceSessionUsage(unittest.IsolatedAsyncioTestCase):
         self._setup_initialize()
 
         mock_activity = MagicMock()
+        mock_activity.start_date_local = None
         mock_activity.id = 99999
         mock_activity.start_date = datetime(2024, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
         mock_activity.model_dump_json.return_value = '{"id": 99999}'
@@ -257,5 +401,46 @@ class TestPostgresServiceSessionUsage(unittest.IsolatedAsyncioTestCase):
         self.mock_session.commit.assert_awaited()
 
 
+class TestPostgresServiceFastReader(unittest.IsolatedAsyncioTestCase):
+    """Tests for the raw asyncpg read path."""
+
+    async def test_get_activities_uses_fast_reader(self) -> None:
+        session_maker = MagicMock()
+        reader = AsyncMock()
+        reader.fetch_recent.return_value = [
+            (111, '{"id": 111, "name": "Morning Run", "type": "Run"}'),
+            (222, '{"id": 222, "name": 7}'),
+        ]
+        service = PostgresService(session_maker, fast_reader=reader)
+
+        result = await service.get_activities(7, limit=10)
+
+        reader.fetch_recent.assert_awaited_once_with(7, 10)
+        session_maker.assert_not_called()
+        self.assertEqual([a.id for a in result], [111])
+        self.assertEqual(result[0].name, "Morning Run")
+
+    async def test_reader_prepares_statement_on_pooled_connection(self) -> None:
+        records = [(111, '{"id": 111}')]
+        statement = AsyncMock()
+        statement.fetch.return_value = records
+        conn = AsyncMock()
+        conn.prepare.return_value = statement
+        pool = MagicMock()
+        pool.acquire.return_value.__aenter__.return_value = conn
+        pool.close = AsyncMock()
+        reader = AsyncpgActivityReader("postgresql://u:p@db/rc")
+
+        with patch("asyncpg.create_pool", AsyncMock(return_value=pool)) as create:
+            self.assertEqual(await reader.fetch_recent(7, 5), records)
+            await reader.fetch_recent(7, 5)
+            await reader.close()
+
+        create.assert_awaited_once()
+        conn.prepare.assert_awaited_with(RECENT_ACTIVITIES_SQL)
+        statement.fetch.assert_awaited_with(7, 5)
+        pool.close.assert_awaited_once()
+
+
 if __name__ == "__main__":
     unittest.main()
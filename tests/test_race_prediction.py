@@ -0,0 +1,192 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+from stravalib.model import SummaryActivity
+
+from src.analytics.race_prediction import (
+    RACE_DISTANCES,
+    RacePredictor,
+    RunLog,
+    TreeEnsemble,
+    load_race_model,
+    predict_batch,
+    riegel_time,
+    vdot,
+    vdot_time,
+)
+from src.database.activity_repository import SyncState, activity_digest
+from src.strava.strava_client import StravaService
+from tests.factories import make_activity
+
+TODAY = date(2024, 6, 1)
+
+
+def _ensemble(directory: str) -> Path:
+    # Tree 0: distance_m <= 10000 ? 100 : 200; tree 1: a constant 5.
+    nodes = np.array(
+        [
+            (0, 10000.0, 1, 2, 0.0),
+            (-1, 0.0, -1, -1, 100.0),
+            (-1, 0.0, -1, -1, 200.0),
+            (-1, 0.0, -1, -1, 5.0),
+        ],
+        dtype=TreeEnsemble.NODE_DTYPE,
+    )
+    path = Path(directory) / "model.npy"
+    np.save(path, nodes)
+    np.save(path.with_suffix(".roots.npy"), np.array([0, 3], dtype=np.int32))
+    return path
+
+
+class TestFormulas(unittest.TestCase):
+    def test_vdot_matches_daniels_tables(self) -> None:
+        # A 20:00 5k is VDOT ~49.8; the same VDOT runs ~41:30 for 10k.
+        score = float(vdot(np.array(5000.0), np.array(1200.0)))
+
+        self.assertAlmostEqual(score, 49.8, delta=0.1)
+        self.assertAlmostEqual(float(vdot_time(score, 5000.0)), 1200.0, delta=0.5)
+        self.assertAlmostEqual(float(vdot_time(score, 10000.0)) / 60, 41.4, delta=0.3)
+
+    def test_riegel_broadcasts(self) -> None:
+        times = riegel_time(
+            np.array([[5000.0]]), np.array([[1200.0]]), np.array([[5000.0, 10000.0]])
+        )
+
+        np.testing.assert_allclose(times, [[1200.0, 1200.0 * 2**1.06]])
+
+
+class TestBatch(unittest.TestCase):
+    def test_predicts_all_athletes_and_distances(self) -> None:
+        fast = RunLog.from_activities(
+            [
+                make_activity(
+                    1, TODAY - timedelta(days=3), distance=5000.0, moving_time=1200
+                ),
+                make_activity(
+                    2, TODAY - timedelta(days=10), distance=10000.0, moving_time=3000
+                ),
+                make_activity(
+                    3,
+                    TODAY - timedelta(days=5),
+                    distance=20000.0,
+                    moving_time=3000,
+                    sport="Ride",
+                ),
+            ]
+        )
+        stale = RunLog.from_activities(
+            [
+                make_activity(
+                    4, TODAY - timedelta(days=400), distance=5000.0, moving_time=1100
+                )
+            ]
+        )
+
+        batch = predict_batch([fast, stale], list(RACE_DISTANCES.values()), TODAY)
+
+        self.assertEqual(batch["riegel"].shape, (2, 4))
+        self.assertAlmostEqual(batch["riegel"][0, 0], 1200.0)
+        self.assertAlmostEqual(batch["vdot_score"][0], 49.8, delta=0.1)
+        self.assertTrue(np.isnan(batch["vdot"][1]).all())
+        self.assertNotIn("model", batch)
+
+    def test_tree_ensemble_is_memory_mapped_and_plugged_in(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = _ensemble(directory)
+            model = load_race_model(str(path))
+
+            self.assertIs(load_race_model(str(path)), model)
+            assert isinstance(model, TreeEnsemble)
+            self.assertIsInstance(model.nodes, np.memmap)
+            log = RunLog.from_activities(
+                [make_activity(1, TODAY, distance=5000.0, moving_time=1200)]
+            )
+            batch = predict_batch([log, RunLog()], [5000.0, 42195.0], TODAY, model)
+            load_race_model.cache_clear()
+
+        np.testing.assert_allclose(batch["model"][0], [105.0, 205.0])
+        self.assertTrue(np.isnan(batch["model"][1]).all())
+
+    def test_rejects_unknown_artifacts(self) -> None:
+        with self.assertRaises(ValueError):
+            load_race_model("model.pkl")
+
+
+class TestPredictor(unittest.IsolatedAsyncioTestCase):
+    def _repository(self, activities: list[SummaryActivity]) -> MagicMock:
+        repository = MagicMock()
+        self._store(repository, activities)
+
+        async def history(athlete_id: int) -> list[SummaryActivity]:
+            return [a for a in repository.activities if a.athlete.id == athlete_id]
+
+        repository.get_activity_history = AsyncMock(side_effect=history)
+        return repository
+
+    @staticmethod
+    def _store(repository: MagicMock, activities: list[SummaryActivity]) -> None:
+        digest = 0
+        for activity in activities:
+            assert activity.id is not None
+            digest ^= activity_digest(activity.id)
+        repository.activities = activities
+        repository.get_sync_state.return_value = SyncState(
+            None, len(activities), digest, None
+        )
+
+    async def test_caches_until_the_athlete_records_a_run(self) -> None:
+        first = make_activity(
+            1, TODAY - timedelta(days=1), distance=5000.0, moving_time=1500
+        )
+        repository = self._repository([first])
+        predictor = RacePredictor(repository)
+
+        before = (await predictor.predict([7], TODAY))[7]
+        cached = (await predictor.predict([7, 8], TODAY))[7]
+        second = make_activity(2, TODAY, distance=5000.0, moving_time=1200)
+        self._store(repository, [first, second])
+        predictor.record(second)
+        after = (await predictor.predict([7, 8], TODAY))[7]
+
+        self.assertIs(cached, before)
+        self.assertEqual(before[0].riegel_s, 1500.0)
+        self.assertEqual(after[0].riegel_s, 1200.0)
+        self.assertIsNone(after[0].model_s)
+        self.assertEqual(
+            [c.args for c in repository.get_activity_history.await_args_list],
+            [(7,), (8,)],
+        )
+
+    async def test_unrecorded_insert_reloads_only_the_requester(self) -> None:
+        first = make_activity(
+            1, TODAY - timedelta(days=1), distance=5000.0, moving_time=1500
+        )
+        repository = self._repository([first])
+        predictor = RacePredictor(repository)
+        await predictor.predict([7, 8], TODAY)
+
+        self._store(
+            repository,
+            [first, make_activity(2, TODAY, distance=5000.0, moving_time=1200)],
+        )
+        after = (await predictor.predict([7], TODAY))[7]
+
+        self.assertEqual(after[0].riegel_s, 1200.0)
+        self.assertEqual(
+            [c.args for c in repository.get_activity_history.await_args_list],
+            [(7,), (8,), (7,)],
+        )
+
+    async def test_service_skips_sessions_without_an_athlete(self) -> None:
+        service = StravaService(MagicMock())
+
+        self.assertEqual(await service.read_race_predictions(None, TODAY), [])
+        self.assertIsNone(service.race_predictor)
+
+
+if __name__ == "__main__":
+    unittest.main()
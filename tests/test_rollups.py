@@ -0,0 +1,187 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from src.analytics.rollups import (
+    bucket_start,
+    compute_rollups,
+    rebuild_plan,
+    rollup_deltas,
+)
+from src.database.dynamo_service import DynamoService
+from src.database.postgres_service import _rollup_upsert
+from src.database.records import Rollup
+from tests.factories import make_activity
+
+
+class TestBuckets(unittest.TestCase):
+    def test_bucket_starts(self) -> None:
+        day = date(2024, 1, 3)  # a Wednesday
+
+        self.assertEqual(bucket_start("week", day), date(2024, 1, 1))
+        self.assertEqual(bucket_start("week", date(2024, 12, 31)), date(2024, 12, 30))
+        self.assertEqual(bucket_start("month", day), date(2024, 1, 1))
+        self.assertEqual(bucket_start("year", date(2024, 7, 9)), date(2024, 1, 1))
+
+    def test_deltas_use_local_day_and_classify_runs(self) -> None:
+        deltas = rollup_deltas(
+            make_activity(1, "2024-03-31T23:30:00Z", sport="TrailRun")
+        )
+
+        self.assertEqual(
+            [(d.period, d.bucket_start) for d in deltas],
+            [
+                ("week", date(2024, 3, 25)),
+                ("month", date(2024, 3, 1)),
+                ("year", date(2024, 1, 1)),
+            ],
+        )
+        self.assertEqual({d.athlete_id for d in deltas}, {7})
+        self.assertEqual(deltas[0].run_count, 1)
+        self.assertEqual(deltas[0].distance_m, 5000.0)
+        ride = rollup_deltas(
+            make_activity(2, "2024-03-31T10:00:00Z", sport="Ride"), sign=-1
+        )
+        self.assertEqual((ride[0].activity_count, ride[0].run_count), (-1, 0))
+
+    def test_activities_without_an_athlete_have_no_deltas(self) -> None:
+        self.assertEqual(
+            rollup_deltas(make_activity(1, "2024-03-31T10:00:00Z", athlete_id=None)), []
+        )
+
+    def test_rebuild_only_recomputes_planned_buckets(self) -> None:
+        activities = [
+            make_activity(1, "2024-02-05T08:00:00Z"),
+            make_activity(2, "2024-02-07T08:00:00Z", sport="Ride", distance=20000.0),
+            make_activity(3, "2024-03-20T08:00:00Z"),
+        ]
+        plan = rebuild_plan(date(2024, 2, 6), date(2024, 2, 6))
+
+        rollups = {
+            (r.period, r.bucket_start): r for r in compute_rollups(activities, plan)
+        }
+
+        week = rollups[("week", date(2024, 2, 5))]
+        self.assertEqual((week.activity_count, week.run_count), (2, 1))
+        self.assertEqual(week.distance_m, 25000.0)
+        self.assertEqual(rollups[("year", date(2024, 1, 1))].activity_count, 3)
+        self.assertNotIn(("month", date(2024, 3, 1)), rollups)
+
+    def test_rebuild_keeps_athletes_apart(self) -> None:
+        activities = [
+            make_activity(1, "2024-02-05T08:00:00Z"),
+            make_activity(2, "2024-02-06T08:00:00Z", athlete_id=8),
+        ]
+        plan = rebuild_plan(date(2024, 2, 5), date(2024, 2, 5))
+
+        weeks = [r for r in compute_rollups(activities, plan) if r.period == "week"]
+
+        self.assertEqual(
+            [(r.athlete_id, r.bucket_start, r.activity_count) for r in weeks],
+            [(7, date(2024, 2, 5), 1), (8, date(2024, 2, 5), 1)],
+        )
+
+
+class TestStorage(unittest.IsolatedAsyncioTestCase):
+    def test_postgres_upsert_adds_to_existing_buckets(self) -> None:
+        sql = str(
+            _rollup_upsert(
+                rollup_deltas(make_activity(1, "2024-02-05T08:00:00Z"))
+            ).compile(dialect=postgresql.dialect())
+        )
+
+        self.assertIn("ON CONFLICT (athlete_id, period, bucket_start) DO UPDATE", sql)
+        self.assertIn(
+            "distance_m = (running_corgium.activity_rollups.distance_m + excluded.distance_m)",
+            sql,
+        )
+
+    async def test_dynamo_insert_adds_to_aggregate_items(self) -> None:
+        table = MagicMock()
+        table.scan.return_value = {"Items": []}
+        rollups_table = MagicMock()
+        service = DynamoService(table, rollups_table)
+
+        await service.insert_activity(make_activity(1, "2024-02-05T08:00:00Z"))
+
+        self.assertEqual(rollups_table.update_item.call_count, 3)
+        call = rollups_table.update_item.call_args_list[0].kwargs
+        self.assertEqual(
+            call["Key"], {"athlete_id": "7", "bucket_key": "week#2024-02-05"}
+        )
+        self.assertTrue(call["UpdateExpression"].startswith("ADD activity_count"))
+        self.assertEqual(
+            str(call["ExpressionAttributeValues"][":distance_m"]), "5000.0"
+        )
+
+    async def test_dynamo_get_rollups_queries_one_period(self) -> None:
+        rollups_table = MagicMock()
+        rollups_table.query.side_effect = [
+            {
+                "Items": [
+                    {
+                        "athlete_id": "7",
+                        "bucket_key": "year#2023-01-01",
+                        "activity_count": 4,
+                    }
+                ],
+                "LastEvaluatedKey": {"athlete_id": "7"},
+            },
+            {"Items": [{"athlete_id": "7", "bucket_key": "year#2024-01-01"}]},
+        ]
+        service = DynamoService(MagicMock(), rollups_table)
+
+        rollups = await service.get_rollups(7, "year", start=date(2023, 1, 1))
+
+        self.assertEqual(
+            rollups,
+            [
+                Rollup(7, "year", date(2023, 1, 1), activity_count=4),
+                Rollup(7, "year", date(2024, 1, 1)),
+            ],
+        )
+        self.assertEqual(rollups_table.query.call_count, 2)
+        condition = rollups_table.query.call_args_list[0].kwargs[
+            "KeyConditionExpression"
+        ]
+        athlete, buckets = condition.get_expression()["values"]
+        self.assertEqual(athlete.get_expression()["values"][1], "7")
+        self.assertEqual(
+            buckets.get_expression()["values"][1:],
+            ("year#2023-01-01", "year#9999-12-31"),
+        )
+
+    async def test_dynamo_rebuild_only_touches_the_athlete(self) -> None:
+        table = MagicMock()
+        table.scan.return_value = {
+            "Items": [
+                {
+                    "strava_response": make_activity(
+                        1, "2024-02-05T08:00:00Z"
+                    ).model_dump_json()
+                },
+                {
+                    "strava_response": make_activity(
+                        2, "2024-02-06T08:00:00Z", athlete_id=8
+                    ).model_dump_json()
+                },
+            ]
+        }
+        rollups_table = MagicMock()
+        rollups_table.query.return_value = {"Items": []}
+        batch = rollups_table.batch_writer.return_value.__enter__.return_value
+        service = DynamoService(table, rollups_table)
+
+        buckets = await service.rebuild_rollups(7, date(2024, 2, 5), date(2024, 2, 5))
+
+        self.assertEqual(buckets, 3)
+        self.assertIn("FilterExpression", table.scan.call_args.kwargs)
+        items = [c.kwargs["Item"] for c in batch.put_item.call_args_list]
+        self.assertEqual({item["athlete_id"] for item in items}, {"7"})
+        self.assertEqual({int(item["activity_count"]) for item in items}, {1})
+
+
+if __name__ == "__main__":
+    unittest.main()
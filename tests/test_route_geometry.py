@@ -0,0 +1,130 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+
+from src.analytics.route_geometry import (
+    RouteCache,
+    RouteGeometry,
+    build_geometries,
+    decode_polylines,
+    encode_polyline,
+    simplify,
+    svg_thumbnail,
+)
+from src.strava.strava_client import AthleteSnapshot, StravaService
+from tests.factories import make_activity
+
+# The example from Google's polyline format documentation.
+EXAMPLE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+EXAMPLE_POINTS = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+
+
+class TestPolylines(unittest.TestCase):
+    def test_decodes_a_batch_and_isolates_malformed_entries(self) -> None:
+        routes = decode_polylines([EXAMPLE, "", "abc", EXAMPLE])
+
+        np.testing.assert_allclose(routes[0], EXAMPLE_POINTS)
+        self.assertEqual(routes[1].shape, (0, 2))
+        # Truncated: every character has the continuation bit set.
+        self.assertEqual(routes[2].shape, (0, 2))
+        np.testing.assert_allclose(routes[3], EXAMPLE_POINTS)
+
+    def test_encoding_round_trips(self) -> None:
+        rng = np.random.default_rng(5)
+        points = np.round(
+            np.column_stack(
+                [
+                    51.5 + np.cumsum(rng.normal(0, 1e-4, 500)),
+                    -0.1 + np.cumsum(rng.normal(0, 1e-4, 500)),
+                ]
+            ),
+            5,
+        )
+
+        encoded = encode_polyline(points)
+
+        self.assertEqual(encode_polyline(np.array(EXAMPLE_POINTS)), EXAMPLE)
+        np.testing.assert_allclose(decode_polylines([encoded])[0], points, atol=1e-9)
+
+
+class TestSimplify(unittest.TestCase):
+    def test_drops_points_within_tolerance(self) -> None:
+        # Out and back at an angle, with 1e-6 degree jitter on every other point.
+        lat = np.linspace(0.0, 0.01, 101)
+        lng = 0.002 * (1 - np.abs(np.arange(101) - 50) / 50)
+        points = np.column_stack([lat, lng + np.where(np.arange(101) % 2, 1e-6, 0.0)])
+
+        simplified = simplify(points, 1e-4)
+
+        np.testing.assert_allclose(
+            simplified, points[[0, 50, 100]], err_msg="keeps the ends and the turn"
+        )
+        self.assertEqual(len(simplify(points, 1e-7)), 101)
+
+    def test_thumbnail_fits_the_box(self) -> None:
+        svg = svg_thumbnail(np.array(EXAMPLE_POINTS), size=32)
+
+        self.assertTrue(svg.startswith('<svg xmlns="http://www.w3.org/2000/svg"'))
+        coordinates = svg.split('points="')[1].split('"')[0].split()
+        values = [float(v) for pair in coordinates for v in pair.split(",")]
+        self.assertEqual(len(coordinates), 3)
+        self.assertGreaterEqual(min(values), 4.0)
+        self.assertLessEqual(max(values), 28.0)
+        self.assertNotIn("polyline", svg_thumbnail(np.zeros((0, 2))))
+
+
+class TestCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self) -> None:
+        cache = RouteCache(max_size=2)
+        geometry = RouteGeometry("", "<svg/>", 0)
+        cache.put(1, "low", geometry)
+        cache.put(1, "high", geometry)
+        cache.get(1, "low")
+        cache.put(2, "low", geometry)
+
+        self.assertIsNotNone(cache.get(1, "low"))
+        self.assertIsNone(cache.get(1, "high"))
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+    async def test_list_pages_ship_simplified_cached_routes(self) -> None:
+        repository = MagicMock()
+        service = StravaService(repository)
+        activities = [
+            make_activity(1, polyline=EXAMPLE),
+            make_activity(2, map={"summary_polyline": None}),
+        ]
+
+        simplified = service.simplify_routes(activities, "low")
+
+        assert simplified[0].map is not None and simplified[1].map is not None
+        self.assertEqual(simplified[0].map.summary_polyline, EXAMPLE)
+        self.assertIsNone(simplified[1].map.summary_polyline)
+        assert service.route_cache is not None
+        self.assertEqual(
+            service.route_cache.get(1, "low"), build_geometries([EXAMPLE], "low")[0]
+        )
+
+        stored = {activity.id: activity for activity in activities}
+        stored[3] = make_activity(3, polyline=EXAMPLE, athlete_id=8)
+        repository.get_activity = AsyncMock(side_effect=stored.get)
+        service.tokens["route_session"] = "token"
+        snapshot = AthleteSnapshot(b"{}", "", datetime.now(timezone.utc), 0.0, 7)
+        with patch.object(
+            service, "get_athlete_snapshot", AsyncMock(return_value=snapshot)
+        ):
+            svg = await service.read_route_thumbnail("route_session", 1, "low")
+            self.assertIn("<polyline", svg)
+            repository.get_activity.assert_awaited_once_with(1)
+            # No route, another athlete's activity, and an unknown activity.
+            for activity_id in (2, 3, 4):
+                with self.assertRaises(LookupError):
+                    await service.read_route_thumbnail(
+                        "route_session", activity_id, "low"
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.exc import OperationalError
+
+from src.database.postgres_service import PostgresService
+from src.database.routing import Replica, ReplicaRouter
+
+
+def _session_maker(execute: AsyncMock | None = None) -> MagicMock:
+    session = AsyncMock()
+    session.add = MagicMock()
+    if execute is not None:
+        session.execute = execute
+    maker = MagicMock()
+    maker.return_value.__aenter__.return_value = session
+    maker.return_value.__aexit__.return_value = None
+    return maker
+
+
+def _lag(seconds: float) -> AsyncMock:
+    result = MagicMock()
+    result.scalar.return_value = seconds
+    return AsyncMock(return_value=result)
+
+
+class TestReplicaRouter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.primary = _session_maker()
+        self.replicas = [
+            Replica("r1", _session_maker(_lag(0.0))),
+            Replica("r2", _session_maker(_lag(0.0))),
+        ]
+        self.router = ReplicaRouter(self.primary, self.replicas, sticky_seconds=60)
+
+    def test_reads_round_robin_over_healthy_replicas(self) -> None:
+        self.replicas[1].healthy = False
+        picks = [self.router.read_session_maker() for _ in range(3)]
+
+        self.assertEqual(picks, [self.replicas[0].session_maker] * 3)
+        self.assertIs(self.router.write_session_maker(), self.primary)
+
+    def test_falls_back_to_primary_without_healthy_replicas(self) -> None:
+        for replica in self.replicas:
+            replica.healthy = False
+
+        self.assertIs(self.router.read_session_maker(), self.primary)
+
+    def test_reads_stick_to_primary_after_write(self) -> None:
+        self.router.mark_write()
+
+        self.assertIs(self.router.read_session_maker(), self.primary)
+
+    async def test_health_check_marks_failing_replica(self) -> None:
+        self.replicas[0].session_maker = _session_maker(
+            AsyncMock(side_effect=OSError("connection refused"))
+        )
+
+        with self.assertLogs("src.database.routing", "WARNING"):
+            await self.router.check_health()
+
+        self.assertFalse(self.replicas[0].healthy)
+        self.assertTrue(self.replicas[1].healthy)
+
+    async def test_measured_lag_extends_the_window_and_skips_laggards(self) -> None:
+        router = ReplicaRouter(self.primary, self.replicas, sticky_seconds=0.0)
+        self.replicas[0].session_maker = _session_maker(_lag(5.0))
+        self.replicas[1].session_maker = _session_maker(_lag(120.0))
+
+        with self.assertLogs("src.database.routing", "WARNING"):
+            await router.check_health()
+        router.mark_write()
+
+        self.assertEqual(router.lag_window(), 5.0)
+        self.assertFalse(self.replicas[1].healthy)
+        self.assertIs(router.read_session_maker(), self.primary)
+
+    async def test_failed_replica_read_is_retried_on_the_primary(self) -> None:
+        router = ReplicaRouter(self.primary, self.replicas[:1])
+        query = AsyncMock(side_effect=[OperationalError("SELECT", {}, Exception()), "rows"])
+
+        with self.assertLogs("src.database.routing", "WARNING"):
+            rows = await router.read(query)
+
+        self.assertEqual(rows, "rows")
+        self.primary.assert_called_once()
+        self.assertFalse(self.replicas[0].healthy)
+
+
+class TestPostgresServiceRouting(unittest.IsolatedAsyncioTestCase):
+    async def test_reads_use_replica_and_inserts_pin_primary(self) -> None:
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        replica = _session_maker(AsyncMock(return_value=result))
+        primary = _session_maker()
+        router = ReplicaRouter(primary, [Replica("r1", replica)], sticky_seconds=60)
+        service = PostgresService(primary, router=router)
+        service._initialized = True
+
+        await service.get_activities(7, limit=5)
+        replica.assert_called_once()
+
+        activity = MagicMock()
+        activity.start_date_local = None
+        activity.id = 1
+        activity.start_date = datetime(2024, 1, 15, 8, 0, tzinfo=timezone.utc)
+        activity.model_dump_json.return_value = '{"id": 1}'
+        await service.insert_activity(activity)
+
+        self.assertIs(router.read_session_maker(), primary)
+
+    async def test_activities_synced_elsewhere_pin_primary(self) -> None:
+        replica = _session_maker()
+        primary = _session_maker()
+        router = ReplicaRouter(primary, [Replica("r1", replica)], sticky_seconds=60)
+        service = PostgresService(primary, router=router)
+
+        service.apply_synced_activity(1, None, 7)
+
+        self.assertIs(router.read_session_maker(), primary)
+
+
+if __name__ == "__main__":
+    unittest.main()
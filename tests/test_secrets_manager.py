@@ -4,9 +4,11 @@ import json
 import os
 from unittest.mock import MagicMock, patch
 
+import pytest
 from pydantic_settings.sources.providers.aws import AWSSecretsManagerSettingsSource
 
 from src.config import Settings
+from src.secrets_cache import CachedSecretsManagerSettingsSource, SecretCache
 
 
 class TestLocalModeSourceSelection:
@@ -23,8 +25,9 @@ class TestLocalModeSourceSelection:
                 dotenv_settings=MagicMock(),
                 file_secret_settings=MagicMock(),
             )
-            source_types = {type(s) for s in sources}
-            assert AWSSecretsManagerSettingsSource not in source_types
+            assert not any(
+                isinstance(s, AWSSecretsManagerSettingsSource) for s in sources
+            )
 
 
 class TestLambdaModeSourceSelection:
@@ -57,8 +60,9 @@ class TestLambdaModeSourceSelection:
                 dotenv_settings=MagicMock(),
                 file_secret_settings=MagicMock(),
             )
-            source_types = [type(s) for s in sources]
-            assert AWSSecretsManagerSettingsSource in source_types
+            assert any(
+                isinstance(s, CachedSecretsManagerSettingsSource) for s in sources
+            )
 
     def test_custom_secret_id_from_env(self):
         mock_client = MagicMock()
@@ -145,3 +149,128 @@ class TestLambdaModeSourceSelection:
             assert s.db_backend == "aws"
             assert s.dynamodb_region == "eu-west-1"
             assert s.dynamodb_table_name == "my-activities"
+
+    def test_settings_reuse_cached_secret(self):
+        mock_secret = {
+            "STRAVA_CLIENT_ID": "42",
+            "STRAVA_CLIENT_SECRET": "cached",
+            "JWT_SECRET": "jwt",
+        }
+        mock_client = MagicMock()
+        mock_client.get_secret_value.return_value = {
+            "SecretString": json.dumps(mock_secret),
+        }
+
+        with (
+            patch.dict(os.environ, {"AWS_LAMBDA_FUNCTION_NAME": "my-func"}, clear=True),
+            patch("boto3.client", return_value=mock_client) as mock_boto3_client,
+        ):
+            first = Settings()
+            second = Settings()
+
+        assert first.strava_client_id == second.strava_client_id == 42
+        mock_client.get_secret_value.assert_called_once()
+        mock_boto3_client.assert_called_once()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSecretCache:
+    """TTL, refresh-ahead and failure behaviour of the in-memory cache."""
+
+    def _make_cache(self, fetch, clock, **kwargs) -> SecretCache:
+        return SecretCache(
+            fetch, ttl_seconds=300, refresh_ahead_seconds=60, clock=clock, **kwargs
+        )
+
+    def _join_refresh(self, cache: SecretCache) -> None:
+        if cache._refresh_thread is not None:
+            cache._refresh_thread.join(timeout=5)
+
+    def test_fetches_once_within_ttl(self):
+        clock = FakeClock()
+        fetch = MagicMock(return_value="v1")
+        cache = self._make_cache(fetch, clock)
+
+        assert cache.get() == "v1"
+        clock.now += 100
+        assert cache.get() == "v1"
+
+        fetch.assert_called_once()
+
+    def test_refreshes_in_background_before_expiry(self):
+        clock = FakeClock()
+        fetch = MagicMock(side_effect=["v1", "v2"])
+        cache = self._make_cache(fetch, clock)
+        cache.get()
+
+        clock.now += 250  # inside the refresh-ahead window, not yet expired
+        assert cache.get() == "v1"
+        self._join_refresh(cache)
+
+        assert cache.get() == "v2"
+        assert fetch.call_count == 2
+        assert cache.generation == 2
+
+    def test_expired_value_is_refreshed_synchronously(self):
+        clock = FakeClock()
+        fetch = MagicMock(side_effect=["v1", "v2"])
+        cache = self._make_cache(fetch, clock)
+        cache.get()
+
+        clock.now += 301
+
+        assert cache.get() == "v2"
+
+    def test_failed_refresh_serves_last_good_value(self):
+        clock = FakeClock()
+        fetch = MagicMock(side_effect=["v1", RuntimeError("throttled")])
+        cache = self._make_cache(fetch, clock)
+        cache.get()
+
+        clock.now += 301
+
+        assert cache.get() == "v1"
+        assert cache.generation == 1
+
+    def test_first_fetch_failure_propagates(self):
+        cache = self._make_cache(
+            MagicMock(side_effect=RuntimeError("denied")), FakeClock()
+        )
+
+        with pytest.raises(RuntimeError):
+            cache.get()
+
+    def test_encrypted_copy_survives_a_new_cache(self, tmp_path):
+        from cryptography.fernet import Fernet
+
+        key = Fernet.generate_key().decode()
+        path = tmp_path / "secret.bin"
+        clock = FakeClock()
+        self._make_cache(
+            MagicMock(return_value="s3cr3t"),
+            clock,
+            persist_path=path,
+            encryption_key=key,
+        ).get()
+
+        assert b"s3cr3t" not in path.read_bytes()
+
+        fetch = MagicMock(return_value="fresh")
+        reloaded = self._make_cache(fetch, clock, persist_path=path, encryption_key=key)
+        assert reloaded.get() == "s3cr3t"
+        fetch.assert_not_called()
+
+    def test_no_persistence_without_key(self, tmp_path):
+        path = tmp_path / "secret.bin"
+        self._make_cache(
+            MagicMock(return_value="v1"), FakeClock(), persist_path=path
+        ).get()
+
+        assert not path.exists()
@@ -0,0 +1,251 @@
+import time
+import unittest
+from datetime import datetime, timezone
+from itertools import pairwise
+from typing import cast
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from stravalib.model import SummaryActivity
+
+from src.analytics.route_geometry import encode_polyline
+from src.analytics.spatial import (
+    RouteIndex,
+    RouteRecord,
+    frechet_m,
+    geohash,
+    haversine_m,
+    match_routes,
+    search_cells,
+)
+from src.database.activity_repository import (
+    ActivityRepository,
+    SyncState,
+    activity_digest,
+)
+from src.database.dynamo_service import DynamoService
+
+
+def _loop(
+    activity_id: int, offset: float = 0.0, scale: float = 1.0, seed: int = 0
+) -> RouteRecord:
+    """A ~5 km loop in Hyde Park, shifted north by ``offset`` degrees."""
+    angle = np.linspace(0, 2 * np.pi, 120)
+    rng = np.random.default_rng(seed)
+    points = np.column_stack(
+        [
+            51.507 + offset + scale * 0.006 * np.sin(angle),
+            -0.165 + scale * 0.01 * (1 - np.cos(angle)),
+        ]
+    ) + rng.normal(0, 5e-6, (120, 2))
+    points = np.round(points, 5)
+    length = sum(haversine_m(*a, *b) for a, b in pairwise(points))
+    (start_lat, start_lng), (end_lat, end_lng) = points[0], points[-1]
+    return RouteRecord(
+        7,
+        activity_id,
+        datetime(2024, 5, activity_id, tzinfo=timezone.utc),
+        length,
+        float(start_lat),
+        float(start_lng),
+        float(end_lat),
+        float(end_lng),
+        encode_polyline(points),
+    )
+
+
+class FakeRoutes:
+    def __init__(self, routes: list[RouteRecord]) -> None:
+        self.routes = routes
+        self.queries = 0
+        self.digest = 1
+
+    def get_sync_state(self) -> SyncState:
+        return SyncState(None, len(self.routes), self.digest, None)
+
+    async def find_routes(self, athlete_id, field, cells):
+        self.queries += 1
+        key = "start_geohash" if field == "start" else "end_geohash"
+        return [
+            route
+            for route in self.routes
+            if route.athlete_id == athlete_id
+            and any(getattr(route, key).startswith(cell) for cell in cells)
+        ]
+
+
+def route_index(repository: FakeRoutes) -> RouteIndex:
+    return RouteIndex(cast(ActivityRepository, repository))
+
+
+class TestGeohash(unittest.TestCase):
+    def test_known_geohash(self) -> None:
+        self.assertEqual(geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+    def test_search_cells_cover_the_radius(self) -> None:
+        rng = np.random.default_rng(8)
+        for lat, lng in [(51.5, -0.12), (64.1, -21.9), (-33.9, 151.2)]:
+            cells = search_cells(lat, lng, 500)
+            self.assertLessEqual(len(cells), 9)
+            for bearing in rng.uniform(0, 2 * np.pi, 50):
+                north = 499 * np.cos(bearing) / 111_195
+                east = 499 * np.sin(bearing) / (111_195 * np.cos(np.radians(lat)))
+                point = geohash(lat + north, lng + east)
+                self.assertTrue(any(point.startswith(cell) for cell in cells))
+
+
+class TestMatching(unittest.TestCase):
+    def test_frechet_of_offset_paths(self) -> None:
+        a = np.column_stack([np.linspace(0, 1000, 50), np.zeros(50)])
+        b = a + [0.0, 30.0]
+
+        self.assertAlmostEqual(frechet_m(a, b), 30.0)
+        self.assertAlmostEqual(frechet_m(a, a[::-1]), 1000.0)
+
+    def test_matches_repeats_but_not_other_loops(self) -> None:
+        reference = _loop(1)
+        repeat = _loop(2, seed=2)
+        shifted = _loop(3, offset=0.0015)
+        bigger = _loop(4, scale=1.1)
+
+        matches = match_routes(reference, [reference, repeat, shifted, bigger])
+
+        self.assertEqual([match.route.activity_id for match in matches], [2])
+        self.assertLess(matches[0].frechet_m, 10)
+
+
+class TestRouteIndex(unittest.IsolatedAsyncioTestCase):
+    async def test_near_filters_exact_distance_and_caches_cells(self) -> None:
+        routes = [_loop(1), _loop(2, offset=0.003), _loop(3, offset=0.02)]
+        repository = FakeRoutes(routes)
+        index = route_index(repository)
+
+        nearby = await index.near(7, 51.507, -0.165, 500)
+        again = await index.near(7, 51.507, -0.165, 500)
+
+        self.assertEqual([item.route.activity_id for item in nearby], [1, 2])
+        self.assertEqual(nearby, again)
+        self.assertEqual(repository.queries, 1)
+        self.assertEqual(await index.near(8, 51.507, -0.165, 500), [])
+
+        # Another process indexed a route: the cache is dropped.
+        repository.digest = 2
+        await index.near(7, 51.507, -0.165, 500)
+        self.assertEqual(repository.queries, 3)
+
+    async def test_recorded_routes_join_cached_cells(self) -> None:
+        repository = FakeRoutes([_loop(1)])
+        index = route_index(repository)
+        self.assertEqual(len(await index.similar(_loop(1))), 0)
+
+        index.record(_loop(2, seed=2))
+        repository.digest ^= activity_digest(2)
+
+        matches = await index.similar(_loop(1))
+        self.assertEqual([match.route.activity_id for match in matches], [2])
+        self.assertEqual(repository.queries, 1)
+
+    async def test_lookups_overlapping_a_record_are_not_cached(self) -> None:
+        repository = FakeRoutes([_loop(1)])
+        index = route_index(repository)
+        late = _loop(2, offset=0.003)
+        stale_find = repository.find_routes
+
+        async def find_during_record(athlete_id, field, cells):
+            # The query reads the rows before route 2 is indexed and recorded.
+            found = await stale_find(athlete_id, field, cells)
+            repository.routes.append(late)
+            index.record(late)
+            return found
+
+        with patch.object(repository, "find_routes", find_during_record):
+            first = await index.near(7, 51.507, -0.165, 500)
+        repository.digest ^= activity_digest(2)
+        second = await index.near(7, 51.507, -0.165, 500)
+
+        self.assertEqual([item.route.activity_id for item in first], [1])
+        self.assertEqual([item.route.activity_id for item in second], [1, 2])
+        self.assertEqual(repository.queries, 2)
+
+    async def test_queries_take_milliseconds(self) -> None:
+        rng = np.random.default_rng(9)
+        base = _loop(1)
+        routes = [
+            RouteRecord(
+                7,
+                100 + i,
+                None,
+                base.distance_m,
+                base.start_lat + lat,
+                base.start_lng + lng,
+                base.end_lat + lat,
+                base.end_lng + lng,
+                base.shape,
+            )
+            for i, (lat, lng) in enumerate(rng.normal(0, 0.05, (5000, 2)))
+        ]
+        index = route_index(FakeRoutes([base, *routes]))
+        await index.near(7, 51.507, -0.165, 500)
+        await index.similar(base)
+
+        began = time.perf_counter()
+        await index.near(7, 51.507, -0.165, 500)
+        await index.similar(base)
+        self.assertLess(time.perf_counter() - began, 0.05)
+
+
+class TestStorage(unittest.IsolatedAsyncioTestCase):
+    async def test_dynamo_writes_cell_items_and_queries_prefixes(self) -> None:
+        route = _loop(1)
+        table = MagicMock()
+        batch = table.batch_writer.return_value.__enter__.return_value
+        service = DynamoService(MagicMock(), routes_table=table)
+
+        await service.index_routes([route])
+
+        keys = [call.kwargs["Item"]["route_key"] for call in batch.put_item.mock_calls]
+        self.assertEqual(
+            keys,
+            [
+                "activity#1",
+                f"start#{route.start_geohash}#1",
+                f"end#{route.end_geohash}#1",
+            ],
+        )
+        item = batch.put_item.mock_calls[0].kwargs["Item"]
+        table.query.return_value = {"Items": [item]}
+
+        found = await service.find_routes(7, "start", ["gcpv", "gcpu"])
+
+        self.assertEqual(found[0].shape, route.shape)
+        self.assertEqual(found[0].start_date, route.start_date)
+        self.assertEqual(table.query.call_count, 2)
+        self.assertTrue(table.query.call_args.kwargs["ConsistentRead"])
+
+    async def test_sync_indexes_new_runs(self) -> None:
+        from src.strava.strava_client import StravaService
+
+        repository = MagicMock()
+        repository.index_routes = AsyncMock(return_value=1)
+        service = StravaService(repository)
+        route = _loop(1)
+        run = SummaryActivity.model_validate(
+            {
+                "id": 1,
+                "athlete": {"id": 7},
+                "sport_type": "Run",
+                "distance": route.distance_m,
+                "start_latlng": [route.start_lat, route.start_lng],
+                "map": {"summary_polyline": route.shape},
+            }
+        )
+
+        await service._index_route(run)
+
+        (indexed,) = repository.index_routes.await_args.args[0]
+        self.assertEqual(indexed.start_geohash, route.start_geohash)
+        self.assertLessEqual(len(indexed.shape), len(route.shape))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import logging
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.database.sql_instrumentation import instrument_engine
+from src.middleware import RequestMetricsMiddleware
+from src.observability.metrics import MetricsRegistry
+from src.observability.queries import QueryStats, normalize_statement, params_shape
+from src.routers.debug import create_debug_router
+
+
+class TestNormalisation(unittest.TestCase):
+    def test_literals_and_parameters_collapse(self) -> None:
+        first = normalize_statement(
+            "SELECT *  FROM activity\n WHERE strava_id = $1 AND name = 'Run'"
+        )
+        second = normalize_statement(
+            "SELECT * FROM activity WHERE strava_id = $7 AND name = 'Walk'"
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first, "SELECT * FROM activity WHERE strava_id = ? AND name = ?"
+        )
+
+    def test_value_lists_collapse(self) -> None:
+        self.assertEqual(
+            normalize_statement("SELECT 1 FROM t WHERE id IN ($1, $2, $3)"),
+            normalize_statement("SELECT 1 FROM t WHERE id IN ($1, $2)"),
+        )
+
+    def test_params_shape_hides_values(self) -> None:
+        self.assertEqual(params_shape((1, "secret")), "(int, str)")
+        self.assertEqual(params_shape({"email": "a@b.c"}), "{email: str}")
+        self.assertEqual(params_shape([(1,), (2,)]), "2 x (int)")
+
+
+class TestQueryStats(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stats = QueryStats(
+            MetricsRegistry(), slow_query_seconds=0.5, statements_per_request_limit=3
+        )
+
+    def test_groups_statements_by_shape(self) -> None:
+        self.stats.record("SELECT * FROM t WHERE id = $1", 0.01)
+        self.stats.record("SELECT * FROM t WHERE id = $1", 0.03)
+        self.stats.record("INSERT INTO t VALUES ($1)", 0.1)
+
+        snapshot = self.stats.snapshot()
+
+        self.assertEqual(snapshot[0]["operation"], "INSERT")
+        self.assertEqual(snapshot[1]["count"], 2)
+        self.assertEqual(snapshot[1]["max_ms"], 30.0)
+
+    def test_slow_query_logged_with_params_shape(self) -> None:
+        with self.assertLogs("src.observability.queries", logging.WARNING) as logs:
+            self.stats.record("SELECT * FROM t WHERE id = $1", 0.6, (42,))
+
+        self.assertIn("params=(int)", logs.output[0])
+        self.assertNotIn("42", logs.output[0])
+
+    def test_requests_over_limit_are_flagged(self) -> None:
+        token = self.stats.start_request()
+        for _ in range(5):
+            self.stats.record("SELECT * FROM t WHERE id = $1", 0.001)
+
+        with self.assertLogs("src.observability.queries", logging.WARNING) as logs:
+            count = self.stats.finish_request(token, "/strava/activities")
+
+        self.assertEqual(count, 5)
+        self.assertEqual(self.stats.flagged_requests, 1)
+        self.assertIn("most repeated (5x)", logs.output[0])
+
+    def test_statements_outside_requests_are_not_counted(self) -> None:
+        self.stats.record("SELECT 1", 0.001)
+        token = self.stats.start_request()
+
+        self.assertEqual(self.stats.finish_request(token, "/x"), 0)
+
+
+class TestEngineHooks(unittest.TestCase):
+    def test_statements_on_engine_are_recorded(self) -> None:
+        stats = QueryStats(MetricsRegistry())
+        engine = create_engine("sqlite://")
+        instrument_engine(engine, stats)
+        instrument_engine(engine, stats)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        snapshot = stats.snapshot()
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot[0]["statement"], "SELECT ?")
+        self.assertEqual(snapshot[0]["count"], 2)
+
+
+class TestRequestScope(unittest.TestCase):
+    def test_middleware_flags_chatty_route_and_debug_endpoint_reports(self) -> None:
+        registry = MetricsRegistry()
+        stats = QueryStats(registry, statements_per_request_limit=2)
+        app = FastAPI()
+        app.add_middleware(
+            RequestMetricsMiddleware, registry=registry, query_stats=stats
+        )
+        app.include_router(create_debug_router(stats))
+
+        @app.get("/chatty")
+        async def chatty():
+            for i in range(4):
+                stats.record(f"SELECT * FROM activity WHERE strava_id = {i}", 0.001)
+            return {}
+
+        client = TestClient(app)
+        client.get("/chatty")
+        report = client.get("/debug/sql").json()
+
+        self.assertEqual(report["flagged_requests"], 1)
+        self.assertEqual(report["statements"][0]["count"], 4)
+        excessive = registry.counter("db_excessive_statement_requests_total", "")
+        self.assertEqual(excessive.value("/chatty"), 1)
+        self.assertEqual(client.delete("/debug/sql").status_code, 204)
+        self.assertEqual(client.get("/debug/sql").json()["statements"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timezone
-from src.strava.strava_client import StravaService
+from stravalib.model import DetailedAthlete
+from src.strava.strava_client import AthleteCache, AthleteSnapshot, StravaService
 from src.config import settings
+from src.sync.registry import AthleteCredentials, InMemorySyncRegistry
 
 
 class TestStravaService(unittest.IsolatedAsyncioTestCase):
@@ -11,6 +13,9 @@ class TestStravaService(unittest.IsolatedAsyncioTestCase):
         self.MockClient = self.patcher.start()
         self.mock_activity_repo = MagicMock()
         self.service = StravaService(self.mock_activity_repo)
+        self.service.client.get_athlete.return_value = DetailedAthlete.model_validate(
+            {"id": 7}
+        )
 
     def tearDown(self):
         self.patcher.stop()
@@ -92,7 +97,7 @@ class TestStravaService(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0].name, "Morning Run")
         self.assertEqual(result[1].name, "Evening Walk")
-        self.service.activity_repo.get_activities.assert_called_once_with(limit=100)
+        self.service.activity_repo.get_activities.assert_called_once_with(7, limit=100)
 
     async def test_list_activities_syncs_new_activities_first(self):
         session_id = "test-session-123"
@@ -156,6 +161,38 @@ class TestStravaService(unittest.IsolatedAsyncioTestCase):
         # Should fetch with limit when no sync date
         self.service.client.get_activities.assert_called_once_with(limit=50)
 
+    async def test_list_activities_uses_the_athletes_own_cursor(self):
+        session_id = "test-session-123"
+        self.service.tokens[session_id] = "mock_token"
+        self.service.activity_repo = MagicMock()
+        self.service.activity_repo.get_last_sync_date.return_value = None
+        self.service.activity_repo.get_activities = AsyncMock(return_value=[])
+        self.service.client.get_activities.return_value = []
+
+        await self.service.list_activities(session_id)
+
+        self.service.activity_repo.get_last_sync_date.assert_called_once_with(7)
+
+    async def test_list_activities_resumes_from_registry_checkpoint(self):
+        session_id = "test-session-123"
+        self.service.tokens[session_id] = "mock_token"
+        checkpoint = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        registry = InMemorySyncRegistry()
+        await registry.save(
+            AthleteCredentials(7, "access", "refresh", 0, last_activity_date=checkpoint)
+        )
+        self.service.sync_registry = registry
+        self.service.activity_repo = MagicMock()
+        self.service.activity_repo.get_activities = AsyncMock(return_value=[])
+        self.service.client.get_activities.return_value = []
+
+        await self.service.list_activities(session_id)
+
+        self.service.client.get_activities.assert_called_once_with(after=checkpoint)
+        self.service.activity_repo.get_last_sync_date.assert_not_called()
+        credentials = await registry.get(7)
+        self.assertIsNotNone(credentials.last_synced_at)
+
     async def test_list_activities_no_session_raises_error(self):
         with self.assertRaises(ValueError) as context:
             await self.service.list_activities("invalid-session")
@@ -187,7 +224,7 @@ class TestStravaService(unittest.IsolatedAsyncioTestCase):
         await self.service.list_activities(session_id, limit=5)
 
         # Custom limit applies to DB fetch
-        self.service.activity_repo.get_activities.assert_called_once_with(limit=5)
+        self.service.activity_repo.get_activities.assert_called_once_with(7, limit=5)
 
     async def test_list_activities_db_failure_raises_error(self):
         session_id = "test-session-123"
@@ -210,5 +247,19 @@ class TestStravaService(unittest.IsolatedAsyncioTestCase):
         self.assertIn("Database connection failed", str(context.exception))
 
 
+class TestAthleteCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = AthleteCache(max_size=2)
+        snapshot = AthleteSnapshot(b"{}", '"a"', datetime.now(timezone.utc), 0.0)
+        cache.put("a", snapshot)
+        cache.put("b", snapshot)
+        cache.get("a")
+        cache.put("c", snapshot)
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,450 @@
+"""Tests for the background sync fan-out, registry, queue and Lambda handler."""
+
+import asyncio
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
+
+from stravalib.client import Client
+
+from src.strava.strava_client import StravaService
+from src.sync import (
+    AthleteCredentials,
+    InMemorySyncQueue,
+    InMemorySyncRegistry,
+    RateBudget,
+    SyncFanout,
+)
+from src.sync.fanout import AthleteSyncOutcome
+from src.sync.queue import SQSSyncQueue
+from src.sync.window import DynamoRequestWindow, InMemoryRequestWindow, Reservation
+from src.sync.worker import run_local_worker
+from src.sync_handler import handle_event
+from tests.factories import make_activity
+
+NOW = datetime(2024, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _credentials(athlete_id: int, last_synced_at: datetime | None = None):
+    return AthleteCredentials(
+        athlete_id=athlete_id,
+        access_token=f"access-{athlete_id}",
+        refresh_token=f"refresh-{athlete_id}",
+        expires_at=2_000_000_000,
+        last_synced_at=last_synced_at,
+    )
+
+
+class FakeSyncOne:
+    """Records calls and the peak number of concurrent syncs."""
+
+    def __init__(self, fail_ids: set[int] | None = None) -> None:
+        self.fail_ids = fail_ids or set()
+        self.calls: list[int] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, credentials: AthleteCredentials) -> AthleteSyncOutcome:
+        self.calls.append(credentials.athlete_id)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        if credentials.athlete_id in self.fail_ids:
+            raise RuntimeError("Strava unavailable")
+        return AthleteSyncOutcome(credentials, 2, NOW - timedelta(hours=1))
+
+
+class TestRateBudget(unittest.TestCase):
+    def test_acquire_until_exhausted(self) -> None:
+        budget = RateBudget(3)
+
+        self.assertTrue(budget.try_acquire(2))
+        self.assertFalse(budget.try_acquire(2))
+        self.assertTrue(budget.try_acquire(1))
+        self.assertEqual(budget.remaining, 0)
+
+    def test_refills_over_time(self) -> None:
+        now = [0.0]
+        budget = RateBudget(10, refill_per_second=1.0, clock=lambda: now[0])
+        budget.try_acquire(10)
+
+        now[0] = 4.0
+
+        self.assertEqual(budget.remaining, 4)
+
+
+class TestInMemorySyncRegistry(unittest.IsolatedAsyncioTestCase):
+    async def test_due_returns_stale_athletes_oldest_first(self) -> None:
+        registry = InMemorySyncRegistry()
+        await registry.save(_credentials(1, NOW - timedelta(hours=2)))
+        await registry.save(_credentials(2, NOW - timedelta(minutes=5)))
+        await registry.save(_credentials(3))
+
+        due = await registry.due(NOW, interval_seconds=3600)
+
+        self.assertEqual([c.athlete_id for c in due], [3, 1])
+
+    async def test_due_respects_limit(self) -> None:
+        registry = InMemorySyncRegistry()
+        for athlete_id in range(5):
+            await registry.save(_credentials(athlete_id))
+
+        due = await registry.due(NOW, interval_seconds=3600, limit=2)
+
+        self.assertEqual(len(due), 2)
+
+
+class TestInMemorySyncQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_pending_athletes_are_not_duplicated(self) -> None:
+        queue = InMemorySyncQueue()
+
+        await queue.send([1, 2])
+        await queue.send([2, 3])
+
+        self.assertEqual(await queue.receive(10), [1, 2, 3])
+        self.assertEqual(await queue.receive(10), [])
+
+
+class TestSQSSyncQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_deferred_athletes_are_delayed(self) -> None:
+        client = MagicMock()
+        queue = SQSSyncQueue(client, "https://sqs/queue", delay_seconds=3600)
+
+        await queue.send([1, 2])
+
+        entries = client.send_message_batch.call_args.kwargs["Entries"]
+        self.assertEqual([entry["DelaySeconds"] for entry in entries], [900, 900])
+
+
+class TestRequestWindow(unittest.IsolatedAsyncioTestCase):
+    async def test_invocations_share_the_window(self) -> None:
+        now = [1_000.0]
+        window = InMemoryRequestWindow(clock=lambda: now[0])
+
+        first = await window.reserve(60, 90)
+        second = await window.reserve(60, 90)
+        await window.release(first, 20)
+        third = await window.reserve(60, 90)
+        now[0] += 900
+        fresh = await window.reserve(60, 90)
+
+        self.assertEqual(
+            [first.granted, second.granted, third.granted, fresh.granted],
+            [60, 30, 20, 60],
+        )
+
+    async def test_dynamo_grant_is_conditional_on_the_remaining_budget(self) -> None:
+        table = MagicMock()
+        table.get_item.return_value = {"Item": {"window": "900", "used": 70}}
+        window = DynamoRequestWindow(table, clock=lambda: 1_000.0)
+
+        reservation = await window.reserve(60, 90)
+        await window.release(reservation, 5)
+
+        self.assertEqual(reservation, Reservation(900, 20))
+        update = table.update_item.call_args_list[0].kwargs
+        self.assertEqual(update["Key"], {"window": "900"})
+        self.assertEqual(update["ExpressionAttributeValues"][":ceiling"], 70)
+        release = table.update_item.call_args_list[1].kwargs
+        self.assertEqual(release["ExpressionAttributeValues"], {":unused": -5})
+
+    async def test_dynamo_window_already_spent_grants_nothing(self) -> None:
+        table = MagicMock()
+        table.get_item.return_value = {"Item": {"window": "900", "used": 90}}
+        window = DynamoRequestWindow(table, clock=lambda: 1_000.0)
+
+        reservation = await window.reserve(60, 90)
+
+        self.assertEqual(reservation.granted, 0)
+        table.update_item.assert_not_called()
+
+
+class TestSyncFanout(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = InMemorySyncRegistry()
+        self.queue = InMemorySyncQueue()
+        for athlete_id in range(1, 11):
+            await self.registry.save(_credentials(athlete_id))
+
+    def _fanout(self, sync_one, budget=100, concurrency=3, batch_size=4):
+        return SyncFanout(
+            self.registry,
+            self.queue,
+            sync_one,
+            RateBudget(budget),
+            concurrency=concurrency,
+            batch_size=batch_size,
+            clock=lambda: NOW,
+        )
+
+    async def test_syncs_all_due_athletes_with_bounded_concurrency(self) -> None:
+        sync_one = FakeSyncOne()
+
+        result = await self._fanout(sync_one).run_due(interval_seconds=3600)
+
+        self.assertEqual(sorted(result.synced), list(range(1, 11)))
+        self.assertEqual(result.new_activities, 20)
+        self.assertLessEqual(sync_one.peak, 3)
+
+    async def test_checkpoints_synced_athletes(self) -> None:
+        await self._fanout(FakeSyncOne()).run_due(interval_seconds=3600)
+
+        stored = await self.registry.get(1)
+        assert stored is not None
+        self.assertEqual(stored.last_synced_at, NOW)
+        self.assertEqual(stored.last_activity_date, NOW - timedelta(hours=1))
+        self.assertEqual(await self.registry.due(NOW, 3600), [])
+
+    async def test_overflow_beyond_budget_is_reenqueued(self) -> None:
+        sync_one = FakeSyncOne()
+
+        # Two requests per athlete: a budget of 6 admits three athletes.
+        result = await self._fanout(sync_one, budget=6).run_due(interval_seconds=3600)
+
+        self.assertEqual(len(result.synced), 3)
+        self.assertEqual(len(result.deferred), 7)
+        self.assertEqual(sorted(await self.queue.receive(10)), sorted(result.deferred))
+
+    async def test_failures_are_not_checkpointed(self) -> None:
+        result = await self._fanout(FakeSyncOne(fail_ids={4})).run_due(3600)
+
+        self.assertEqual(result.failed, [4])
+        due = await self.registry.due(NOW, 3600)
+        self.assertEqual([c.athlete_id for c in due], [4])
+
+    async def test_pending_streams_are_charged_one_request_each(self) -> None:
+        await self.registry.save(_credentials(1).with_pending([11, 12, 13]))
+        processed: list[int] = []
+
+        async def process_streams(credentials, activity_id):
+            processed.append(activity_id)
+
+        fanout = SyncFanout(
+            self.registry,
+            self.queue,
+            FakeSyncOne(),
+            RateBudget(4),
+            clock=lambda: NOW,
+            process_streams=process_streams,
+        )
+        result = await fanout.run_ids([1])
+
+        # Two requests for the sync leave two for streams.
+        self.assertEqual(processed, [11, 12])
+        stored = await self.registry.get(1)
+        assert stored is not None
+        self.assertEqual(stored.pending_streams, (13,))
+        self.assertEqual(result.deferred, [1])
+        self.assertEqual(await self.queue.receive(), [1])
+
+    async def test_run_ids_skips_unknown_and_recently_synced(self) -> None:
+        await self.registry.save(_credentials(2, last_synced_at=NOW))
+        sync_one = FakeSyncOne()
+
+        result = await self._fanout(sync_one).run_ids([1, 2, 99, 1], 3600)
+
+        self.assertEqual(sync_one.calls, [1])
+        self.assertEqual(result.synced, [1])
+
+
+class TestLocalWorker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = InMemorySyncRegistry()
+        self.queue = InMemorySyncQueue()
+        for athlete_id in range(1, 4):
+            await self.registry.save(_credentials(athlete_id))
+        self.stop = asyncio.Event()
+        self.sync_one = FakeSyncOne()
+
+    def _stopping_after(self, calls: int):
+        async def sync_one(credentials):
+            outcome = await self.sync_one(credentials)
+            if len(self.sync_one.calls) == calls:
+                self.stop.set()
+            return outcome
+
+        return sync_one
+
+    async def _run_worker(self, fanout: SyncFanout) -> None:
+        await asyncio.wait_for(
+            run_local_worker(fanout, self.queue, 3600, self.stop, poll_seconds=0.01),
+            timeout=5,
+        )
+
+    async def test_worker_syncs_due_and_skips_stale_queue_entries(self) -> None:
+        await self.queue.send([3])
+        fanout = SyncFanout(
+            self.registry, self.queue, self._stopping_after(3), RateBudget(100)
+        )
+
+        await self._run_worker(fanout)
+
+        # Athlete 3 was synced by the due pass, so its queue entry is a no-op.
+        self.assertEqual(sorted(self.sync_one.calls), [1, 2, 3])
+        self.assertEqual(self.queue.qsize(), 0)
+
+    async def test_worker_stops_draining_when_out_of_budget(self) -> None:
+        fanout = SyncFanout(
+            self.registry,
+            self.queue,
+            self._stopping_after(1),
+            RateBudget(2),
+            batch_size=1,
+        )
+
+        await self._run_worker(fanout)
+
+        self.assertEqual(self.sync_one.calls, [1])
+        self.assertEqual(self.queue.qsize(), 2)
+
+
+class TestSyncHandler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = InMemorySyncRegistry()
+        self.queue = InMemorySyncQueue()
+        self.repo = MagicMock()
+        self.repo.initialize = AsyncMock()
+        self.service = MagicMock()
+        self.service.activity_repo = self.repo
+        self.service.sync_registry = self.registry
+        self.service.sync_athlete = FakeSyncOne(fail_ids={2})
+        self.window = InMemoryRequestWindow()
+        for athlete_id in (1, 2, 3):
+            await self.registry.save(_credentials(athlete_id))
+
+    async def test_scheduled_event_syncs_due_athletes(self) -> None:
+        event = {"source": "aws.events", "detail-type": "Scheduled Event"}
+
+        result = await handle_event(event, self.service, self.queue, self.window)
+
+        self.repo.initialize.assert_awaited_once()
+        self.assertEqual(sorted(result["synced"]), [1, 3])
+        self.assertEqual(result["failed"], [2])
+        self.assertNotIn("batchItemFailures", result)
+
+    async def test_sqs_event_reports_failed_records(self) -> None:
+        event = {
+            "Records": [
+                {
+                    "messageId": "m1",
+                    "eventSource": "aws:sqs",
+                    "body": json.dumps({"athlete_ids": [1]}),
+                },
+                {
+                    "messageId": "m2",
+                    "eventSource": "aws:sqs",
+                    "body": json.dumps({"athlete_ids": [2, 3]}),
+                },
+            ]
+        }
+
+        result = await handle_event(event, self.service, self.queue, self.window)
+
+        self.assertEqual(result["batchItemFailures"], [{"itemIdentifier": "m2"}])
+
+    async def test_invocations_share_the_request_budget(self) -> None:
+        event = {"source": "aws.events", "detail-type": "Scheduled Event"}
+        # Another invocation already spent most of this window.
+        await self.window.reserve(86, 90)
+
+        result = await handle_event(event, self.service, self.queue, self.window)
+
+        self.assertEqual(len(result["synced"]) + len(result["failed"]), 2)
+        self.assertEqual(len(result["deferred"]), 1)
+        self.assertEqual(self.queue.qsize(), 1)
+
+
+class TestStravaServiceBackgroundSync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.patcher = patch("src.strava.strava_client.Client")
+        self.MockClient = self.patcher.start()
+        self.registry = InMemorySyncRegistry()
+        self.repo = MagicMock()
+        self.repo.is_activity_synced.return_value = False
+        self.repo.insert_activity = AsyncMock(return_value=True)
+        self.service = StravaService(self.repo, sync_registry=self.registry)
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+
+    async def test_authenticate_registers_athlete(self) -> None:
+        athlete = MagicMock()
+        athlete.id = 77
+        client = create_autospec(Client, instance=True)
+        exchange = client.exchange_code_for_token
+        with patch.object(self.service, "client", client):
+            exchange.return_value = (
+                {"access_token": "a", "refresh_token": "r", "expires_at": 123},
+                athlete,
+            )
+            await self.service.authenticate_and_store("session", "code")
+
+        stored = await self.registry.get(77)
+        assert stored is not None
+        self.assertEqual(stored.refresh_token, "r")
+        _, kwargs = exchange.call_args
+        self.assertTrue(kwargs["return_athlete"])
+
+    async def test_sync_athlete_refreshes_expired_token(self) -> None:
+        refresh_client = MagicMock()
+        refresh_client.refresh_access_token.return_value = {
+            "access_token": "new-access",
+            "refresh_token": "new-refresh",
+            "expires_at": 2_000_000_000,
+        }
+        sync_client = MagicMock()
+        sync_client.get_activities.return_value = []
+        self.MockClient.side_effect = [refresh_client, sync_client]
+        credentials = AthleteCredentials(77, "old", "old-refresh", expires_at=0)
+
+        outcome = await self.service.sync_athlete(credentials)
+
+        self.assertEqual(outcome.credentials.access_token, "new-access")
+        self.MockClient.assert_called_with(access_token="new-access")
+
+    async def test_sync_athlete_uses_athlete_checkpoint(self) -> None:
+        activity = MagicMock()
+        activity.id = 5
+        activity.start_date = NOW
+        sync_client = MagicMock()
+        sync_client.get_activities.return_value = [activity]
+        self.MockClient.return_value = sync_client
+        checkpoint = NOW - timedelta(days=3)
+        credentials = AthleteCredentials(
+            77, "a", "r", expires_at=2_000_000_000, last_activity_date=checkpoint
+        )
+
+        outcome = await self.service.sync_athlete(credentials)
+
+        sync_client.get_activities.assert_called_once_with(after=checkpoint)
+        self.assertEqual(outcome.new_activities, 1)
+        self.assertEqual(outcome.last_activity_date, NOW)
+
+    async def test_sync_athlete_leaves_new_runs_streams_pending(self) -> None:
+        sync_client = MagicMock()
+        sync_client.get_activities.return_value = [make_activity(5, NOW)]
+        self.MockClient.return_value = sync_client
+
+        outcome = await self.service.sync_athlete(
+            AthleteCredentials(7, "a", "r", expires_at=2_000_000_000)
+        )
+
+        sync_client.get_activity_streams.assert_not_called()
+        self.assertEqual(outcome.credentials.pending_streams, (5,))
+
+    async def test_sync_run_streams_processes_the_stored_run(self) -> None:
+        run = make_activity(5, NOW)
+        self.repo.get_activity = AsyncMock(return_value=run)
+        credentials = AthleteCredentials(7, "a", "r", expires_at=2_000_000_000)
+
+        with patch.object(self.service, "_process_run_streams", AsyncMock()) as process:
+            await self.service.sync_run_streams(credentials, 5)
+
+        self.MockClient.assert_called_with(access_token="a")
+        process.assert_awaited_once_with(self.MockClient.return_value, run)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.database.sync_notifications import (
+    CHANNEL,
+    SyncStateListener,
+    notify_params,
+    parse_payload,
+)
+
+
+class TestPayload(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        start = datetime(2024, 1, 15, 8, 0, tzinfo=timezone.utc)
+        params = notify_params(42, start, 9)
+
+        self.assertEqual(params["channel"], CHANNEL)
+        self.assertEqual(parse_payload(params["payload"]), (42, start, 9))
+        self.assertEqual(
+            parse_payload(notify_params(7, None)["payload"]), (7, None, None)
+        )
+
+
+class TestSyncStateListener(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.service = MagicMock()
+        self.service.reload_sync_state = AsyncMock()
+        self.conn = AsyncMock()
+        self.conn.add_termination_listener = MagicMock()
+        self.conn.is_closed = MagicMock(return_value=False)
+        self.listener = SyncStateListener(
+            "postgresql://u:p@db/rc", self.service, reconnect_delay=0
+        )
+
+    async def test_notifications_update_service(self) -> None:
+        with patch("asyncpg.connect", AsyncMock(return_value=self.conn)):
+            await self.listener.start()
+        callback = self.conn.add_listener.await_args.args[1]
+
+        callback(self.conn, 1, CHANNEL, notify_params(42, None, 9)["payload"])
+        with self.assertLogs("src.database.sync_notifications", "WARNING"):
+            callback(self.conn, 1, CHANNEL, "not json")
+
+        self.service.apply_synced_activity.assert_called_once_with(42, None, 9)
+
+    async def test_reconnect_reloads_missed_state(self) -> None:
+        connect = AsyncMock(side_effect=[self.conn, OSError("down"), self.conn])
+        with patch("asyncpg.connect", connect):
+            await self.listener.start()
+            with self.assertLogs("src.database.sync_notifications", "WARNING"):
+                self.listener._on_termination(self.conn)
+                assert self.listener._reconnect_task is not None
+                await self.listener._reconnect_task
+
+        self.assertEqual(connect.await_count, 3)
+        self.service.reload_sync_state.assert_awaited_once()
+
+        await self.listener.stop()
+        self.conn.close.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+import asyncio
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.database.dynamo_service import DynamoService
+from src.middleware import TracingMiddleware
+from src.observability.tracing import (
+    NOOP_SPAN,
+    ConsoleSpanExporter,
+    FileSpanExporter,
+    InMemorySpanExporter,
+    Tracer,
+    configure_tracing,
+    inject,
+    parse_traceparent,
+    set_tracer,
+    span,
+)
+from src.sync import InMemorySyncQueue, InMemorySyncRegistry
+from src.sync.queue import SQSSyncQueue
+from src.sync.window import InMemoryRequestWindow
+from src.sync_handler import handle_event
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.exporter = InMemorySpanExporter()
+        set_tracer(Tracer(self.exporter))
+
+    def tearDown(self) -> None:
+        set_tracer(None)
+
+    def by_name(self, name: str):
+        return next(s for s in self.exporter.spans if s.name == name)
+
+
+class TestTraceparent(unittest.TestCase):
+    def test_parse_valid_header(self) -> None:
+        parsed = parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01")
+
+        self.assertEqual(parsed, (int(TRACE_ID, 16), int(PARENT_ID, 16), True))
+
+    def test_rejects_invalid_headers(self) -> None:
+        self.assertIsNone(parse_traceparent("garbage"))
+        self.assertIsNone(parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01"))
+        self.assertIsNone(parse_traceparent(None))
+
+
+class TestSpans(TracingTestCase):
+    def test_disabled_tracing_yields_noop_span(self) -> None:
+        set_tracer(None)
+
+        with span("anything") as active:
+            active.set_attribute("ignored", 1)
+
+        self.assertIs(active, NOOP_SPAN)
+        self.assertEqual(NOOP_SPAN.attributes, {})
+
+    def test_children_share_trace_and_parent(self) -> None:
+        with span("parent") as parent, span("child", {"rows": 3}):
+            pass
+
+        child = self.by_name("child")
+        self.assertEqual(child.trace_id, parent.trace_id)
+        self.assertEqual(child.parent_id, parent.span_id)
+        self.assertEqual(child.attributes, {"rows": 3})
+        self.assertEqual([s.name for s in self.exporter.spans], ["child", "parent"])
+
+    def test_context_follows_to_thread(self) -> None:
+        async def run() -> None:
+            with span("request"):
+                await asyncio.to_thread(self._in_thread)
+
+        asyncio.run(run())
+
+        self.assertEqual(
+            self.by_name("thread").parent_id, self.by_name("request").span_id
+        )
+
+    def _in_thread(self) -> None:
+        with span("thread"):
+            pass
+
+    def test_remote_parent_continues_trace(self) -> None:
+        with span("server", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01") as server:
+            headers: dict[str, str] = {}
+            inject(headers)
+
+        self.assertEqual(f"{server.trace_id:032x}", TRACE_ID)
+        self.assertEqual(f"{server.parent_id:016x}", PARENT_ID)
+        self.assertTrue(headers["traceparent"].startswith(f"00-{TRACE_ID}-"))
+
+    def test_unsampled_remote_parent_is_not_exported(self) -> None:
+        with (
+            span("server", traceparent=f"00-{TRACE_ID}-{PARENT_ID}-00"),
+            span("child"),
+        ):
+            pass
+
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_sample_ratio_zero_records_nothing(self) -> None:
+        set_tracer(Tracer(self.exporter, sample_ratio=0.0))
+
+        with span("root"):
+            pass
+
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_errors_mark_span(self) -> None:
+        with self.assertRaises(RuntimeError), span("failing"):
+            raise RuntimeError("boom")
+
+        failing = self.by_name("failing")
+        self.assertEqual(failing.status, "ERROR")
+        self.assertEqual(failing.attributes["exception.message"], "boom")
+
+
+class TestExporters(unittest.TestCase):
+    def tearDown(self) -> None:
+        set_tracer(None)
+
+    def test_file_exporter_writes_json_lines(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "spans.jsonl"
+            set_tracer(Tracer(FileSpanExporter(path)))
+            with span("one"), span("two"):
+                pass
+
+            records = [json.loads(line) for line in path.read_text().splitlines()]
+
+        self.assertEqual([r["name"] for r in records], ["two", "one"])
+        self.assertEqual(records[0]["parentSpanId"], records[1]["spanId"])
+
+    def test_console_exporter(self) -> None:
+        stream = io.StringIO()
+        set_tracer(Tracer(ConsoleSpanExporter(stream)))
+
+        with span("printed"):
+            pass
+
+        self.assertEqual(json.loads(stream.getvalue())["name"], "printed")
+
+    def test_configure_rejects_unknown_exporter(self) -> None:
+        with self.assertRaises(ValueError):
+            configure_tracing("zipkin")
+        self.assertIsNone(configure_tracing("none"))
+
+
+class TestTracingMiddleware(TracingTestCase):
+    def test_server_span_named_after_route(self) -> None:
+        app = FastAPI()
+        app.add_middleware(TracingMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            with span("work"):
+                return {"id": item_id}
+
+        TestClient(app).get(
+            "/items/7", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+
+        server = self.by_name("GET /items/{item_id}")
+        self.assertEqual(f"{server.trace_id:032x}", TRACE_ID)
+        self.assertEqual(server.attributes["http.response.status_code"], 200)
+        self.assertEqual(self.by_name("work").parent_id, server.span_id)
+
+
+class TestRepositorySpans(TracingTestCase):
+    def test_dynamo_scan_records_rows_and_bytes(self) -> None:
+        table = MagicMock()
+        table.scan.return_value = {
+            "Items": [
+                {"strava_id": "1", "strava_response": '{"id": 1}', "athlete_id": "7"},
+                {"strava_id": "2", "strava_response": '{"id": 2}', "athlete_id": "7"},
+            ]
+        }
+
+        asyncio.run(DynamoService(table).get_activities(7))
+
+        scan = self.by_name("dynamo.get_activities")
+        self.assertEqual(scan.attributes["db.response.returned_rows"], 2)
+        self.assertEqual(scan.attributes["db.response.bytes_read"], 18)
+        self.assertEqual(scan.attributes["dynamodb.page_count"], 1)
+        self.assertEqual(
+            self.by_name("activities.parse").attributes["activity.parsed"], 2
+        )
+
+
+class TestSyncQueuePropagation(TracingTestCase):
+    def test_queued_sync_continues_the_enqueuing_trace(self) -> None:
+        client = MagicMock()
+        with span("sync.scheduled") as sender:
+            asyncio.run(SQSSyncQueue(client, "https://sqs/queue").send([1]))
+        (entry,) = client.send_message_batch.call_args.kwargs["Entries"]
+        traceparent = entry["MessageAttributes"]["traceparent"]["StringValue"]
+        service = MagicMock()
+        service.activity_repo.initialize = AsyncMock()
+        service.sync_registry = InMemorySyncRegistry()
+        event = {
+            "Records": [
+                {
+                    "messageId": "m1",
+                    "eventSource": "aws:sqs",
+                    "body": json.dumps({"athlete_ids": [1]}),
+                    "messageAttributes": {
+                        "traceparent": {
+                            "stringValue": traceparent,
+                            "dataType": "String",
+                        }
+                    },
+                }
+            ]
+        }
+
+        asyncio.run(
+            handle_event(event, service, InMemorySyncQueue(), InMemoryRequestWindow())
+        )
+
+        worker = self.by_name("sync.queued")
+        self.assertEqual(worker.trace_id, sender.trace_id)
+        self.assertEqual(worker.parent_id, sender.span_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import time
+import unittest
+from datetime import date, timedelta
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+from stravalib.model import SummaryActivity
+
+from src.analytics.training_load import (
+    ATL_DAYS,
+    CTL_DAYS,
+    TrainingLoad,
+    TrainingLoadEngine,
+    ewma,
+    smoothing,
+)
+from src.database.activity_repository import SyncState, activity_digest
+from src.strava.strava_client import StravaService
+from tests.factories import make_activity
+
+# An hour at a relative effort of 50 unless the test says otherwise.
+_activity = partial(make_activity, moving_time=3600, suffer_score=50)
+
+
+def _naive_ewma(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    out = []
+    previous = initial
+    for value in values:
+        previous += alpha * (value - previous)
+        out.append(previous)
+    return np.array(out)
+
+
+class TestSeries(unittest.TestCase):
+    def test_ewma_matches_recurrence_across_blocks(self) -> None:
+        values = np.random.default_rng(1).uniform(0, 200, 3650)
+        for days in (ATL_DAYS, CTL_DAYS):
+            alpha = smoothing(days)
+            np.testing.assert_allclose(
+                ewma(values, alpha, 12.5), _naive_ewma(values, alpha, 12.5), rtol=1e-9
+            )
+
+    def test_loads_fall_back_to_moving_minutes(self) -> None:
+        series = TrainingLoad.from_activities(
+            [
+                _activity(1, date(2024, 1, 1)),
+                _activity(2, date(2024, 1, 1), suffer_score=None),
+                _activity(3, date(2024, 1, 4)),
+            ]
+        )
+
+        assert series is not None
+        self.assertEqual(series.load.tolist(), [110.0, 0.0, 0.0, 50.0])
+        self.assertAlmostEqual(series.atl[0], 110.0 * smoothing(ATL_DAYS))
+        np.testing.assert_allclose(series.tsb, series.ctl - series.atl)
+
+    def test_incremental_add_matches_full_recompute(self) -> None:
+        start = date(2015, 1, 1)
+        activities = [_activity(i, start + timedelta(days=i * 3)) for i in range(1200)]
+        series = TrainingLoad.from_activities(activities[:-1])
+        assert series is not None
+
+        late = activities[-1]
+        recomputed = series.add(start + timedelta(days=3597), 50.0)
+        early = series.add(start + timedelta(days=3000), 20.0)
+        before = series.add(start - timedelta(days=2), 30.0)
+
+        expected = TrainingLoad.from_activities(
+            [
+                *activities[:-1],
+                late,
+                _activity(9001, start + timedelta(days=3000), suffer_score=20),
+                _activity(9002, start - timedelta(days=2), suffer_score=30),
+            ]
+        )
+        assert expected is not None
+        self.assertEqual(recomputed, 3)  # two rest days, then the new one
+        self.assertEqual(early, 598)
+        self.assertEqual(before, len(series.load))
+        self.assertEqual(series.origin, expected.origin)
+        np.testing.assert_allclose(series.ctl, expected.ctl)
+        np.testing.assert_allclose(series.atl, expected.atl)
+
+    def test_extend_to_decays_through_rest_days(self) -> None:
+        series = TrainingLoad.from_activities([_activity(1, date(2024, 1, 1))])
+        assert series is not None
+
+        self.assertEqual(series.extend_to(date(2024, 1, 11)), 10)
+        self.assertEqual(series.extend_to(date(2024, 1, 5)), 0)
+        self.assertEqual(len(series.load), 11)
+        self.assertLess(series.atl[-1], series.atl[0])
+        window = series.window(date(2024, 1, 10), date(2024, 2, 1))
+        self.assertEqual(window["start"], date(2024, 1, 10))
+        self.assertEqual(len(window["ctl"]), 2)
+
+    def test_ten_year_history_computes_quickly(self) -> None:
+        loads = np.random.default_rng(2).uniform(0, 150, 3653)
+        series = TrainingLoad(date(2015, 1, 1), loads, np.empty(0), np.empty(0))
+
+        started = time.perf_counter()
+        series._recompute(0)
+        self.assertLess(time.perf_counter() - started, 0.05)
+
+
+class TestEngine(unittest.IsolatedAsyncioTestCase):
+    def _engine(self, activities: list[SummaryActivity]):
+        repository = MagicMock()
+        self._store(repository, activities)
+
+        async def history(athlete_id: int) -> list[SummaryActivity]:
+            return [a for a in repository.activities if a.athlete.id == athlete_id]
+
+        repository.get_activity_history = AsyncMock(side_effect=history)
+        return TrainingLoadEngine(repository), repository
+
+    @staticmethod
+    def _store(repository: MagicMock, activities: list[SummaryActivity]) -> None:
+        digest = 0
+        for activity in activities:
+            assert activity.id is not None
+            digest ^= activity_digest(activity.id)
+        repository.activities = activities
+        repository.get_sync_state.return_value = SyncState(
+            None, len(activities), digest, None
+        )
+
+    async def test_series_are_cached_per_athlete(self) -> None:
+        engine, repository = self._engine(
+            [
+                _activity(1, date(2024, 1, 1)),
+                _activity(2, date(2024, 1, 2), athlete_id=8),
+            ]
+        )
+
+        series = await engine.get(7, date(2024, 1, 3))
+        again = await engine.get(7, date(2024, 1, 3))
+        other = await engine.get(8, date(2024, 1, 3))
+
+        assert series is not None and other is not None
+        self.assertIs(again, series)
+        self.assertEqual(series.load.tolist(), [50.0, 0.0, 0.0])
+        self.assertEqual(other.origin, date(2024, 1, 2))
+        self.assertIsNone(await engine.get(9, date(2024, 1, 3)))
+        self.assertEqual(
+            [c.args for c in repository.get_activity_history.await_args_list],
+            [(7,), (8,), (9,)],
+        )
+
+    async def test_recorded_insert_updates_without_reload(self) -> None:
+        first = _activity(1, date(2024, 1, 1))
+        other = _activity(3, date(2024, 1, 1), athlete_id=8)
+        engine, repository = self._engine([first, other])
+        await engine.get(7, date(2024, 1, 1))
+        await engine.get(8, date(2024, 1, 1))
+
+        second = _activity(2, date(2024, 1, 3))
+        self._store(repository, [first, other, second])
+        engine.record(second)
+        series = await engine.get(7, date(2024, 1, 3))
+        await engine.get(8, date(2024, 1, 3))
+
+        assert series is not None
+        self.assertEqual(series.load.tolist(), [50.0, 0.0, 50.0])
+        self.assertEqual(repository.get_activity_history.await_count, 2)
+
+    async def test_unrecorded_insert_reloads_only_the_requester(self) -> None:
+        engine, repository = self._engine(
+            [
+                _activity(1, date(2024, 1, 1)),
+                _activity(3, date(2024, 1, 1), athlete_id=8),
+            ]
+        )
+        await engine.get(7, date(2024, 1, 1))
+        await engine.get(8, date(2024, 1, 1))
+
+        self._store(
+            repository, [*repository.activities, _activity(2, date(2024, 1, 2))]
+        )
+        series = await engine.get(7, date(2024, 1, 2))
+
+        assert series is not None
+        self.assertEqual(series.load.tolist(), [50.0, 50.0])
+        self.assertEqual(
+            [c.args for c in repository.get_activity_history.await_args_list],
+            [(7,), (8,), (7,)],
+        )
+
+    async def test_service_skips_sessions_without_an_athlete(self) -> None:
+        service = StravaService(MagicMock())
+
+        self.assertIsNone(await service.read_training_load(None, date(2024, 1, 1)))
+        self.assertIsNone(service.training_load)
+
+
+if __name__ == "__main__":
+    unittest.main()